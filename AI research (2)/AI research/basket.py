@@ -0,0 +1,415 @@
+"""
+Split‑Basket Solver for Cost‑to‑Finish
+======================================
+
+Given the cards still missing from a deck and prices from several
+markets, find the cheapest way to buy them when each card may come from
+a different market.  Markets charge a flat shipping fee per order,
+waived once the order subtotal reaches a free‑shipping threshold, so the
+cheapest basket is not simply "each card at its cheapest market".
+
+All prices must already be in one currency (see ``normalise_prices``).
+
+Method
+------
+
+Small instances – at most ``EXACT_ASSIGNMENTS`` ways to place the cards
+that more than one market sells – are solved exactly by scoring every
+assignment at once, as a ``assignments × markets`` subtotal array.
+
+Otherwise the solver is a bounded‑gap heuristic.  The markets actually used form a subset ``S``.  For a fixed ``S``, the
+item cost is minimised by buying every card at its cheapest market in
+``S``; with at most ~16 markets every subset is enumerated, and the
+per‑subset minima are built one market at a time so the whole table is
+``M`` vectorised ``minimum`` operations over a ``2^M × cards`` array.
+
+Shipping is then charged per used market below its threshold.  Each
+subset also gets a lower bound (its item minimum plus, per market, the
+cheaper of shipping and a bound on the cost of reaching free shipping).
+Subsets are refined in lower‑bound order – a greedy top‑up moves cards
+into a market when reaching its threshold saves more than the moves
+cost – until no remaining subset can beat the best basket, then the
+winner is polished with single‑card moves.  The smallest lower bound
+is reported with the basket: the total is within ``gap`` of the optimum
+and ``gap == 0`` proves it optimal.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAX_MARKETS = 16
+# Enumerate every assignment when there are at most this many.
+EXACT_ASSIGNMENTS = 1 << 16
+
+
+class Shipping(NamedTuple):
+    """Flat shipping per order; free once the subtotal reaches ``free_over``."""
+
+    cost: float = 0.0
+    free_over: Optional[float] = None
+
+
+def normalise_prices(
+    price_table: Mapping[str, Mapping[str, float]],
+    currencies: Mapping[str, str],
+    fx_to_gbp: Mapping[str, float],
+    shipping: Optional[Mapping[str, Shipping]] = None,
+) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Shipping]]:
+    """Convert every market's prices and shipping terms to GBP.
+
+    Markets whose currency has no rate in ``fx_to_gbp`` are dropped
+    rather than compared at face value.
+    """
+    prices: Dict[str, Dict[str, float]] = {}
+    terms: Dict[str, Shipping] = {}
+    for market, table in price_table.items():
+        rate = fx_to_gbp.get(currencies.get(market, "GBP"))
+        if rate is None:
+            continue
+        prices[market] = {name: float(price) * rate for name, price in table.items() if price is not None}
+        ship = (shipping or {}).get(market, Shipping())
+        terms[market] = Shipping(
+            ship.cost * rate,
+            None if ship.free_over is None else ship.free_over * rate,
+        )
+    return prices, terms
+
+
+def _subset_minima(costs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Cheapest line cost and its market for every non‑empty market subset."""
+    n, m = costs.shape
+    best = np.full((1 << m, n), np.inf)
+    where = np.zeros((1 << m, n), dtype=np.int8)
+    for b in range(m):
+        lo, hi = 1 << b, 2 << b
+        # Subsets whose highest market is b extend the subsets below them.
+        take = costs[:, b] < best[:lo]
+        best[lo:hi] = np.where(take, costs[:, b], best[:lo])
+        where[lo:hi] = np.where(take, b, where[:lo])
+    return best, where
+
+
+def _subset_lower_bounds(
+    costs: np.ndarray,
+    best: np.ndarray,
+    where: np.ndarray,
+    subtotals: np.ndarray,
+    membership: np.ndarray,
+    ship: np.ndarray,
+    free_over: np.ndarray,
+    items: np.ndarray,
+) -> np.ndarray:
+    """Lower bound on any basket that uses exactly each subset of markets.
+
+    Every used market either pays shipping or reaches its threshold.
+    Reaching it means moving cards in from their cheapest market in the
+    subset, which costs at least the deficit times the smallest
+    extra‑cost‑per‑unit‑of‑subtotal ratio among the cards that could
+    move; cards move to one market each, so these bounds add up.
+    """
+    lower = items.copy()
+    finite = np.isfinite(costs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for k in range(costs.shape[1]):
+            in_subset = membership[:, k]
+            if not math.isfinite(free_over[k]) or costs[finite[:, k], k].sum() < free_over[k]:
+                lower += in_subset * ship[k]
+                continue
+            # min (c_k - best) / c_k == 1 - max best / c_k over cards not
+            # already at k; cards k does not sell have 1 / c_k == 0.
+            share = best * np.where(finite[:, k], 1.0 / costs[:, k], 0.0)
+            share *= where != k
+            ratio = 1.0 - share.max(axis=1)
+            deficit = free_over[k] - subtotals[:, k]
+            extra = np.where(deficit > 0, deficit * ratio, 0.0)
+            lower += in_subset * np.minimum(ship[k], extra)
+    # Subsets that cannot supply every card (items is inf) give NaNs above.
+    lower[~np.isfinite(items)] = np.inf
+    return lower
+
+
+class _Costing:
+    def __init__(self, costs: np.ndarray, ship: np.ndarray, free_over: np.ndarray):
+        self.costs = costs
+        self.ship = ship
+        self.free_over = free_over
+        self.rows = np.arange(costs.shape[0])
+        self.m = costs.shape[1]
+
+    def subtotals(self, assign: np.ndarray) -> np.ndarray:
+        return np.bincount(assign, weights=self.costs[self.rows, assign], minlength=self.m)
+
+    def charged(self, assign: np.ndarray, subtotals: np.ndarray) -> np.ndarray:
+        used = np.bincount(assign, minlength=self.m) > 0
+        return used & (subtotals < self.free_over)
+
+    def total(self, assign: np.ndarray) -> float:
+        subtotals = self.subtotals(assign)
+        return float(subtotals.sum() + self.ship[self.charged(assign, subtotals)].sum())
+
+    def exhaustive(self, limit: int) -> Optional[np.ndarray]:
+        """Cheapest assignment by scoring all of them, or None if there are more than ``limit``."""
+        options = [np.flatnonzero(np.isfinite(row)) for row in self.costs]
+        free = [i for i, opts in enumerate(options) if len(opts) > 1]
+        combos = 1
+        for i in free:
+            combos *= len(options[i])
+            if combos > limit:
+                return None
+        base = np.array([opts[0] for opts in options], dtype=np.intp)
+        if not free:
+            return base
+        fixed = self.costs[self.rows, base]
+        fixed[free] = 0.0
+        # Assignment a picks option (a // stride) % size for each free card.
+        sizes = np.array([len(options[i]) for i in free], dtype=np.intp)
+        table = np.zeros((len(free), int(sizes.max(initial=1))), dtype=np.intp)
+        for j, i in enumerate(free):
+            table[j, :sizes[j]] = options[i]
+        strides = np.cumprod(np.concatenate(([1], sizes[:-1]))).astype(np.intp)
+        digits = (np.arange(combos)[:, None] // strides) % sizes
+        picks = table[np.arange(len(free)), digits]
+        cells = (np.arange(combos)[:, None] * self.m + picks).ravel()
+        line = self.costs[np.array(free, dtype=np.intp), picks]
+        subtotals = np.bincount(cells, weights=line.ravel(), minlength=combos * self.m).reshape(combos, self.m)
+        subtotals += np.bincount(base, weights=fixed, minlength=self.m)
+        counts = np.bincount(cells, minlength=combos * self.m).reshape(combos, self.m)
+        counts += np.bincount(np.delete(base, free), minlength=self.m)
+        charged = (counts > 0) & (subtotals < self.free_over)
+        best = int(np.argmin(subtotals.sum(axis=1) + (charged * self.ship).sum(axis=1)))
+        base[free] = picks[best]
+        return base
+
+    def top_up(self, assign: np.ndarray) -> np.ndarray:
+        """Move cards into markets just short of free shipping while it pays."""
+        total = self.total(assign)
+        improved = True
+        while improved:
+            improved = False
+            subtotals = self.subtotals(assign)
+            best_trial, best_total = assign, total
+            for market in np.flatnonzero(self.charged(assign, subtotals)):
+                moved = self._cover(assign, market, self.free_over[market] - subtotals[market])
+                if moved is None:
+                    continue
+                trial = assign.copy()
+                trial[moved] = market
+                trial_total = self.total(trial)
+                if trial_total < best_total - 1e-9:
+                    best_trial, best_total = trial, trial_total
+            if best_total < total - 1e-9:
+                assign, total, improved = best_trial, best_total, True
+        return assign
+
+    def _cover(self, assign: np.ndarray, market: int, deficit: float) -> Optional[np.ndarray]:
+        """Cheap set of cards to move into ``market`` to add ``deficit`` to its subtotal.
+
+        Greedy by extra cost per unit of subtotal, where any prefix may be
+        completed by the single cheapest card that covers the rest
+        (the usual knapsack‑cover refinement), then cards that turn out
+        not to be needed are dropped again.
+        """
+        rows = np.flatnonzero((assign != market) & np.isfinite(self.costs[:, market]))
+        if not len(rows):
+            return None
+        gain = self.costs[rows, market]
+        penalty = gain - self.costs[rows, assign[rows]]
+        order = np.argsort(penalty / np.maximum(gain, 1e-9), kind="stable")
+        rows, gain, penalty = rows[order], gain[order], penalty[order]
+        gained = np.concatenate(([0.0], np.cumsum(gain)))
+        paid = np.concatenate(([0.0], np.cumsum(penalty)))
+        stop = int(np.searchsorted(gained, deficit))
+        if stop > len(rows):
+            return None
+        best_cost, best_set = paid[stop], rows[:stop]
+        for k in range(stop):
+            covers = np.flatnonzero(gain[k:] >= deficit - gained[k])
+            if len(covers):
+                j = k + covers[np.argmin(penalty[k:][covers])]
+                if paid[k] + penalty[j] < best_cost:
+                    best_cost, best_set = paid[k] + penalty[j], np.append(rows[:k], rows[j])
+        # Drop the dearest moves the cover can do without.
+        keep = list(best_set)
+        extra = sum(self.costs[i, market] for i in keep) - deficit
+        for i in sorted(keep, key=lambda i: self.costs[i, market] - self.costs[i, assign[i]], reverse=True):
+            if self.costs[i, market] <= extra:
+                keep.remove(i)
+                extra -= self.costs[i, market]
+        return np.array(keep, dtype=np.intp)
+
+    def local_search(self, assign: np.ndarray) -> np.ndarray:
+        """Single‑card moves (with exact shipping deltas) until none helps."""
+        costs = self.costs.tolist()
+        ship = self.ship.tolist()
+        free_over = self.free_over.tolist()
+        assign = assign.tolist()
+        subtotal = self.subtotals(np.array(assign, dtype=np.intp)).tolist()
+        count = np.bincount(assign, minlength=self.m).tolist()
+
+        def shipping(k: int, sub: float, cnt: int) -> float:
+            return ship[k] if cnt and sub < free_over[k] else 0.0
+
+        improved = True
+        while improved:
+            improved = False
+            for i, row in enumerate(costs):
+                a = assign[i]
+                leave = shipping(a, subtotal[a] - row[a], count[a] - 1) - shipping(a, subtotal[a], count[a])
+                best_delta, best_b = -1e-9, -1
+                for b, cost in enumerate(row):
+                    if b == a or cost == math.inf:
+                        continue
+                    delta = (cost - row[a] + leave
+                             + shipping(b, subtotal[b] + cost, count[b] + 1) - shipping(b, subtotal[b], count[b]))
+                    if delta < best_delta:
+                        best_delta, best_b = delta, b
+                if best_b >= 0:
+                    subtotal[a] -= row[a]
+                    count[a] -= 1
+                    subtotal[best_b] += row[best_b]
+                    count[best_b] += 1
+                    assign[i] = best_b
+                    improved = True
+        return np.array(assign, dtype=np.intp)
+
+
+def _branch_and_bound(costing: _Costing, refine: int) -> Tuple[np.ndarray, float, float]:
+    """Best assignment found over market subsets, its total and a lower bound."""
+    costs, ship, free_over = costing.costs, costing.ship, costing.free_over
+    best, where = _subset_minima(costs)
+    items = best.sum(axis=1)
+    m = costing.m
+    membership = ((np.arange(1 << m)[:, None] >> np.arange(m)) & 1).astype(bool)
+    subtotals = np.zeros((1 << m, m))
+    used = np.zeros((1 << m, m), dtype=bool)
+    for k in range(m):
+        at_k = where == k
+        subtotals[:, k] = np.where(at_k, best, 0.0).sum(axis=1)
+        used[:, k] = at_k.any(axis=1)
+    totals = items + ((used & (subtotals < free_over)) * ship).sum(axis=1)
+    totals[0] = np.inf
+    lower = _subset_lower_bounds(costs, best, where, subtotals, membership, ship, free_over, items)
+
+    # Branch and bound over subsets: refine in order of lower bound until
+    # no remaining subset can beat the incumbent.
+    first = int(np.argmin(totals))
+    best_assign = where[first].astype(np.intp)
+    best_total = float(totals[first])
+    for subset in np.lexsort((totals, lower))[:max(1, refine)].tolist():
+        if lower[subset] >= best_total - 1e-9:
+            break
+        assign = costing.top_up(where[subset].astype(np.intp))
+        total = costing.total(assign)
+        if total < best_total - 1e-9:
+            best_assign, best_total = assign, total
+    best_assign = costing.local_search(best_assign)
+    best_total = costing.total(best_assign)
+    lower_bound = min(best_total, float(lower.min()))
+    return best_assign, best_total, lower_bound
+
+
+def solve_basket(
+    cards: Sequence[Tuple[str, int]],
+    prices: Mapping[str, Mapping[str, float]],
+    shipping: Optional[Mapping[str, Shipping]] = None,
+    refine: int = 64,
+) -> Dict[str, object]:
+    """Cheapest split basket for ``cards`` (``(name, qty)`` pairs).
+
+    ``prices`` and ``shipping`` must share one currency.  Each card is
+    bought whole from one market.  Cards with no price anywhere are
+    listed under ``unpriced`` and excluded from the totals.  Instances
+    with at most ``EXACT_ASSIGNMENTS`` assignments are solved exactly;
+    larger ones are a bounded‑gap heuristic whose ``total`` is within the
+    reported ``gap`` of the optimum.  ``refine`` caps how many market
+    subsets are refined before settling for that gap.
+    """
+    markets = list(prices)
+    if len(markets) > MAX_MARKETS:
+        raise ValueError(f"solve_basket supports at most {MAX_MARKETS} markets")
+    shipping = shipping or {}
+    names = [name for name, _qty in cards]
+    qty = np.array([q for _name, q in cards], dtype=np.float64)
+    unit = np.array(
+        [[prices[m].get(name, np.inf) for m in markets] for name in names], dtype=np.float64
+    ).reshape(len(names), len(markets))
+    priced = np.isfinite(unit).any(axis=1) if markets else np.zeros(len(names), dtype=bool)
+    unpriced = [name for name, ok in zip(names, priced.tolist()) if not ok]
+    names = [name for name, ok in zip(names, priced.tolist()) if ok]
+    unit, qty = unit[priced], qty[priced]
+
+    result: Dict[str, object] = {
+        "lines": [],
+        "markets": [],
+        "items_total": 0.0,
+        "shipping_total": 0.0,
+        "total": 0.0,
+        "lower_bound": 0.0,
+        "gap": 0.0,
+        "optimal": True,
+        "unpriced": unpriced,
+    }
+    if not names:
+        return result
+
+    costs = unit * qty[:, None]
+    ship = np.array([shipping.get(m, Shipping()).cost for m in markets], dtype=np.float64)
+    free_over = np.array(
+        [np.inf if shipping.get(m, Shipping()).free_over is None else shipping[m].free_over for m in markets],
+        dtype=np.float64,
+    )
+    costing = _Costing(costs, ship, free_over)
+
+    best_assign = costing.exhaustive(EXACT_ASSIGNMENTS)
+    if best_assign is not None:
+        best_total = lower_bound = costing.total(best_assign)
+    else:
+        best_assign, best_total, lower_bound = _branch_and_bound(costing, refine)
+    m = len(markets)
+
+    subtotal = costing.subtotals(best_assign)
+    charged = costing.charged(best_assign, subtotal)
+    result["lines"] = [
+        {
+            "card_name": name,
+            "qty": int(q),
+            "market": markets[k],
+            "unit_price": round(float(unit[i, k]), 2),
+            "price": round(float(costs[i, k]), 2),
+        }
+        for i, (name, q, k) in enumerate(zip(names, qty.tolist(), best_assign.tolist()))
+    ]
+    result["markets"] = [
+        {
+            "market": markets[k],
+            "cards": int((best_assign == k).sum()),
+            "subtotal": round(float(subtotal[k]), 2),
+            "shipping": round(float(ship[k]) if charged[k] else 0.0, 2),
+        }
+        for k in range(m)
+        if (best_assign == k).any()
+    ]
+    shipping_total = float(ship[charged].sum())
+    result["items_total"] = round(float(subtotal.sum()), 2)
+    result["shipping_total"] = round(shipping_total, 2)
+    result["total"] = round(best_total, 2)
+    result["lower_bound"] = round(lower_bound, 2)
+    result["gap"] = round(max(0.0, best_total - lower_bound), 2)
+    result["optimal"] = best_total - lower_bound <= 1e-6
+    return result
+
+
+def missing_cards(decklist: Iterable[Mapping[str, object]], owned: Iterable[str]) -> List[Tuple[str, int]]:
+    """``(name, qty)`` for deck entries not in ``owned``, merged by name."""
+    owned_set = set(owned)
+    missing: Dict[str, int] = {}
+    for entry in decklist:
+        name = entry["card_name"]
+        if name in owned_set:
+            continue
+        missing[name] = missing.get(name, 0) + int(entry.get("qty", 1))
+    return list(missing.items())
@@ -0,0 +1,101 @@
+"""
+Benchmark batch deck analysis.
+
+Builds the synthetic database from ``bench_replacements`` and ``--decks``
+random 100‑card decks drawn from a skewed popularity distribution (so
+staples repeat across decks, as in real saved decks), then reports
+decks/second for ``analyse_deck`` one deck at a time and for
+``iter_analyse_decks`` in process, checking the batch results match.
+The process pool is only timed with ``--processes N`` (it loses on a
+single core), and ``--split-basket`` adds the multi‑market basket to
+every deck.
+
+    python bench/bench_analyse_decks.py [--cards 30000] [--decks 10000] [--processes 4] [--split-basket]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import replacement_engine as engine  # noqa: E402
+from bench_replacements import FORMATS, synthetic_database  # noqa: E402
+
+
+def synthetic_decks(names, n: int, seed: int = 9):
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 10) for rank in range(len(names))]
+    decks = []
+    for _ in range(n):
+        cards = list(dict.fromkeys(rng.choices(names, weights=weights, k=120)))[:100]
+        decks.append({
+            "fmt": rng.choice(FORMATS),
+            "budget_gbp": rng.choice([2.0, 5.0, 10.0]),
+            "persona": rng.choice(["Budget Brewer", "Spike"]),
+            "color_identity": rng.sample("WUBRG", rng.choice([1, 2, 3, 5])),
+            "decklist": [{"card_name": c, "qty": 1} for c in cards],
+        })
+    return decks
+
+
+def head(results, n: int):
+    """Consume ``results`` and return the first ``n``."""
+    kept = []
+    for result in results:
+        if len(kept) < n:
+            kept.append(result)
+    return kept
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--decks", type=int, default=10000)
+    ap.add_argument("--processes", type=int, default=0)
+    ap.add_argument("--split-basket", action="store_true")
+    args = ap.parse_args()
+
+    engine.CARD_DATABASE = synthetic_database(args.cards)
+    engine.rebuild_index()
+    engine.get_store()
+    decks = synthetic_decks(list(engine.CARD_DATABASE), args.decks)
+    for deck in decks:
+        deck["split_basket"] = args.split_basket
+
+    sample = decks[: max(1, args.decks // 10)]
+    t0 = time.perf_counter()
+    single = [engine.analyse_deck(**deck) for deck in sample]
+    t_single = time.perf_counter() - t0
+
+    # Reports are streamed and only the sample's are kept: 10k full
+    # reports take several GB, and forked workers would inherit them.
+    memo = engine.ReplacementMemo(maxsize=None)
+    t0 = time.perf_counter()
+    batch = head(engine.iter_analyse_decks(decks, memo=memo), len(sample))
+    t_batch = time.perf_counter() - t0
+
+    mismatches = sum(a != b for a, b in zip(single, batch))
+    print(f"cards={args.cards} decks={args.decks} split_basket={args.split_basket} cpus={os.cpu_count()}")
+    print(f"analyse_deck (first {len(sample)}): {len(sample) / t_single:9,.0f} decks/s")
+    print(f"analyse_decks:                 {args.decks / t_batch:9,.0f} decks/s")
+    if args.processes > 0:
+        t0 = time.perf_counter()
+        pooled = head(engine.iter_analyse_decks(decks, processes=args.processes), len(sample))
+        t_pool = time.perf_counter() - t0
+        mismatches += sum(a != b for a, b in zip(batch, pooled))
+        print(f"analyse_decks processes={args.processes}:     {args.decks / t_pool:9,.0f} decks/s  "
+              f"({t_batch / t_pool:.2f}x in process)")
+    else:
+        print("analyse_decks processes:       skipped (pass --processes N)")
+    print(f"memo hit rate: {memo.hits / max(1, memo.hits + memo.misses):.1%}")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the split‑basket solver.
+
+Times ``solve_basket`` on random instances of ``--cards`` cards across
+``--markets`` markets (defaults 100 × 10) with ~15% missing prices,
+per‑market shipping and free‑shipping thresholds, and reports the
+optimality gap against the solver's lower bound.  Small instances, which
+the solver enumerates exactly, are also checked against brute force
+over every assignment.
+
+    python bench/bench_basket.py [--cards 100] [--markets 10] [--runs 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from basket import Shipping, solve_basket  # noqa: E402
+
+
+def instance(cards: int, markets: int, rng: random.Random):
+    names = [f"Card {i}" for i in range(cards)]
+    base = {name: rng.lognormvariate(0.5, 1.2) for name in names}
+    prices = {
+        f"Market {m}": {
+            name: round(base[name] * rng.uniform(0.8, 1.3), 2) for name in names if rng.random() > 0.15
+        }
+        for m in range(markets)
+    }
+    shipping = {
+        market: Shipping(round(rng.uniform(1.0, 6.0), 2), rng.choice([None, 15.0, 25.0, 40.0]))
+        for market in prices
+    }
+    cards_qty = [(name, rng.choice([1, 1, 1, 2, 4])) for name in names]
+    return cards_qty, prices, shipping
+
+
+def brute_force(cards, prices, shipping) -> float:
+    markets = list(prices)
+    best = math.inf
+    options = [[m for m in markets if name in prices[m]] for name, _qty in cards]
+    for choice in itertools.product(*options):
+        subtotal = dict.fromkeys(markets, 0.0)
+        for (name, qty), market in zip(cards, choice):
+            subtotal[market] += prices[market][name] * qty
+        total = sum(subtotal.values())
+        for market in set(choice):
+            free_over = shipping[market].free_over
+            if free_over is None or subtotal[market] < free_over:
+                total += shipping[market].cost
+        best = min(best, total)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=100)
+    ap.add_argument("--markets", type=int, default=10)
+    ap.add_argument("--runs", type=int, default=50)
+    args = ap.parse_args()
+
+    rng = random.Random(13)
+    times, gaps, proven = [], [], 0
+    for _ in range(args.runs):
+        cards, prices, shipping = instance(args.cards, args.markets, rng)
+        t0 = time.perf_counter()
+        result = solve_basket(cards, prices, shipping)
+        times.append(time.perf_counter() - t0)
+        gaps.append(result["gap"] / result["total"] if result["total"] else 0.0)
+        proven += result["optimal"]
+    times.sort()
+    print(f"{args.cards} cards x {args.markets} markets, {args.runs} runs")
+    print(f"solve: median {times[len(times) // 2] * 1e3:.2f} ms  max {times[-1] * 1e3:.2f} ms")
+    print(f"proven optimal: {proven}/{args.runs}  worst gap vs lower bound: {max(gaps) * 100:.2f}%")
+
+    worse = 0
+    for _ in range(200):
+        cards, prices, shipping = instance(7, 4, rng)
+        if any(not any(name in prices[m] for m in prices) for name, _ in cards):
+            continue
+        exact = brute_force(cards, prices, shipping)
+        worse += solve_basket(cards, prices, shipping)["total"] > round(exact, 2) + 0.01
+    print(f"small instances (7 x 4) worse than brute force: {worse}/200")
+
+
+if __name__ == "__main__":
+    main()
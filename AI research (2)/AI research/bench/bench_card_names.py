@@ -0,0 +1,119 @@
+"""
+Benchmark offline card name normalisation.
+
+Checks ``card_names.NameNormalizer`` against the bundled data:
+
+* every ``aliases.jsonl`` row resolves to its ``normalized_name``;
+* ``confusions.json`` spelling/annotation variants resolve to their
+  card, while the pairs of distinct real cards are left alone;
+* every known name resolves to itself;
+* ``--typos`` random one-edit misspellings (substitution, insertion,
+  deletion, transposition) of long known names are counted as fixed,
+  left alone, or rewritten to a wrong card.
+
+Then times resolving deck lines: all-distinct names (cold cache) and a
+typical 100-card list repeated (warm cache).
+Target: ≥ 50k lines/s cold, ≥ 1M lines/s warm.
+
+    python bench/bench_card_names.py [--typos 2000] [--lines 50000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from card_names import ALIASES_PATH, CONFUSIONS_PATH, NameNormalizer, fold, max_edits  # noqa: E402
+
+
+def typo(name, rng):
+    i = rng.randrange(len(name) - 1)
+    kind = rng.choice("sidt")
+    if kind == "s":
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+    if kind == "i":
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i:]
+    if kind == "d":
+        return name[:i] + name[i + 1:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--typos", type=int, default=2000)
+    ap.add_argument("--lines", type=int, default=50_000)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    normalizer = NameNormalizer.load()
+    print(f"  built {len(normalizer)} names in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    mismatches = 0
+    with open(ALIASES_PATH, encoding="utf-8") as f:
+        aliases = [json.loads(line) for line in f if line.strip()]
+    for row in aliases:
+        hit = normalizer.resolve(row["alias"])
+        if hit.name != row["normalized_name"]:
+            mismatches += 1
+            print(f"  alias {row['alias']!r} -> {hit.name!r}, expected {row['normalized_name']!r}")
+    with open(CONFUSIONS_PATH, encoding="utf-8") as f:
+        confusions = json.load(f)
+    for pair in confusions:
+        hit = normalizer.resolve(pair["variant"])
+        variant = fold(hit.name) == fold(pair["alias"])
+        same_card = fold(pair["variant"].split("(")[0]) == fold(pair["alias"])
+        if variant != same_card:
+            mismatches += 1
+            print(f"  confusion {pair['variant']!r} -> {hit.name!r} ({hit.rule})")
+    known = sorted({name for name, _c, rule in normalizer.table.values() if rule == "exact"})
+    mismatches += sum(normalizer.resolve(name).name != name for name in known)
+    print(f"aliases={len(aliases)} confusions={len(confusions)} known={len(known)} mismatches={mismatches}")
+
+    rng = random.Random(0)
+    long_names = [name for name in known if max_edits(fold(name))]
+    fixed = left = wrong = 0
+    for _ in range(args.typos):
+        name = rng.choice(long_names)
+        bad = typo(name, rng)
+        hit = normalizer.resolve(bad)
+        if hit.name == name or fold(bad) == fold(name):
+            fixed += 1
+        elif hit.rule == "unknown":
+            left += 1
+        else:
+            wrong += 1
+    print(f"  typos {args.typos}: fixed {fixed / args.typos:.1%}  left {left / args.typos:.1%}  "
+          f"wrong {wrong / args.typos:.1%}")
+
+    lines = [typo(rng.choice(long_names), rng) if i % 4 else f"{rng.choice(known)} (SET) {i}"
+             for i in range(args.lines)]
+    cold = NameNormalizer.load()
+    t0 = time.perf_counter()
+    for line in lines:
+        cold.resolve(line)
+    elapsed = time.perf_counter() - t0
+    print(f"  {args.lines} distinct lines   {elapsed:6.3f}s  {args.lines / elapsed / 1e3:7.1f}k lines/s  "
+          f"target>=50k {'ok' if args.lines / elapsed >= 5e4 else 'MISSED'}")
+    deck = [rng.choice(known) for _ in range(60)] + [row["alias"] for row in aliases] + \
+           [pair["variant"] for pair in confusions] + [typo(rng.choice(long_names), rng) for _ in range(9)]
+    normalizer.resolve.cache_clear()
+    repeats = max(args.lines // len(deck), 1)
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for line in deck:
+            normalizer.resolve(line)
+    elapsed = time.perf_counter() - t0
+    total = repeats * len(deck)
+    print(f"  {total} deck lines (warm)  {elapsed:6.3f}s  {total / elapsed / 1e3:7.1f}k lines/s  "
+          f"target>=1M {'ok' if total / elapsed >= 1e6 else 'MISSED'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark building and loading the columnar card store.
+
+Generates a synthetic Scryfall ``default_cards``‑style dump of ``--cards``
+oracle cards (default 30,000) with ``--printings`` printings each, builds
+the store, then times ``CardStore.load`` (best of five), measures the
+Python heap it allocates, and checks the engine helpers answer the same
+through the store as through a plain ``CARD_DATABASE`` dictionary.
+
+    python bench/bench_card_store.py [--cards 30000] [--printings 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import replacement_engine as engine  # noqa: E402
+from card_store import FORMATS, CardStore  # noqa: E402
+
+TEXTS = [
+    "Add {G}.",
+    "Draw two cards.",
+    "Destroy target creature.",
+    "Counter target spell.",
+    "Target creature you control gains hexproof until end of turn.",
+    "{T}: Add one mana of any color.",
+    "Search your library for a card, put it into your hand, then shuffle.",
+    "Flying",
+]
+TYPES = ["Creature — Elf", "Instant", "Sorcery", "Artifact", "Enchantment", "Land"]
+
+
+def synthetic_dump(n: int, printings: int, seed: int = 11):
+    rng = random.Random(seed)
+    for i in range(n):
+        legal = {key: rng.choice(["legal", "legal", "legal", "not_legal", "banned"]) for _f, key in FORMATS}
+        identity = rng.sample("WUBRG", rng.choice([0, 1, 1, 2, 3]))
+        base = rng.lognormvariate(0.3, 1.3)
+        for _ in range(printings):
+            yield {
+                "oracle_id": f"{i:08d}-0000-0000-0000-000000000000",
+                "name": f"Card {i}",
+                "layout": "normal",
+                "type_line": rng.choice(TYPES),
+                "oracle_text": rng.choice(TEXTS),
+                "color_identity": identity,
+                "legalities": legal,
+                "prices": {
+                    "usd": f"{base * rng.uniform(0.8, 1.5):.2f}",
+                    "usd_foil": f"{base * 2.5:.2f}" if rng.random() < 0.5 else None,
+                    "eur": f"{base * rng.uniform(0.8, 1.4):.2f}" if rng.random() < 0.9 else None,
+                    "eur_foil": None,
+                    "tix": "0.02",
+                },
+            }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--printings", type=int, default=3)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    built = CardStore.from_bulk(synthetic_dump(args.cards, args.printings))
+    t_build = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as out:
+        built.save(out)
+        on_disk = sum(os.path.getsize(os.path.join(out, f)) for f in os.listdir(out))
+
+        t_load = float("inf")
+        for _ in range(5):
+            t0 = time.perf_counter()
+            store = CardStore.load(out)
+            t_load = min(t_load, time.perf_counter() - t0)
+        # Measured separately: tracing slows the load itself several‑fold.
+        tracemalloc.start()
+        store = CardStore.load(out)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        t0 = time.perf_counter()
+        engine.load_card_database(out)
+        t_engine = time.perf_counter() - t0
+
+        as_dict = {name: store[name] for name in store}
+        rng = random.Random(3)
+        queries = [
+            (name, rng.choice(FORMATS)[0], rng.sample("WUBRG", rng.choice([1, 2, 3, 5])))
+            for name in rng.sample(list(store), 2000)
+        ]
+
+        def helpers():
+            return [
+                (engine.assign_role(name), engine.is_legal(name, fmt),
+                 engine.within_budget(name, 5.0), engine.color_identity_ok(name, colours))
+                for name, fmt, colours in queries
+            ]
+
+        # Swap databases once: the legality matrix is recompiled on a swap.
+        via_store = helpers()
+        engine.CARD_DATABASE = as_dict
+        via_dict = helpers()
+        engine.CARD_DATABASE = store
+        mismatches = sum(a != b for a, b in zip(via_store, via_dict))
+
+    print(f"cards={len(built)} printings={args.cards * args.printings} build={t_build:.2f}s "
+          f"on_disk={on_disk / 1e6:.1f}MB")
+    print(f"load:   {t_load * 1e3:7.1f} ms  python_heap_peak={peak / 1e6:.1f}MB")
+    print(f"engine: {t_engine * 1e3:7.1f} ms  (load + index build)")
+    print(f"helper mismatches vs dict: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
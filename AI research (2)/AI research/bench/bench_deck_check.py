@@ -0,0 +1,77 @@
+"""
+Benchmark whole‑deck constraint checking.
+
+Uses the synthetic database from ``bench_replacements`` and times, for
+100‑card decks, ``check_card_constraints`` called card by card against
+``check_deck_constraints`` (one deck at a time) and
+``check_decks_constraints`` (all decks in one batch), checking all three
+give the same violations.  A slice of the cards is marked restricted in
+Vintage (the default format) and some decks run several copies, so the
+restricted copy limit is exercised too.
+
+    python bench/bench_deck_check.py [--cards 30000] [--decks 5000] [--format Vintage]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import replacement_engine as engine  # noqa: E402
+from bench_replacements import FORMATS, synthetic_database  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--decks", type=int, default=5000)
+    ap.add_argument("--format", default="Vintage", choices=FORMATS)
+    args = ap.parse_args()
+
+    engine.CARD_DATABASE = synthetic_database(args.cards)
+    rng = random.Random(5)
+    names = list(engine.CARD_DATABASE)
+    engine.load_legalities({"name": n, "legalities": {"vintage": "restricted"}} for n in rng.sample(names, len(names) // 50))
+    t0 = time.perf_counter()
+    engine.get_store()
+    convert = time.perf_counter() - t0
+
+    decks = [rng.sample(names, 99) + ["Unknown Card"] for _ in range(args.decks)]
+    quantities = [[rng.choice([1, 1, 1, 2, 4]) for _ in deck] for deck in decks]
+    colours = [rng.sample("WUBRG", rng.choice([1, 2, 3, 5])) for _ in range(args.decks)]
+    fmt = args.format
+
+    t0 = time.perf_counter()
+    per_card = [
+        [engine.check_card_constraints(card, fmt, 5.0, c, q) for card, q in zip(deck, qty)]
+        for deck, qty, c in zip(decks, quantities, colours)
+    ]
+    t_card = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    per_deck = [engine.check_deck_constraints(deck, fmt, 5.0, c, qty) for deck, qty, c in zip(decks, quantities, colours)]
+    t_deck = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = engine.check_decks_constraints(decks, fmt, 5.0, colours, quantities)
+    t_batch = time.perf_counter() - t0
+
+    mismatches = sum(a != b or a != c for a, b, c in zip(per_card, per_deck, batch))
+    n = args.decks
+    print(f"cards={args.cards} decks={n} (100 cards) store_convert={convert * 1e3:.0f}ms")
+    print(f"per card:  {t_card / n * 1e6:8.1f} us/deck")
+    print(f"per deck:  {t_deck / n * 1e6:8.1f} us/deck")
+    print(f"batch:     {t_batch / n * 1e6:8.1f} us/deck  ({n / t_batch:,.0f} decks/s)")
+    over_limit = sum("Restricted" in card for deck in batch for card in deck)
+    print(f"restricted over limit: {over_limit}")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark the hypergeometric probability engine.
+
+Checks every ``probability_table`` entry of ``mtg_deck_analysis.json``
+(to its four published decimals), then ``--checks`` random
+multi‑category scenarios against an exact ``math.comb`` enumeration, and
+times ``curve_table`` for one curve (three categories, turns 0–10 on the
+play and on the draw) and for ``--batch`` curves in one call.
+Target: a whole curve table in under a millisecond.
+
+    python bench/bench_hypergeometric.py [--checks 300] [--batch 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from math import comb
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hypergeometric import at_least, curve_table  # noqa: E402
+
+ANALYSIS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mtg_deck_analysis.json")
+# Card counts behind each documented scenario, as given in its explanation.
+LANDS = {"Mono-Green Ramp": 37, "Mono-Red Aggro": 36, "Izzet Spellslinger": 37, "Golgari Aristocrats": 37,
+         "Azorius Control": 38, "5-Color Goodstuff": 39, "Modern Burn": 20, "Modern Tron": 22,
+         "Pioneer Mono-Black Aggro": 24, "Legacy Delver": 18, "Standard Midrange": 24}
+RAMP = {"Mono-Green Ramp": 12, "Mono-Red Aggro": 8, "Izzet Spellslinger": 10, "Golgari Aristocrats": 10,
+        "Azorius Control": 10, "5-Color Goodstuff": 12, "Modern Tron": 8}
+
+
+def scenario_counts(row):
+    """(successes, minimum) for a probability_table row."""
+    if "lands" in row["scenario"]:
+        return LANDS[row["deck_name"]], 2
+    if "ramp" in row["scenario"]:
+        return RAMP.get(row["deck_name"], 0), 1
+    if row["format"] == "Commander":
+        return 1, 1
+    return (3 if row["deck_name"] == "Standard Midrange" else 4), 1
+
+
+def reference(deck_size, counts, minimum, draws):
+    """Exact P(all minimums met) by enumerating every category split."""
+    rest = deck_size - sum(counts)
+    total = 0
+    for split in itertools.product(*(range(m, min(k, draws) + 1) for k, m in zip(counts, minimum))):
+        seen = sum(split)
+        if seen <= draws:
+            ways = comb(rest, draws - seen)
+            for k, x in zip(counts, split):
+                ways *= comb(k, x)
+            total += ways
+    return total / comb(deck_size, draws)
+
+
+def timed(fn, repeats):
+    fn()
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--checks", type=int, default=300)
+    ap.add_argument("--batch", type=int, default=200)
+    ap.add_argument("--repeats", type=int, default=50)
+    args = ap.parse_args()
+
+    with open(ANALYSIS, encoding="utf-8") as fh:
+        table = json.load(fh)["probability_table"]
+    pairs = [scenario_counts(row) for row in table]
+    got = at_least([r["deck_size"] for r in table], [k for k, _ in pairs], [m for _, m in pairs],
+                   [r["hand_size"] for r in table])
+    mismatches = sum(abs(round(float(p), 4) - r["probability"]) > 1e-9 for p, r in zip(got, table))
+    print(f"probability_table rows={len(table)} mismatches={mismatches}")
+
+    rng = random.Random(7)
+    cases = []
+    for _ in range(args.checks):
+        deck_size = rng.choice([40, 60, 99, 100])
+        counts = [rng.randint(0, deck_size // 3) for _ in range(rng.randint(1, 3))]
+        minimum = [rng.randint(0, 3) for _ in counts]
+        cases.append((deck_size, counts, minimum, rng.randint(0, 20)))
+    width = 3
+    got = at_least([c[0] for c in cases], [c[1] + [0] * (width - len(c[1])) for c in cases],
+                   [c[2] + [0] * (width - len(c[2])) for c in cases], [c[3] for c in cases])
+    worst = max(abs(float(p) - reference(*c)) for p, c in zip(got, cases))
+    mismatches = sum(abs(float(p) - reference(*c)) > 1e-9 for p, c in zip(got, cases))
+    print(f"random scenarios={len(cases)} mismatches={mismatches} worst error={worst:.1e}")
+
+    one = [{"deck_size": 99, "turns": 10, "categories": [
+        {"name": "lands", "count": 37, "min": 3}, {"name": "ramp", "count": 12, "min": 1},
+        {"name": "draw", "count": 10, "min": 1}]}]
+    many = [{"deck_size": rng.choice([60, 99]), "turns": 10, "mulligans": rng.randint(0, 2),
+             "categories": [{"count": rng.randint(10, 20), "min": rng.randint(1, 3)},
+                            {"count": rng.randint(1, 10), "min": 1}]} for _ in range(args.batch)]
+    single = timed(lambda: curve_table(one), args.repeats)
+    batch = timed(lambda: curve_table(many), max(args.repeats // 10, 3))
+    print(f"  one curve table    {single:6.3f}ms  target<1ms {'ok' if single < 1 else 'MISSED'}")
+    print(f"  {args.batch} curve tables  {batch:6.2f}ms  ({batch / args.batch * 1e3:.0f}µs each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark the commander metagame overlap engine.
+
+Builds a synthetic metagame of ``--commanders`` commanders with
+``--staples`` top cards each, drawn with skewed popularity from
+``--cards`` cards (so staples are shared between commanders, as real
+Commander staples are), then times ``MetagameMatrix.report`` on
+100‑card decks and checks the similar commanders and meta scores
+against a dict‑of‑dicts reference that scores every commander.
+Target: single‑digit milliseconds per deck.
+
+    python bench/bench_metagame.py [--commanders 3000] [--staples 300] [--cards 30000] [--decks 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from metagame import MetagameMatrix  # noqa: E402
+
+
+def synthetic_metagame(commanders, staples, cards, seed=11):
+    rng = random.Random(seed)
+    names = [f"Card {i}" for i in range(cards)]
+    weights = [1.0 / (rank + 20) for rank in range(cards)]
+    rows = []
+    for c in range(commanders):
+        picked = list(dict.fromkeys(rng.choices(names, weights=weights, k=staples * 2)))[:staples]
+        rows.append({
+            "commander_name": f"Commander {c}",
+            "popularity_rank": c + 1,
+            "themes": [rng.choice(["Tokens", "Spellslinger", "Reanimator", "Voltron"])],
+            "top_cards": [{"card_name": n, "inclusion_rate": f"{rng.randint(5, 95)}%"} for n in picked]
+                         + [{"card_name": "Card unknown", "inclusion_rate": "—"}],
+            "trend": "Stable",
+        })
+    return rows, names, weights
+
+
+def reference(rows, deck, k):
+    """(top k (commander, similarity), meta score of the best commander)."""
+    deck = set(deck)
+    known = {card["card_name"] for row in rows for card in row["top_cards"] if card["inclusion_rate"] != "—"}
+    size = math.sqrt(max(len(deck & known), 1))
+    scored = []
+    for row in rows:
+        rates = {card["card_name"]: int(card["inclusion_rate"][:-1]) / 100
+                 for card in row["top_cards"] if card["inclusion_rate"] != "—"}
+        norm = math.sqrt(sum(r * r for r in rates.values()))
+        dot = sum(r for name, r in rates.items() if name in deck)
+        if dot > 0:
+            scored.append((-dot / (norm * size), row["commander_name"], sum(rates.values()), dot))
+    scored.sort()
+    best = scored[0] if scored else None
+    return [(name, -s) for s, name, _t, _d in scored[:k]], (best[3] / best[2] if best else None)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--commanders", type=int, default=3000)
+    ap.add_argument("--staples", type=int, default=300)
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--decks", type=int, default=300)
+    ap.add_argument("--checks", type=int, default=20)
+    args = ap.parse_args()
+
+    rows, names, weights = synthetic_metagame(args.commanders, args.staples, args.cards)
+    t0 = time.perf_counter()
+    matrix = MetagameMatrix.from_rows(rows)
+    build = time.perf_counter() - t0
+    print(f"commanders={len(matrix.commanders)} cards={len(matrix.cards)} non-zeros={len(matrix)} "
+          f"build={build * 1e3:.0f}ms")
+
+    rng = random.Random(3)
+    decks = [list(dict.fromkeys(rng.choices(names, weights=weights, k=130)))[:99] + ["Sol Ring"]
+             for _ in range(args.decks)]
+    mismatches = 0
+    for deck in decks[:args.checks]:
+        got = matrix.report(deck, k=5)
+        want, meta = reference(rows, deck, 5)
+        pairs = [(s["commander"], s["similarity"]) for s in got["similar_commanders"]]
+        if ([n for n, _ in pairs] != [n for n, _ in want] or any(abs(a - b[1]) > 1e-4 for (_, a), b in zip(pairs, want))
+                or abs(got["meta"]["meta_score"] - meta) > 1e-4):
+            mismatches += 1
+    print(f"reference checks={args.checks} mismatches={mismatches}")
+
+    for deck in decks[:20]:
+        matrix.report(deck)
+    timings = []
+    for deck in decks:
+        t0 = time.perf_counter()
+        matrix.report(deck, k=5)
+        timings.append((time.perf_counter() - t0) * 1e3)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(round(0.99 * (len(timings) - 1))))]
+    print(f"report p50 {timings[len(timings) // 2]:5.2f}ms  p99 {p99:5.2f}ms  "
+          f"target<10ms {'ok' if p99 < 10 else 'MISSED'}")
+    t0 = time.perf_counter()
+    for deck in decks[:5]:
+        reference(rows, deck, 5)
+    print(f"dict reference {(time.perf_counter() - t0) / 5 * 1e3:7.1f}ms/deck")
+
+
+if __name__ == "__main__":
+    main()
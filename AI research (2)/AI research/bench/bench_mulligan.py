@@ -0,0 +1,113 @@
+"""
+Benchmark the opening hand simulator.
+
+Checks ``mulligan.simulate`` against exact answers, flagging any estimate
+more than four standard errors away:
+
+* single‑category keep rates and turn‑N goals on the play and on the
+  draw against ``hypergeometric.at_least``;
+* the keep‑until‑two‑lands mulligan chain against
+  ``hypergeometric.with_mulligans``;
+* a multi‑clause Commander keep rule ("two to five lands and a ramp
+  piece, or one land with Sol Ring and a dork") against a ``math.comb``
+  enumeration of every 7‑card category split.
+
+Then times ``--hands`` hands of that rule with three mulligans and a
+turn‑4 goal, in process and with ``--processes`` workers.
+Target: ≥ 1M hands/s per core.
+
+    python bench/bench_mulligan.py [--hands 2000000] [--checks-hands 200000] [--processes 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hypergeometric import at_least, with_mulligans  # noqa: E402
+from mulligan import simulate  # noqa: E402
+
+COMMANDER_DECK = {"land": 37, "sol_ring": 1, "dork": 8, "ramp": 10, "draw": 10, "other": 33}
+COMMANDER_KEEP = [{"land": [2, 5], "ramp": 1}, {"land": [2, 5], "dork": 1},
+                  {"land": 1, "sol_ring": 1, "dork": 1}]
+
+
+def enumerate_keep(deck, clauses, hand_size=7):
+    """Exact P(the opening hand meets any clause) by enumerating category splits."""
+    names, counts = list(deck), list(deck.values())
+    total = 0
+    for split in itertools.product(*(range(min(k, hand_size) + 1) for k in counts)):
+        if sum(split) != hand_size:
+            continue
+        hand = dict(zip(names, split))
+        for clause in clauses:
+            if all((lo_hi[0] <= hand[n] <= lo_hi[1]) if isinstance(lo_hi, list) else hand[n] >= lo_hi
+                   for n, lo_hi in clause.items()):
+                total += math.prod(math.comb(k, x) for k, x in zip(counts, split))
+                break
+    return total / math.comb(sum(counts), hand_size)
+
+
+def check(label, estimate, exact, hands):
+    err = math.sqrt(max(exact * (1 - exact), 1e-12) / hands)
+    ok = abs(estimate["p"] - exact) <= 4 * err
+    print(f"  {label:<44} sim {estimate['p']:.4f} [{estimate['low']:.4f}, {estimate['high']:.4f}]  "
+          f"exact {exact:.4f}  {'ok' if ok else 'MISMATCH'}")
+    return not ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hands", type=int, default=2_000_000)
+    ap.add_argument("--checks-hands", type=int, default=200_000)
+    ap.add_argument("--processes", type=int, default=2)
+    args = ap.parse_args()
+    n = args.checks_hands
+
+    mismatches = 0
+    lands = {"land": 37, "other": 62}
+    result = simulate({"deck": lands, "keep": {"land": 2}, "max_mulligans": 0, "hands": n, "seed": 1})
+    mismatches += check("keep 7 with >=2 of 37 lands", result["keep_opening"], at_least(99, 37, 2, 7)[0], n)
+    for turn, on_draw in ((3, False), (3, True), (6, True)):
+        result = simulate({"deck": lands, "keep": {"land": 0}, "max_mulligans": 0, "goal": {"land": 4},
+                           "turn": turn, "on_draw": on_draw, "hands": n, "seed": turn + on_draw})
+        draws = 7 + turn - 1 + on_draw
+        mismatches += check(f">=4 lands by turn {turn} on the {'draw' if on_draw else 'play'}",
+                            result["goal"], at_least(99, 37, 4, draws)[0], n)
+    burn = {"land": 20, "other": 40}
+    result = simulate({"deck": burn, "keep": {"land": 2}, "max_mulligans": 2, "goal": {"land": 2},
+                       "hands": n, "seed": 9})
+    p = at_least(60, 20, 2, 7)[0]
+    mismatches += check("60 cards, mulligan to 5 for 2 of 20 lands", result["goal"], with_mulligans(p, p, 2), n)
+    result = simulate({"deck": COMMANDER_DECK, "keep": COMMANDER_KEEP, "max_mulligans": 0, "hands": n, "seed": 4})
+    mismatches += check("Commander multi-clause keep rule", result["keep_opening"],
+                        enumerate_keep(COMMANDER_DECK, COMMANDER_KEEP), n)
+    print(f"checks mismatches={mismatches}")
+
+    config = {"deck": COMMANDER_DECK, "keep": COMMANDER_KEEP, "max_mulligans": 3, "free_mulligan": True,
+              "goal": {"land": 4}, "turn": 4, "hands": args.hands, "seed": 0}
+    simulate({**config, "hands": 1 << 16})
+    t0 = time.perf_counter()
+    result = simulate(config)
+    single = time.perf_counter() - t0
+    print(f"  {args.hands} hands in process     {single:6.2f}s  {args.hands / single / 1e6:5.2f}M hands/s  "
+          f"target>=1M {'ok' if args.hands / single >= 1e6 else 'MISSED'}")
+    if args.processes > 1:
+        t0 = time.perf_counter()
+        pooled = simulate(config, processes=args.processes)
+        elapsed = time.perf_counter() - t0
+        print(f"  {args.hands} hands, {args.processes} processes  {elapsed:6.2f}s  "
+              f"{args.hands / elapsed / 1e6:5.2f}M hands/s  same result={pooled == result} "
+              f"(cpus={os.cpu_count()})")
+    print(f"  keep 7 {result['keep_opening']['p']:.4f}  mean hand {result['mean_hand_size']}  "
+          f"4 lands by turn 4 {result['goal']['p']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
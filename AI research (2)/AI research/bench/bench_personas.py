@@ -0,0 +1,108 @@
+"""
+Benchmark persona‑weighted replacement ranking.
+
+For every persona in ``player_personas.json``, times
+``propose_replacements`` with that persona (and a commander from the
+synthetic synergy table of ``bench_synergy``) against a reference that
+computes the same weighted features card by card in Python over
+``CardIndex.candidates`` and sorts, and checks both pick the same cards.
+The first pass builds each (persona, commander) ranking; the repeat pass
+shows the cached per‑role‑set picks.
+
+    python bench/bench_personas.py [--cards 30000] [--per-commander 2000] [--queries 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import replacement_engine as engine  # noqa: E402
+from bench_replacements import FORMATS, synthetic_database  # noqa: E402
+from bench_synergy import COMMANDERS, synthetic_synergy  # noqa: E402
+
+
+def reference_pick(card_name, fmt, deck_colors, commander, persona):
+    """Per‑candidate scoring loop the vectorised path replaces."""
+    index = engine.get_index()
+    synergy = engine.get_synergy().positions(commander, index)
+    w = persona.weights.tolist()
+    top_power = math.log1p(max(index.prices))
+    roles = list(dict.fromkeys(engine.assign_role(card_name)))
+    mask = engine.colour_mask(deck_colors)
+    exclude = index.position.get(card_name)
+    picked = []
+    for _tier, bound in engine.DEFAULT_TIERS:
+        scored = []
+        for i in index.candidates(roles, fmt, mask, bound, exclude):
+            if i in picked:
+                continue
+            price = index.prices[i]
+            match = sum(role in index.roles[i] for role in roles) / len(roles)
+            features = (1.0 / (1.0 + price), math.log1p(price) / top_power, synergy.get(i, 0.0), match)
+            scored.append((-sum(a * b for a, b in zip(w, features)), index.rank[i], i))
+        scored.sort()
+        picked.extend(i for _s, _r, i in scored[: 5 - len(picked)])
+        if len(picked) >= 5:
+            break
+    return [index.names[i] for i in picked]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--per-commander", type=int, default=2000)
+    ap.add_argument("--queries", type=int, default=300)
+    args = ap.parse_args()
+
+    engine.CARD_DATABASE = synthetic_database(args.cards)
+    engine.rebuild_index()
+    names = list(engine.CARD_DATABASE)
+    engine._SYNERGY = synthetic_synergy(names, args.per_commander)
+    personas = engine.get_personas()
+
+    rng = random.Random(3)
+    queries = [
+        (rng.choice(names), rng.choice(FORMATS), rng.sample("WUBRG", rng.choice([1, 2, 3, 5])), rng.choice(COMMANDERS))
+        for _ in range(args.queries)
+    ]
+    t0 = time.perf_counter()
+    engine.get_persona_scorer()
+    print(f"cards={args.cards} queries={args.queries} personas={len(personas)} "
+          f"scorer build={(time.perf_counter() - t0) * 1e3:.0f}ms")
+    per_query = lambda t: t / args.queries * 1e6  # noqa: E731
+
+    t0 = time.perf_counter()
+    for card, fmt, colours, commander in queries:
+        engine.propose_replacements(card, fmt, 5.0, colours, commander=commander)
+    print(f"{'synergy only':22s} {per_query(time.perf_counter() - t0):8.1f} us/query")
+
+    for name in personas.names():
+        persona = personas.resolve(name)
+        t0 = time.perf_counter()
+        got = [engine.propose_replacements(card, fmt, 5.0, colours, commander=commander, persona=name)
+               for card, fmt, colours, commander in queries]
+        t_vector = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for card, fmt, colours, commander in queries:
+            engine.propose_replacements(card, fmt, 5.0, colours, commander=commander, persona=name)
+        t_repeat = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        want = [reference_pick(card, fmt, colours, commander, persona) for card, fmt, colours, commander in queries]
+        t_loop = time.perf_counter() - t0
+        mismatches = sum([s["card_name"] for s in g] != w for g, w in zip(got, want))
+        weights = " ".join(f"{x:.2f}" for x in persona.weights)
+        print(f"{name:22s} {per_query(t_vector):7.1f} us/query (repeat {per_query(t_repeat):6.1f})  "
+              f"per-card loop {per_query(t_loop):8.1f} us/query  "
+              f"w=[{weights}]  mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark the scanned-card printings index.
+
+Checks ``printings.PrintingStore`` on ``ocr_labels.csv`` (3,000 scans):
+
+* built from the labels themselves, every scan resolves and exactly the
+  scans whose labelled name disagrees with the first label of the same
+  (set, number, language) are flagged ``name_mismatch``;
+* built from a Scryfall-shaped dump synthesised from the labels (a
+  priced English printing per set and number, unpriced localised
+  printings for some of them), every scan gets the English price of its
+  own finish and the right ``match`` ("exact" or "english"), before and
+  after a save/load round trip.
+
+Then times resolving the whole file in one batch.
+Target: ≥ 200k rows/s.
+
+    python bench/bench_printings.py [--repeat 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from printings import LANGUAGES, PrintingStore, collector_number, language_code, scan_finish  # noqa: E402
+
+LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ocr_labels.csv")
+
+
+def synthetic_dump(scans, rng):
+    """Scryfall card objects for every labelled printing, with known prices."""
+    english, localised = {}, set()
+    for scan in scans:
+        key = (scan["set_code"], collector_number(scan["collector_number"]))
+        english.setdefault(key, scan["card_name"])
+        lang = language_code(scan["language"])
+        if lang != "en" and rng.random() < 0.6:
+            localised.add(key + (lang,))
+    cards, prices = [], {}
+    for (set_code, number), name in english.items():
+        price = {"usd": round(rng.uniform(0.1, 80), 2), "eur": round(rng.uniform(0.1, 70), 2)}
+        if rng.random() < 0.8:
+            price.update({"usd_foil": round(price["usd"] * 2.5, 2), "eur_foil": round(price["eur"] * 2.2, 2)})
+        prices[(set_code, number)] = price
+        cards.append({"set": set_code.lower(), "collector_number": number, "lang": "en", "name": name,
+                      "id": f"{set_code}-{number}", "finishes": ["nonfoil", "foil"],
+                      "prices": {k: str(v) for k, v in price.items()}})
+    for set_code, number, lang in sorted(localised):
+        cards.append({"set": set_code.lower(), "collector_number": number, "lang": lang,
+                      "name": english[(set_code, number)], "finishes": ["nonfoil", "foil"], "prices": {}})
+    return cards, prices, localised
+
+
+def check_priced(store, scans, prices, localised):
+    result = store.resolve(scans)
+    bad = result["unresolved"]
+    for scan, row in zip(scans, result["rows"]):
+        key = (scan["set_code"], collector_number(scan["collector_number"]))
+        price = prices[key]
+        suffix = "" if scan_finish(scan) == "nonfoil" else "_" + scan_finish(scan)
+        want = [None if price.get(c + suffix) is None else round(float(np.float32(price[c + suffix])), 2)
+                for c in ("usd", "eur")]
+        match = "exact" if language_code(scan["language"]) == "en" or key + (language_code(scan["language"]),) \
+            in localised else "english"
+        bad += [row["usd"], row["eur"]] != want or row["match"] != match
+    return bad, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+    with open(LABELS, encoding="utf-8", newline="") as fh:
+        scans = list(csv.DictReader(line for line in fh if line.strip()))
+
+    t0 = time.perf_counter()
+    labels = PrintingStore.from_labels(scans)
+    print(f"  labels: {len(labels)} printings of {len(labels.cards)} cards, {labels.conflicts} conflicting rows, "
+          f"built in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    first = {}
+    for scan in scans:
+        first.setdefault((scan["set_code"], collector_number(scan["collector_number"]),
+                          language_code(scan["language"])), scan["card_name"])
+    result = labels.resolve(scans)
+    flagged = sum(row["name_mismatch"] != (first[(s["set_code"], collector_number(s["collector_number"]),
+                                                  language_code(s["language"]))] != s["card_name"])
+                  for s, row in zip(scans, result["rows"]))
+    mismatches = result["unresolved"] + flagged
+    print(f"labels resolved={result['resolved']}/{len(scans)} name_mismatches={result['name_mismatches']} "
+          f"mismatches={mismatches}")
+
+    cards, prices, localised = synthetic_dump(scans, random.Random(0))
+    t0 = time.perf_counter()
+    store = PrintingStore.from_scryfall(cards)
+    built = time.perf_counter() - t0
+    bad, result = check_priced(store, scans, prices, localised)
+    with tempfile.TemporaryDirectory() as tmp:
+        store.save(tmp)
+        t0 = time.perf_counter()
+        loaded = PrintingStore.load(tmp)
+        load_ms = (time.perf_counter() - t0) * 1000
+        reloaded_bad, reloaded = check_priced(loaded, scans, prices, localised)
+    print(f"scryfall printings={len(store)} ({len(LANGUAGES)} languages) built {built * 1000:.1f} ms, "
+          f"loaded {load_ms:.1f} ms  english_fallback={result['english_fallback']}  "
+          f"total ${result['total_usd']:.2f} / €{result['total_eur']:.2f}  "
+          f"mismatches={bad} reloaded mismatches={reloaded_bad + (reloaded != result)}")
+
+    for label, index in (("labels store", labels), ("scryfall store", store)):
+        index.resolve(scans)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            index.resolve(scans)
+        rate = args.repeat * len(scans) / (time.perf_counter() - t0)
+        print(f"  {label:<15} {len(scans)} rows x {args.repeat}  {rate / 1e3:7.1f}k rows/s  "
+              f"({len(scans) / rate * 1000:.1f} ms per file)  target>=200k {'ok' if rate >= 2e5 else 'MISSED'}")
+
+
+if __name__ == "__main__":
+    main()
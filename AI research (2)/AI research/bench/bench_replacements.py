@@ -0,0 +1,106 @@
+"""
+Benchmark indexed candidate selection against a full database scan.
+
+Builds a synthetic database of ``--cards`` entries (default 30,000) with
+realistic role, colour, price and ban distributions, then times
+``propose_replacements`` through the ``CardIndex`` against the previous
+linear scan (reproduced below as ``linear_candidates``) for the same
+queries and checks both pick the same cards.
+
+    python bench/bench_replacements.py [--cards 30000] [--queries 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import replacement_engine as engine  # noqa: E402
+
+ROLES = ["Ramp", "Draw", "Utility", "Fixing", "Protection", "Control", "Wincon", "Combo Piece"]
+FORMATS = ["Modern", "Pioneer", "Standard", "Legacy", "Vintage", "Pauper", "Brawl", "Historic", "Commander"]
+TIERS = (("Budget", 5.0), ("Mid", 15.0), ("Premium", float("inf")))
+
+
+def synthetic_database(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    db = {}
+    for i in range(n):
+        db[f"Card {i}"] = {
+            "oracle_id": f"oid-{i}",
+            "color_identity": rng.sample("WUBRG", rng.choice([0, 1, 1, 1, 2, 2, 3])),
+            "price_gbp": round(rng.lognormvariate(0.3, 1.3), 2),
+            "banned_in": rng.sample(FORMATS, rng.choice([0, 0, 0, 1, 3, 6])),
+            "roles": rng.sample(ROLES, rng.choice([1, 1, 2, 3])),
+        }
+    return db
+
+
+def linear_candidates(card_name, fmt, deck_colors):
+    """The pre-index selection: scan, filter and sort the whole database."""
+    original_roles = set(engine.assign_role(card_name))
+    candidates = []
+    for name, data in engine.CARD_DATABASE.items():
+        if name == card_name:
+            continue
+        if not engine.is_legal(name, fmt):
+            continue
+        if not engine.color_identity_ok(name, deck_colors):
+            continue
+        if not set(data.get("roles", [])) & original_roles:
+            continue
+        candidates.append((name, data))
+    candidates.sort(key=lambda item: item[1].get("price_gbp", 0.0))
+    picked = []
+    for _tier, bound in TIERS:
+        for name, data in candidates:
+            if len(picked) >= 5:
+                break
+            if data.get("price_gbp", 0.0) <= bound and name not in picked:
+                picked.append(name)
+    return picked
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--queries", type=int, default=500)
+    args = ap.parse_args()
+
+    engine.CARD_DATABASE = synthetic_database(args.cards)
+    t0 = time.perf_counter()
+    engine.rebuild_index()
+    build = time.perf_counter() - t0
+
+    rng = random.Random(1)
+    names = list(engine.CARD_DATABASE)
+    queries = [
+        (rng.choice(names), rng.choice(FORMATS), rng.sample("WUBRG", rng.choice([1, 2, 3, 5])))
+        for _ in range(args.queries)
+    ]
+
+    t0 = time.perf_counter()
+    indexed = [
+        [s["card_name"] for s in engine.propose_replacements(card, fmt, 5.0, colours, tiers=TIERS)]
+        for card, fmt, colours in queries
+    ]
+    t_index = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scanned = [linear_candidates(card, fmt, colours) for card, fmt, colours in queries]
+    t_scan = time.perf_counter() - t0
+
+    mismatches = sum(a != b for a, b in zip(indexed, scanned))
+    print(f"cards={args.cards} queries={args.queries} index_build={build * 1e3:.1f}ms")
+    print(f"indexed: {t_index / args.queries * 1e6:9.1f} us/query")
+    print(f"scan:    {t_scan / args.queries * 1e6:9.1f} us/query  ({t_scan / t_index:.0f}x slower)")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark reprint‑risk scoring.
+
+Generates a synthetic printings history (``--cards`` cards, 1–15
+printings each, a few Reserved List cards), scores it with
+``ReprintRisk.from_printings`` and checks every card's features, risk and
+rationale against a per‑card Python reference.  Then values a
+``--collection`` card collection with ``exposure`` and compares the
+value at risk with a Python loop.  Target: a 20k‑card collection in
+milliseconds.
+
+    python bench/bench_reprint_risk.py [--cards 30000] [--collection 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import reprint_risk as rr  # noqa: E402
+from reprint_risk import ReprintRisk  # noqa: E402
+
+TODAY = datetime.date(2025, 6, 1)
+
+
+def synthetic_printings(n, seed=21):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        name = f"Card {i}"
+        reserved = rng.random() < 0.01
+        start = datetime.date(1993, 8, 5) + datetime.timedelta(days=rng.randrange(11500))
+        for _ in range(rng.choice([1, 1, 2, 3, 4, 6, 9, 15])):
+            day = start + datetime.timedelta(days=rng.randrange(max(1, (TODAY - start).days)))
+            rows.append((name, day.isoformat(), reserved))
+    rng.shuffle(rows)
+    return rows
+
+
+def reference(rows):
+    """name → (reprints, avg interval, risk, rationale), one card at a time."""
+    dates, reserved = {}, {}
+    for name, released, flag in rows:
+        dates.setdefault(name, set()).add(datetime.date.fromisoformat(released))
+        reserved[name] = reserved.get(name, False) or flag
+    out = {}
+    for name, days in dates.items():
+        days = sorted(days)
+        reprints = len(days) - 1
+        interval = (days[-1] - days[0]).days / reprints if reprints else None
+        since = max((TODAY - days[-1]).days, 0)
+        count = min(reprints, rr.MAX_COUNTED_REPRINTS) / rr.MAX_COUNTED_REPRINTS
+        fast = 0.0
+        if reprints:
+            fast = (rr.SLOW_INTERVAL_DAYS - interval) / (rr.SLOW_INTERVAL_DAYS - rr.FAST_INTERVAL_DAYS)
+            fast = min(max(fast, 0.0), 1.0)
+        due = min(since / (max(interval, 1.0) if reprints else rr.SINGLE_PRINTING_DUE_DAYS), 1.0)
+        w = rr.WEIGHTS
+        risk = 0 if reserved[name] else round(100 * (w[0] * count + w[1] * fast + w[2] * due))
+        code = (rr._RESERVED * reserved[name] | rr._MULTIPLE * (reprints >= rr.MULTIPLE_REPRINTS)
+                | rr._SHORT * bool(reprints and interval <= rr.SHORT_INTERVAL_DAYS) | rr._SINGLE * (reprints == 0))
+        out[name] = (reprints, interval, risk, rr.RATIONALES[code])
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--collection", type=int, default=20000)
+    ap.add_argument("--repeats", type=int, default=20)
+    args = ap.parse_args()
+
+    rows = synthetic_printings(args.cards)
+    t0 = time.perf_counter()
+    table = ReprintRisk.from_printings(rows, TODAY)
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    want = reference(rows)
+    ref_build = time.perf_counter() - t0
+    mismatches = 0
+    for name, (reprints, interval, risk, rationale) in want.items():
+        got = table.entry(table.ids[name])
+        if (got["reprints"] != reprints or got["risk"] != risk or got["rationale"] != rationale
+                or (interval is None) != (got["avg_interval_days"] is None)
+                or (interval is not None and abs(got["avg_interval_days"] - interval) > 0.06)):
+            mismatches += 1
+    bands = {name: int((table.band == b).sum()) for b, (name, _lo) in enumerate(rr.BANDS)}
+    print(f"printings={len(rows)} cards={len(table)} build={build * 1e3:.0f}ms "
+          f"(python reference {ref_build * 1e3:.0f}ms) bands={bands} mismatches={mismatches}")
+
+    rng = random.Random(5)
+    prices = np.array([round(rng.lognormvariate(0, 1.5), 2) if rng.random() < 0.95 else np.nan
+                       for _ in range(len(table))])
+    names = [rng.choice(table.names) for _ in range(args.collection)]
+    names[::50] = [f"Unknown {i}" for i in range(len(names[::50]))]
+    names[1::97] = [n.upper() for n in names[1::97]]
+    qty = [rng.choice([1, 1, 1, 2, 4]) for _ in names]
+
+    result = table.exposure(names, qty, prices, top=10)
+    expected = 0.0
+    for name, q in zip(names, qty):
+        i = table.ids.get(name, table.folded.get(rr.fold(name)))
+        if i is not None and prices[i] == prices[i]:
+            expected += q * prices[i] * table.risk[i] / 100.0
+    print(f"collection={len(names)} value at risk={result['value_at_risk_gbp']} "
+          f"(python loop {expected:.2f}) unknown={result['unknown_cards']} unpriced={result['unpriced_cards']}")
+
+    timings = []
+    for _ in range(args.repeats):
+        t0 = time.perf_counter()
+        table.exposure(names, qty, prices, top=10)
+        timings.append((time.perf_counter() - t0) * 1e3)
+    t0 = time.perf_counter()
+    for _ in range(3):
+        [table.lookup(name) for name in names]
+    per_card = (time.perf_counter() - t0) / 3 * 1e3
+    print(f"  exposure          {min(timings):7.2f}ms best, {sorted(timings)[len(timings) // 2]:7.2f}ms median")
+    print(f"  per-card lookups  {per_card:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
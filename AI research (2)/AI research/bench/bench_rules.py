@@ -0,0 +1,128 @@
+"""
+Benchmark the Comprehensive Rules lookup index.
+
+Times ``RulesIndex.lookup`` (exact and prefix), ``search`` and
+``citations`` on ``mtg_rules_dataset.json`` and on a synthetic dataset of
+``--entries`` entries with random CR references, against a reference
+that scans every entry and re‑parses its ``rule_reference`` per query,
+and checks both return the same entries.  Target: lookups in
+microseconds.
+
+    python bench/bench_rules.py [--entries 20000] [--queries 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rules_index import RULES_DATASET, RulesIndex, normalise_number, parse_reference, sort_key  # noqa: E402
+
+
+def under(number, query):
+    """Is CR ``number`` ``query`` itself or beneath it in the rule tree?"""
+    if number == query:
+        return True
+    if len(query) == 1:
+        return number[0] == query
+    if "." not in query:
+        return number.split(".")[0] == query
+    return number.startswith(query) and number[len(query):].isalpha()
+
+
+def linear_lookup(rows, query, prefix):
+    """Scan every entry; order by the smallest matching number, then dataset order."""
+    query = normalise_number(query)
+    found = []
+    for i, row in enumerate(rows):
+        numbers = parse_reference(row["rule_reference"])
+        matching = [n for n in numbers if (under(n, query) if prefix else n == query)]
+        if matching:
+            found.append((min(sort_key(n) for n in matching), i))
+    return [i for _key, i in sorted(found)]
+
+
+def synthetic_rows(n, seed=17):
+    rng = random.Random(seed)
+    words = "damage counter layer priority stack trigger replacement commander zone token copy mana cost".split()
+    words += ["".join(rng.choices("bcdfgklmnprstvz", k=3)) + rng.choice("aeiou") + "x" for _ in range(3000)]
+    rows = []
+    for i in range(n):
+        refs = []
+        for _ in range(rng.choice([1, 1, 2, 3])):
+            section = rng.choice([100, 111, 119, 120, 601, 603, 613, 614, 702, 704, 707, 903]) + rng.randint(0, 5)
+            ref = f"CR {section}"
+            if rng.random() < 0.9:
+                ref += f".{rng.randint(1, 140)}"
+                if rng.random() < 0.6:
+                    first = rng.randint(0, 10)
+                    ref += chr(97 + first) + (f"-{chr(97 + first + rng.randint(1, 4))}" if rng.random() < 0.2 else "")
+            refs.append(ref)
+        rows.append({
+            "topic": " ".join(rng.sample(words, 2)).title(),
+            "rule_reference": "; ".join(refs),
+            "plain_explanation": " ".join(rng.choices(words, k=20)),
+            "example": " ".join(rng.choices(words, k=10)),
+            "sources": ["synthetic"],
+        })
+    return rows
+
+
+def run(label, rows, queries):
+    t0 = time.perf_counter()
+    index = RulesIndex.from_rows(rows)
+    build = time.perf_counter() - t0
+    mismatches = 0
+    for query, prefix in queries[:300]:
+        got = [index.entries.index(e) for e in index.lookup(query, prefix)]
+        if got != linear_lookup(rows, query, prefix):
+            mismatches += 1
+    print(f"{label}: entries={len(rows)} nodes={len(index.nodes)} build={build * 1e3:.0f}ms "
+          f"reference checks={min(300, len(queries))} mismatches={mismatches}")
+    for name, fn in (
+        ("exact lookup", lambda q: index.lookup(q, prefix=False)),
+        ("prefix lookup", lambda q: index.lookup(q)),
+    ):
+        t0 = time.perf_counter()
+        for query, _prefix in queries:
+            fn(query)
+        print(f"  {name:14s} {(time.perf_counter() - t0) / len(queries) * 1e6:7.1f} us/query")
+    t0 = time.perf_counter()
+    for query, prefix in queries[:50]:
+        linear_lookup(rows, query, prefix)
+    print(f"  {'linear scan':14s} {(time.perf_counter() - t0) / 50 * 1e6:7.1f} us/query")
+    texts = ["commander damage from the command zone", "layer dependency for copy effects",
+             "Under CR 704.5a the player loses; see also rule 613.7b for timestamps."]
+    for name, fn in (("keyword search", lambda t: index.search(t, 5)), ("citations", index.citations)):
+        t0 = time.perf_counter()
+        for _ in range(100):
+            for text in texts:
+                fn(text)
+        print(f"  {name:14s} {(time.perf_counter() - t0) / (100 * len(texts)) * 1e6:7.1f} us/query")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=20000)
+    ap.add_argument("--queries", type=int, default=2000)
+    args = ap.parse_args()
+
+    rng = random.Random(4)
+    with open(RULES_DATASET, encoding="utf-8") as fh:
+        dataset = json.load(fh)
+    for label, rows in (("mtg_rules_dataset", dataset), ("synthetic", synthetic_rows(args.entries))):
+        numbers = sorted({n for row in rows for n in parse_reference(row["rule_reference"])})
+        prefixes = sorted({n.rsplit(".", 1)[0] for n in numbers} | {n.rstrip("abcdefghijklmnopqrstuvwxyz") for n in numbers})
+        pool = numbers + prefixes + ["7", "999.1"]
+        queries = [(rng.choice(pool), rng.random() < 0.5) for _ in range(args.queries)]
+        run(label, rows, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark synergy‑ranked replacement selection.
+
+Builds the synthetic database from ``bench_replacements`` and a synthetic
+synergy table (``--per-commander`` scored cards for each of 10
+commanders), then times ``propose_replacements`` cheapest first and
+ranked for a commander, and checks the heap top‑k picks the same cards
+as sorting every match by ``combined_score``.
+
+    python bench/bench_synergy.py [--cards 30000] [--per-commander 2000] [--queries 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import replacement_engine as engine  # noqa: E402
+from bench_replacements import FORMATS, synthetic_database  # noqa: E402
+from synergy import SynergyTable, combined_score  # noqa: E402
+
+COMMANDERS = [f"Commander {i}" for i in range(10)]
+
+
+def synthetic_synergy(names, per_commander: int, seed: int = 11):
+    rng = random.Random(seed)
+    return SynergyTable({
+        commander: {name: round(rng.random(), 2) for name in rng.sample(names, per_commander)}
+        for commander in COMMANDERS
+    })
+
+
+def sorted_pick(card_name, fmt, deck_colors, commander):
+    """Reference selection: score every match per tier and sort."""
+    index = engine.get_index()
+    synergy = engine.get_synergy().positions(commander, index)
+    roles = engine.assign_role(card_name)
+    mask = engine.colour_mask(deck_colors)
+    exclude = index.position.get(card_name)
+    picked = []
+    for _tier, bound in engine.DEFAULT_TIERS:
+        matches = [i for i in index.candidates(roles, fmt, mask, bound, exclude) if i not in picked]
+        matches.sort(key=lambda i: (-combined_score(synergy.get(i, 0.0), index.prices[i], engine.SYNERGY_WEIGHT), index.rank[i]))
+        picked.extend(matches[: 5 - len(picked)])
+        if len(picked) >= 5:
+            break
+    return [index.names[i] for i in picked]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--per-commander", type=int, default=2000)
+    ap.add_argument("--queries", type=int, default=500)
+    args = ap.parse_args()
+
+    engine.CARD_DATABASE = synthetic_database(args.cards)
+    engine.rebuild_index()
+    names = list(engine.CARD_DATABASE)
+    engine._SYNERGY = synthetic_synergy(names, args.per_commander)
+
+    rng = random.Random(1)
+    queries = [
+        (rng.choice(names), rng.choice(FORMATS), rng.sample("WUBRG", rng.choice([1, 2, 3, 5])), rng.choice(COMMANDERS))
+        for _ in range(args.queries)
+    ]
+
+    t0 = time.perf_counter()
+    for card, fmt, colours, _commander in queries:
+        engine.propose_replacements(card, fmt, 5.0, colours)
+    t_price = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ranked = [engine.propose_replacements(card, fmt, 5.0, colours, commander=commander) for card, fmt, colours, commander in queries]
+    t_synergy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    reference = [sorted_pick(*query) for query in queries]
+    t_sorted = time.perf_counter() - t0
+
+    mismatches = sum([s["card_name"] for s in got] != want for got, want in zip(ranked, reference))
+    per_query = lambda t: t / args.queries * 1e6  # noqa: E731
+    print(f"cards={args.cards} scored per commander={args.per_commander} queries={args.queries}")
+    print(f"cheapest first:       {per_query(t_price):9.1f} us/query")
+    print(f"synergy top-k (heap): {per_query(t_synergy):9.1f} us/query")
+    print(f"synergy full sort:    {per_query(t_sorted):9.1f} us/query")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark the columnar commander synergy store.
+
+Generates ``--rows`` synthetic synergy rows (some pairs repeated, a few
+features missing), builds a ``SynergyStore``, saves and reloads it
+memory‑mapped, and times ``top`` queries and bulk ``score_pairs``
+against a dict‑of‑dicts reference built the way ``SynergyTable`` reads
+the JSON‑lines file.  Both must agree on every pair and on the top‑N
+order.  Target: top‑N in microseconds.
+
+    python bench/bench_synergy_store.py [--rows 1000000] [--commanders 2000] [--cards 30000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from synergy_store import SynergyStore  # noqa: E402
+
+FEATURES = ("color_ok", "curve_alignment", "role_match", "text_similarity", "usage_z")
+
+
+def synthetic_rows(n, commanders, cards, seed=5):
+    rng = np.random.default_rng(seed)
+    commander_col = rng.integers(0, commanders, n)
+    card_col = rng.integers(0, cards, n)
+    scores = np.round(rng.random(n), 2)
+    values = np.round(rng.random((n, len(FEATURES))), 4)
+    missing = rng.random(n) < 0.05
+    rows = []
+    for i in range(n):
+        features = dict(zip(FEATURES, values[i].tolist()))
+        if missing[i]:
+            features.pop("usage_z")
+        rows.append({
+            "commander_name": f"Commander {commander_col[i]}",
+            "card_name": f"Card {card_col[i]}",
+            "synergy_score": float(scores[i]),
+            "features": features,
+        })
+    return rows
+
+
+def reference(rows):
+    """commander → {card → mean score}, as ``SynergyTable`` averages repeats."""
+    sums, counts = {}, {}
+    for row in rows:
+        key = (row["commander_name"], row["card_name"])
+        sums[key] = sums.get(key, 0.0) + row["synergy_score"]
+        counts[key] = counts.get(key, 0) + 1
+    table = {}
+    for (commander, card), total in sums.items():
+        table.setdefault(commander, {})[card] = total / counts[(commander, card)]
+    return table
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1000000)
+    ap.add_argument("--commanders", type=int, default=2000)
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--queries", type=int, default=5000)
+    ap.add_argument("--pairs", type=int, default=100000)
+    args = ap.parse_args()
+
+    rows = synthetic_rows(args.rows, args.commanders, args.cards)
+    t0 = time.perf_counter()
+    table = reference(rows)
+    ref_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    built = SynergyStore.from_rows(rows)
+    build = time.perf_counter() - t0
+    with tempfile.TemporaryDirectory() as tmp:
+        built.save(tmp)
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        t0 = time.perf_counter()
+        store = SynergyStore.load(tmp)
+        load = time.perf_counter() - t0
+        print(f"rows={len(rows)} pairs={len(store)} commanders={len(store.commanders)} build={build:.1f}s "
+              f"(dict reference {ref_build:.1f}s) on disk={size / 2 ** 20:.1f}MiB load={load * 1e3:.1f}ms")
+
+        rng = random.Random(3)
+        names = list(table)
+        mismatches = 0
+        for commander in names[:300]:
+            # The store ranks by its scores as served (rounded), ties by card name.
+            want = sorted(table[commander].items(), key=lambda item: (-round(item[1], 4), item[0]))[:20]
+            got = store.top(commander, 20)
+            if [g["card_name"] for g in got] != [w[0] for w in want] or any(
+                abs(g["synergy_score"] - w[1]) > 1e-4 for g, w in zip(got, want)
+            ):
+                mismatches += 1
+        print(f"top-20 checks=300 mismatches={mismatches}")
+
+        pairs = [(rng.choice(names), f"Card {rng.randrange(args.cards + 100)}") for _ in range(args.pairs)]
+        got = store.score_pairs(pairs)
+        want = [table[c].get(card) for c, card in pairs]
+        bad = sum((g is None) != (w is None) or (g is not None and abs(g - w) > 1e-4) for g, w in zip(got, want))
+        print(f"pair checks={len(pairs)} found={sum(w is not None for w in want)} mismatches={bad}")
+
+        queries = [rng.choice(names) for _ in range(args.queries)]
+        for n in (10, 50):
+            t0 = time.perf_counter()
+            for commander in queries:
+                store.top(commander, n)
+            print(f"  top-{n:<3d}          {(time.perf_counter() - t0) / len(queries) * 1e6:7.1f} us/query")
+        t0 = time.perf_counter()
+        for commander in queries:
+            sorted(table[commander].items(), key=lambda item: -item[1])[:10]
+        print(f"  dict sort top-10  {(time.perf_counter() - t0) / len(queries) * 1e6:7.1f} us/query")
+        t0 = time.perf_counter()
+        store.score_pairs(pairs)
+        print(f"  score_pairs       {(time.perf_counter() - t0) / len(pairs) * 1e6:7.2f} us/pair ({len(pairs)} pairs)")
+        t0 = time.perf_counter()
+        [table[c].get(card) for c, card in pairs]
+        print(f"  dict lookups      {(time.perf_counter() - t0) / len(pairs) * 1e6:7.2f} us/pair")
+
+
+if __name__ == "__main__":
+    main()
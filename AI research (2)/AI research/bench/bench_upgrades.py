@@ -0,0 +1,113 @@
+"""
+Benchmark the budget‑constrained upgrade optimiser.
+
+Times ``plan_upgrades`` for random 100‑card Commander decks against the
+synthetic database from ``bench_replacements`` and a synthetic synergy
+table with ``--per-commander`` scored cards per commander (the
+candidates), for several total budgets.  Target: under 100 ms for the
+slowest plan, including the first plan for each commander.
+
+Exactness is checked separately: ``--checks`` small random instances are
+solved by ``solve_upgrades`` and by exhaustive search over every
+assignment of distinct candidates to deck cards of the same role, and
+the best gains must agree.
+
+    python bench/bench_upgrades.py [--cards 30000] [--per-commander 5000] [--decks 50] [--checks 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import replacement_engine as engine  # noqa: E402
+from bench_replacements import synthetic_database  # noqa: E402
+from bench_synergy import COMMANDERS, synthetic_synergy  # noqa: E402
+from upgrades import Candidate, Slot, solve_upgrades  # noqa: E402
+
+BUDGETS = (10.0, 50.0, 200.0)
+TARGET_MS = 100.0
+
+
+def exhaustive_gain(slots, candidates, budget):
+    """Best gain over every assignment of distinct candidates to same‑role slots."""
+    cents = [round(c.cost * 100) for c in candidates]
+    limit = round(budget * 100)
+    best = 0.0
+
+    def search(s, spent, gain, used):
+        nonlocal best
+        if s == len(slots):
+            best = max(best, gain)
+            return
+        search(s + 1, spent, gain, used)
+        for j, c in enumerate(candidates):
+            if j in used or c.role != slots[s].role or spent + cents[j] > limit:
+                continue
+            search(s + 1, spent + cents[j], gain + c.value - slots[s].value, used | {j})
+
+    search(0, 0, 0.0, frozenset())
+    return best
+
+
+def random_instance(rng):
+    roles = ["Ramp", "Draw", "Control"]
+    slots = [Slot(f"Deck {i}", rng.choice(roles), round(rng.random(), 2)) for i in range(rng.randint(1, 5))]
+    candidates = [
+        Candidate(f"Cand {j}", rng.choice(roles), round(rng.random(), 2), round(rng.uniform(0, 8), 2))
+        for j in range(rng.randint(1, 8))
+    ]
+    return slots, candidates, round(rng.uniform(0, 20), 2)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--per-commander", type=int, default=5000)
+    ap.add_argument("--decks", type=int, default=50)
+    ap.add_argument("--checks", type=int, default=300)
+    args = ap.parse_args()
+
+    rng = random.Random(5)
+    mismatches = 0
+    for _ in range(args.checks):
+        slots, candidates, budget = random_instance(rng)
+        got = solve_upgrades(slots, candidates, budget, unit=0.01)
+        want = exhaustive_gain(slots, candidates, budget)
+        if abs(got["gain"] - want) > 1e-6 or got["spent"] > budget + 1e-9:
+            mismatches += 1
+    print(f"exhaustive checks={args.checks} mismatches={mismatches}")
+
+    engine.CARD_DATABASE = synthetic_database(args.cards)
+    engine.rebuild_index()
+    names = list(engine.CARD_DATABASE)
+    engine._SYNERGY = synthetic_synergy(names, args.per_commander)
+
+    decks = []
+    for _ in range(args.decks):
+        cards = rng.sample(names, 100)
+        decks.append(([{"card_name": name, "qty": 1} for name in cards], rng.choice(COMMANDERS)))
+
+    print(f"cards={args.cards} candidates per commander={args.per_commander} decks={args.decks}")
+    for budget in BUDGETS:
+        timings, swaps = [], []
+        for decklist, commander in decks:
+            t0 = time.perf_counter()
+            plan = engine.plan_upgrades(decklist, budget, "Commander", "WUBRG", commander=commander)
+            timings.append((time.perf_counter() - t0) * 1e3)
+            swaps.append(len(plan["swaps"]))
+            assert plan["spent"] <= budget + 1e-9
+        worst = max(timings)
+        print(f"budget £{budget:6.2f}: median {statistics.median(timings):6.1f}ms  max {worst:6.1f}ms  "
+              f"swaps {statistics.mean(swaps):5.1f}  target<{TARGET_MS:.0f}ms {'ok' if worst < TARGET_MS else 'MISSED'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Candidate Index for the Replacement Engine
+==========================================
+
+``propose_replacements`` needs, for one violating card, the cheapest
+cards that share a role with it, are legal in the chosen format and fit
+the deck's colour identity.  Scanning the whole card database for every
+violation makes ``analyse_deck`` O(violations × database); this module
+precomputes the structures that make each query O(matches) instead:
+
+* **Role postings** – for every role, the positions of the cards with
+  that role, sorted by (price, database order), together with a parallel
+  price list so a tier's price bound is a single ``bisect``.
+* **Colour identity masks** – every identity is a 5‑bit WUBRG mask, so
+  the commander subset rule is ``mask & ~deck_mask == 0``.
+* **Legality bitsets** – one bit per card for every format the card is
+  banned in, stored in a ``bytearray`` so each test is O(1).
+
+``ranked_candidates`` ranks the same matches by commander synergy blended
+with price, using heap top‑k selection instead of sorting every match.
+
+The index is a snapshot of the database it was built from; rebuild it
+after editing ``CARD_DATABASE``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+from itertools import islice
+from typing import Container, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from synergy import combined_score
+
+COLOURS = "WUBRG"
+
+
+def colour_mask(colours: Iterable[str]) -> int:
+    """Return the WUBRG bitmask for a list of colour letters."""
+    mask = 0
+    for colour in colours:
+        i = COLOURS.find(str(colour).strip().upper()[:1])
+        if i >= 0:
+            mask |= 1 << i
+    return mask
+
+
+class CardIndex:
+    """Read‑only candidate index over a card database mapping.
+
+    ``legality`` (a ``legality.LegalityMatrix`` compiled with the
+    database's names first) adds the cards it marks banned or not legal
+    to the per‑format bitsets, on top of the database's own ``banned_in``.
+    """
+
+    def __init__(self, database: Mapping[str, Mapping[str, object]], legality=None):
+        self.source = database
+        self.size = len(database)
+        self.names: List[str] = list(database.keys())
+        self.position: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.prices: List[float] = []
+        self.masks: List[int] = []
+        self.roles: List[Tuple[str, ...]] = []
+        banned_positions: Dict[str, Iterable[int]] = {}
+        columns = getattr(database, "index_columns", None)
+        if columns is not None:
+            # Columnar stores (card_store.CardStore) hand over their arrays directly.
+            prices, masks, roles, banned_positions = columns()
+            self.prices = [float(p) for p in prices.tolist()]
+            self.masks = masks.tolist()
+            self.roles = roles
+            self.position = dict(getattr(database, "position", self.position))
+        else:
+            for i, name in enumerate(self.names):
+                entry = database[name]
+                self.prices.append(float(entry.get("price_gbp", 0.0) or 0.0))
+                self.masks.append(colour_mask(entry.get("color_identity", [])))
+                self.roles.append(tuple(entry.get("roles", [])))
+                for fmt in entry.get("banned_in", []):
+                    banned_positions.setdefault(fmt, []).append(i)
+        if legality is not None:
+            banned_positions = {fmt: list(positions) for fmt, positions in banned_positions.items()}
+            for fmt in legality.formats:
+                rows = legality.unplayable_rows(fmt)
+                extra = rows[:bisect.bisect_left(rows, self.size)]
+                if extra:
+                    banned_positions.setdefault(fmt, []).extend(extra)
+
+        self._banned: Dict[str, bytearray] = {}
+        for fmt, positions in banned_positions.items():
+            bits = bytearray((self.size + 7) // 8)
+            for i in positions:
+                bits[i >> 3] |= 1 << (i & 7)
+            self._banned[fmt] = bits
+
+        # Global (price, database order) rank; postings are kept in rank order
+        # so streams from several roles can be merged without re-sorting.
+        order = sorted(range(self.size), key=lambda i: (self.prices[i], i))
+        self.rank: List[int] = [0] * self.size
+        for r, i in enumerate(order):
+            self.rank[i] = r
+        self._postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for i in order:
+            for role in self.roles[i]:
+                positions, prices = self._postings.setdefault(role, ([], []))
+                positions.append(i)
+                prices.append(self.prices[i])
+
+    def matches(self, database: Mapping[str, Mapping[str, object]]) -> bool:
+        """Cheap staleness check: same mapping object and same size."""
+        return database is self.source and len(database) == self.size
+
+    def is_banned(self, position: int, fmt: str) -> bool:
+        bits = self._banned.get(fmt)
+        return bool(bits and bits[position >> 3] >> (position & 7) & 1)
+
+    def banned_bitset(self, fmt: str) -> bytearray:
+        """The format's banned bits, least significant bit first (empty if none)."""
+        return self._banned.get(fmt, bytearray())
+
+    def candidates(
+        self,
+        roles: Sequence[str],
+        fmt: str,
+        deck_mask: int,
+        max_price: float = float("inf"),
+        exclude: Optional[int] = None,
+    ) -> Iterator[int]:
+        """Yield positions of matching cards, cheapest first.
+
+        A card matches if it shares at least one of ``roles``, is not
+        banned in ``fmt``, its identity fits within ``deck_mask`` and it
+        costs at most ``max_price``.  Ties keep database order.
+        """
+        banned = self._banned.get(fmt)
+        outside = ~deck_mask
+        streams = []
+        for role in dict.fromkeys(roles):
+            posting = self._postings.get(role)
+            if not posting:
+                continue
+            positions, prices = posting
+            end = bisect.bisect_right(prices, max_price)
+            if end:
+                streams.append(islice(positions, end))
+        merged = streams[0] if len(streams) == 1 else heapq.merge(*streams, key=self.rank.__getitem__)
+        last = -1
+        for i in merged:
+            # Cards with several shared roles appear once per posting, adjacently.
+            if i == last or i == exclude:
+                continue
+            last = i
+            if self.masks[i] & outside:
+                continue
+            if banned and banned[i >> 3] >> (i & 7) & 1:
+                continue
+            yield i
+
+    def ranked_candidates(
+        self,
+        roles: Sequence[str],
+        fmt: str,
+        deck_mask: int,
+        k: int,
+        synergy: Mapping[int, float],
+        ranked: Iterable[int],
+        weight: float,
+        max_price: float = float("inf"),
+        exclude: Optional[int] = None,
+        skip: Container[int] = (),
+    ) -> List[int]:
+        """Return the ``k`` best matching positions by ``combined_score``.
+
+        ``synergy`` maps positions to scores and ``ranked`` lists those
+        positions best first (see ``SynergyTable``), so only the first
+        ``k`` scored matches are needed.  Other cards score 0 for synergy
+        and therefore rank in the cheapest‑first order of ``candidates``,
+        so again only the first ``k`` can make the cut: the heap sees at
+        most ``2k`` entries rather than every match.  Positions in
+        ``skip`` are ignored; ties keep (price, database order).
+        """
+        if k <= 0:
+            return []
+        wanted = set(roles)
+        outside = ~deck_mask
+        banned = self._banned.get(fmt)
+        pool: List[Tuple[float, int, int]] = []
+        for i in ranked:
+            if i == exclude or i in skip or self.prices[i] > max_price or self.masks[i] & outside:
+                continue
+            if banned and banned[i >> 3] >> (i & 7) & 1:
+                continue
+            if wanted.isdisjoint(self.roles[i]):
+                continue
+            pool.append((combined_score(synergy[i], self.prices[i], weight), -self.rank[i], i))
+            if len(pool) >= k:
+                break
+        unscored = 0
+        for i in self.candidates(roles, fmt, deck_mask, max_price, exclude):
+            if i in synergy or i in skip:
+                continue
+            pool.append((combined_score(0.0, self.prices[i], weight), -self.rank[i], i))
+            unscored += 1
+            if unscored >= k:
+                break
+        return [i for _score, _rank, i in heapq.nlargest(k, pool)]
@@ -0,0 +1,255 @@
+"""
+Card Name Normalisation
+=======================
+
+Deck imports are full of names Scryfall's exact lookup rejects:
+nicknames ("L. Bolt", "SDT"), misspellings ("Ligthning Bolt"), spacing
+and case slips ("Counter Spell", "SkullClamp") and printing annotations
+("Forest (Full Art)", "Ponder (Japanese)", "Sol Ring (CMR) 472").
+``NameNormalizer`` rewrites them to canonical names offline, with a
+confidence, before anything reaches the network:
+
+* Names are compared by a *folded* key – accents, case, spaces and
+  punctuation removed ("Sensei's Divining Top" → ``senseisdiviningtop``)
+  – so every spacing/case variant of a known name is one dict hit.
+* ``aliases.jsonl`` nicknames map through the same folded table, with
+  the confidence the dataset gives them.
+* Trailing annotations in brackets (plus a following collector number)
+  are stripped and the rest resolved again; a ``//`` name falls back to
+  its front face.
+* Anything still unknown goes to an edit-distance fallback: every
+  folded name of at least ``MIN_FUZZY_LENGTH`` characters is indexed
+  under itself and each one-character deletion, so a misspelt key only
+  looks up its own deletions and verifies the few names they share with
+  a bounded optimal-string-alignment distance (a transposition is one
+  edit).  Ties between different cards are left unresolved.
+
+The vocabulary is every ``card_name``/``commander_name`` in the bundled
+datasets plus both sides of ``confusions.json``: its pairs whose folded
+names differ ("Elvish Mystic" / "Llanowar Elves") are distinct real
+cards, so both are known names and neither is rewritten into the other.
+Pure Python, so deck parsing works without NumPy.
+
+    python card_names.py "L. Bolt" "Counter Spell" "Forest (Full Art)"
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ALIASES_PATH = os.path.join(HERE, "aliases.jsonl")
+CONFUSIONS_PATH = os.path.join(HERE, "confusions.json")
+# Datasets whose card_name / commander_name columns are known card names.
+NAME_SOURCES = tuple(os.path.join(HERE, f) for f in (
+    "canonical_cards.jsonl", "reprint_risk_dataset.jsonl", "synergy_dataset.jsonl", "mtg_price_dataset.json",
+    "commander_metagame.json", "mtg_banlist_dataset.csv",
+))
+NAME_FIELDS = ("card_name", "commander_name")
+
+MIN_FUZZY_LENGTH = 8
+# Folded keys this long tolerate two edits; shorter ones only one.
+LONG_NAME_LENGTH = 14
+FUZZY_MAX_CONFIDENCE = 0.9
+VARIANT_CONFIDENCE = 0.95
+FOLDED_CONFIDENCE = 0.95
+CACHE_SIZE = 1 << 14
+
+# "(Full Art)", "[PLST]", "(CMR) 472", "(Japanese)"; Archidekt "^Have,#37d67a^" tags.
+ANNOTATION_RE = re.compile(r"\s*(?:[(\[][^()\[\]]*[)\]]|\^[^^]*\^)(?:\s+\d[\w★*-]*)?\s*$")
+FACE_SEPARATOR = "//"
+
+
+class Resolution(NamedTuple):
+    """``rule`` is how ``name`` was reached: exact, folded, alias, variant,
+    fuzzy, or unknown (``name`` unchanged, confidence 0)."""
+    name: str
+    confidence: float
+    rule: str
+
+
+def fold(name: str) -> str:
+    """Comparison key: "Sensei’s Divining-Top" -> "senseisdiviningtop"."""
+    name = unicodedata.normalize("NFKD", name or "").casefold().replace("æ", "ae")
+    return "".join(ch for ch in name if ch.isalnum())
+
+
+def strip_annotations(name: str) -> str:
+    """``name`` without trailing bracketed annotations: "Sol Ring (CMR) 472" -> "Sol Ring"."""
+    while True:
+        m = ANNOTATION_RE.search(name)
+        if not m or m.start() == 0:
+            return name
+        name = name[:m.start()]
+
+
+def deletions(key: str) -> Iterable[str]:
+    """``key`` with each one of its characters removed."""
+    return (key[:i] + key[i + 1:] for i in range(len(key)))
+
+
+def osa_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Only the middle that differs needs the table.
+    start, stop_a, stop_b = 0, len(a), len(b)
+    while start < stop_a and start < stop_b and a[start] == b[start]:
+        start += 1
+    while stop_a > start and stop_b > start and a[stop_a - 1] == b[stop_b - 1]:
+        stop_a, stop_b = stop_a - 1, stop_b - 1
+    a, b = a[start:stop_a], b[start:stop_b]
+    if not a or not b:
+        return min(len(a) + len(b), limit + 1)
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            d = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d = min(d, previous2[j - 2] + 1)
+            current[j] = d
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def max_edits(key: str) -> int:
+    if len(key) < MIN_FUZZY_LENGTH:
+        return 0
+    return 2 if len(key) >= LONG_NAME_LENGTH else 1
+
+
+class NameNormalizer:
+    def __init__(self, names: Iterable[str], aliases: Iterable[Mapping[str, object]] = (),
+                 confusions: Iterable[Mapping[str, str]] = ()):
+        # folded key -> (canonical name, confidence, rule)
+        self.table: Dict[str, Tuple[str, float, str]] = {}
+        for name in names:
+            if name and fold(name):
+                self.table.setdefault(fold(name), (name, 1.0, "exact"))
+        for pair in confusions:
+            canonical, variant = pair.get("alias") or "", pair.get("variant") or ""
+            self.table.setdefault(fold(canonical), (canonical, 1.0, "exact"))
+            if fold(strip_annotations(variant)) != fold(canonical):
+                self.table.setdefault(fold(variant), (variant, 1.0, "exact"))
+        for row in aliases:
+            key, target = fold(str(row.get("alias") or "")), str(row.get("normalized_name") or "")
+            if key and target and key not in self.table:
+                self.table[key] = (target, float(row.get("confidence", 0.8)), "alias")
+        self.deletes: Dict[str, Set[str]] = {}
+        for key in self.table:
+            if max_edits(key):
+                self.deletes.setdefault(key, set()).add(key)
+                for d in deletions(key):
+                    self.deletes.setdefault(d, set()).add(key)
+        self.resolve = lru_cache(maxsize=CACHE_SIZE)(self._resolve)
+
+    @classmethod
+    def load(cls, aliases_path: str = ALIASES_PATH, confusions_path: str = CONFUSIONS_PATH,
+             name_sources: Sequence[str] = NAME_SOURCES) -> "NameNormalizer":
+        names: List[str] = []
+        for path in name_sources:
+            if os.path.exists(path):
+                names.extend(read_names(path))
+        aliases = read_records(aliases_path) if os.path.exists(aliases_path) else []
+        confusions = read_records(confusions_path) if os.path.exists(confusions_path) else []
+        return cls(names, aliases, confusions)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def lookup(self, name: str) -> Optional[Resolution]:
+        """Exact or alias hit for ``name``'s folded key."""
+        hit = self.table.get(fold(name))
+        if hit is None:
+            return None
+        canonical, confidence, rule = hit
+        if rule == "exact" and canonical != name:
+            return Resolution(canonical, FOLDED_CONFIDENCE, "folded")
+        return Resolution(canonical, confidence, rule)
+
+    def fuzzy(self, name: str) -> Optional[Resolution]:
+        """Closest known name within ``max_edits``; None if none or tied."""
+        key = fold(name)
+        limit = max_edits(key)
+        if not limit:
+            return None
+        candidates: Set[str] = set(self.deletes.get(key, ()))
+        for d in deletions(key):
+            candidates.update(self.deletes.get(d, ()))
+        best, found = limit + 1, set()
+        for candidate in candidates:
+            distance = osa_distance(key, candidate, min(limit, max_edits(candidate)))
+            if distance < best:
+                best, found = distance, {candidate}
+            elif distance == best:
+                found.add(candidate)
+        targets = {self.table[k][0] for k in found}
+        if best > limit or len(targets) != 1:
+            return None
+        canonical, confidence, _rule = self.table[found.pop()]
+        score = min(FUZZY_MAX_CONFIDENCE, 1.0 - best / len(key))
+        return Resolution(canonical, round(confidence * score, 3), "fuzzy")
+
+    def _resolve(self, original: str) -> Resolution:
+        name = original.strip()
+        hit = self.lookup(name)
+        if hit is not None:
+            return hit
+        bare = strip_annotations(name)
+        if bare != name:
+            hit = self.lookup(bare)
+            if hit is not None:
+                return Resolution(hit.name, round(min(hit.confidence, VARIANT_CONFIDENCE), 3), "variant")
+            name = bare
+        if FACE_SEPARATOR in name:
+            front = name.split(FACE_SEPARATOR, 1)[0].strip()
+            hit = self.lookup(front)
+            if hit is not None:
+                return Resolution(hit.name, round(min(hit.confidence, VARIANT_CONFIDENCE), 3), "variant")
+        hit = self.fuzzy(name)
+        if hit is not None:
+            return hit
+        return Resolution(original, 0.0, "unknown")
+
+
+def read_records(path: str) -> List[Mapping[str, object]]:
+    """Rows of a .jsonl, .json (a list) or .csv file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        if path.endswith(".csv"):
+            return list(csv.DictReader(line for line in f if line.strip()))
+        data = json.load(f)
+    return data if isinstance(data, list) else []
+
+
+def read_names(path: str) -> Iterable[str]:
+    for row in read_records(path):
+        if not isinstance(row, Mapping):
+            continue
+        for field in NAME_FIELDS:
+            value = row.get(field)
+            if isinstance(value, str) and value.strip():
+                yield value.strip()
+        for card in row.get("top_cards") or ():
+            if isinstance(card, Mapping) and card.get("card_name"):
+                yield str(card["card_name"])
+
+
+if __name__ == "__main__":
+    normalizer = NameNormalizer.load()
+    for arg in sys.argv[1:] or ["L. Bolt", "Counter Spell", "Forest (Full Art)", "Ligthning Bolt"]:
+        hit = normalizer.resolve(arg)
+        print(f"{arg!r:28} -> {hit.name!r:28} {hit.confidence:.3f} {hit.rule}")
@@ -0,0 +1,529 @@
+"""
+Columnar Card Store for the Replacement Engine
+==============================================
+
+``CARD_DATABASE`` and ``PRICE_TABLE`` in ``replacement_engine`` are small
+hand‑written dictionaries.  This module builds a compact columnar store
+for the full catalogue from a bulk dump and loads it back in
+milliseconds:
+
+* Scryfall bulk data (``oracle_cards`` or ``default_cards`` JSON) or
+  MTGJSON ``AtomicCards.json`` can be compiled with::
+
+      python card_store.py build oracle-cards.json card_store/
+
+* The output directory holds one ``.npy`` file per column plus a
+  ``meta.json`` describing formats, roles and price markets.  Columns
+  are memory‑mapped on load, so only the name table is materialised in
+  Python objects.
+
+Columns (``n`` cards):
+
+  ``oracle_id``  – ``S36`` oracle identifiers.
+  ``names``      – UTF‑8 name blob plus ``name_offsets`` (``n + 1``).
+  ``identity``   – ``uint8`` WUBRG colour identity mask.
+  ``banned``     – ``uint32`` bitmask of formats the card may not be
+                   played in (banned or not legal), one bit per
+                   ``FORMATS`` entry.
+  ``roles``      – ``uint16`` bitmask over ``ROLES``.
+  ``prices``     – ``float32`` ``n × markets`` matrix, NaN when unknown.
+
+``CardStore`` also behaves as a read‑only mapping from card name to the
+same entry dictionaries as ``CARD_DATABASE``, so ``assign_role``,
+``is_legal``, ``within_budget`` and ``color_identity_ok`` keep working
+unchanged when the engine is pointed at a store.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from card_index import COLOURS, colour_mask
+from currency import FX_TO_GBP
+
+STORE_VERSION = 1
+
+# Engine format names and the matching Scryfall / MTGJSON legality keys.
+FORMATS: Tuple[Tuple[str, str], ...] = (
+    ("Standard", "standard"),
+    ("Pioneer", "pioneer"),
+    ("Modern", "modern"),
+    ("Legacy", "legacy"),
+    ("Vintage", "vintage"),
+    ("Commander", "commander"),
+    ("Pauper", "pauper"),
+    ("Brawl", "brawl"),
+    ("Historic", "historic"),
+    ("Timeless", "timeless"),
+    ("Explorer", "explorer"),
+    ("Alchemy", "alchemy"),
+    ("Oathbreaker", "oathbreaker"),
+    ("Penny", "penny"),
+    ("Premodern", "premodern"),
+    ("Old School", "oldschool"),
+    ("Duel", "duel"),
+    ("PreDH", "predh"),
+    ("Pauper Commander", "paupercommander"),
+    ("Standard Brawl", "standardbrawl"),
+    ("Gladiator", "gladiator"),
+    ("Future", "future"),
+)
+
+ROLES: Tuple[str, ...] = (
+    "Ramp", "Draw", "Removal", "Control", "Protection",
+    "Fixing", "Tutor", "Wincon", "Combo Piece", "Utility",
+)
+
+# Price columns: (name, currency, finish).  Column 0 is the engine's
+# reference ``price_gbp``; the rest are per‑market prices.
+SCRYFALL_MARKETS: Tuple[Tuple[str, str, str], ...] = (
+    ("price_gbp", "GBP", "nonfoil"),
+    ("TCGplayer", "USD", "nonfoil"),
+    ("TCGplayer Foil", "USD", "foil"),
+    ("Cardmarket", "EUR", "nonfoil"),
+    ("Cardmarket Foil", "EUR", "foil"),
+    ("MTGO", "TIX", "nonfoil"),
+)
+_SCRYFALL_PRICE_KEYS = (None, "usd", "usd_foil", "eur", "eur_foil", "tix")
+
+# Currencies of the markets in ``replacement_engine.PRICE_TABLE``.
+KNOWN_MARKET_CURRENCIES = {"Cardmarket": "EUR", "MagicMadhouse": "GBP", "TCGplayer": "USD"}
+
+_SKIP_LAYOUTS = {"token", "double_faced_token", "art_series", "emblem", "scheme", "planar", "vanguard"}
+
+
+############################
+# Role heuristics
+############################
+
+_ROLE_PATTERNS: Tuple[Tuple[str, "re.Pattern[str]"], ...] = tuple(
+    (role, re.compile(pattern, re.IGNORECASE))
+    for role, pattern in (
+        ("Ramp", r"add \{|add (?:one|two|three) mana|search your library for (?:a|up to \w+) basic land|"
+                 r"put (?:a|that|those) lands? cards? onto the battlefield|create (?:a|two|\w+) treasure"),
+        ("Draw", r"draws? (?:a|two|three|x|that many) cards?|draw cards|investigate"),
+        ("Removal", r"(?:destroy|exile) target|deals? (?:\d+|x) damage to (?:any target|target creature)|"
+                    r"target (?:creature|player) sacrifices|return target (?:nonland )?permanent to its owner's hand"),
+        ("Control", r"counter target|destroy all|exile all|each (?:creature|player) sacrifices|"
+                    r"tap all|return all"),
+        ("Protection", r"hexproof|indestructible|protection from|phase out|shroud"),
+        ("Fixing", r"mana of any (?:one )?colou?r|add one mana of any"),
+        ("Tutor", r"search your library for an? (?!basic land)"),
+        ("Wincon", r"you win the game|loses the game|each opponent loses \d+ life|additional combat phase"),
+        ("Combo Piece", r"untap (?:all|target|up to)|infinite|copy (?:target|that) (?:spell|ability)|"
+                        r"whenever you cast .* untap"),
+    )
+)
+
+
+def classify_roles(type_line: str, oracle_text: str) -> List[str]:
+    """Assign broad roles from type line and rules text.
+
+    Deliberately coarse: it only needs to put cards into the same
+    buckets as the hand‑curated entries so replacements share a role.
+    """
+    text = oracle_text or ""
+    roles = [role for role, pattern in _ROLE_PATTERNS if pattern.search(text)]
+    if "Land" in (type_line or ""):
+        # Lands that tap for mana are fixing, not ramp.
+        roles = [r for r in roles if r != "Ramp"]
+        if len(re.findall(r"\{[WUBRG]\}", text)) >= 2 and "Fixing" not in roles:
+            roles.append("Fixing")
+    return roles or ["Utility"]
+
+
+############################
+# Store
+############################
+
+def _bits(names: Iterable[str], vocabulary: Sequence[str]) -> int:
+    mask = 0
+    for name in names:
+        try:
+            mask |= 1 << vocabulary.index(name)
+        except ValueError:
+            continue
+    return mask
+
+
+class MarketPrices(Mapping):
+    """Name → price view of one price column; cards without a price are absent."""
+
+    def __init__(self, store: "CardStore", column: int):
+        self._store = store
+        self._column = column
+
+    def __getitem__(self, name: str) -> float:
+        i = self._store.position[name]
+        value = self._store.prices[i, self._column]
+        if np.isnan(value):
+            raise KeyError(name)
+        return float(value)
+
+    def __iter__(self) -> Iterator[str]:
+        present = ~np.isnan(self._store.prices[:, self._column])
+        names = self._store.names
+        return (names[i] for i in np.flatnonzero(present))
+
+    def __len__(self) -> int:
+        return int((~np.isnan(self._store.prices[:, self._column])).sum())
+
+
+class CardStore(Mapping):
+    """Columnar card database; also a read‑only ``name → entry`` mapping."""
+
+    def __init__(
+        self,
+        names: List[str],
+        oracle_id: np.ndarray,
+        identity: np.ndarray,
+        banned: np.ndarray,
+        roles: np.ndarray,
+        prices: np.ndarray,
+        formats: Sequence[str],
+        role_names: Sequence[str],
+        markets: Sequence[Tuple[str, str, str]],
+        aliases: Optional[Dict[str, int]] = None,
+    ):
+        self.names = names
+        self.oracle_id = oracle_id
+        self.identity = identity
+        self.banned = banned
+        self.roles = roles
+        self.prices = prices
+        self.formats = list(formats)
+        self.role_names = list(role_names)
+        self.markets = [tuple(m) for m in markets]
+        self.position: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        for alias, i in (aliases or {}).items():
+            self.position.setdefault(alias, i)
+        self._format_bit = {fmt: 1 << b for b, fmt in enumerate(self.formats)}
+        self._roles_by_mask: Dict[int, List[str]] = {}
+        self._checks: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    # -- Mapping interface --------------------------------------------
+    def __getitem__(self, name: str) -> Dict[str, object]:
+        return self.entry(self.position[name])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.position
+
+    # -- Column accessors ---------------------------------------------
+    def role_list(self, mask: int) -> List[str]:
+        roles = self._roles_by_mask.get(mask)
+        if roles is None:
+            roles = [r for b, r in enumerate(self.role_names) if mask >> b & 1]
+            self._roles_by_mask[mask] = roles
+        return roles
+
+    def format_bit(self, fmt: str) -> int:
+        return self._format_bit.get(fmt, 0)
+
+    def entry(self, i: int) -> Dict[str, object]:
+        banned = int(self.banned[i])
+        identity = int(self.identity[i])
+        price = self.prices[i, 0]
+        return {
+            "oracle_id": self.oracle_id[i].decode("ascii"),
+            "color_identity": [c for b, c in enumerate(COLOURS) if identity >> b & 1],
+            "price_gbp": 0.0 if np.isnan(price) else float(price),
+            "banned_in": [f for b, f in enumerate(self.formats) if banned >> b & 1],
+            "roles": list(self.role_list(int(self.roles[i]))),
+        }
+
+    def index_columns(self):
+        """Columns in the shape ``CardIndex`` needs, without building entry dicts."""
+        prices = np.nan_to_num(self.prices[:, 0], nan=0.0)
+        roles = [tuple(self.role_list(mask)) for mask in self.roles.tolist()]
+        banned = {
+            fmt: np.flatnonzero(self.banned & np.uint32(1 << b))
+            for b, fmt in enumerate(self.formats)
+        }
+        return prices, self.identity, roles, banned
+
+    def legality_matrix(self):
+        """``legality.LegalityMatrix`` over the ``banned`` column, rows in store order."""
+        from legality import LegalityMatrix
+
+        return LegalityMatrix.from_bitmask(self.names, self.formats, self.banned, self.position)
+
+    def price_table(self) -> Dict[str, MarketPrices]:
+        """``PRICE_TABLE``‑shaped view of the non‑foil paper market columns."""
+        return {
+            name: MarketPrices(self, col)
+            for col, (name, currency, finish) in enumerate(self.markets)
+            if col > 0 and finish == "nonfoil" and currency != "TIX"
+        }
+
+    def market_currencies(self) -> Dict[str, str]:
+        return {name: currency for name, currency, _finish in self.markets}
+
+    def indices(self, names: Iterable[str]) -> np.ndarray:
+        """Map names to row indices once; unknown names become ``-1``."""
+        get = self.position.get
+        return np.fromiter((get(n, -1) for n in names), dtype=np.int64)
+
+    def violation_masks(self, rows: np.ndarray, fmt: str, budget_gbp: float, deck_masks) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Price, format and colour violation masks for many cards at once.
+
+        ``rows`` comes from ``indices``; unknown cards (``-1``) never
+        violate anything, as in the per‑card helpers.  ``deck_masks`` is
+        one WUBRG mask or one per row, so cards from decks with different
+        commanders can be checked in the same call.
+        """
+        price, banned, identity = self._check_columns()
+        # Compare in float32 so a price equal to the budget is not a violation.
+        over_budget = price[rows] > np.float32(budget_gbp)
+        bit = self.format_bit(fmt)
+        in_banned = (banned[rows] & np.uint32(bit)) != 0 if bit else np.zeros(len(rows), dtype=bool)
+        off_colour = (identity[rows] & ~np.asarray(deck_masks, dtype=np.uint8)) != 0
+        return over_budget, in_banned, off_colour
+
+    def _check_columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # In-memory copies with one extra all-zero row, so row -1 (unknown
+        # card) reads as free, legal and colourless without masking.
+        if self._checks is None:
+            self._checks = (
+                np.append(np.nan_to_num(self.prices[:, 0], nan=0.0), np.float32(0)),
+                np.append(self.banned, np.uint32(0)),
+                np.append(self.identity, np.uint8(0)),
+            )
+        return self._checks
+
+    # -- Persistence --------------------------------------------------
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        encoded = [n.encode("utf-8") for n in self.names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        aliases = {a: i for a, i in self.position.items() if i < len(self.names) and self.names[i] != a}
+        columns = {
+            "names": blob,
+            "name_offsets": offsets,
+            "oracle_id": self.oracle_id,
+            "identity": self.identity,
+            "banned": self.banned,
+            "roles": self.roles,
+            "prices": self.prices,
+        }
+        for column, array in columns.items():
+            np.save(os.path.join(directory, f"{column}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump({
+                "version": STORE_VERSION,
+                "count": len(self.names),
+                "formats": self.formats,
+                "roles": self.role_names,
+                "markets": [list(m) for m in self.markets],
+                "aliases": aliases,
+            }, fh)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "CardStore":
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported card store version {meta.get('version')}")
+        mode = "r" if mmap else None
+
+        def column(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+
+        blob = column("names").tobytes().decode("utf-8")
+        offsets = column("name_offsets")
+        # Offsets are byte offsets; names are ASCII in practice, so only fall
+        # back to per‑name decoding when the blob contains multibyte text.
+        if len(blob) == int(offsets[-1]):
+            names = [blob[a:b] for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+        else:
+            raw = column("names").tobytes()
+            names = [raw[a:b].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+        return cls(
+            names=names,
+            oracle_id=column("oracle_id"),
+            identity=column("identity"),
+            banned=column("banned"),
+            roles=column("roles"),
+            prices=column("prices"),
+            formats=meta["formats"],
+            role_names=meta["roles"],
+            markets=meta["markets"],
+            aliases=meta.get("aliases"),
+        )
+
+    # -- Builders -----------------------------------------------------
+    @classmethod
+    def from_database(
+        cls,
+        database: Mapping[str, Mapping[str, object]],
+        price_table: Optional[Mapping[str, Mapping[str, float]]] = None,
+    ) -> "CardStore":
+        """Convert a ``CARD_DATABASE``/``PRICE_TABLE`` pair into a store."""
+        if isinstance(database, CardStore):
+            return database
+        names = list(database)
+        formats = [f for f, _key in FORMATS]
+        roles = list(ROLES)
+        for entry in database.values():
+            for fmt in entry.get("banned_in", []):
+                if fmt not in formats:
+                    formats.append(fmt)
+            for role in entry.get("roles", []):
+                if role not in roles:
+                    roles.append(role)
+        if len(formats) > 32:
+            raise ValueError("CardStore supports at most 32 formats")
+        if len(roles) > 16:
+            raise ValueError("CardStore supports at most 16 roles")
+        price_table = price_table or {}
+        markets = [("price_gbp", "GBP", "nonfoil")] + [
+            (market, KNOWN_MARKET_CURRENCIES.get(market, "GBP"), "nonfoil") for market in price_table
+        ]
+        n = len(names)
+        prices = np.full((n, len(markets)), np.nan, dtype=np.float32)
+        for i, name in enumerate(names):
+            entry = database[name]
+            prices[i, 0] = float(entry.get("price_gbp", 0.0) or 0.0)
+            for col, market in enumerate(price_table, start=1):
+                value = price_table[market].get(name)
+                if value is not None:
+                    prices[i, col] = value
+        return cls(
+            names=names,
+            oracle_id=np.array([str(database[n].get("oracle_id") or "") for n in names], dtype="S36"),
+            identity=np.array([colour_mask(database[n].get("color_identity", [])) for n in names], dtype=np.uint8),
+            banned=np.array([_bits(database[n].get("banned_in", []), formats) for n in names], dtype=np.uint32),
+            roles=np.array([_bits(database[n].get("roles", []), roles) for n in names], dtype=np.uint16),
+            prices=prices,
+            formats=formats,
+            role_names=roles,
+            markets=markets,
+        )
+
+    @classmethod
+    def from_bulk(
+        cls,
+        cards: Iterable[Dict[str, object]],
+        usd_to_gbp: float = FX_TO_GBP["USD"],
+        eur_to_gbp: float = FX_TO_GBP["EUR"],
+    ) -> "CardStore":
+        """Build from Scryfall bulk card objects (one per oracle card or per printing).
+
+        Printings of the same oracle card collapse into one row that keeps
+        the cheapest known price per market.
+        """
+        formats = [f for f, _key in FORMATS]
+        by_oracle: Dict[str, int] = {}
+        names: List[str] = []
+        aliases: Dict[str, int] = {}
+        oracle_ids: List[str] = []
+        identity: List[int] = []
+        banned: List[int] = []
+        roles: List[int] = []
+        prices: List[List[float]] = []
+        nan = float("nan")
+        for card in cards:
+            if card.get("layout") in _SKIP_LAYOUTS:
+                continue
+            oracle_id = card.get("oracle_id") or (card.get("card_faces") or [{}])[0].get("oracle_id")
+            if not oracle_id:
+                continue
+            raw = card.get("prices") or {}
+            row = [nan]
+            for key in _SCRYFALL_PRICE_KEYS[1:]:
+                try:
+                    row.append(float(raw[key]) if raw.get(key) not in (None, "") else nan)
+                except (TypeError, ValueError):
+                    row.append(nan)
+            i = by_oracle.get(oracle_id)
+            if i is not None:
+                prices[i] = [b if np.isnan(a) else (a if np.isnan(b) else min(a, b)) for a, b in zip(prices[i], row)]
+                continue
+            by_oracle[oracle_id] = i = len(names)
+            name = card.get("name") or ""
+            names.append(name)
+            if " // " in name:
+                aliases.setdefault(name.split(" // ")[0], i)
+            faces = card.get("card_faces") or [card]
+            text = "\n".join(f.get("oracle_text") or "" for f in faces) or card.get("oracle_text") or ""
+            legalities = card.get("legalities") or {}
+            oracle_ids.append(oracle_id)
+            identity.append(colour_mask(card.get("color_identity") or []))
+            banned.append(sum(
+                1 << b for b, (_fmt, key) in enumerate(FORMATS)
+                if legalities.get(key, "not_legal") in ("banned", "not_legal")
+            ))
+            roles.append(_bits(classify_roles(card.get("type_line") or "", text), ROLES))
+            prices.append(row)
+
+        full_names = set(names)
+        aliases = {a: i for a, i in aliases.items() if a not in full_names}
+        price_matrix = np.array(prices, dtype=np.float32).reshape(len(names), len(SCRYFALL_MARKETS))
+        usd, eur = price_matrix[:, 1], price_matrix[:, 3]
+        price_matrix[:, 0] = np.where(np.isnan(usd), eur * eur_to_gbp, usd * usd_to_gbp)
+        return cls(
+            names=names,
+            oracle_id=np.array(oracle_ids, dtype="S36"),
+            identity=np.array(identity, dtype=np.uint8),
+            banned=np.array(banned, dtype=np.uint32),
+            roles=np.array(roles, dtype=np.uint16),
+            prices=price_matrix,
+            formats=formats,
+            role_names=ROLES,
+            markets=SCRYFALL_MARKETS,
+            aliases=aliases,
+        )
+
+    @classmethod
+    def from_mtgjson(cls, atomic: Dict[str, object]) -> "CardStore":
+        """Build from MTGJSON ``AtomicCards.json`` (no prices; those live in AllPrices)."""
+        cards = []
+        for name, faces in (atomic.get("data") or {}).items():
+            front = faces[0]
+            cards.append({
+                "name": name,
+                "oracle_id": (front.get("identifiers") or {}).get("scryfallOracleId"),
+                "color_identity": front.get("colorIdentity") or [],
+                "type_line": front.get("type") or "",
+                "card_faces": [{"oracle_text": f.get("text") or ""} for f in faces],
+                "legalities": {k: str(v).lower() for k, v in (front.get("legalities") or {}).items()},
+                "layout": front.get("layout"),
+            })
+        return cls.from_bulk(cards)
+
+
+def build(
+    dump_path: str, out_dir: str, usd_to_gbp: float = FX_TO_GBP["USD"], eur_to_gbp: float = FX_TO_GBP["EUR"]
+) -> CardStore:
+    """Compile a Scryfall or MTGJSON dump into ``out_dir``."""
+    with open(dump_path, encoding="utf-8") as fh:
+        dump = json.load(fh)
+    if isinstance(dump, dict) and "data" in dump:
+        store = CardStore.from_mtgjson(dump)
+    else:
+        store = CardStore.from_bulk(dump, usd_to_gbp=usd_to_gbp, eur_to_gbp=eur_to_gbp)
+    store.save(out_dir)
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "build":
+        print("usage: python card_store.py build <scryfall-or-mtgjson.json> <out_dir> [usd_to_gbp] [eur_to_gbp]")
+        sys.exit(2)
+    rates = [float(x) for x in sys.argv[4:6]]
+    built = build(sys.argv[2], sys.argv[3], *rates)
+    print(f"Wrote {len(built)} cards to {sys.argv[3]}")
@@ -0,0 +1,16 @@
+"""
+Fallback Exchange Rates
+=======================
+
+Rough conversion rates to GBP for comparing prices quoted in different
+currencies when no live rate is available.  This is the one table the
+engine's market comparison and split basket, ``card_store`` builds and
+the backend's fallback (when its FX fetch fails) all read, so they never
+disagree.  Pure Python, so the backend can import it without NumPy.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+FX_TO_GBP: Dict[str, float] = {"GBP": 1.0, "EUR": 0.86, "USD": 0.79}
@@ -0,0 +1,467 @@
+"""
+Evaluation Harness
+==================
+
+``eval_cases.jsonl`` holds typed cases (``legality_check``,
+``replacement_suggestion``, ``synergy_justification``, …), each with an
+``input`` and an ``expected_output``.  This module runs them: every case
+is dispatched to the runner registered for its type, timed, and graded
+against its expectation, and the results are summarised per type::
+
+    python eval_harness.py --processes 4 --out report.json
+    python eval_harness.py --baseline report.json          # exit 1 on regressions
+
+Runners are registered per target in ``RUNNERS``:
+
+* ``engine`` calls the engine directly (``is_legal``,
+  ``propose_replacements``, ``SynergyTable.score``,
+  ``compute_cost_to_finish``, the combos in ``combos_synergies.json`` and
+  ``mulligan.keep_hand``).
+* ``backend`` sends the case through the Flask test client of
+  ``backend/app.py`` (``/api/replacements``, ``/api/synergy/score``);
+  types without a backend route fall back to the engine runner.
+
+A type without a runner is reported as ``skipped`` rather than failed.
+Case timings are wall time inside the worker after a warm‑up (indexes
+built, datasets loaded), so they measure steady‑state latency.
+
+The report is JSON with sorted keys and cases in id order, so two
+reports diff line by line; ``regressions`` compares a report with a
+baseline for accuracy drops, newly failing cases and slower types.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EVAL_CASES = os.path.join(HERE, "eval_cases.jsonl")
+COMBOS_DATASET = os.path.join(HERE, "combos_synergies.json")
+BACKEND_DIR = os.path.join(HERE, "..", "..", "backend")
+
+# The keep rule every mulligan_advice case states: "Keep if two lands or
+# Sol Ring; else mulligan."
+MULLIGAN_KEEP_RULE = [{"land": 2}, {"sol_ring": 1}]
+
+# Grading tolerances.
+SCORE_TOLERANCE = 0.05
+COST_TOLERANCE = 0.01
+# A type's p95 regresses when it exceeds the baseline by this factor and by MIN_REGRESSION_MS.
+LATENCY_FACTOR = 1.5
+MIN_REGRESSION_MS = 1.0
+
+PASS, FAIL, ERROR, SKIPPED = "pass", "fail", "error", "skipped"
+
+
+class CaseResult(NamedTuple):
+    id: str
+    type: str
+    target: str
+    status: str
+    ms: float
+    got: object
+    detail: str
+
+
+def load_cases(path: str = EVAL_CASES) -> List[Dict[str, object]]:
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+############################
+# Engine runners
+############################
+
+_COMBOS: Optional[List[Tuple[frozenset, Dict[str, object]]]] = None
+
+
+def known_combos() -> List[Tuple[frozenset, Dict[str, object]]]:
+    global _COMBOS
+    if _COMBOS is None:
+        with open(COMBOS_DATASET, encoding="utf-8") as fh:
+            combos = json.load(fh).get("combos", [])
+        _COMBOS = [(frozenset(c.get("cards", ())), c) for c in combos if c.get("cards")]
+    return _COMBOS
+
+
+def engine_legality(case: Mapping[str, object]) -> Dict[str, object]:
+    from replacement_engine import is_legal
+
+    fmt = case["format"]
+    illegal = [card for card in case["deck"] if not is_legal(card, fmt)]
+    return {"legal": not illegal, "illegal_cards": illegal}
+
+
+def engine_replacements(case: Mapping[str, object]) -> Dict[str, object]:
+    from replacement_engine import propose_replacements
+
+    found = propose_replacements(
+        case["card"], case.get("format", "Commander"), float(case.get("budget_gbp", 5.0)),
+        case.get("color_identity", "WUBRG"), persona=case.get("persona"),
+    )
+    return {"replacements": [s["card_name"] for s in found]}
+
+
+def engine_synergy(case: Mapping[str, object]) -> Dict[str, object]:
+    from replacement_engine import get_synergy
+
+    return {"synergy_score": get_synergy().score(case["commander"], case["card"])}
+
+
+def engine_combo(case: Mapping[str, object]) -> Dict[str, object]:
+    cards = set(case["cards"])
+    for combo_cards, combo in known_combos():
+        if combo_cards <= cards:
+            return {"combo": combo.get("combo_name"), "explanation": " ".join(combo.get("steps", []))}
+    return {"combo": None, "explanation": None}
+
+
+def engine_cost(case: Mapping[str, object]) -> Dict[str, object]:
+    from replacement_engine import PRICE_TABLE, compute_cost_to_finish
+
+    decklist = [{"card_name": name, "qty": 1} for name in case["deck"]]
+    _totals, best = compute_cost_to_finish(decklist, case.get("owned_cards"), PRICE_TABLE)
+    return {"cost_gbp": best["total_gbp"], "market": best["market"], "missing_cards": best["missing_cards"]}
+
+
+def engine_mulligan(case: Mapping[str, object]) -> Dict[str, object]:
+    """Lands are counted by name (basic lands): the bundled card data has no type lines."""
+    from mulligan import BASIC_LANDS, keep_hand
+
+    hand = list(case["hand"])
+    lands = sum(card in BASIC_LANDS for card in hand)
+    rings = hand.count("Sol Ring")
+    counts = {"land": lands, "sol_ring": rings, "other": len(hand) - lands - rings}
+    return {"keep": keep_hand(counts, MULLIGAN_KEEP_RULE)}
+
+
+def warm_engine():
+    import replacement_engine as engine
+
+    engine.get_index()
+    engine.get_synergy()
+    engine.get_persona_scorer()
+    known_combos()
+
+
+############################
+# Backend runners
+############################
+
+_CLIENT = None
+_TOKEN = "eval"
+
+
+def backend_client():
+    """Flask test client for backend/app.py, imported once per process."""
+    global _CLIENT, _TOKEN
+    if _CLIENT is None:
+        for key, value in (
+            ("REQUIRE_LEGACY_API_AUTH", "1"),
+            ("LEGACY_API_TOKEN", _TOKEN),
+            ("LEGACY_RATE_LIMIT_MAX_REQUESTS", str(10 ** 9)),
+            ("PRICE_REFRESHER_ENABLED", "0"),
+            ("UPSTREAM_CACHE_PATH", ""),
+            ("REPLACEMENTS_PRELOAD", "0"),
+            ("RETRIEVAL_PRELOAD", "0"),
+        ):
+            os.environ[key] = value
+        if BACKEND_DIR not in sys.path:
+            sys.path.insert(0, BACKEND_DIR)
+        import app as backend
+
+        # An app imported earlier (e.g. by a test run) keeps its own token.
+        _TOKEN = backend.LEGACY_API_TOKEN or _TOKEN
+        backend.REPLACEMENTS.warm()
+        backend.SYNERGY.warm()
+        _CLIENT = backend.app.test_client()
+    return _CLIENT
+
+
+def _post(path: str, body: Mapping[str, object]) -> Dict[str, object]:
+    resp = backend_client().post(path, json=body, headers={"Authorization": f"Bearer {_TOKEN}"})
+    data = resp.get_json() or {}
+    if resp.status_code != 200:
+        raise RuntimeError(f"{path} returned {resp.status_code}: {data.get('error')}")
+    return data
+
+
+def _deck_text(cards: Iterable[str]) -> str:
+    return "\n".join(f"1 {card}" for card in cards)
+
+
+def backend_legality(case: Mapping[str, object]) -> Dict[str, object]:
+    data = _post("/api/replacements", {
+        "deck_text": _deck_text(case["deck"]), "format": case["format"],
+        "budget_gbp": 1e9, "color_identity": list("WUBRG"),
+    })
+    illegal = [v["original_card"] for v in data["violations"] if "Format" in v["issue"]]
+    return {"legal": not illegal, "illegal_cards": illegal}
+
+
+def backend_replacements(case: Mapping[str, object]) -> Dict[str, object]:
+    data = _post("/api/replacements", {
+        "deck_text": _deck_text([case["card"]]), "format": case.get("format", "Commander"),
+        "budget_gbp": float(case.get("budget_gbp", 5.0)), "persona": case.get("persona") or "",
+        "color_identity": list(case.get("color_identity", "WUBRG")),
+    })
+    found = data["violations"][0]["replacements"] if data["violations"] else []
+    return {"replacements": [s["card_name"] for s in found]}
+
+
+def backend_synergy(case: Mapping[str, object]) -> Dict[str, object]:
+    data = _post("/api/synergy/score", {"pairs": [[case["commander"], case["card"]]]})
+    return {"synergy_score": data["scores"][0]}
+
+
+def backend_cost(case: Mapping[str, object]) -> Dict[str, object]:
+    data = _post("/api/replacements", {
+        "deck_text": _deck_text(case["deck"]), "owned": list(case.get("owned_cards") or ()),
+        "budget_gbp": 1e9, "color_identity": list("WUBRG"),
+    })
+    best = data["best_basket"]
+    return {"cost_gbp": best["total_gbp"], "market": best["market"], "missing_cards": best["missing_cards"]}
+
+
+def warm_backend():
+    warm_engine()
+    backend_client()
+
+
+############################
+# Graders
+############################
+
+def grade_legality(got, expected) -> Tuple[bool, str]:
+    same = got["legal"] == expected["legal"] and set(got["illegal_cards"]) == set(expected["illegal_cards"])
+    return same, "" if same else f"expected illegal {sorted(expected['illegal_cards'])}"
+
+
+def grade_replacements(got, expected) -> Tuple[bool, str]:
+    """Passes when any expected replacement is suggested (hit@k)."""
+    hits = [name for name in expected["replacements"] if name in got["replacements"]]
+    return bool(hits), f"{len(hits)}/{len(expected['replacements'])} expected suggested"
+
+
+def grade_synergy(got, expected) -> Tuple[bool, str]:
+    score = got["synergy_score"]
+    if score is None:
+        return False, "no synergy score"
+    return abs(score - expected["synergy_score"]) <= SCORE_TOLERANCE, f"expected {expected['synergy_score']}"
+
+
+def grade_combo(got, expected) -> Tuple[bool, str]:
+    """The expected explanations all assert a combo, so a known combo passes."""
+    return got["combo"] is not None, "" if got["combo"] else "no known combo among the cards"
+
+
+def grade_mulligan(got, expected) -> Tuple[bool, str]:
+    same = got["keep"] == expected["keep"]
+    return same, "" if same else f"expected keep={expected['keep']}"
+
+
+def grade_cost(got, expected) -> Tuple[bool, str]:
+    cost = got["cost_gbp"]
+    if cost is None:
+        return False, "no GBP total"
+    return abs(cost - expected["cost_gbp"]) <= COST_TOLERANCE, f"expected {expected['cost_gbp']}"
+
+
+Runner = Callable[[Mapping[str, object]], Dict[str, object]]
+Grader = Callable[[Dict[str, object], Mapping[str, object]], Tuple[bool, str]]
+
+RUNNERS: Dict[str, Dict[str, Runner]] = {
+    "engine": {
+        "legality_check": engine_legality,
+        "replacement_suggestion": engine_replacements,
+        "synergy_justification": engine_synergy,
+        "combo_explanation": engine_combo,
+        "cost_to_finish": engine_cost,
+        "mulligan_advice": engine_mulligan,
+    },
+    "backend": {
+        "legality_check": backend_legality,
+        "replacement_suggestion": backend_replacements,
+        "synergy_justification": backend_synergy,
+        "cost_to_finish": backend_cost,
+    },
+}
+GRADERS: Dict[str, Grader] = {
+    "legality_check": grade_legality,
+    "replacement_suggestion": grade_replacements,
+    "synergy_justification": grade_synergy,
+    "combo_explanation": grade_combo,
+    "cost_to_finish": grade_cost,
+    "mulligan_advice": grade_mulligan,
+}
+WARMERS: Dict[str, Callable[[], None]] = {"engine": warm_engine, "backend": warm_backend}
+
+
+############################
+# Running
+############################
+
+def run_case(case: Mapping[str, object], target: str = "engine") -> CaseResult:
+    kind = str(case.get("type"))
+    used = target if kind in RUNNERS[target] else "engine"
+    runner = RUNNERS[used].get(kind)
+    grader = GRADERS.get(kind)
+    if runner is None or grader is None:
+        return CaseResult(str(case.get("id")), kind, used, SKIPPED, 0.0, None, "no runner for this type")
+    t0 = time.perf_counter()
+    try:
+        got = runner(case["input"])
+    except Exception as e:
+        ms = (time.perf_counter() - t0) * 1e3
+        return CaseResult(str(case.get("id")), kind, used, ERROR, round(ms, 3), None, f"{type(e).__name__}: {e}")
+    ms = (time.perf_counter() - t0) * 1e3
+    try:
+        passed, detail = grader(got, case["expected_output"])
+    except Exception as e:
+        passed, detail = False, f"{type(e).__name__}: {e}"
+    return CaseResult(str(case.get("id")), kind, used, PASS if passed else FAIL, round(ms, 3), got, detail)
+
+
+def _init_worker(target: str, card_store_path: Optional[str]):
+    if card_store_path:
+        from replacement_engine import load_card_database
+
+        load_card_database(card_store_path)
+    WARMERS[target]()
+
+
+def _run_chunk(args: Tuple[str, List[Dict[str, object]]]) -> List[CaseResult]:
+    target, chunk = args
+    return [run_case(case, target) for case in chunk]
+
+
+def iter_run_cases(
+    cases: Iterable[Mapping[str, object]],
+    target: str = "engine",
+    processes: int = 0,
+    chunk_size: int = 10,
+    card_store_path: Optional[str] = None,
+) -> Iterator[CaseResult]:
+    """Run ``cases`` in input order, in process or across a process pool.
+
+    Each pool worker loads ``card_store_path`` if given, warms the
+    target once and then takes ``chunk_size`` cases at a time.
+    """
+    if target not in RUNNERS:
+        raise ValueError(f"Unknown target {target!r}; expected one of {sorted(RUNNERS)}")
+    if processes <= 0:
+        _init_worker(target, card_store_path)
+        for case in cases:
+            yield run_case(case, target)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    cases = iter(cases)
+    chunks = iter(lambda: (target, list(islice(cases, chunk_size))), (target, []))
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(target, card_store_path)) as pool:
+        for chunk in pool.map(_run_chunk, chunks):
+            yield from chunk
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def report(results: Iterable[CaseResult], target: str = "engine") -> Dict[str, object]:
+    """Per‑case results (id order) and per‑type accuracy and latency."""
+    results = sorted(results, key=lambda r: (len(r.id), r.id))
+    types: Dict[str, Dict[str, object]] = {}
+    for kind in sorted({r.type for r in results}):
+        rows = [r for r in results if r.type == kind]
+        counts = {status: sum(r.status == status for r in rows) for status in (PASS, FAIL, ERROR, SKIPPED)}
+        graded = len(rows) - counts[SKIPPED]
+        timings = [r.ms for r in rows if r.status != SKIPPED]
+        types[kind] = {
+            "cases": len(rows),
+            "passed": counts[PASS],
+            "failed": counts[FAIL],
+            "errors": counts[ERROR],
+            "skipped": counts[SKIPPED],
+            "accuracy": round(counts[PASS] / graded, 4) if graded else None,
+            "p50_ms": round(_percentile(timings, 50), 3),
+            "p95_ms": round(_percentile(timings, 95), 3),
+            "total_ms": round(sum(timings), 3),
+        }
+    graded = [r for r in results if r.status != SKIPPED]
+    return {
+        "target": target,
+        "summary": {
+            "cases": len(results),
+            "passed": sum(r.status == PASS for r in results),
+            "skipped": len(results) - len(graded),
+            "accuracy": round(sum(r.status == PASS for r in graded) / len(graded), 4) if graded else None,
+        },
+        "types": types,
+        "cases": [r._asdict() for r in results],
+    }
+
+
+def regressions(baseline: Mapping[str, object], current: Mapping[str, object]) -> List[str]:
+    """Accuracy drops, cases that stopped passing and slower types since ``baseline``."""
+    found = []
+    for kind, now in current["types"].items():
+        before = baseline["types"].get(kind)
+        if before is None:
+            continue
+        if before["accuracy"] is not None and (now["accuracy"] or 0.0) < before["accuracy"]:
+            found.append(f"{kind}: accuracy {before['accuracy']} -> {now['accuracy']}")
+        if now["p95_ms"] > before["p95_ms"] * LATENCY_FACTOR and now["p95_ms"] - before["p95_ms"] > MIN_REGRESSION_MS:
+            found.append(f"{kind}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+    passed_before = {c["id"] for c in baseline["cases"] if c["status"] == PASS}
+    for case in current["cases"]:
+        if case["id"] in passed_before and case["status"] != PASS:
+            found.append(f"{case['id']} ({case['type']}): pass -> {case['status']} {case['detail']}".rstrip())
+    return found
+
+
+def dumps(data: Mapping[str, object]) -> str:
+    return json.dumps(data, indent=1, sort_keys=True, ensure_ascii=False) + "\n"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run eval_cases.jsonl against the engine or backend.")
+    ap.add_argument("--cases", default=EVAL_CASES)
+    ap.add_argument("--target", choices=sorted(RUNNERS), default="engine")
+    ap.add_argument("--processes", type=int, default=0)
+    ap.add_argument("--chunk-size", type=int, default=10)
+    ap.add_argument("--card-store", default=os.environ.get("CARD_STORE_PATH"))
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", help="earlier report; exit 1 on any regression")
+    args = ap.parse_args()
+
+    started = time.perf_counter()
+    result = report(
+        iter_run_cases(load_cases(args.cases), args.target, args.processes, args.chunk_size, args.card_store),
+        args.target,
+    )
+    elapsed = time.perf_counter() - started
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(dumps(result))
+    else:
+        sys.stdout.write(dumps(result))
+    for kind, row in result["types"].items():
+        print(f"{kind:24s} {row['passed']:3d}/{row['cases'] - row['skipped']:<3d} accuracy={row['accuracy']} "
+              f"p50={row['p50_ms']}ms p95={row['p95_ms']}ms errors={row['errors']} skipped={row['skipped']}", file=sys.stderr)
+    print(f"{result['summary']['cases']} cases in {elapsed:.2f}s ({args.target}, processes={args.processes})",
+          file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            found = regressions(json.load(fh), result)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if found else 0)
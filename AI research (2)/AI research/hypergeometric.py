@@ -0,0 +1,241 @@
+"""
+Opening Hand Probabilities
+==========================
+
+``mtg_deck_analysis.json`` documents opening-hand odds as hypergeometric
+formulas, e.g. P(≥2 lands in 7 from 99 with 37 lands) =
+1 − [C(62,7) + C(37,1)·C(62,6)] / C(99,7) = 0.8142.  This module
+evaluates them exactly, in batches:
+
+* ``log_comb`` reads log-binomials from a cached ``lgamma`` table, so no
+  big integers are formed and a query costs a few array operations.
+* ``at_least`` answers many scenarios in one call.  A scenario is a deck
+  size, a number of cards seen and any number of card categories
+  (lands, ramp, a combo piece …), each with the minimum wanted; the
+  probability is that *every* minimum is met at once (multivariate
+  hypergeometric).  Each category contributes a generating polynomial
+  Σₓ C(Kᵢ, x)·zˣ over x ≥ kᵢ, the rest of the deck Σₓ C(R, x)·zˣ, and
+  the answer is the zⁿ coefficient of their product over C(N, n).  The
+  polynomials are scaled by their largest coefficient, so products stay
+  in float range for any realistic deck, and multiplied one shifted
+  multiply-add per term, so memory stays at scenarios × cards seen.
+* ``draws_by_turn`` converts a turn on the play or on the draw into cards
+  seen, and ``with_mulligans`` folds in London mulligans: a hand missing
+  the requirement in the opening hand is shuffled away, up to
+  ``mulligans`` times, and the last one is kept.  The cards put on the
+  bottom are assumed never to be the ones the requirement needs.
+* ``curve_table`` turns request scenarios into one flat batch covering
+  every turn on the play and on the draw, which is what the probability
+  tool plots.
+
+    python hypergeometric.py 99 37:2 12:1
+"""
+
+from __future__ import annotations
+
+import math
+import sys
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+
+DEFAULT_HAND_SIZE = 7
+DEFAULT_TURNS = 10
+MAX_DECK_SIZE = 1000
+# Cards seen are at most hand size + turns, which bounds the polynomial degree.
+MAX_HAND_SIZE = 60
+MAX_CATEGORIES = 8
+MAX_TURNS = 40
+MAX_MULLIGANS = 6
+
+_LOG_FACTORIAL = np.zeros(1)
+
+
+def log_factorial(n: int) -> np.ndarray:
+    """log(i!) for i in 0..n (at least), grown in powers of two and cached."""
+    global _LOG_FACTORIAL
+    if n >= len(_LOG_FACTORIAL):
+        size = 1 << max(int(n), 1).bit_length()
+        _LOG_FACTORIAL = np.array([math.lgamma(i + 1) for i in range(size + 1)])
+    return _LOG_FACTORIAL
+
+
+def log_comb(n, k) -> np.ndarray:
+    """log C(n, k), elementwise; −inf where k < 0 or k > n."""
+    n, k = np.broadcast_arrays(np.asarray(n, dtype=np.int64), np.asarray(k, dtype=np.int64))
+    table = log_factorial(int(n.max(initial=0)))
+    valid = (k >= 0) & (k <= n)
+    n0, k0 = np.where(valid, n, 0), np.where(valid, k, 0)
+    return np.where(valid, table[n0] - table[k0] - table[n0 - k0], -np.inf)
+
+
+def _polynomial(total: np.ndarray, minimum: np.ndarray, degree: int):
+    """Rows of C(total, x) for minimum ≤ x ≤ degree, scaled by the row's
+    largest coefficient; also returns the log of that scale."""
+    x = np.arange(degree + 1)
+    logs = log_comb(total[:, None], x[None, :])
+    logs[x[None, :] < minimum[:, None]] = -np.inf
+    scale = logs.max(axis=1)
+    scale[~np.isfinite(scale)] = 0.0
+    return np.exp(logs - scale[:, None]), scale
+
+
+def _truncated_product(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise product of two coefficient arrays, truncated at their width."""
+    out = np.zeros_like(a)
+    width = a.shape[1]
+    for j in np.flatnonzero(b.any(axis=0)).tolist():
+        out[:, j:] += b[:, j, None] * a[:, :width - j]
+    return out
+
+
+def at_least(deck_size, counts, minimum, draws) -> np.ndarray:
+    """P(every category i shows at least ``minimum[:, i]`` of its
+    ``counts[:, i]`` cards among ``draws`` cards seen from ``deck_size``).
+
+    ``deck_size`` and ``draws`` have one entry per scenario; ``counts``
+    and ``minimum`` are (scenarios × categories), or one value per
+    scenario for a single category.  Unused category slots can be padded
+    with count 0, minimum 0.
+    """
+    deck_size = np.atleast_1d(np.asarray(deck_size, dtype=np.int64))
+    draws = np.atleast_1d(np.asarray(draws, dtype=np.int64))
+    counts = np.asarray(counts, dtype=np.int64)
+    minimum = np.asarray(minimum, dtype=np.int64)
+    if counts.ndim < 2:
+        counts, minimum = counts.reshape(-1, 1), minimum.reshape(-1, 1)
+    rest = deck_size - counts.sum(axis=1)
+    if (rest < 0).any() or (counts < 0).any() or (draws < 0).any():
+        raise ValueError("category counts must be non-negative and fit in the deck")
+    draws = np.minimum(draws, deck_size)
+    degree = int(draws.max(initial=0))
+
+    # Product of the rest-of-deck polynomial with every category but the
+    # last, truncated at the largest degree needed ...
+    acc, scale = _polynomial(rest, np.zeros_like(rest), degree)
+    for i in range(counts.shape[1] - 1):
+        poly, s = _polynomial(counts[:, i], minimum[:, i], degree)
+        acc = _truncated_product(acc, poly)
+        scale = scale + s
+    # ... and only the coefficient of z**draws from the last one.
+    poly, s = _polynomial(counts[:, -1], minimum[:, -1], degree)
+    shift = draws[:, None] - np.arange(degree + 1)[None, :]
+    picked = np.take_along_axis(acc, np.maximum(shift, 0), axis=1)
+    coefficient = (poly * picked * (shift >= 0)).sum(axis=1)
+    with np.errstate(under="ignore"):
+        p = coefficient * np.exp(scale + s - log_comb(deck_size, draws))
+    return np.clip(p, 0.0, 1.0)
+
+
+def draws_by_turn(turn, on_draw, hand_size=DEFAULT_HAND_SIZE) -> np.ndarray:
+    """Cards seen by ``turn`` (0 = the opening hand): one draw a turn,
+    skipped on turn 1 on the play."""
+    turn = np.asarray(turn, dtype=np.int64)
+    return hand_size + np.where(turn > 0, turn - 1 + np.asarray(on_draw, dtype=np.int64), 0)
+
+
+def with_mulligans(p_turn, p_opening, mulligans) -> np.ndarray:
+    """Fold up to ``mulligans`` London mulligans into ``p_turn``: each
+    hand missing the requirement (probability 1 − ``p_opening``) is
+    shuffled away, and the last one is kept whatever it holds."""
+    return 1.0 - (1.0 - np.asarray(p_opening)) ** np.asarray(mulligans) * (1.0 - np.asarray(p_turn))
+
+
+def _int(scenario: Mapping[str, object], key: str, default, low: int, high: int) -> int:
+    value = scenario.get(key, default)
+    if isinstance(value, bool):
+        raise ValueError(f"'{key}' must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{key}' must be an integer") from None
+    if not low <= value <= high:
+        raise ValueError(f"'{key}' must be between {low} and {high}")
+    return value
+
+
+def parse_scenario(scenario: Mapping[str, object]) -> Dict[str, object]:
+    """Validated copy of a request scenario; raises ``ValueError``.
+
+    ``{"deck_size": 99, "hand_size": 7, "turns": 10, "mulligans": 0,
+    "categories": [{"name": "lands", "count": 37, "min": 2}, ...]}``
+    """
+    if not isinstance(scenario, Mapping):
+        raise ValueError("each scenario must be an object")
+    deck_size = _int(scenario, "deck_size", None, 1, MAX_DECK_SIZE)
+    categories = scenario.get("categories")
+    if not isinstance(categories, list) or not 1 <= len(categories) <= MAX_CATEGORIES:
+        raise ValueError(f"'categories' must list 1 to {MAX_CATEGORIES} categories")
+    parsed = []
+    for i, category in enumerate(categories):
+        if not isinstance(category, Mapping):
+            raise ValueError("each category must be an object")
+        count = _int(category, "count", None, 0, deck_size)
+        parsed.append({
+            "name": str(category.get("name") or f"category {i + 1}"),
+            "count": count,
+            "min": _int(category, "min", 1, 0, deck_size),
+        })
+    if sum(c["count"] for c in parsed) > deck_size:
+        raise ValueError("category counts add up to more than 'deck_size'")
+    return {
+        "deck_size": deck_size,
+        "hand_size": _int(scenario, "hand_size", DEFAULT_HAND_SIZE, 0, min(deck_size, MAX_HAND_SIZE)),
+        "turns": _int(scenario, "turns", DEFAULT_TURNS, 0, MAX_TURNS),
+        "mulligans": _int(scenario, "mulligans", 0, 0, MAX_MULLIGANS),
+        "categories": parsed,
+    }
+
+
+def curve_table(scenarios: Sequence[Mapping[str, object]]) -> List[Dict[str, object]]:
+    """Per-turn probabilities (turn 0 = opening hand, through ``turns``)
+    on the play and on the draw for every scenario, in one batch.
+
+    Turn t on the draw sees as many cards as turn t + 1 on the play, so
+    each scenario is evaluated once per distinct number of cards seen.
+    Raises ``ValueError`` for an invalid scenario.
+    """
+    parsed = [parse_scenario(s) for s in scenarios]
+    if not parsed:
+        return []
+    width = max(len(s["categories"]) for s in parsed)
+    deck, draws, owner, counts, minimum = [], [], [], [], []
+    for i, s in enumerate(parsed):
+        rows = s["turns"] + 1
+        pad = [0] * (width - len(s["categories"]))
+        deck += [s["deck_size"]] * rows
+        draws += [min(s["hand_size"] + extra, s["deck_size"]) for extra in range(rows)]
+        owner += [i] * rows
+        counts += [[c["count"] for c in s["categories"]] + pad] * rows
+        minimum += [[c["min"] for c in s["categories"]] + pad] * rows
+
+    owner = np.array(owner)
+    p = at_least(deck, counts, minimum, draws)
+    mulligans = np.array([s["mulligans"] for s in parsed])[owner]
+    if mulligans.any():
+        # Each scenario's first row is its opening hand.
+        p = with_mulligans(p, p[np.searchsorted(owner, owner)], mulligans)
+
+    p = np.round(p, 6).tolist()
+    out, row = [], 0
+    for s in parsed:
+        curve = []
+        for t in range(s["turns"] + 1):
+            play, draw = row + max(t - 1, 0), row + t
+            curve.append({
+                "turn": t,
+                "draws_play": draws[play], "play": p[play],
+                "draws_draw": draws[draw], "draw": p[draw],
+            })
+        row += s["turns"] + 1
+        out.append({**s, "curve": curve})
+    return out
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python hypergeometric.py <deck size> <count>:<min>...")
+        sys.exit(2)
+    wanted = [dict(zip(("count", "min"), map(int, arg.split(":")))) for arg in sys.argv[2:]]
+    for entry in curve_table([{"deck_size": int(sys.argv[1]), "categories": wanted}])[0]["curve"]:
+        print(f"turn {entry['turn']:2d}  play {entry['play']:.4f}  draw {entry['draw']:.4f}")
@@ -0,0 +1,241 @@
+"""
+Format Legality Matrix
+======================
+
+Legality used to be a per‑card ``banned_in`` list, checked with
+``fmt not in list`` and with no notion of Vintage's restricted list.
+This module compiles every legality source into one card × format
+matrix of two‑bit statuses:
+
+  ``LEGAL`` (0), ``BANNED`` (1), ``RESTRICTED`` (2), ``NOT_LEGAL`` (3)
+
+Four formats share a byte and each card owns a fixed‑width row of a
+``bytearray``, so a single lookup is two dict hits and a shift with no
+NumPy involved.  ``statuses`` and ``check_deck`` view the same buffer as
+a NumPy array to evaluate whole decks at once, including the
+restricted‑list copy limit.
+
+Sources, later ones overriding earlier ones for the same card and format:
+
+* ``database_entries`` – ``banned_in`` lists from ``CARD_DATABASE``, or
+  for a columnar store its ``banned`` column via ``from_bitmask``.
+* ``banlist_entries`` – ``mtg_banlist_dataset.csv`` (``Banned`` and
+  ``Restricted`` rows; format rule rows are skipped).
+* ``scryfall_entries`` – ``legalities`` from Scryfall card objects, when
+  available, as they track the live banned and restricted lists.
+
+Cards the matrix has never heard of are legal everywhere, as in the
+per‑card helpers.
+"""
+
+from __future__ import annotations
+
+import csv
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+LEGAL, BANNED, RESTRICTED, NOT_LEGAL = 0, 1, 2, 3
+STATUS_NAMES: Tuple[str, ...] = ("legal", "banned", "restricted", "not_legal")
+_STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+# Copies of a restricted card a deck may run.
+RESTRICTED_LIMIT = 1
+
+Entry = Tuple[str, str, int]
+
+
+def database_entries(database: Mapping[str, Mapping[str, object]]) -> Iterable[Entry]:
+    """``banned_in`` lists from a ``CARD_DATABASE``‑shaped mapping."""
+    for name, entry in database.items():
+        for fmt in entry.get("banned_in", []):
+            yield name, fmt, BANNED
+
+
+def banlist_entries(path: str) -> Iterable[Entry]:
+    """Rows of a banlist CSV with ``card_name``, ``format`` and ``legality_status``."""
+    with open(path, encoding="utf-8", newline="") as fh:
+        # The bundled file starts with a blank line before its header.
+        lines = (line for line in fh if line.strip())
+        for row in csv.DictReader(lines):
+            code = _STATUS_CODES.get((row.get("legality_status") or "").strip().lower())
+            name = (row.get("card_name") or "").strip()
+            fmt = (row.get("format") or "").strip()
+            if code is None or not name or not fmt:
+                continue
+            yield name, fmt, code
+
+
+def scryfall_entries(cards: Iterable[Mapping[str, object]]) -> Iterable[Entry]:
+    """``legalities`` from Scryfall card objects, under engine format names."""
+    from card_store import FORMATS
+
+    for card in cards:
+        name = card.get("name")
+        legalities = card.get("legalities") or {}
+        if not name or not legalities:
+            continue
+        for fmt, key in FORMATS:
+            code = _STATUS_CODES.get(legalities.get(key))
+            if code is not None:
+                yield name, fmt, code
+
+
+class LegalityMatrix:
+    """Read‑only card × format matrix of two‑bit legality statuses."""
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        formats: Sequence[str],
+        data: bytearray,
+        unplayable: Optional[Mapping[str, List[int]]] = None,
+        position: Optional[Mapping[str, int]] = None,
+    ):
+        self.names = list(names)
+        self.formats = list(formats)
+        self.size = len(self.names)
+        self.position: Dict[str, int] = (
+            dict(position) if position is not None else {name: i for i, name in enumerate(self.names)}
+        )
+        self.format_index: Dict[str, int] = {fmt: f for f, fmt in enumerate(self.formats)}
+        self.stride = (len(self.formats) + 3) // 4
+        # One extra all‑legal row at the end stands in for unknown cards.
+        self._data = data
+        self._array = None
+        self._unplayable: Dict[str, List[int]] = dict(unplayable or {})
+
+    @classmethod
+    def compile(cls, entries: Iterable[Entry], names: Sequence[str] = ()) -> "LegalityMatrix":
+        """Build a matrix from ``(card, format, status)`` entries.
+
+        Cards in ``names`` take the first rows in that order, so a matrix
+        compiled with a database's names shares its row numbers.  Later
+        entries override earlier ones for the same card and format.
+        """
+        return cls(names, [], bytearray()).updated(entries)
+
+    @classmethod
+    def from_bitmask(
+        cls, names: Sequence[str], formats: Sequence[str], bits, position: Optional[Mapping[str, int]] = None
+    ) -> "LegalityMatrix":
+        """Build from a per‑card bitmask column (bit ``f`` set = barred from ``formats[f]``).
+
+        This is ``card_store.CardStore``'s ``banned`` column; it does not
+        tell banned from not legal, so every set bit becomes ``BANNED``.
+        """
+        import numpy as np
+
+        bits = np.asarray(bits, dtype=np.uint64)
+        stride = (len(formats) + 3) // 4
+        packed = np.zeros((len(names) + 1, stride), dtype=np.uint8)
+        unplayable: Dict[str, List[int]] = {}
+        for f, fmt in enumerate(formats):
+            barred = ((bits >> np.uint64(f)) & np.uint64(1)).astype(np.uint8)
+            packed[:-1, f >> 2] |= barred * np.uint8(BANNED) << np.uint8((f & 3) * 2)
+            rows = np.flatnonzero(barred).tolist()
+            if rows:
+                unplayable[fmt] = rows
+        return cls(names, formats, bytearray(packed.tobytes()), unplayable, position)
+
+    def updated(self, entries: Iterable[Entry]) -> "LegalityMatrix":
+        """A copy with ``(card, format, status)`` entries applied on top.
+
+        Unknown cards get new rows after the existing ones and unknown
+        formats new columns, so existing row numbers are unchanged.
+        """
+        statuses: Dict[Tuple[str, str], int] = {}
+        position = dict(self.position)
+        names = list(self.names)
+        formats = {fmt: f for f, fmt in enumerate(self.formats)}
+        for name, fmt, code in entries:
+            statuses[name, fmt] = code
+            if name not in position:
+                position[name] = len(names)
+                names.append(name)
+            formats.setdefault(fmt, len(formats))
+        stride = (len(formats) + 3) // 4
+        data = bytearray((len(names) + 1) * stride)
+        old = self.stride
+        if old == stride:
+            data[:self.size * old] = self._data[:self.size * old]
+        elif old:
+            for row in range(self.size):
+                data[row * stride:row * stride + old] = self._data[row * old:(row + 1) * old]
+        unplayable = {fmt: set(rows) for fmt, rows in self._unplayable.items()}
+        for (name, fmt), code in statuses.items():
+            f = formats[fmt]
+            row = position[name]
+            cell = row * stride + (f >> 2)
+            shift = (f & 3) * 2
+            data[cell] = data[cell] & ~(3 << shift) | code << shift
+            if code in (BANNED, NOT_LEGAL):
+                unplayable.setdefault(fmt, set()).add(row)
+            elif fmt in unplayable:
+                unplayable[fmt].discard(row)
+        return type(self)(
+            names, list(formats), data, {fmt: sorted(rows) for fmt, rows in unplayable.items()}, position
+        )
+
+    # -- Per‑card lookups ---------------------------------------------
+    def status(self, card_name: str, fmt: str) -> int:
+        row = self.position.get(card_name)
+        f = self.format_index.get(fmt)
+        if row is None or f is None:
+            return LEGAL
+        return self._data[row * self.stride + (f >> 2)] >> ((f & 3) * 2) & 3
+
+    def is_legal(self, card_name: str, fmt: str) -> bool:
+        """Legal or restricted; restricted cards are limited, not barred."""
+        return self.status(card_name, fmt) in (LEGAL, RESTRICTED)
+
+    def legalities(self, card_name: str) -> Dict[str, str]:
+        """Every format's status for one card, as Scryfall‑style strings."""
+        return {fmt: STATUS_NAMES[self.status(card_name, fmt)] for fmt in self.formats}
+
+    # -- Vectorised checks --------------------------------------------
+    def rows(self, names: Iterable[str]):
+        """Map names to rows once; unknown names map to the all‑legal row."""
+        import numpy as np
+
+        get, unknown = self.position.get, self.size
+        return np.fromiter((get(n, unknown) for n in names), dtype=np.int64)
+
+    def statuses(self, rows, fmt: str):
+        """Status codes (``uint8``) of ``rows`` in ``fmt``."""
+        import numpy as np
+
+        f = self.format_index.get(fmt)
+        if f is None:
+            return np.zeros(len(rows), dtype=np.uint8)
+        if self._array is None:
+            self._array = np.frombuffer(self._data, dtype=np.uint8).reshape(self.size + 1, self.stride)
+        return self._array[rows, f >> 2] >> np.uint8((f & 3) * 2) & np.uint8(3)
+
+    def unplayable_rows(self, fmt: str) -> List[int]:
+        """Rows of cards that are banned or not legal in ``fmt``, ascending."""
+        return self._unplayable.get(fmt, [])
+
+    def check_deck(
+        self, card_names: Sequence[str], fmt: str, quantities: Optional[Sequence[int]] = None
+    ) -> Dict[str, List[str]]:
+        """Whole‑deck legality in one pass.
+
+        Returns the names that are ``banned``, ``not_legal``, and
+        ``restricted`` cards run above ``RESTRICTED_LIMIT`` copies.
+        Repeated entries for the same card count towards its limit.
+        """
+        import numpy as np
+
+        rows = self.rows(card_names)
+        codes = self.statuses(rows, fmt)
+        qty = np.ones(len(rows), dtype=np.int64) if quantities is None else np.asarray(quantities, dtype=np.int64)
+        copies = np.bincount(rows, weights=qty, minlength=self.size + 1)[rows]
+        over = (codes == RESTRICTED) & (copies > RESTRICTED_LIMIT)
+
+        def pick(mask) -> List[str]:
+            return list(dict.fromkeys(card_names[i] for i in np.flatnonzero(mask).tolist()))
+
+        return {
+            "banned": pick(codes == BANNED),
+            "not_legal": pick(codes == NOT_LEGAL),
+            "restricted": pick(over),
+        }
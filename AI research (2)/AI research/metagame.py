@@ -0,0 +1,217 @@
+"""
+Commander Metagame Overlap
+==========================
+
+``commander_metagame.json`` lists, per commander, its most played cards
+with inclusion rates written as strings (``"61%"``; ``"—"`` when
+unknown, which is skipped), plus themes and a trend.  ``MetagameMatrix``
+compiles the rates into a sparse commander × card matrix held twice, by
+commander (CSR: ``row_start`` / ``row_card`` / ``row_rate``) and by card
+(CSC: ``col_start`` / ``col_commander`` / ``col_rate``), and answers from
+a deck's card list:
+
+* **How meta is the list** – for a commander, the share of its total
+  inclusion rate the deck covers (``meta_score``), the staples it plays
+  and the most played ones it is missing.
+* **Which commanders it resembles** – cosine similarity between the
+  deck's 0/1 card vector and every commander row.  The deck's columns
+  are gathered from the CSC arrays and summed per commander with one
+  ``bincount``, so the cost grows with the deck's non‑zeros, not with
+  the number of commanders.
+
+``report`` does both in one pass; without a commander the deck is
+scored against the one it most resembles.
+
+    python metagame.py "Atraxa, Praetors' Voice" "Doubling Season" "Sol Ring"
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+METAGAME_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commander_metagame.json")
+RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*%?\s*$")
+
+
+def parse_rate(value: object) -> Optional[float]:
+    """``"61%"`` → 0.61; bare numbers above 1 are read as percentages.
+    ``None`` if the rate is missing or unreadable."""
+    if isinstance(value, (int, float)):
+        rate, percent = float(value), False
+    else:
+        m = RATE_RE.match(str(value or ""))
+        if not m:
+            return None
+        rate, percent = float(m.group(1)), "%" in str(value)
+    if percent or rate > 1.0:
+        rate /= 100.0
+    return rate if 0.0 <= rate <= 1.0 else None
+
+
+def _segments(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenated ``arange(s, e)`` for every (start, end) pair."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+class MetagameMatrix:
+    """Sparse commander × card inclusion rates with deck overlap queries."""
+
+    def __init__(
+        self,
+        commanders: Sequence[str],
+        cards: Sequence[str],
+        commander_ids: np.ndarray,
+        card_ids: np.ndarray,
+        rates: np.ndarray,
+        info: Optional[Sequence[Mapping[str, object]]] = None,
+    ):
+        self.commanders: List[str] = list(commanders)
+        self.cards: List[str] = list(cards)
+        self.info: List[Mapping[str, object]] = list(info) if info is not None else [{} for _ in self.commanders]
+        n_commanders, n_cards = len(self.commanders), len(self.cards)
+        commander_ids = np.asarray(commander_ids, dtype=np.int64)
+        card_ids = np.asarray(card_ids, dtype=np.int64)
+        rates = np.asarray(rates, dtype=np.float32)
+
+        order = np.lexsort((-rates, commander_ids))  # by commander, most played first
+        self.row_start = np.searchsorted(commander_ids[order], np.arange(n_commanders + 1)).astype(np.int64)
+        self.row_card = card_ids[order].astype(np.int32)
+        self.row_rate = rates[order]
+        order = np.lexsort((commander_ids, card_ids))
+        self.col_start = np.searchsorted(card_ids[order], np.arange(n_cards + 1)).astype(np.int64)
+        self.col_commander = commander_ids[order].astype(np.int32)
+        self.col_rate = rates[order]
+
+        self.row_total = np.bincount(commander_ids, weights=rates, minlength=n_commanders)
+        self.row_norm = np.sqrt(np.bincount(commander_ids, weights=rates.astype(np.float64) ** 2,
+                                            minlength=n_commanders))
+        self.commander_index: Dict[str, int] = {n: i for i, n in enumerate(self.commanders)}
+        self.card_index: Dict[str, int] = {n: i for i, n in enumerate(self.cards)}
+        self._folded_commanders = {n.casefold(): i for i, n in enumerate(self.commanders)}
+        self._folded_cards = {n.casefold(): i for i, n in enumerate(self.cards)}
+
+    def __len__(self) -> int:
+        return len(self.row_card)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping[str, object]]) -> "MetagameMatrix":
+        """Build from ``commander_metagame.json`` entries; a card listed twice keeps its highest rate."""
+        commanders: Dict[str, int] = {}
+        cards: Dict[str, int] = {}
+        info: List[Mapping[str, object]] = []
+        best: Dict[tuple, float] = {}
+        for row in rows:
+            name = row.get("commander_name")
+            if not name:
+                continue
+            c = commanders.get(name)
+            if c is None:
+                c = commanders[name] = len(commanders)
+                info.append({
+                    "popularity_rank": row.get("popularity_rank"),
+                    "themes": list(row.get("themes") or ()),
+                    "trend": row.get("trend"),
+                })
+            for card in row.get("top_cards") or ():
+                rate = parse_rate(card.get("inclusion_rate"))
+                card_name = card.get("card_name")
+                if rate is None or not card_name:
+                    continue
+                key = (c, cards.setdefault(card_name, len(cards)))
+                best[key] = max(rate, best.get(key, 0.0))
+        pairs = np.array(list(best), dtype=np.int64).reshape(-1, 2)
+        return cls(
+            list(commanders), list(cards), pairs[:, 0], pairs[:, 1],
+            np.array(list(best.values()), dtype=np.float32), info,
+        )
+
+    @classmethod
+    def load(cls, path: str = METAGAME_DATASET) -> "MetagameMatrix":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_rows(json.load(fh))
+
+    # -- Queries ------------------------------------------------------
+    def commander_id(self, name: str) -> Optional[int]:
+        i = self.commander_index.get(name)
+        return self._folded_commanders.get(str(name).strip().casefold()) if i is None else i
+
+    def deck_ids(self, names: Iterable[str]) -> np.ndarray:
+        """Sorted unique ids of the deck's cards that appear in the matrix."""
+        index, folded = self.card_index, self._folded_cards
+        ids = set()
+        for name in names:
+            i = index.get(name)
+            if i is None:
+                i = folded.get(str(name).strip().casefold())
+            if i is not None:
+                ids.add(i)
+        return np.array(sorted(ids), dtype=np.int64)
+
+    def similarity(self, deck: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the deck's 0/1 vector with every commander row."""
+        rows = _segments(self.col_start[deck], self.col_start[deck + 1])
+        dots = np.bincount(self.col_commander[rows], weights=self.col_rate[rows], minlength=len(self.commanders))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.nan_to_num(dots / (self.row_norm * np.sqrt(max(len(deck), 1))))
+
+    def overlap(self, commander: int, deck: np.ndarray, missing: int = 10) -> Dict[str, object]:
+        start, end = int(self.row_start[commander]), int(self.row_start[commander + 1])
+        cards, rates = self.row_card[start:end], self.row_rate[start:end]
+        played = np.isin(cards, deck, assume_unique=True)
+        total = float(self.row_total[commander])
+        names = self.cards
+        return {
+            "commander": self.commanders[commander],
+            **self.info[commander],
+            "meta_score": round(float(rates[played].sum()) / total, 4) if total else 0.0,
+            "staples_played": int(played.sum()),
+            "staples": int(end - start),
+            "included": [{"card_name": names[c], "inclusion_rate": round(r, 4)}
+                         for c, r in zip(cards[played].tolist(), rates[played].tolist())],
+            "missing_staples": [{"card_name": names[c], "inclusion_rate": round(r, 4)}
+                                for c, r in zip(cards[~played][:max(missing, 0)].tolist(),
+                                                rates[~played][:max(missing, 0)].tolist())],
+        }
+
+    def report(
+        self, deck_cards: Iterable[str], commander: Optional[str] = None, k: int = 5, missing: int = 10
+    ) -> Dict[str, object]:
+        """Meta overlap with ``commander`` (or the closest commander) and
+        the ``k`` commanders the deck most resembles."""
+        deck = self.deck_ids(deck_cards)
+        scores = self.similarity(deck)
+        k = min(max(k, 0), len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+        top = top[np.lexsort((top, -scores[top]))]
+        top = top[scores[top] > 0]
+        c = self.commander_id(commander) if commander else None
+        if c is None and not commander and len(top):
+            c = int(top[0])
+        return {
+            "known_cards": int(len(deck)),
+            "commander_found": c is not None,
+            "meta": self.overlap(c, deck, missing) if c is not None else None,
+            "similar_commanders": [
+                {"commander": self.commanders[i], "similarity": round(float(scores[i]), 4)} for i in top.tolist()
+            ],
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python metagame.py <commander | -> <card name>...")
+        sys.exit(2)
+    matrix = MetagameMatrix.load()
+    chosen = None if sys.argv[1] == "-" else sys.argv[1]
+    print(json.dumps(matrix.report(sys.argv[2:], chosen), indent=2, ensure_ascii=False))
@@ -0,0 +1,353 @@
+"""
+Opening Hand Simulator
+======================
+
+Keep/mulligan advice such as ``mulligan_examples`` in
+``mtg_deck_analysis.json`` ("two lands and a ramp piece, or one land with
+Sol Ring and a dork") puts conditions on several card roles at once and
+on London mulligan bottoming, which ``hypergeometric`` does not cover.
+This module estimates them by Monte Carlo:
+
+* A deck is a set of exclusive categories with counts (``land``,
+  ``ramp``, ``sol_ring``, ``other`` …), encoded as one ``int8`` array of
+  category codes and tiled into a hands × deck matrix.  Only the cards
+  looked at are shuffled: a partial Fisher–Yates pass over every row at
+  once, one swap per card drawn.
+* A keep rule is a list of clauses, any of which keeps the hand; a clause
+  maps categories to a minimum (``{"land": 2}``) or an inclusive range
+  (``{"land": [2, 4]}``).  After ``m`` mulligans the hand is kept if some
+  choice of ``hand_size − m`` of its cards meets a clause, and the cards
+  bottomed are the surplus: the clause's minimums stay, then the
+  remaining slots are filled in deck order.  The last allowed mulligan is
+  kept whatever it holds.
+* An optional goal (same shape as a clause) is checked on the kept cards
+  plus the draws up to ``turn``, on the play or on the draw.
+
+Each 8192-hand chunk has its own seed spawned from ``seed``, so results
+do not depend on how many processes ran the chunks.  Probabilities come
+with 95 % Wilson score intervals.
+
+    python mulligan.py land=37 ramp=12 draw=10 other=40 --keep land:2,ramp:1 --keep land:1,ramp:2 --goal land:4 --turn 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from hypergeometric import draws_by_turn
+
+DEFAULT_HAND_SIZE = 7
+DEFAULT_MAX_MULLIGANS = 3
+DEFAULT_HANDS = 100_000
+MAX_DECK_SIZE = 1000
+MAX_CATEGORIES = 16
+MAX_HANDS = 100_000_000
+MAX_TURNS = 40
+CHUNK_HANDS = 1 << 13  # 8192 rows of a 99-card deck stay in L2
+Z_95 = 1.959964
+
+BASIC_LANDS = frozenset(
+    ["Plains", "Island", "Swamp", "Mountain", "Forest", "Wastes"]
+    + [f"Snow-Covered {land}" for land in ("Plains", "Island", "Swamp", "Mountain", "Forest", "Wastes")]
+)
+
+
+def wilson(successes: int, trials: int, z: float = Z_95) -> Tuple[float, float]:
+    """Wilson score interval for ``successes`` out of ``trials``."""
+    if not trials:
+        return 0.0, 1.0
+    p = successes / trials
+    denom = 1.0 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(centre - half, 0.0), min(centre + half, 1.0)
+
+
+def _estimate(successes: int, trials: int) -> Dict[str, float]:
+    low, high = wilson(successes, trials)
+    return {"p": round(successes / trials, 6) if trials else 0.0, "low": round(low, 6), "high": round(high, 6)}
+
+
+############################
+# Config
+############################
+
+def _int(config: Mapping[str, object], key: str, default, low: int, high: int) -> int:
+    value = config.get(key, default)
+    if isinstance(value, bool):
+        raise ValueError(f"'{key}' must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{key}' must be an integer") from None
+    if not low <= value <= high:
+        raise ValueError(f"'{key}' must be between {low} and {high}")
+    return value
+
+
+def _clauses(raw, categories: Sequence[str], hand_size: int, what: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(lo, hi) arrays of clauses × categories; unmentioned categories are
+    0..hand_size.  A minimum above ``hand_size`` is allowed and never met."""
+    if isinstance(raw, Mapping):
+        raw = [raw]
+    if not isinstance(raw, list) or not raw:
+        raise ValueError(f"'{what}' must be a clause or a list of clauses")
+    position = {name: i for i, name in enumerate(categories)}
+    lo = np.zeros((len(raw), len(categories)), dtype=np.int64)
+    hi = np.full((len(raw), len(categories)), hand_size, dtype=np.int64)
+    for r, clause in enumerate(raw):
+        if not isinstance(clause, Mapping):
+            raise ValueError(f"each '{what}' clause must be an object")
+        for name, bound in clause.items():
+            if name not in position:
+                raise ValueError(f"'{what}' uses '{name}', which is not a deck category")
+            pair = isinstance(bound, list) and len(bound) == 2
+            low, high = bound if pair else (bound, hand_size)
+            if not all(isinstance(b, int) and not isinstance(b, bool) for b in (low, high)) or low < 0 \
+                    or (pair and low > high):
+                raise ValueError(f"'{what}' bounds must be a minimum or a [min, max] pair")
+            lo[r, position[name]], hi[r, position[name]] = low, max(high, low)
+    return lo, hi
+
+
+def parse_config(config: Mapping[str, object]) -> Dict[str, object]:
+    """Validated simulation settings; raises ``ValueError``.
+
+    ``{"deck": {"land": 37, "ramp": 12, "other": 50}, "keep": [{"land": 2, "ramp": 1}],
+    "max_mulligans": 3, "hand_size": 7, "free_mulligan": false,
+    "goal": {"land": 4}, "turn": 4, "on_draw": false, "hands": 100000, "seed": 0}``
+    """
+    if not isinstance(config, Mapping):
+        raise ValueError("the simulation config must be an object")
+    deck = config.get("deck")
+    if not isinstance(deck, Mapping) or not 1 <= len(deck) <= MAX_CATEGORIES:
+        raise ValueError(f"'deck' must map 1 to {MAX_CATEGORIES} categories to card counts")
+    categories = [str(name) for name in deck]
+    counts = [_int(deck, name, None, 0, MAX_DECK_SIZE) for name in deck]
+    deck_size = sum(counts)
+    if not 1 <= deck_size <= MAX_DECK_SIZE:
+        raise ValueError(f"the deck must hold 1 to {MAX_DECK_SIZE} cards")
+    hand_size = _int(config, "hand_size", DEFAULT_HAND_SIZE, 1, deck_size)
+    keep_lo, keep_hi = _clauses(config.get("keep"), categories, hand_size, "keep")
+    goal = config.get("goal")
+    goal_lo = goal_hi = None
+    turn = _int(config, "turn", 0, 0, MAX_TURNS)
+    on_draw = bool(config.get("on_draw", False))
+    extra = int(draws_by_turn(turn, on_draw, hand_size)) - hand_size
+    if goal is not None:
+        goal_lo, goal_hi = _clauses(goal, categories, hand_size + extra, "goal")
+        if len(goal_lo) != 1:
+            raise ValueError("'goal' must be a single clause")
+        if hand_size + extra > deck_size:
+            raise ValueError("the deck runs out of cards before 'turn'")
+    return {
+        "categories": categories,
+        "counts": counts,
+        "hand_size": hand_size,
+        "max_mulligans": _int(config, "max_mulligans", DEFAULT_MAX_MULLIGANS, 0, hand_size),
+        "free_mulligan": bool(config.get("free_mulligan", False)),
+        "keep_lo": keep_lo,
+        "keep_hi": keep_hi,
+        "goal_lo": goal_lo,
+        "goal_hi": goal_hi,
+        "turn": turn,
+        "on_draw": on_draw,
+        "extra_draws": extra if goal is not None else 0,
+        "hands": _int(config, "hands", DEFAULT_HANDS, 1, MAX_HANDS),
+        "seed": _int(config, "seed", 0, 0, 2 ** 63 - 1),
+    }
+
+
+############################
+# Simulation
+############################
+
+def category_counts(cards: np.ndarray, n_categories: int) -> np.ndarray:
+    """Per-row category counts of a hands × cards matrix of category codes."""
+    n = len(cards)
+    codes = (np.arange(n, dtype=np.int64) * n_categories)[:, None] + cards
+    return np.bincount(codes.ravel(), minlength=n * n_categories).reshape(n, n_categories)
+
+
+def keepable(hands: np.ndarray, lo: np.ndarray, hi: np.ndarray, keep_size: int) -> np.ndarray:
+    """hands × clauses: can ``keep_size`` of the hand's cards meet the clause?
+
+    Each clause only touches the categories it bounds: its minimums must
+    be in hand and fit in ``keep_size``, and the cards left once every
+    capped category is cut to its maximum must still fill ``keep_size``.
+    """
+    total = hands.sum(axis=1)
+    most = int(hands.max(initial=0))
+    out = np.empty((len(hands), len(lo)), dtype=bool)
+    for r in range(len(lo)):
+        ok = np.full(len(hands), lo[r].sum() <= keep_size)
+        for c in np.flatnonzero(lo[r] > 0):
+            ok &= hands[:, c] >= lo[r, c]
+        room = total
+        for c in np.flatnonzero(hi[r] < most):
+            room = room - np.maximum(hands[:, c] - hi[r, c], 0)
+        out[:, r] = ok & (room >= keep_size)
+    return out
+
+
+def bottom(hands: np.ndarray, lo: np.ndarray, hi: np.ndarray, keep_size: int) -> np.ndarray:
+    """Counts kept when bottoming down to ``keep_size`` cards: the
+    minimums ``lo`` first, then as many as allowed in category order."""
+    cap = np.minimum(hands, hi)
+    kept = np.minimum(lo, cap)
+    room = keep_size - kept.sum(axis=1)
+    for c in range(hands.shape[1]):
+        take = np.maximum(np.minimum(room, cap[:, c] - kept[:, c]), 0)
+        kept[:, c] += take
+        room = room - take
+    return kept
+
+
+def keep_hand(counts: Mapping[str, int], keep, mulligans: int = 0) -> bool:
+    """Whether a single hand (category → count) is kept after ``mulligans``."""
+    categories = list(counts)
+    hand = np.array([[int(counts[name]) for name in categories]])
+    size = int(hand.sum())
+    lo, hi = _clauses(keep, categories, size, "keep")
+    return bool(keepable(hand, lo, hi, max(size - mulligans, 0)).any())
+
+
+def _shuffle(cards: np.ndarray, start: int, stop: int, rng: np.random.Generator):
+    """Partial Fisher–Yates over positions ``start``..``stop`` − 1 of every
+    row, in place: those become uniformly random draws from the rest of
+    the row."""
+    n, size = cards.shape
+    flat = cards.reshape(-1)
+    base = np.arange(n, dtype=np.int64) * size
+    for j in range(start, stop):
+        pick = rng.integers(j, size, size=n)
+        pick += base
+        here = base + j
+        drawn = flat[pick]
+        flat[pick] = flat[here]
+        flat[here] = drawn
+
+
+def _simulate_chunk(args) -> np.ndarray:
+    """[kept after 0..M mulligans, forced keeps, goals met, cards kept,
+    opening hands keepable] for one chunk."""
+    sim, n, seed = args
+    rng = np.random.default_rng(seed)
+    n_categories, hand_size = len(sim["categories"]), sim["hand_size"]
+    top, extra = sim["max_mulligans"], sim["extra_draws"]
+    keep_lo, keep_hi, goal_lo, goal_hi = sim["keep_lo"], sim["keep_hi"], sim["goal_lo"], sim["goal_hi"]
+    deck = np.repeat(np.arange(n_categories, dtype=np.int8), sim["counts"])
+    rows = np.tile(deck, (n, 1))
+    out = np.zeros(top + 5, dtype=np.int64)
+    for m in range(top + 1):
+        # Any arrangement of a row is a deck, so a mulligan reshuffles in place.
+        _shuffle(rows, 0, hand_size, rng)
+        hands = category_counts(rows[:, :hand_size], n_categories)
+        keep_size = max(hand_size - max(m - sim["free_mulligan"], 0), 0)
+        ok = keepable(hands, keep_lo, keep_hi, keep_size)
+        kept_ok = ok.any(axis=1)
+        keeps = int(kept_ok.sum())
+        if m == 0:
+            out[top + 4] = keeps
+        takes = kept_ok if m < top else np.ones(len(rows), dtype=bool)
+        taken = int(takes.sum())
+        out[m] = taken
+        out[top + 1] += taken - keeps
+        out[top + 3] += taken * keep_size
+        if goal_lo is not None and taken:
+            # Bottom the surplus, then draw up to the goal turn.
+            picked = hands[takes]
+            clause = ok[takes].argmax(axis=1)
+            lo, hi = keep_lo[clause], keep_hi[clause]
+            if m == top:
+                forced = ~kept_ok[:, None]
+                lo, hi = np.where(forced, 0, lo), np.where(forced, picked, hi)
+            seen = bottom(picked, lo, hi, keep_size)
+            if extra:
+                kept_rows = rows[takes]
+                _shuffle(kept_rows, hand_size, hand_size + extra, rng)
+                seen += category_counts(kept_rows[:, hand_size:hand_size + extra], n_categories)
+            met = np.ones(taken, dtype=bool)
+            for c in np.flatnonzero((goal_lo[0] > 0) | (goal_hi[0] < hand_size + extra)):
+                met &= (seen[:, c] >= goal_lo[0, c]) & (seen[:, c] <= goal_hi[0, c])
+            out[top + 2] += int(met.sum())
+        if taken == len(rows):
+            break
+        rows = rows[~takes]
+    return out
+
+
+def simulate(config: Mapping[str, object], processes: int = 0) -> Dict[str, object]:
+    """Keep rates, mulligan depth and goal odds for ``config`` (see
+    ``parse_config``), with 95 % Wilson intervals.  ``processes`` > 1
+    spreads the chunks over a process pool.  Raises ``ValueError`` for
+    an invalid config."""
+    sim = parse_config(config)
+    hands = sim["hands"]
+    sizes = [CHUNK_HANDS] * (hands // CHUNK_HANDS) + ([hands % CHUNK_HANDS] if hands % CHUNK_HANDS else [])
+    seeds = np.random.SeedSequence(sim["seed"]).spawn(len(sizes))
+    jobs = [(sim, size, seed) for size, seed in zip(sizes, seeds)]
+    if processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_simulate_chunk, jobs, chunksize=max(len(jobs) // (4 * processes), 1)))
+    else:
+        parts = [_simulate_chunk(job) for job in jobs]
+    totals = np.sum(parts, axis=0).tolist()
+
+    top = sim["max_mulligans"]
+    goal = None
+    if sim["goal_lo"] is not None:
+        goal = {"turn": sim["turn"], "on_draw": sim["on_draw"], **_estimate(totals[top + 2], hands)}
+    return {
+        "hands": hands,
+        "seed": sim["seed"],
+        "deck_size": sum(sim["counts"]),
+        "keep_opening": _estimate(totals[top + 4], hands),
+        "kept_after": [
+            {"mulligans": m, "hand_size": max(sim["hand_size"] - max(m - sim["free_mulligan"], 0), 0),
+             **_estimate(totals[m], hands)}
+            for m in range(top + 1)
+        ],
+        "forced_keep": _estimate(totals[top + 1], hands),
+        "mean_hand_size": round(totals[top + 3] / hands, 4),
+        "goal": goal,
+    }
+
+
+def _bounds(text: str) -> Dict[str, object]:
+    clause = {}
+    for part in text.split(","):
+        name, _, bound = part.partition(":")
+        low, _, high = bound.partition("-")
+        clause[name] = [int(low), int(high)] if high else int(low)
+    return clause
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Monte Carlo opening hands with London mulligans.")
+    ap.add_argument("deck", nargs="+", help="category=count, e.g. land=37")
+    ap.add_argument("--keep", action="append", required=True, help="clause such as land:2,ramp:1 or land:2-4")
+    ap.add_argument("--goal")
+    ap.add_argument("--turn", type=int, default=0)
+    ap.add_argument("--on-draw", action="store_true")
+    ap.add_argument("--max-mulligans", type=int, default=DEFAULT_MAX_MULLIGANS)
+    ap.add_argument("--free-mulligan", action="store_true")
+    ap.add_argument("--hands", type=int, default=1_000_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--processes", type=int, default=0)
+    args = ap.parse_args()
+    settings: Dict[str, object] = {
+        "deck": {name: int(count) for name, _, count in (item.partition("=") for item in args.deck)},
+        "keep": [_bounds(clause) for clause in args.keep],
+        "turn": args.turn, "on_draw": args.on_draw, "max_mulligans": args.max_mulligans,
+        "free_mulligan": args.free_mulligan, "hands": args.hands, "seed": args.seed,
+    }
+    if args.goal:
+        settings["goal"] = _bounds(args.goal)
+    print(json.dumps(simulate(settings, args.processes), indent=2))
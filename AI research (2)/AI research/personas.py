@@ -0,0 +1,326 @@
+"""
+Persona Weight Vectors
+======================
+
+``player_personas.json`` describes each persona's priorities in words
+(``budget: high``, ``power: very high`` ...).  This module compiles them
+once, at load time, into numeric weight vectors over the features the
+replacement engine knows for every candidate:
+
+* ``price`` – cheapness, ``1 / (1 + price)`` as in ``synergy.combined_score``.
+* ``power`` – a power proxy: ``log(1 + price)`` scaled to [0, 1] by the
+  dearest card, since the market prices in demand from strong decks.
+* ``synergy`` – commander synergy score (0 without a commander).
+* ``role_match`` – share of the original card's roles the candidate has.
+
+``budget`` weights ``price``, ``power`` weights ``power`` and ``theme``
+weights ``synergy``; ``role_match`` has a fixed medium weight because
+replacements must keep the deck working whoever asks.  ``fun`` and
+``legality`` have no card feature (legality is a hard filter already).
+Each vector is normalised to sum to 1.
+
+``PersonaScorer`` keeps the features of a ``CardIndex`` as NumPy
+columns.  The columns that do not depend on the query are multiplied by
+the persona's weights once per (persona, commander) – a single
+matrix‑vector product – and each price tier's cards are kept sorted by
+that base score, split by role.  A query (``PersonaQuery``) reads
+chunks of the best remaining cards with the original's roles, adds their
+role‑match column and filters them with boolean masks until no card
+left can make the top ``k``, so ranking has no Python work per
+candidate and usually reads a chunk or two.
+"""
+
+from __future__ import annotations
+
+import json
+from itertools import combinations
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+FEATURES: Tuple[str, ...] = ("price", "power", "synergy", "role_match")
+LEVELS: Dict[str, float] = {"low": 1.0, "medium": 2.0, "moderate": 2.0, "high": 3.0, "very high": 4.0}
+PRIORITY_FEATURES: Dict[str, str] = {"budget": "price", "power": "power", "theme": "synergy"}
+ROLE_MATCH_LEVEL = "medium"
+
+
+class Persona(NamedTuple):
+    name: str
+    weights: np.ndarray
+    rules: Tuple[str, ...]
+    tone: str
+
+
+def compile_weights(priorities: Dict[str, str]) -> np.ndarray:
+    """Weight vector over ``FEATURES`` for one persona's priorities.
+
+    Unknown levels count as medium.
+    """
+    raw = np.zeros(len(FEATURES))
+    for priority, feature in PRIORITY_FEATURES.items():
+        level = str(priorities.get(priority, "medium")).strip().lower()
+        raw[FEATURES.index(feature)] = LEVELS.get(level, LEVELS["medium"])
+    raw[FEATURES.index("role_match")] = LEVELS[ROLE_MATCH_LEVEL]
+    return raw / raw.sum()
+
+
+class PersonaTable:
+    """Compiled personas, looked up by name."""
+
+    def __init__(self, personas: Iterable[Persona]):
+        self.personas: Dict[str, Persona] = {p.name: p for p in personas}
+        self._lookup: Dict[str, str] = {name.lower(): name for name in self.personas}
+        # A single distinctive word ("spike", "johnny") also names a persona.
+        words: Dict[str, List[str]] = {}
+        for name in self.personas:
+            for word in name.lower().split():
+                words.setdefault(word, []).append(name)
+        for word, names in words.items():
+            if len(names) == 1:
+                self._lookup.setdefault(word, names[0])
+
+    @classmethod
+    def from_dataset(cls, data: Dict[str, object]) -> "PersonaTable":
+        rules = {a["persona_name"]: tuple(a.get("adjustment_rules", [])) for a in data.get("adjustments", [])}
+        tones = {t["persona_name"]: t.get("tone_style", "") for t in data.get("tones", [])}
+        return cls(
+            Persona(p["persona_name"], compile_weights(p.get("priorities", {})),
+                    rules.get(p["persona_name"], ()), tones.get(p["persona_name"], ""))
+            for p in data.get("personas", [])
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PersonaTable":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_dataset(json.load(fh))
+
+    def __len__(self) -> int:
+        return len(self.personas)
+
+    def names(self) -> List[str]:
+        return list(self.personas)
+
+    def resolve(self, name: Optional[str]) -> Optional[Persona]:
+        """Persona by full name or unique word, case‑insensitively."""
+        key = self._lookup.get(str(name or "").strip().lower())
+        return self.personas.get(key) if key else None
+
+    def matrix(self) -> np.ndarray:
+        """All weight vectors stacked, one row per persona in ``names()`` order."""
+        return np.array([p.weights for p in self.personas.values()]).reshape(len(self), len(FEATURES))
+
+
+class PersonaScorer:
+    """Feature columns of one ``CardIndex`` for persona‑weighted ranking."""
+
+    BAND_CACHE = 64
+    PICK_CACHE = 16384
+
+    def __init__(self, index):
+        self.index = index
+        prices = np.asarray(index.prices, dtype=np.float64)
+        self.prices = prices
+        self.rank = np.asarray(index.rank, dtype=np.int64)
+        self.colours = np.asarray(index.masks, dtype=np.int64)
+        power = np.log1p(prices)
+        top = power.max() if len(power) else 0.0
+        self.static = np.column_stack([1.0 / (1.0 + prices), power / top if top > 0 else power])
+        self.role_names: Dict[str, int] = {}
+        for roles in index.roles:
+            for role in roles:
+                self.role_names.setdefault(role, len(self.role_names))
+        self.roles = np.zeros((index.size, max(1, len(self.role_names))), dtype=np.float64)
+        for i, roles in enumerate(index.roles):
+            for role in roles:
+                self.roles[i, self.role_names[role]] = 1.0
+        self._banned: Dict[str, np.ndarray] = {}
+        self._base: Dict[Tuple[str, Optional[str]], np.ndarray] = {}
+        self._bands: Dict[Tuple[str, Optional[str], Tuple[float, ...]], List[_RolePostings]] = {}
+        self._picks: Dict[Tuple[object, ...], Tuple[List[int], List[float]]] = {}
+
+    def banned(self, fmt: str) -> np.ndarray:
+        cached = self._banned.get(fmt)
+        if cached is None:
+            bits = np.frombuffer(bytes(self.index.banned_bitset(fmt)), dtype=np.uint8)
+            cached = np.unpackbits(bits, bitorder="little")[:self.index.size].astype(bool)
+            if len(cached) < self.index.size:
+                cached = np.zeros(self.index.size, dtype=bool)
+            self._banned[fmt] = cached
+        return cached
+
+    def base_scores(self, persona: Persona, commander: Optional[str] = None, synergy=None) -> np.ndarray:
+        """Score of every card from its query‑independent features.
+
+        ``synergy`` maps index positions to the commander's scores; the
+        result is cached per (persona, commander).
+        """
+        key = (persona.name, commander if synergy else None)
+        cached = self._base.get(key)
+        if cached is None:
+            w = persona.weights
+            cached = self.static @ w[:2]
+            if synergy:
+                column = np.zeros(self.index.size)
+                column[np.fromiter(synergy.keys(), dtype=np.int64, count=len(synergy))] = list(synergy.values())
+                cached = cached + w[2] * column
+            self._base[key] = cached
+        return cached
+
+    def bands(
+        self, persona: Persona, tiers: Sequence[Tuple[str, float]], commander: Optional[str] = None, synergy=None
+    ) -> List["_RolePostings"]:
+        """Per tier, per role set: positions in the tier's own price band, best base score first.
+
+        A tier's band holds the cards dearer than every earlier tier's
+        bound and within its own; ties keep (price, database order).
+        Role postings are split off lazily and everything is cached per
+        (persona, commander, tier bounds) for the last ``BAND_CACHE`` keys.
+        """
+        bounds = tuple(bound for _name, bound in tiers)
+        key = (persona.name, commander if synergy else None, bounds)
+        cached = self._bands.get(key)
+        if cached is None:
+            if len(self._bands) >= self.BAND_CACHE:
+                del self._bands[next(iter(self._bands))]
+            base = self.base_scores(persona, commander, synergy)
+            order = np.lexsort((self.rank, -base))
+            prices = self.prices[order]
+            cached, low = [], -np.inf
+            for bound in bounds:
+                cached.append(_RolePostings(self.roles, order[(prices > low) & (prices <= bound)]))
+                low = max(low, bound)
+            self._bands[key] = cached
+        return cached
+
+    def query(
+        self,
+        persona: Persona,
+        roles: Sequence[str],
+        fmt: str,
+        deck_mask: int,
+        tiers: Sequence[Tuple[str, float]],
+        commander: Optional[str] = None,
+        synergy=None,
+        exclude: Optional[int] = None,
+    ) -> "PersonaQuery":
+        return PersonaQuery(self, persona, roles, fmt, deck_mask, tiers, commander, synergy, exclude)
+
+
+class _RolePostings(dict):
+    """Role ids → the band's positions with all those roles, in band order (built on first use)."""
+
+    def __init__(self, roles: np.ndarray, band: np.ndarray):
+        super().__init__()
+        self.roles = roles
+        self.band = band
+
+    def __missing__(self, role_ids: Tuple[int, ...]) -> np.ndarray:
+        # Narrow the posting of all but the last role, so larger subsets stay cheap.
+        rows = self[role_ids[:-1]] if len(role_ids) > 1 else self.band
+        posting = self[role_ids] = rows[self.roles[rows, role_ids[-1]] > 0]
+        return posting
+
+
+class PersonaQuery:
+    """Persona ranking of one card's replacements, tier by tier.
+
+    ``propose_replacements`` fills tiers in order and a tier only stops
+    short of ``k`` picks when its matches run out, so every match cheaper
+    than an earlier tier's bound has been picked by the time a later tier
+    is asked; each tier therefore only ranks its own price band.
+
+    Matches are read in chunks, in descending base score, from the band's
+    postings for every non‑empty subset of the original card's roles (the
+    cards having all roles of the subset), in the manner of the threshold
+    algorithm; each chunk is filtered with masks and scored with one
+    (rows × roles) product.  A card not read yet that shares ``j`` of the
+    ``n`` roles is still ahead in the posting of that ``j``‑subset, so it
+    scores at most the highest frontier among ``j``‑subsets plus ``j / n``
+    of the role‑match weight; reading stops once the ``k``‑th best score
+    beats that bound for every ``j``.  Postings of larger subsets are
+    short, so the bound tightens after a chunk or two.
+    """
+
+    CHUNK = 64
+
+    def __init__(self, scorer, persona, roles, fmt, deck_mask, tiers, commander, synergy, exclude):
+        self.scorer = scorer
+        self.base = scorer.base_scores(persona, commander, synergy)
+        self.bands = scorer.bands(persona, tiers, commander, synergy)
+        self.role_weight = float(persona.weights[3])
+        unique = list(dict.fromkeys(roles))
+        self.key = (
+            persona.name, commander if synergy else None, tuple(b for _n, b in tiers),
+            tuple(sorted(unique)), fmt, deck_mask,
+        )
+        self.role_ids = [scorer.role_names[r] for r in unique if r in scorer.role_names]
+        self.share = 1.0 / len(unique) if unique else 0.0
+        self.wanted = np.zeros(scorer.roles.shape[1])
+        self.wanted[self.role_ids] = self.share
+        self.banned = scorer.banned(fmt)
+        self.outside = ~deck_mask
+        self.exclude = exclude
+        self.scores: Dict[int, float] = {}
+
+    def _bound(self, postings: List[np.ndarray], sizes: List[int], starts: List[int]) -> float:
+        bound = -np.inf
+        for posting, j, start in zip(postings, sizes, starts):
+            if start < len(posting):
+                bound = max(bound, float(self.base[posting[start]]) + self.role_weight * self.share * j)
+        return bound
+
+    def top(self, tier: int, k: int) -> List[int]:
+        """The ``k`` best matches in tier ``tier``'s band; ties keep (price, database order).
+
+        Picks depend on the original card only through its roles and
+        ``exclude``, so the best ``k + 1`` are cached per (persona,
+        commander, tiers, role set, format, colour mask) and the original
+        is dropped from them.
+        """
+        if k <= 0 or not self.role_ids:
+            return []
+        picks = self.scorer._picks
+        key = self.key + (tier, k)
+        cached = picks.get(key)
+        if cached is None:
+            if len(picks) >= self.scorer.PICK_CACHE:
+                picks.clear()
+            cached = picks[key] = self._select(tier, k + 1)
+        rows, scores = cached
+        picked = [i for i in rows if i != self.exclude][:k]
+        self.scores.update((i, score) for i, score in zip(rows, scores) if i != self.exclude)
+        return picked
+
+    def _select(self, tier: int, k: int) -> Tuple[List[int], List[float]]:
+        scorer = self.scorer
+        subsets = [c for j in range(1, len(self.role_ids) + 1) for c in combinations(sorted(self.role_ids), j)]
+        postings = [self.bands[tier][c] for c in subsets]
+        sizes = [len(c) for c in subsets]
+        starts = [0] * len(postings)
+        rows = np.zeros(0, dtype=np.int64)
+        size = self.CHUNK
+        while True:
+            chunks = [rows]
+            for p, posting in enumerate(postings):
+                chunk = posting[starts[p]:starts[p] + size]
+                starts[p] += size
+                ok = ~self.banned[chunk] & (scorer.colours[chunk] & self.outside == 0)
+                chunks.append(chunk[ok])
+            size *= 2
+            rows = np.concatenate(chunks)
+            if len(postings) > 1 and len(rows):
+                # A card with several of the roles is read from each posting.
+                rows.sort()
+                rows = rows[np.concatenate(([True], rows[1:] != rows[:-1]))]
+            bound = self._bound(postings, sizes, starts)
+            if bound == -np.inf:
+                break
+            if len(rows) >= k:
+                scores = self.base[rows] + self.role_weight * (scorer.roles[rows] @ self.wanted)
+                if -np.partition(-scores, k - 1)[k - 1] > bound:
+                    break
+        if not len(rows):
+            return [], []
+        scores = self.base[rows] + self.role_weight * (scorer.roles[rows] @ self.wanted)
+        order = np.lexsort((scorer.rank[rows], -scores))[:k]
+        return rows[order].tolist(), scores[order].tolist()
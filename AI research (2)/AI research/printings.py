@@ -0,0 +1,388 @@
+"""
+Printings Index for Scanned Cards
+=================================
+
+A card scanner reports what is printed on the card, not its name:
+``ocr_labels.csv`` rows are set code + collector number + foil +
+language.  ``PrintingStore`` resolves thousands of such rows at once to
+the printing (card name, Scryfall id, finishes) and its price for the
+scanned finish, without a name lookup per card::
+
+    python printings.py build <scryfall all_cards.json | labels.csv> printings_store/
+    python printings.py lookup printings_store/ NCC 274 ja foil
+
+Sets, collector numbers and card names are interned, and every
+printing is keyed by ``(set × numbers + number) × languages +
+language`` in one sorted ``int64`` column, so a batch of scans is a
+dict lookup per field and one ``searchsorted`` (as in
+``synergy_store``).  Columns (``n`` printings):
+
+  ``sets`` / ``numbers`` / ``cards`` – UTF‑8 blobs plus ``*_offsets``.
+  ``set`` / ``number`` / ``lang`` / ``card`` – ids per printing.
+  ``scryfall_id`` – ``S36``.
+  ``finishes``    – ``uint8`` bits: 1 nonfoil, 2 foil, 4 etched.
+  ``prices``      – ``float32`` ``n × 7`` in ``PRICE_FIELDS`` order, NaN
+                    where unknown.
+  ``key`` / ``key_row`` – sorted printing keys and the row of each.
+
+Scryfall only prices the English printing of most cards, so a scan of a
+printing missing from the store resolves to the English printing of the
+same set and number (``match: "english"``), and a printing without a
+price for the scanned finish borrows the English one.  A scan that also
+carries a ``card_name`` (OCR) is flagged when the name disagrees with
+the printing, which usually means a misread collector number.
+
+Stores build from a Scryfall ``all_cards``/``default_cards`` dump or
+from a CSV of labelled scans with ``set_code, collector_number,
+language, card_name`` (and optional price columns); the first row per
+printing wins.  Labelled scans such as ``ocr_labels.csv`` have no prices
+and are only bench data: the engine serves dumps and compiled stores.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from card_names import fold, strip_annotations
+
+STORE_VERSION = 1
+PRICE_FIELDS = ("usd", "usd_foil", "usd_etched", "eur", "eur_foil", "eur_etched", "tix")
+FINISHES = ("nonfoil", "foil", "etched")
+FINISH_BITS = {"nonfoil": 1, "foil": 2, "etched": 4}
+FINISH_INDEX = {f: i for i, f in enumerate(FINISHES)}
+# Price columns of each currency, by finish index.
+USD_COLUMNS = np.array([0, 1, 2])
+EUR_COLUMNS = np.array([3, 4, 5])
+
+# Scryfall language codes, in id order; "en" must stay first.
+LANGUAGES = ("en", "es", "fr", "de", "it", "pt", "ja", "ko", "ru", "zhs", "zht", "he", "la", "grc", "ar", "sa", "ph")
+LANGUAGE_NAMES = {
+    "english": "en", "spanish": "es", "french": "fr", "german": "de", "italian": "it", "portuguese": "pt",
+    "japanese": "ja", "korean": "ko", "russian": "ru", "chinese": "zhs", "simplified chinese": "zhs",
+    "chinese simplified": "zhs", "traditional chinese": "zht", "chinese traditional": "zht", "hebrew": "he",
+    "latin": "la", "ancient greek": "grc", "arabic": "ar", "sanskrit": "sa", "phyrexian": "ph",
+}
+LANGUAGE_IDS = {code: i for i, code in enumerate(LANGUAGES)}
+# Exact spellings seen most often, so a batch rarely needs to normalise.
+_LANGUAGE_CODES = {**{c: c for c in LANGUAGES}, **{n.title(): c for n, c in LANGUAGE_NAMES.items()}}
+TRUE_WORDS = frozenset(("yes", "y", "true", "1", "foil"))
+
+
+def _blob(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    return [raw[a:b].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def language_code(value: object) -> str:
+    """Scryfall code for a language name or code: "Japanese" -> "ja"; "" if unknown."""
+    code = _LANGUAGE_CODES.get(value) if isinstance(value, str) else None
+    if code is None:
+        text = str(value or "en").strip().lower().replace("_", " ")
+        code = text if text in LANGUAGE_IDS else LANGUAGE_NAMES.get(text, "")
+    return code
+
+
+def collector_number(value: object) -> str:
+    """Collector numbers as Scryfall writes them: "089" -> "89"."""
+    text = str(value or "").strip()
+    return text.lstrip("0") or text
+
+
+def scan_finish(scan: Mapping[str, object]) -> str:
+    """``finish`` if given (nonfoil/foil/etched), else the ``foil`` flag."""
+    finish = str(scan.get("finish") or "").strip().lower()
+    if finish in FINISH_BITS:
+        return finish
+    foil = scan.get("foil")
+    if isinstance(foil, bool):
+        return "foil" if foil else "nonfoil"
+    foil = str(foil or "").strip().lower()
+    return "etched" if foil == "etched" else ("foil" if foil in TRUE_WORDS else "nonfoil")
+
+
+@lru_cache(maxsize=1 << 14)
+def _name_key(name: str) -> str:
+    return fold(strip_annotations(name))
+
+
+class PrintingStore:
+    """Read‑only columnar (set, collector number, language) → printing."""
+
+    COLUMNS = ("set", "number", "lang", "card", "scryfall_id", "finishes", "prices", "key", "key_row")
+
+    def __init__(self, sets: Sequence[str], numbers: Sequence[str], cards: Sequence[str],
+                 columns: Mapping[str, np.ndarray], conflicts: int = 0):
+        self.sets: List[str] = list(sets)
+        self.numbers: List[str] = list(numbers)
+        self.cards: List[str] = list(cards)
+        self.conflicts = conflicts
+        for name in self.COLUMNS:
+            setattr(self, name, np.asarray(columns[name]))
+        self.set_ids: Dict[str, int] = {s: i for i, s in enumerate(self.sets)}
+        self.number_ids: Dict[str, int] = {n: i for i, n in enumerate(self.numbers)}
+        self._card_keys: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.card)
+
+    @classmethod
+    def from_printings(cls, printings: Iterable[Tuple[str, str, str, str, str, int, Sequence[float]]]) -> "PrintingStore":
+        """Build from ``(set, collector number, language code, name,
+        scryfall id, finish bits, prices)`` tuples; the first of each
+        (set, number, language) wins."""
+        set_ids: Dict[str, int] = {}
+        number_ids: Dict[str, int] = {}
+        card_ids: Dict[str, int] = {}
+        seen: Dict[Tuple[int, int, int], int] = {}
+        columns: Dict[str, list] = {c: [] for c in ("set", "number", "lang", "card", "scryfall_id", "finishes", "prices")}
+        conflicts = 0
+        for set_code, number, lang, name, scryfall_id, finishes, prices in printings:
+            set_code, number = str(set_code or "").upper(), collector_number(number)
+            if not set_code or not number or lang not in LANGUAGE_IDS or not name:
+                continue
+            ids = (set_ids.setdefault(set_code, len(set_ids)), number_ids.setdefault(number, len(number_ids)),
+                   LANGUAGE_IDS[lang])
+            card = card_ids.setdefault(name, len(card_ids))
+            first = seen.get(ids)
+            if first is not None:
+                if columns["card"][first] != card:
+                    conflicts += 1
+                else:
+                    columns["finishes"][first] |= finishes
+                continue
+            seen[ids] = len(columns["card"])
+            for column, value in zip(("set", "number", "lang", "card", "scryfall_id", "finishes", "prices"),
+                                     ids + (card, scryfall_id or "", finishes, prices)):
+                columns[column].append(value)
+
+        n = len(columns["card"])
+        set_col = np.array(columns["set"], dtype=np.uint16)
+        number_col = np.array(columns["number"], dtype=np.uint32)
+        lang_col = np.array(columns["lang"], dtype=np.uint8)
+        keys = (set_col.astype(np.int64) * max(len(number_ids), 1) + number_col) * len(LANGUAGES) + lang_col
+        order = np.argsort(keys, kind="stable")
+        return cls(list(set_ids), list(number_ids), list(card_ids), {
+            "set": set_col,
+            "number": number_col,
+            "lang": lang_col,
+            "card": np.array(columns["card"], dtype=np.uint32),
+            "scryfall_id": np.array(columns["scryfall_id"], dtype="S36"),
+            "finishes": np.array(columns["finishes"], dtype=np.uint8),
+            "prices": np.array(columns["prices"], dtype=np.float32).reshape(n, len(PRICE_FIELDS)),
+            "key": keys[order].astype(np.int64),
+            "key_row": order.astype(np.uint32),
+        }, conflicts)
+
+    @classmethod
+    def from_scryfall(cls, cards: Iterable[Mapping[str, object]]) -> "PrintingStore":
+        """Scryfall ``all_cards`` / ``default_cards`` objects (one per printing; digital‑only skipped)."""
+        def rows():
+            for card in cards:
+                if card.get("digital"):
+                    continue
+                finishes = card.get("finishes")
+                if finishes is None:
+                    finishes = [f for f, flag in (("nonfoil", card.get("nonfoil")), ("foil", card.get("foil"))) if flag]
+                yield (card.get("set"), card.get("collector_number"), str(card.get("lang") or "en"),
+                       card.get("name"), card.get("id"), sum(FINISH_BITS.get(f, 0) for f in finishes),
+                       _prices(card.get("prices") or {}))
+        return cls.from_printings(rows())
+
+    @classmethod
+    def from_labels(cls, rows: Iterable[Mapping[str, object]]) -> "PrintingStore":
+        """Labelled scan rows (``ocr_labels.csv``): ``set_code``,
+        ``collector_number``, ``language``, ``card_name``, ``foil`` and
+        any of ``PRICE_FIELDS``.  Card names are taken as labelled."""
+        return cls.from_printings(
+            (row.get("set_code") or row.get("set"), row.get("collector_number"),
+             language_code(row.get("language") or row.get("lang")), str(row.get("card_name") or "").strip(),
+             row.get("scryfall_id"), FINISH_BITS[scan_finish(row)], _prices(row))
+            for row in rows
+        )
+
+    # -- Persistence --------------------------------------------------
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        blobs = {}
+        blobs["sets"], blobs["set_offsets"] = _blob(self.sets)
+        blobs["numbers"], blobs["number_offsets"] = _blob(self.numbers)
+        blobs["cards"], blobs["card_offsets"] = _blob(self.cards)
+        for name, array in list(blobs.items()) + [(c, getattr(self, c)) for c in self.COLUMNS]:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump({
+                "version": STORE_VERSION,
+                "count": len(self),
+                "sets": len(self.sets),
+                "cards": len(self.cards),
+                "conflicts": self.conflicts,
+                "languages": list(LANGUAGES),
+            }, fh)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "PrintingStore":
+        """A store directory, a Scryfall JSON dump or a labelled-scan CSV."""
+        if not os.path.isdir(path):
+            with open(path, encoding="utf-8-sig", newline="") as fh:
+                if path.endswith(".csv"):
+                    return cls.from_labels(csv.DictReader(line for line in fh if line.strip()))
+                return cls.from_scryfall(json.load(fh))
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != STORE_VERSION or meta.get("languages") != list(LANGUAGES):
+            raise ValueError(f"Unsupported printings store version {meta.get('version')}")
+        mode = "r" if mmap else None
+
+        def column(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+        return cls(
+            _strings(column("sets"), column("set_offsets")),
+            _strings(column("numbers"), column("number_offsets")),
+            _strings(column("cards"), column("card_offsets")),
+            {name: column(name) for name in cls.COLUMNS},
+            int(meta.get("conflicts", 0)),
+        )
+
+    # -- Queries ------------------------------------------------------
+    def rows(self, set_ids, number_ids, lang_ids) -> np.ndarray:
+        """Printing row of each (set id, number id, language id), −1 where absent or an id is −1."""
+        set_ids = np.asarray(set_ids, dtype=np.int64)
+        number_ids = np.asarray(number_ids, dtype=np.int64)
+        lang_ids = np.broadcast_to(np.asarray(lang_ids, dtype=np.int64), set_ids.shape)
+        rows = np.full(len(set_ids), -1, dtype=np.int64)
+        if not len(self.key):
+            return rows
+        keys = (set_ids * max(len(self.numbers), 1) + number_ids) * len(LANGUAGES) + lang_ids
+        at = np.minimum(np.searchsorted(self.key, keys), len(self.key) - 1)
+        found = (set_ids >= 0) & (number_ids >= 0) & (lang_ids >= 0) & (self.key[at] == keys)
+        rows[found] = self.key_row[at[found]]
+        return rows
+
+    def card_keys(self) -> List[str]:
+        if self._card_keys is None:
+            self._card_keys = [_name_key(name) for name in self.cards]
+        return self._card_keys
+
+    def resolve(self, scans: Sequence[Mapping[str, object]]) -> Dict[str, object]:
+        """Resolve scanned rows (``set_code``/``set``, ``collector_number``,
+        ``language``/``lang``, ``foil`` or ``finish``, optional
+        ``card_name``) to printings with their USD and EUR price for the
+        scanned finish.  Raises ``ValueError`` for a row that is not an
+        object."""
+        heads, set_ids, number_ids, lang_ids, finish_ids, names = [], [], [], [], [], []
+        for scan in scans:
+            if not isinstance(scan, dict):
+                raise ValueError("each scanned row must be an object")
+            get = scan.get
+            set_code = str(get("set_code") or get("set") or "").strip().upper()
+            number = str(get("collector_number") or "").strip()
+            lang = language_code(get("language") or get("lang"))
+            finish = scan_finish(scan)
+            heads.append((set_code, number, lang or None, finish))
+            set_ids.append(self.set_ids.get(set_code, -1))
+            number_ids.append(self.number_ids.get(collector_number(number), -1))
+            lang_ids.append(LANGUAGE_IDS.get(lang, -1))
+            finish_ids.append(FINISH_INDEX[finish])
+            names.append(get("card_name"))
+
+        exact = self.rows(set_ids, number_ids, lang_ids)
+        english = self.rows(set_ids, number_ids, LANGUAGE_IDS["en"])
+        matched = np.where(exact >= 0, exact, english)
+        found = matched >= 0
+        if len(self):
+            safe, english_safe = np.maximum(matched, 0), np.maximum(english, 0)
+            finish_ids = np.array(finish_ids, dtype=np.int64)
+            usd = self.prices[safe, USD_COLUMNS[finish_ids]].astype(np.float64)
+            eur = self.prices[safe, EUR_COLUMNS[finish_ids]].astype(np.float64)
+            # Unpriced localised printings borrow the English printing's price.
+            borrow = (english >= 0) & (matched != english)
+            usd = np.where(np.isnan(usd) & borrow, self.prices[english_safe, USD_COLUMNS[finish_ids]], usd)
+            eur = np.where(np.isnan(eur) & borrow, self.prices[english_safe, EUR_COLUMNS[finish_ids]], eur)
+            usd[~found], eur[~found] = np.nan, np.nan
+            card = self.card[safe].tolist()
+            has_finish = ((self.finishes[safe] & (1 << finish_ids)) > 0).tolist()
+            scryfall_ids = self.scryfall_id[safe].tolist()
+        else:
+            usd = eur = np.full(len(heads), np.nan)
+        usd_list = [None if u != u else u for u in np.round(usd, 2).tolist()]
+        eur_list = [None if e != e else e for e in np.round(eur, 2).tolist()]
+
+        cards, card_keys = self.cards, self.card_keys()
+        out, mismatches = [], 0
+        for i, (row, exact_row) in enumerate(zip(matched.tolist(), exact.tolist())):
+            set_code, number, lang, finish = heads[i]
+            if row < 0:
+                out.append({"set": set_code, "collector_number": number, "lang": lang, "finish": finish,
+                            "match": None})
+                continue
+            entry = {
+                "set": set_code, "collector_number": number, "lang": lang, "finish": finish,
+                "match": "exact" if exact_row >= 0 else "english",
+                "card_name": cards[card[i]],
+                "scryfall_id": scryfall_ids[i].decode("ascii") or None,
+                "finish_known": has_finish[i],
+                "usd": usd_list[i],
+                "eur": eur_list[i],
+            }
+            if names[i]:
+                entry["name_mismatch"] = mismatch = _name_key(str(names[i])) != card_keys[card[i]]
+                mismatches += mismatch
+            out.append(entry)
+        resolved = int(found.sum())
+        return {
+            "rows": out,
+            "resolved": resolved,
+            "unresolved": len(out) - resolved,
+            "english_fallback": int((found & (exact < 0)).sum()),
+            "name_mismatches": mismatches,
+            "unpriced": int((found & np.isnan(usd) & np.isnan(eur)).sum()),
+            "total_usd": round(float(np.nansum(usd)), 2),
+            "total_eur": round(float(np.nansum(eur)), 2),
+        }
+
+
+def _prices(source: Mapping[str, object]) -> List[float]:
+    row = []
+    for field in PRICE_FIELDS:
+        raw = source.get(field)
+        try:
+            row.append(float(raw) if raw not in (None, "") else float("nan"))
+        except (TypeError, ValueError):
+            row.append(float("nan"))
+    return row
+
+
+def build(dump_path: str, out_dir: str) -> PrintingStore:
+    """Compile a Scryfall dump or labelled-scan CSV into ``out_dir``."""
+    store = PrintingStore.load(dump_path)
+    store.save(out_dir)
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "build":
+        built = build(sys.argv[2], sys.argv[3])
+        print(f"{len(built)} printings of {len(built.cards)} cards in {len(built.sets)} sets "
+              f"({built.conflicts} conflicting rows skipped) -> {sys.argv[3]}")
+    elif len(sys.argv) >= 5 and sys.argv[1] == "lookup":
+        scan = dict(zip(("set", "collector_number", "lang", "finish"), sys.argv[3:7]))
+        print(json.dumps(PrintingStore.load(sys.argv[2]).resolve([scan])["rows"][0], indent=2))
+    else:
+        print("usage: python printings.py build <all_cards.json | labels.csv> <out_dir>\n"
+              "       python printings.py lookup <store> <set> <number> [lang] [finish]")
+        sys.exit(2)
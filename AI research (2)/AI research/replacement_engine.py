@@ -26,9 +26,10 @@ Important rules implemented here:
   card's mana cost or rules text【575749619764133†L270-L299】.
 
 * **Format legality** — Some cards are banned or restricted in
-  various formats.  The built‑in database encodes a simple list of
-  banned formats; if a card is banned in the chosen format it will be
-  flagged.
+  various formats.  The built‑in database's ``banned_in`` lists, the
+  bundled banlist and (when loaded) Scryfall legalities are compiled
+  into a ``legality.LegalityMatrix``; banned cards are flagged, as are
+  restricted cards run above one copy.
 
 * **Budget constraints** — If the per‑card price of a card exceeds
   the target budget, the card is considered a violation.
@@ -44,7 +45,16 @@ Example usage is provided at the bottom of this file under the
 from __future__ import annotations
 
 import json
-from typing import Dict, List, Optional, Tuple, Iterable
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple, Iterable
+
+from card_index import CardIndex, colour_mask
+from currency import FX_TO_GBP
+from legality import LEGAL, RESTRICTED, RESTRICTED_LIMIT, LegalityMatrix, banlist_entries, database_entries, scryfall_entries
+from synergy import SynergyTable
 
 
 ############################
@@ -257,6 +267,41 @@ PRICE_TABLE: Dict[str, Dict[str, float]] = {
 }
 
 
+# Currency each market quotes in; ``currency.FX_TO_GBP`` converts them to
+# GBP to compare markets.  Replace the rates with live FX where available.
+MARKET_CURRENCIES: Dict[str, str] = {
+    "Cardmarket": "EUR",
+    "MagicMadhouse": "GBP",
+    "TCGplayer": "USD",
+}
+
+# Per‑order shipping (market currency) and the subtotal above which it is
+# waived (``None`` = never).  Illustrative single‑seller figures.
+MARKET_SHIPPING: Dict[str, Tuple[float, Optional[float]]] = {
+    "Cardmarket": (1.25, None),
+    "MagicMadhouse": (1.99, 20.0),
+    "TCGplayer": (4.99, 35.0),
+}
+
+
+# Replacement price tiers: (name, maximum price in GBP).
+DEFAULT_TIERS: Tuple[Tuple[str, float], ...] = (("Budget", 5.0), ("Mid", 15.0), ("Premium", float("inf")))
+
+# Commander synergy scores used to rank replacements when a commander is
+# given.  ``SYNERGY_WEIGHT`` is the share of the combined score taken by
+# synergy; the rest favours cheaper cards (see ``synergy.combined_score``).
+SYNERGY_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "synergy_dataset.jsonl")
+SYNERGY_WEIGHT = 0.7
+
+# Banned/restricted list compiled into the legality matrix on top of the
+# database's own ``banned_in`` lists.
+BANLIST_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mtg_banlist_dataset.csv")
+
+# Player personas, compiled into weight vectors that rank replacements
+# (see ``personas.py``).
+PERSONA_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "player_personas.json")
+
+
 ############################
 # Utility functions
 ############################
@@ -277,11 +322,10 @@ def is_legal(card_name: str, fmt: str) -> bool:
     """Return ``True`` if the given card is legal in the specified format.
 
     Formats are case sensitive; see entries in the ``banned_in`` lists.
+    Restricted cards count as legal here (see ``check_card_constraints``
+    for the copy limit); cards no legality source knows are assumed legal.
     """
-    entry = CARD_DATABASE.get(card_name)
-    if not entry:
-        return True  # Unknown cards assumed legal
-    return fmt not in entry.get("banned_in", [])
+    return get_legality().is_legal(card_name, fmt)
 
 
 def within_budget(card_name: str, budget_gbp: float) -> bool:
@@ -307,11 +351,12 @@ def color_identity_ok(card_name: str, deck_colors: Iterable[str]) -> bool:
 
 
 def check_card_constraints(
-    card_name: str, fmt: str, budget_gbp: float, deck_colors: Iterable[str]
+    card_name: str, fmt: str, budget_gbp: float, deck_colors: Iterable[str], qty: int = 1
 ) -> List[str]:
     """Return a list of constraint violations for the given card.
 
-    Possible violation strings: "Price", "Format", "Color".
+    Possible violation strings: "Price", "Format", "Color", "Restricted"
+    (a restricted card run at ``qty`` above ``RESTRICTED_LIMIT``).
     """
     violations: List[str] = []
     if not within_budget(card_name, budget_gbp):
@@ -320,16 +365,287 @@ def check_card_constraints(
         violations.append("Format")
     if not color_identity_ok(card_name, deck_colors):
         violations.append("Color")
+    if qty > RESTRICTED_LIMIT and get_legality().status(card_name, fmt) == RESTRICTED:
+        violations.append("Restricted")
     return violations
 
 
+# Violation lists for every combination of (Price, Format, Color, Restricted) bits.
+_VIOLATION_LABELS = tuple(
+    tuple(label for bit, label in enumerate(("Price", "Format", "Color", "Restricted")) if code >> bit & 1)
+    for code in range(16)
+)
+
+
+def check_deck_constraints(
+    card_names: List[str],
+    fmt: str,
+    budget_gbp: float,
+    deck_colors: Iterable[str],
+    quantities: Optional[List[int]] = None,
+) -> List[List[str]]:
+    """Vectorised ``check_card_constraints`` for a whole deck.
+
+    Names are mapped to store rows once and the rules are evaluated as
+    boolean masks over the deck; the result holds the same violation
+    lists ``check_card_constraints`` would return, in deck order.
+    ``quantities`` (default one each) feed the restricted copy limit.
+    """
+    return check_decks_constraints(
+        [card_names], fmt, budget_gbp, [deck_colors], None if quantities is None else [quantities]
+    )[0]
+
+
+def check_decks_constraints(
+    decks: List[List[str]],
+    fmt: str,
+    budget_gbp: float,
+    deck_colors: List[Iterable[str]],
+    quantities: Optional[List[List[int]]] = None,
+) -> List[List[List[str]]]:
+    """Check many decks (one colour identity each) in a single pass.
+
+    Intended for batch jobs: all decks are concatenated into one index
+    array, so the per‑deck cost is one name lookup per card plus a few
+    slices.
+    """
+    import numpy as np
+
+    store = get_store()
+    legality = get_legality()
+    lengths = [len(deck) for deck in decks]
+    names = [name for deck in decks for name in deck]
+    # Resolve names once, against the legality matrix (a superset of the
+    # store's cards), and translate those rows to store rows.
+    legal_rows = legality.rows(names)
+    rows = legality_store_rows(legality, store)[legal_rows]
+    deck_masks = np.repeat(np.array([colour_mask(c) for c in deck_colors], dtype=np.uint8), lengths)
+    price, _banned, colour = store.violation_masks(rows, fmt, budget_gbp, deck_masks)
+    status = legality.statuses(legal_rows, fmt)
+    qty = np.ones(len(names), dtype=np.int64) if quantities is None else np.fromiter(
+        (q for deck in quantities for q in deck), dtype=np.int64, count=len(names)
+    )
+    banned = (status != LEGAL) & (status != RESTRICTED)
+    over = (status == RESTRICTED) & (qty > RESTRICTED_LIMIT)
+    # Pack the four masks into one code per card; each code maps to a fixed list.
+    codes = (
+        price.view(np.uint8) | banned.view(np.uint8) << 1 | colour.view(np.uint8) << 2 | over.view(np.uint8) << 3
+    ).tolist()
+    out: List[List[List[str]]] = []
+    start = 0
+    for length in lengths:
+        out.append([list(_VIOLATION_LABELS[code]) for code in codes[start:start + length]])
+        start += length
+    return out
+
+
+def load_card_database(path: str):
+    """Point the engine at a columnar card store built by ``card_store.py``.
+
+    Replaces ``CARD_DATABASE`` and ``PRICE_TABLE`` with views over the
+    store, so every helper in this module works on the full catalogue.
+    Setting the ``CARD_STORE_PATH`` environment variable loads a store at
+    import time.
+    """
+    global CARD_DATABASE, PRICE_TABLE
+    from card_store import CardStore  # NumPy is only needed for stores
+
+    store = CardStore.load(path)
+    CARD_DATABASE = store
+    PRICE_TABLE = store.price_table()
+    rebuild_index()
+    return store
+
+
+_INDEX: Optional[CardIndex] = None
+_STORE = None
+_STORE_SOURCE: Tuple[object, int, object] = (None, -1, None)
+_LEGALITY: Optional[LegalityMatrix] = None
+_LEGALITY_SOURCE: Tuple[object, int] = (None, -1)
+_LEGALITY_STORE_ROWS: Tuple[object, object, object] = (None, None, None)
+_SCRYFALL_LEGALITIES: List[Tuple[str, str, int]] = []
+
+
+def get_legality() -> LegalityMatrix:
+    """Legality matrix for ``CARD_DATABASE``, compiled on first use.
+
+    Sources are the database's ``banned_in`` lists, the banlist at
+    ``BANLIST_DATASET_PATH`` (overridable with the environment variable
+    of the same name) and any Scryfall legalities passed to
+    ``load_legalities``, in increasing precedence.  Recompiled when the
+    database is replaced or resized, or by ``rebuild_index()``.
+    """
+    global _LEGALITY, _LEGALITY_SOURCE
+    database, size = _LEGALITY_SOURCE
+    if _LEGALITY is None or database is not CARD_DATABASE or size != len(CARD_DATABASE):
+        if hasattr(CARD_DATABASE, "legality_matrix"):
+            base = CARD_DATABASE.legality_matrix()
+        else:
+            base = LegalityMatrix.compile(database_entries(CARD_DATABASE), names=list(CARD_DATABASE))
+        entries: List[Tuple[str, str, int]] = []
+        path = os.environ.get("BANLIST_DATASET_PATH", BANLIST_DATASET_PATH)
+        if os.path.exists(path):
+            entries.extend(banlist_entries(path))
+        entries.extend(_SCRYFALL_LEGALITIES)
+        _LEGALITY = base.updated(entries)
+        _LEGALITY_SOURCE = (CARD_DATABASE, len(CARD_DATABASE))
+    return _LEGALITY
+
+
+def legality_store_rows(legality: LegalityMatrix, store):
+    """Store row (``-1`` if absent) of each legality row, including its unknown row.
+
+    Cached for the current matrix and store, so a batch check resolves
+    each name once with ``legality.rows`` and indexes this array.
+    """
+    global _LEGALITY_STORE_ROWS
+    import numpy as np
+
+    cached_legality, cached_store, table = _LEGALITY_STORE_ROWS
+    if cached_legality is not legality or cached_store is not store:
+        get = store.position.get
+        table = np.fromiter(
+            (get(name, -1) for name in legality.names), dtype=np.int64, count=legality.size
+        )
+        table = np.append(table, -1)
+        _LEGALITY_STORE_ROWS = (legality, store, table)
+    return table
+
+
+def load_legalities(cards: Iterable[Dict[str, object]]) -> LegalityMatrix:
+    """Add Scryfall card objects' ``legalities`` to the legality matrix.
+
+    They take precedence over the banlist and ``banned_in`` lists, so the
+    live banned and restricted lists win where the sources disagree.
+    """
+    global _SCRYFALL_LEGALITIES
+    _SCRYFALL_LEGALITIES = list(scryfall_entries(cards))
+    rebuild_index()
+    return get_legality()
+
+
+def get_index() -> CardIndex:
+    """Return the candidate index for ``CARD_DATABASE``, building it if needed.
+
+    The index is rebuilt automatically when cards are added or removed;
+    call ``rebuild_index()`` after editing existing entries in place.
+    Cards the legality matrix bars from a format are never candidates.
+    """
+    global _INDEX
+    if _INDEX is None or not _INDEX.matches(CARD_DATABASE):
+        _INDEX = CardIndex(CARD_DATABASE, get_legality())
+    return _INDEX
+
+
+def rebuild_index() -> CardIndex:
+    global _INDEX, _STORE, _LEGALITY
+    _INDEX = None
+    _STORE = None
+    _LEGALITY = None
+    return get_index()
+
+
+def get_store():
+    """Columnar view of ``CARD_DATABASE`` and ``PRICE_TABLE`` for vectorised checks.
+
+    A database loaded with ``load_card_database`` is used as is; the
+    built‑in dictionaries are converted once and reconverted when either
+    is replaced or resized (call ``rebuild_index()`` after in‑place edits).
+    """
+    global _STORE, _STORE_SOURCE
+    from card_store import CardStore  # NumPy is only needed for stores
+
+    database, size, prices = _STORE_SOURCE
+    if _STORE is None or database is not CARD_DATABASE or size != len(CARD_DATABASE) or prices is not PRICE_TABLE:
+        _STORE = CardStore.from_database(CARD_DATABASE, PRICE_TABLE)
+        _STORE_SOURCE = (CARD_DATABASE, len(CARD_DATABASE), PRICE_TABLE)
+    return _STORE
+
+
+_SYNERGY: Optional[SynergyTable] = None
+
+
+def load_synergy_dataset(path: str) -> SynergyTable:
+    """Load commander synergy scores from a JSON‑lines file or a directory
+    built by ``synergy_store.py``.
+
+    Setting the ``SYNERGY_DATASET_PATH`` environment variable overrides the
+    bundled ``synergy_dataset.jsonl``, which is otherwise loaded on first use.
+    """
+    global _SYNERGY
+    if os.path.isdir(path):
+        from synergy_store import SynergyStore  # NumPy is only needed for stores
+
+        _SYNERGY = SynergyTable(SynergyStore.load(path).scores())
+    else:
+        _SYNERGY = SynergyTable.load(path)
+    return _SYNERGY
+
+
+def get_synergy() -> SynergyTable:
+    if _SYNERGY is None:
+        path = os.environ.get("SYNERGY_DATASET_PATH", SYNERGY_DATASET_PATH)
+        if os.path.exists(path):
+            return load_synergy_dataset(path)
+        return SynergyTable({})
+    return _SYNERGY
+
+
+_PERSONAS = None
+_PERSONA_SCORER = None
+_PERSONA_SCORER_SOURCE: Tuple[object, object, object] = (None, None, None)
+
+
+def load_persona_dataset(path: str):
+    """Compile player personas from a ``player_personas.json``‑shaped file.
+
+    Setting the ``PERSONA_DATASET_PATH`` environment variable overrides the
+    bundled file, which is otherwise loaded on first use.
+    """
+    global _PERSONAS
+    from personas import PersonaTable  # NumPy is only needed for personas
+
+    _PERSONAS = PersonaTable.load(path)
+    return _PERSONAS
+
+
+def get_personas():
+    if _PERSONAS is None:
+        from personas import PersonaTable
+
+        path = os.environ.get("PERSONA_DATASET_PATH", PERSONA_DATASET_PATH)
+        if os.path.exists(path):
+            return load_persona_dataset(path)
+        return PersonaTable([])
+    return _PERSONAS
+
+
+def get_persona_scorer():
+    """Feature columns of the current index for persona ranking.
+
+    Rebuilt with the index, and when the synergy or persona dataset is
+    reloaded, since its cached rankings are keyed by name.
+    """
+    global _PERSONA_SCORER, _PERSONA_SCORER_SOURCE
+    from personas import PersonaScorer
+
+    index = get_index()
+    source = (index, _SYNERGY, _PERSONAS)
+    if _PERSONA_SCORER is None or any(a is not b for a, b in zip(source, _PERSONA_SCORER_SOURCE)):
+        _PERSONA_SCORER = PersonaScorer(index)
+        _PERSONA_SCORER_SOURCE = source
+    return _PERSONA_SCORER
+
+
 def propose_replacements(
     card_name: str,
     fmt: str,
     budget_gbp: float,
     deck_colors: Iterable[str],
-    tiers: Tuple[Tuple[str, float], ...] = (("Budget", 5.0), ("Mid", 15.0), ("Premium", float("inf"))),
+    tiers: Tuple[Tuple[str, float], ...] = DEFAULT_TIERS,
     max_suggestions: int = 5,
+    commander: Optional[str] = None,
+    persona: Optional[str] = None,
 ) -> List[Dict[str, object]]:
     """Suggest replacement cards for the specified card.
 
@@ -339,6 +655,15 @@ def propose_replacements(
     suggestions returned is limited by ``max_suggestions``; if fewer
     suitable candidates exist then fewer results are returned.
 
+    Candidates come from the precomputed ``CardIndex``, cheapest first,
+    so each tier only visits cards under its price bound.  When a
+    ``commander`` with synergy data is given, each tier instead takes the
+    top candidates by ``synergy.combined_score`` (``SYNERGY_WEIGHT``) and
+    every suggestion carries its ``synergy`` score.  A known ``persona``
+    ranks each tier by the persona's weighted features instead (see
+    ``personas.py``), using the commander's synergy if given, and every
+    suggestion carries its persona ``score``.
+
     Each suggestion dictionary contains:
       card_name: Name of the replacement card.
       oracle_id: Oracle identifier.
@@ -347,62 +672,95 @@ def propose_replacements(
       price: Dict with currency codes and numeric values.
       roles: List of roles preserved.
     """
-    original_roles = set(assign_role(card_name))
-    # Build candidate list excluding the original card
-    candidates = []
-    for name, data in CARD_DATABASE.items():
-        if name == card_name:
-            continue
-        # Skip if card is not legal in the format or colour identity
-        if not is_legal(name, fmt):
-            continue
-        if not color_identity_ok(name, deck_colors):
-            continue
-        # Share at least one role
-        cand_roles = set(data.get("roles", []))
-        if not cand_roles & original_roles:
-            continue
-        candidates.append((name, data))
+    index = get_index()
+    return _suggest(
+        assign_role(card_name),
+        is_legal(card_name, "Commander"),  # Use Commander as common baseline
+        fmt, colour_mask(deck_colors), index.position.get(card_name),
+        tiers, max_suggestions, commander, persona,
+    )
+
+
+def _suggest(
+    original_roles: List[str],
+    original_legal: bool,
+    fmt: str,
+    deck_mask: int,
+    exclude: Optional[int],
+    tiers: Tuple[Tuple[str, float], ...],
+    max_suggestions: int,
+    commander: Optional[str],
+    persona: Optional[str],
+) -> List[Dict[str, object]]:
+    """``propose_replacements`` for a card known by its roles, Commander
+    legality and index position (``exclude``, None to exclude nothing)."""
+    index = get_index()
+    synergy: Dict[int, float] = {}
+    if commander:
+        table = get_synergy()
+        synergy = table.positions(commander, index)
+        ranked = table.ranked(commander, index, SYNERGY_WEIGHT)
+    profile = get_personas().resolve(persona) if persona else None
+    if profile is not None:
+        query = get_persona_scorer().query(
+            profile, original_roles, fmt, deck_mask, tiers, commander, synergy, exclude
+        )
 
-    # Sort candidates by price ascending so that cheaper cards appear first
-    candidates.sort(key=lambda item: item[1].get("price_gbp", 0.0))
     suggestions: List[Dict[str, object]] = []
-    for tier_name, tier_max in tiers:
-        for name, data in candidates:
+    chosen = set()
+    for tier, (tier_name, tier_max) in enumerate(tiers):
+        if profile is not None:
+            picked = query.top(tier, max_suggestions - len(suggestions))
+        elif synergy:
+            picked = index.ranked_candidates(
+                original_roles, fmt, deck_mask, max_suggestions - len(suggestions),
+                synergy, ranked, SYNERGY_WEIGHT, tier_max, exclude, chosen,
+            )
+        else:
+            picked = index.candidates(original_roles, fmt, deck_mask, tier_max, exclude)
+        for i in picked:
             if len(suggestions) >= max_suggestions:
                 break
-            price = data.get("price_gbp", 0.0)
-            if price > tier_max:
-                continue
             # Avoid duplicate suggestions for the same card in multiple tiers
-            if any(sug["card_name"] == name for sug in suggestions):
+            if i in chosen:
                 continue
-            reason = _build_reason(card_name, name, data)
-            suggestions.append({
+            chosen.add(i)
+            name = index.names[i]
+            data = CARD_DATABASE[name]
+            price = index.prices[i]
+            suggestion = {
                 "card_name": name,
                 "oracle_id": data.get("oracle_id"),
                 "tier": tier_name,
-                "reason": reason,
+                "reason": _build_reason(original_roles, original_legal, data),
                 "price": {
                     "GBP": round(price, 2),
                 },
                 "roles": data.get("roles", []),
-            })
+            }
+            if synergy:
+                suggestion["synergy"] = synergy.get(i, 0.0)
+            if profile is not None:
+                suggestion["score"] = round(query.scores[i], 4)
+            suggestions.append(suggestion)
         if len(suggestions) >= max_suggestions:
             break
     return suggestions
 
 
-def _build_reason(original_card: str, replacement_card: str, data: Dict[str, object]) -> str:
+def _build_reason(original_roles: Iterable[str], original_legal: bool, data: Dict[str, object]) -> str:
     """Generate a concise (<25 words) rationale for a replacement.
 
     The reason notes the shared roles and emphasises legality or cost
-    advantages.  It does not exceed 25 words.
+    advantages.  It does not exceed 25 words.  The original card's roles
+    and Commander legality are passed in so they are computed once per
+    violation rather than once per suggestion.
     """
     replacement_roles = data.get("roles", [])
-    # Compose a simple message focusing on the first role
-    shared_roles = set(assign_role(original_card)) & set(replacement_roles)
-    primary_role = next(iter(shared_roles)) if shared_roles else next(iter(replacement_roles), "Utility")
+    # Compose a simple message focusing on the first shared role
+    original = set(original_roles)
+    shared_roles = [role for role in replacement_roles if role in original]
+    primary_role = shared_roles[0] if shared_roles else next(iter(replacement_roles), "Utility")
     price = data.get("price_gbp", 0.0)
     reason_parts = []
     reason_parts.append(f"Shares the {primary_role.lower()} role")
@@ -413,7 +771,7 @@ def _build_reason(original_card: str, replacement_card: str, data: Dict[str, obj
     else:
         reason_parts.append("as a high‑end upgrade")
     # Mention legality if the original card was banned in the format
-    if not is_legal(original_card, 'Commander'):  # Use Commander as common baseline
+    if not original_legal:
         reason_parts.append("and is legal where the original is not")
     # Join parts and trim to 25 words
     reason = ", ".join(reason_parts)
@@ -437,43 +795,161 @@ def compute_cost_to_finish(
     The ``decklist`` is a list of dicts with at least ``card_name`` and
     ``qty``.  The ``owned_cards`` list names cards already in the
     player's collection; these are excluded from the cost calculation.
+
+    Totals are in each market's own currency, with ``total_gbp`` for
+    comparison.  Cards a market has no price for are listed under
+    ``missing_cards`` rather than counted as free, and the best basket is
+    the cheapest market among those missing the fewest cards.  See
+    ``compute_split_basket`` for buying from several markets at once.
     """
-    owned_set = set(owned_cards or [])
-    # Determine required quantities of each card not owned
-    missing: Dict[str, int] = {}
-    for entry in decklist:
-        name = entry["card_name"]
-        qty = entry.get("qty", 1)
-        if name in owned_set:
-            continue
-        missing[name] = missing.get(name, 0) + qty
+    from basket import missing_cards
+
+    missing = missing_cards(decklist, owned_cards or [])
     market_totals: List[Dict[str, object]] = []
-    best_market: Optional[str] = None
-    best_total: float = float("inf")
+    best_entry: Optional[Dict[str, object]] = None
+    best_key: Tuple[int, float] = (len(missing) + 1, float("inf"))
     for market, prices in price_table.items():
         total = 0.0
-        for name, qty in missing.items():
+        unpriced: List[str] = []
+        for name, qty in missing:
             price = prices.get(name)
             if price is None:
-                continue  # Unknown price; assume zero
+                unpriced.append(name)
+                continue
             total += price * qty
+        currency = MARKET_CURRENCIES.get(market, "GBP")
+        rate = FX_TO_GBP.get(currency)
         market_entry = {
             "market": market,
-            "currency": "EUR" if market == "Cardmarket" else ("GBP" if market == "MagicMadhouse" else "USD"),
+            "currency": currency,
             "total": round(total, 2),
+            "total_gbp": round(total * rate, 2) if rate is not None else None,
+            "missing_cards": unpriced,
         }
         market_totals.append(market_entry)
-        if total < best_total:
-            best_total = total
-            best_market = market
+        key = (len(unpriced), total * rate if rate is not None else float("inf"))
+        if key < best_key:
+            best_key = key
+            best_entry = market_entry
     best_basket = {
-        "market": best_market,
-        "currency": next((entry["currency"] for entry in market_totals if entry["market"] == best_market), "GBP"),
-        "total": round(best_total, 2),
+        "market": best_entry["market"] if best_entry else None,
+        "currency": best_entry["currency"] if best_entry else "GBP",
+        "total": best_entry["total"] if best_entry else 0.0,
+        "total_gbp": best_entry["total_gbp"] if best_entry else 0.0,
+        "missing_cards": best_entry["missing_cards"] if best_entry else [],
     }
     return market_totals, best_basket
 
 
+def compute_split_basket(
+    decklist: List[Dict[str, object]],
+    owned_cards: Optional[List[str]],
+    price_table: Dict[str, Dict[str, float]],
+    shipping: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+) -> Dict[str, object]:
+    """Cheapest way to buy the missing cards when each may come from any market.
+
+    Prices and shipping are converted to GBP with ``FX_TO_GBP`` and the
+    basket is solved by ``basket.solve_basket``, which accounts for
+    per‑market shipping and free‑shipping thresholds.  The result lists
+    one line per card with its market, per‑market subtotals and
+    shipping, the total, and a lower bound with the remaining ``gap``
+    (zero when the basket is provably optimal).  All amounts are GBP.
+    """
+    from basket import Shipping, missing_cards, normalise_prices, solve_basket
+
+    terms = {m: Shipping(*t) for m, t in (MARKET_SHIPPING if shipping is None else shipping).items()}
+    prices, terms = normalise_prices(price_table, MARKET_CURRENCIES, FX_TO_GBP, terms)
+    basket = solve_basket(missing_cards(decklist, owned_cards or []), prices, terms)
+    basket["currency"] = "GBP"
+    return basket
+
+
+_UPGRADE_COLUMNS: Tuple[object, object] = (None, None)
+
+
+def upgrade_columns(index: CardIndex):
+    """Names, primary roles (``""`` if none), colour masks and prices of ``index`` as arrays.
+
+    Cached for the current index, so ``plan_upgrades`` filters its
+    candidates with a few array operations.
+    """
+    global _UPGRADE_COLUMNS
+    import numpy as np
+
+    cached, columns = _UPGRADE_COLUMNS
+    if cached is not index:
+        columns = (
+            np.array(index.names, dtype=object),
+            np.array([roles[0] if roles else "" for roles in index.roles], dtype=str),
+            np.array(index.masks, dtype=np.int64),
+            np.array(index.prices, dtype=np.float64),
+        )
+        _UPGRADE_COLUMNS = (index, columns)
+    return columns
+
+
+def plan_upgrades(
+    decklist: List[Dict[str, object]],
+    total_budget_gbp: float,
+    fmt: str,
+    color_identity: Iterable[str],
+    commander: Optional[str] = None,
+    values: Optional[Dict[str, float]] = None,
+    owned_cards: Optional[Iterable[str]] = None,
+) -> Dict[str, object]:
+    """Best set of upgrades for the deck within a total budget.
+
+    Cards are valued by ``values`` (card name → value) or, by default, by
+    their synergy with ``commander``; one of the two is required.
+    Candidates are the valued cards not already in the deck that are
+    legal in ``fmt`` and fit ``color_identity``; owned cards cost nothing.
+    Each swap keeps the outgoing card's primary role and only singleton
+    deck entries (not the commander) are swapped out.  See
+    ``upgrades.solve_upgrades`` for the method and the result shape.
+    """
+    import numpy as np
+    from upgrades import Slot, solve_upgrade_columns
+
+    index = get_index()
+    position = index.position
+    if values is not None:
+        valued = {position[name]: value for name, value in values.items() if name in position}
+        value_of = lambda name: values.get(name, 0.0)  # noqa: E731
+    elif commander:
+        table = get_synergy()
+        valued = table.positions(commander, index)
+        value_of = lambda name: table.score(commander, name) or 0.0  # noqa: E731
+    else:
+        raise ValueError("plan_upgrades needs a commander or card values")
+
+    in_deck = {item["card_name"] for item in decklist}
+    slots = [
+        Slot(item["card_name"], assign_role(item["card_name"])[0], value_of(item["card_name"]))
+        for item in decklist
+        if int(item.get("qty", 1)) == 1 and item["card_name"] != commander
+    ]
+    # Thousands of valued cards are filtered as arrays; no per-card objects.
+    names, roles, masks, prices = upgrade_columns(index)
+    positions = np.fromiter(valued, dtype=np.int64, count=len(valued))
+    scores = np.fromiter(valued.values(), dtype=np.float64, count=len(valued))
+    skip = [position[name] for name in in_deck | {commander} if name in position]
+    owned = [position[name] for name in set(owned_cards or ()) if name in position]
+    banned = index.banned_bitset(fmt)
+    keep = (roles[positions] != "") & ((masks[positions] & ~colour_mask(color_identity)) == 0)
+    keep &= ~np.isin(positions, skip)
+    if banned:
+        bits = np.unpackbits(np.frombuffer(banned, dtype=np.uint8), count=index.size, bitorder="little")
+        keep &= bits[positions] == 0
+    positions, scores = positions[keep], scores[keep]
+    costs = np.where(np.isin(positions, owned), 0.0, prices[positions])
+    plan = solve_upgrade_columns(
+        slots, names[positions], roles[positions], scores, costs, total_budget_gbp
+    )
+    plan["currency"] = "GBP"
+    return plan
+
+
 def analyse_deck(
     fmt: str,
     budget_gbp: float,
@@ -481,6 +957,10 @@ def analyse_deck(
     color_identity: Iterable[str],
     decklist: List[Dict[str, object]],
     owned_cards: Optional[List[str]] = None,
+    vectorized: bool = False,
+    memo: Optional["ReplacementMemo"] = None,
+    commander: Optional[str] = None,
+    split_basket: bool = False,
 ) -> Dict[str, object]:
     """Analyse a deck and produce replacement suggestions and cost summary.
 
@@ -490,26 +970,55 @@ def analyse_deck(
     replacements.  It also assigns roles to each card and computes the
     cost to complete the deck.
 
+    With ``vectorized=True`` the constraints for the whole deck are
+    evaluated at once by ``check_deck_constraints`` (requires NumPy);
+    the output is identical.  Passing a ``ReplacementMemo`` reuses
+    replacement suggestions across calls (see ``analyse_decks``).  A
+    ``commander`` ranks replacements by synergy and a persona from
+    ``player_personas.json`` by that persona's priorities (see
+    ``propose_replacements``).  ``split_basket=True`` also solves the
+    multi‑market basket, which costs more than the rest of the analysis
+    for a typical deck, so batch callers only ask for it where needed.
+
     Returns a JSON‑serialisable dictionary with keys:
       "violations" – a list of violation entries.
       "cost_to_finish_by_market" – list of per‑market cost totals.
-      "best_basket" – the cheapest overall purchase option.
+      "best_basket" – the cheapest single‑market purchase option.
+      "split_basket" – the cheapest purchase split across markets (only
+      with ``split_basket=True``).
     """
     violations_output: List[Dict[str, object]] = []
+    profile = get_personas().resolve(persona)
+    persona_name = profile.name if profile is not None else None
+    if vectorized:
+        deck_issues = check_deck_constraints(
+            [item["card_name"] for item in decklist], fmt, budget_gbp, color_identity,
+            [int(item.get("qty", 1)) for item in decklist],
+        )
     # Determine role assignments for all cards (useful for synergy notes)
-    for item in decklist:
+    for position, item in enumerate(decklist):
         card = item["card_name"]
-        issues = check_card_constraints(card, fmt, budget_gbp, color_identity)
+        if vectorized:
+            issues = deck_issues[position]
+        else:
+            issues = check_card_constraints(card, fmt, budget_gbp, color_identity, int(item.get("qty", 1)))
         if not issues:
             continue
         # Provide 3–5 replacement suggestions
-        replacements = propose_replacements(
-            card_name=card,
-            fmt=fmt,
-            budget_gbp=budget_gbp,
-            deck_colors=color_identity,
-            max_suggestions=5,
-        )
+        if memo is not None:
+            replacements = memo.replacements(
+                card, fmt, budget_gbp, color_identity, commander=commander, persona=persona_name
+            )
+        else:
+            replacements = propose_replacements(
+                card_name=card,
+                fmt=fmt,
+                budget_gbp=budget_gbp,
+                deck_colors=color_identity,
+                max_suggestions=5,
+                commander=commander,
+                persona=persona_name,
+            )
         violation_entry = {
             "original_card": card,
             "issue": ", ".join(issues),
@@ -520,21 +1029,161 @@ def analyse_deck(
     # Compute cost to finish
     market_totals, best_basket = compute_cost_to_finish(decklist, owned_cards, PRICE_TABLE)
 
-    # Build overall notes based on persona (simple example)
+    # Build overall notes based on persona
     notes = []
-    if persona.lower() == "budget brewer":
-        notes.append("Budget persona: prioritise low‑cost synergy pieces over flashy staples.")
-    elif persona.lower() == "spike":
-        notes.append("Spike persona: emphasise efficiency and high‑impact staples.")
-    else:
+    if profile is None:
         notes.append("Persona not recognised; using default recommendation mix.")
+    elif profile.rules:
+        notes.append(f"{profile.name} persona: {profile.rules[0]}")
+    else:
+        notes.append(f"{profile.name} persona: replacements ranked by its priorities.")
 
-    return {
+    result = {
         "violations": violations_output,
         "cost_to_finish_by_market": market_totals,
         "best_basket": best_basket,
         "notes": " ".join(notes),
     }
+    if split_basket:
+        result["split_basket"] = compute_split_basket(decklist, owned_cards, PRICE_TABLE)
+    return result
+
+
+# Results a ReplacementMemo keeps by default: roughly 100 MB of suggestions.
+MEMO_SIZE = 20_000
+
+
+class ReplacementMemo:
+    """Cache of ``propose_replacements`` results shared across decks.
+
+    Suggestions depend on the original card only through its roles, its
+    Commander legality (the reason text) and its own exclusion, and not
+    on the per‑card budget at all.  So results are keyed by (roles,
+    legality, format, colour identity mask, tiers, limit, commander,
+    persona), computed for ``limit + 1`` without excluding anything, and
+    the original is dropped from them, as ``personas.PersonaQuery.top``
+    does: a staple shares entries with every card of the same roles,
+    whatever deck or budget it comes from.  Tiers fill in a fixed order
+    and each takes the next best matches, so this equals a direct call.
+    It keeps the ``maxsize`` most recently used results (all of them when
+    ``maxsize`` is None) and empties itself when the candidate index is
+    rebuilt.  Callers get fresh copies of the cached suggestion
+    dictionaries.  ``hits`` and ``misses`` count lookups.
+    """
+
+    def __init__(self, maxsize: Optional[int] = MEMO_SIZE):
+        self.maxsize = maxsize
+        self._index: Optional[CardIndex] = None
+        self._results: "OrderedDict[Tuple[object, ...], List[Dict[str, object]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def replacements(
+        self,
+        card_name: str,
+        fmt: str,
+        budget_gbp: float,
+        deck_colors: Iterable[str],
+        tiers: Tuple[Tuple[str, float], ...] = DEFAULT_TIERS,
+        max_suggestions: int = 5,
+        commander: Optional[str] = None,
+        persona: Optional[str] = None,
+    ) -> List[Dict[str, object]]:
+        index = get_index()
+        roles = assign_role(card_name)
+        legal = is_legal(card_name, "Commander")
+        mask = colour_mask(deck_colors)
+        key = (tuple(roles), legal, fmt, mask, tiers, max_suggestions, commander, persona)
+        with self._lock:
+            if index is not self._index:
+                self._results.clear()
+                self._index = index
+            cached = self._results.get(key)
+            if cached is not None:
+                self.hits += 1
+                self._results.move_to_end(key)
+        if cached is None:
+            cached = _suggest(roles, legal, fmt, mask, None, tiers, max_suggestions + 1, commander, persona)
+            with self._lock:
+                self.misses += 1
+                self._results[key] = cached
+                if self.maxsize is not None and len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+        kept = [suggestion for suggestion in cached if suggestion["card_name"] != card_name][:max_suggestions]
+        return [dict(suggestion, price=dict(suggestion["price"])) for suggestion in kept]
+
+
+# Pool workers exit with their pool, so their memo is unbounded.
+_WORKER_MEMO = ReplacementMemo(maxsize=None)
+
+
+def _init_worker(card_store_path: Optional[str]):
+    if card_store_path:
+        load_card_database(card_store_path)
+    get_index()
+
+
+def _analyse_chunk(chunk: List[Dict[str, object]]) -> List[Dict[str, object]]:
+    return [analyse_deck(vectorized=True, memo=_WORKER_MEMO, **deck) for deck in chunk]
+
+
+def iter_analyse_decks(
+    decks: Iterable[Dict[str, object]],
+    processes: int = 0,
+    chunk_size: int = 200,
+    card_store_path: Optional[str] = None,
+    memo: Optional[ReplacementMemo] = None,
+) -> Iterator[Dict[str, object]]:
+    """Analyse many decks, sharing one index and one replacement memo.
+
+    Each deck is a dictionary of ``analyse_deck`` keyword arguments
+    (``fmt``, ``budget_gbp``, ``persona``, ``color_identity``,
+    ``decklist`` and optionally ``owned_cards``, ``commander`` and
+    ``split_basket``).  Results are yielded
+    in input order and match ``analyse_deck`` output exactly, so a
+    nightly job can write each report out instead of holding them all.
+    A ``memo`` may be passed to reuse suggestions across batches;
+    otherwise the call gets its own unbounded one.
+
+    With ``processes > 0`` decks are analysed in chunks by a process
+    pool.  It only pays on several cores: on one core the pool is about
+    half the in‑process rate, so the default stays in process.  Each
+    worker loads ``card_store_path`` (or inherits the parent's database
+    when processes are forked), builds the index once and keeps its own
+    memo for the life of the pool.
+    """
+    if processes <= 0:
+        memo = memo if memo is not None else ReplacementMemo(maxsize=None)
+        for deck in decks:
+            yield analyse_deck(vectorized=True, memo=memo, **deck)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    decks = iter(decks)
+    chunks = iter(lambda: list(islice(decks, chunk_size)), [])
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(card_store_path,)) as pool:
+        for chunk in pool.map(_analyse_chunk, chunks):
+            yield from chunk
+
+
+def analyse_decks(
+    decks: Iterable[Dict[str, object]],
+    processes: int = 0,
+    chunk_size: int = 200,
+    card_store_path: Optional[str] = None,
+    memo: Optional[ReplacementMemo] = None,
+) -> List[Dict[str, object]]:
+    """List form of ``iter_analyse_decks``."""
+    return list(iter_analyse_decks(decks, processes, chunk_size, card_store_path, memo))
+
+
+if os.environ.get("CARD_STORE_PATH"):
+    load_card_database(os.environ["CARD_STORE_PATH"])
 
 
 if __name__ == "__main__":
@@ -556,6 +1205,7 @@ if __name__ == "__main__":
         color_identity=["U", "R"],
         decklist=sample_deck,
         owned_cards=["Arcane Signet", "Sol Ring"],
+        split_basket=True,
     )
     # Print the resulting JSON to stdout
     print(json.dumps(result, indent=2))
\ No newline at end of file
@@ -0,0 +1,315 @@
+"""
+Reprint Risk Scoring
+====================
+
+How likely a card is to be reprinted (and its price to fall) is scored
+0–100 from its printing history:
+
+* ``reprints``      – distinct printings after the first (printings on
+                      the same release date count once).
+* ``avg_interval``  – mean days between printings.
+* ``since_last``    – days from the latest printing to ``today``.
+
+``risk = 100 × (0.45·count + 0.35·interval + 0.20·due)`` where ``count``
+is ``min(reprints, 6) / 6``, ``interval`` falls from 1 at a yearly
+reprint to 0 at one every six years, and ``due`` is how much of the
+usual interval has passed since the last printing (capped at 1; cards
+printed once use five years).  Reserved List cards cannot be reprinted
+and score 0.  Bands follow ``reprint_risk_dataset.jsonl``: High above
+60, Medium above 28, else Low.
+
+``ReprintRisk.from_printings`` computes every column at once from a
+printings table (one row per printing: name, release date, reserved),
+e.g. Scryfall ``default_cards`` via ``from_scryfall``.  Without a
+printings dump the precomputed scores in ``reprint_risk_dataset.jsonl``
+are used as they are (``from_dataset``; the latest row per card wins).
+
+``exposure`` scores a whole deck or collection in one call: names are
+resolved to ids once, then quantities, prices and risks are combined as
+arrays.  ``value_at_risk_gbp`` is ``Σ qty × price × risk / 100``.
+
+    python reprint_risk.py default-cards.json "Cyclonic Rift" "Sol Ring"
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import re
+import sys
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+REPRINT_RISK_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reprint_risk_dataset.jsonl")
+
+BANDS: Tuple[Tuple[str, int], ...] = (("Low", 0), ("Medium", 29), ("High", 61))
+MAX_COUNTED_REPRINTS = 6
+FAST_INTERVAL_DAYS = 365.0
+SLOW_INTERVAL_DAYS = 6 * 365.0
+SINGLE_PRINTING_DUE_DAYS = 5 * 365.0
+MULTIPLE_REPRINTS = 3
+SHORT_INTERVAL_DAYS = 2 * 365.0
+WEIGHTS = (0.45, 0.35, 0.20)
+
+_RESERVED, _MULTIPLE, _SHORT, _SINGLE = 1, 2, 4, 8
+_SKIP_LAYOUTS = {"token", "double_faced_token", "art_series", "emblem", "scheme", "planar", "vanguard"}
+
+
+def _rationale(code: int) -> str:
+    parts = []
+    if code & _RESERVED:
+        parts.append("Reserved list card; never reprinted")
+    elif code & _SINGLE:
+        parts.append("Never reprinted")
+    if code & _MULTIPLE:
+        parts.append("Multiple past reprints")
+    if code & _SHORT:
+        parts.append("Short average interval")
+    return "; ".join(parts) or "Staple with moderate reprint history"
+
+
+# Rationale text for every combination of (reserved, multiple, short, single) bits.
+RATIONALES: Tuple[str, ...] = tuple(_rationale(code) for code in range(16))
+
+_PUNCT = str.maketrans({"‘": "'", "’": "'", "‐": "-", "‑": "-", "–": "-", "—": "-"})
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fold(name: str) -> str:
+    """Case, accent and punctuation‑insensitive key (as the backend's collection keys)."""
+    name = unicodedata.normalize("NFKD", str(name).translate(_PUNCT))
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    return _SPACE_RE.sub(" ", name).strip().casefold()
+
+
+def _days(dates: Sequence[str]) -> np.ndarray:
+    return np.array(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def band_codes(risk: np.ndarray) -> np.ndarray:
+    return (np.searchsorted([lo for _name, lo in BANDS], risk, side="right") - 1).astype(np.uint8)
+
+
+class ReprintRisk:
+    """Per‑card reprint risk columns with batch lookups."""
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        risk: np.ndarray,
+        rationales: Sequence[str],
+        rationale: np.ndarray,
+        reprints: Optional[np.ndarray] = None,
+        avg_interval: Optional[np.ndarray] = None,
+        last_printed: Optional[np.ndarray] = None,
+    ):
+        n = len(names)
+        self.names: List[str] = list(names)
+        self.risk = np.asarray(risk, dtype=np.float32)
+        self.band = band_codes(self.risk)
+        self.rationales: List[str] = list(rationales)
+        self.rationale = np.asarray(rationale, dtype=np.uint8)
+        # Unknown features (precomputed scores) are -1 / NaN.
+        self.reprints = np.full(n, -1, dtype=np.int16) if reprints is None else np.asarray(reprints, dtype=np.int16)
+        self.avg_interval = (np.full(n, np.nan, dtype=np.float32) if avg_interval is None
+                             else np.asarray(avg_interval, dtype=np.float32))
+        self.last_printed = (np.full(n, -1, dtype=np.int64) if last_printed is None
+                             else np.asarray(last_printed, dtype=np.int64))
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.folded: Dict[str, int] = {}
+        for i, name in enumerate(self.names):
+            self.folded.setdefault(fold(name), i)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # -- Builders -----------------------------------------------------
+    @classmethod
+    def from_printings(
+        cls, printings: Iterable[Tuple[str, str, bool]], today: Optional[datetime.date] = None
+    ) -> "ReprintRisk":
+        """Score cards from ``(name, released_at "YYYY-MM-DD", reserved)`` printing rows."""
+        ids: Dict[str, int] = {}
+        card_col: List[int] = []
+        dates: List[str] = []
+        reserved_ids = set()
+        for name, released, reserved in printings:
+            if not name or not released:
+                continue
+            i = ids.setdefault(name, len(ids))
+            card_col.append(i)
+            dates.append(released)
+            if reserved:
+                reserved_ids.add(i)
+        n = len(ids)
+        today_day = int(_days([str(today or datetime.date.today())])[0])
+        days = _days(dates)
+        card = np.array(card_col, dtype=np.int64)
+
+        # One row per distinct (card, release date), sorted by card then date.
+        keys = np.unique(card << 32 | (days - days.min() if len(days) else days))
+        card = keys >> 32
+        day = (keys & 0xFFFFFFFF) + (days.min() if len(days) else 0)
+        printed = np.bincount(card, minlength=n)
+        start = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(printed, out=start[1:])
+        first, last = day[start[:-1]], day[start[1:] - 1]
+        reprints = printed - 1
+        avg_interval = np.where(reprints > 0, (last - first) / np.maximum(reprints, 1), np.nan)
+        since_last = np.maximum(today_day - last, 0)
+        reserved = np.zeros(n, dtype=bool)
+        reserved[list(reserved_ids)] = True
+
+        count = np.minimum(reprints, MAX_COUNTED_REPRINTS) / MAX_COUNTED_REPRINTS
+        interval = np.where(
+            reprints > 0,
+            np.clip((SLOW_INTERVAL_DAYS - np.nan_to_num(avg_interval)) / (SLOW_INTERVAL_DAYS - FAST_INTERVAL_DAYS), 0, 1),
+            0.0,
+        )
+        due = np.clip(since_last / np.where(reprints > 0, np.maximum(np.nan_to_num(avg_interval), 1.0),
+                                             SINGLE_PRINTING_DUE_DAYS), 0, 1)
+        risk = np.round(100 * (WEIGHTS[0] * count + WEIGHTS[1] * interval + WEIGHTS[2] * due))
+        risk[reserved] = 0
+        code = (reserved * _RESERVED | (reprints >= MULTIPLE_REPRINTS) * _MULTIPLE
+                | ((reprints > 0) & (np.nan_to_num(avg_interval, nan=np.inf) <= SHORT_INTERVAL_DAYS)) * _SHORT
+                | (reprints == 0) * _SINGLE)
+        return cls(sorted(ids, key=ids.get), risk, RATIONALES, code, reprints, avg_interval, last)
+
+    @classmethod
+    def from_scryfall(cls, cards: Iterable[Mapping[str, object]], today: Optional[datetime.date] = None) -> "ReprintRisk":
+        """Score from Scryfall ``default_cards`` (one object per printing; digital‑only skipped)."""
+        return cls.from_printings(
+            ((card.get("name"), card.get("released_at"), bool(card.get("reserved")))
+             for card in cards if not card.get("digital") and card.get("layout") not in _SKIP_LAYOUTS),
+            today,
+        )
+
+    @classmethod
+    def from_dataset(cls, rows: Iterable[Mapping[str, object]]) -> "ReprintRisk":
+        """Precomputed ``reprint_risk_dataset.jsonl`` rows; the latest ``last_reprint_date`` per card wins."""
+        latest: Dict[str, Mapping[str, object]] = {}
+        for row in rows:
+            name = row.get("card_name")
+            if not name or row.get("risk") is None:
+                continue
+            seen = latest.get(name)
+            if seen is None or str(row.get("last_reprint_date") or "") >= str(seen.get("last_reprint_date") or ""):
+                latest[name] = row
+        names = list(latest)
+        rationales = list(dict.fromkeys(str(latest[n].get("rationale") or "") for n in names))
+        position = {text: i for i, text in enumerate(rationales)}
+        dates = [latest[n].get("last_reprint_date") or "NaT" for n in names]
+        last = _days(dates) if names else np.zeros(0, dtype=np.int64)
+        last = np.where(last == np.iinfo(np.int64).min, -1, last)
+        return cls(
+            names,
+            np.array([float(latest[n]["risk"]) for n in names], dtype=np.float32),
+            rationales,
+            np.array([position[str(latest[n].get("rationale") or "")] for n in names], dtype=np.uint8),
+            last_printed=last,
+        )
+
+    @classmethod
+    def load(cls, path: str = REPRINT_RISK_DATASET, today: Optional[datetime.date] = None) -> "ReprintRisk":
+        """A ``.jsonl`` of precomputed scores or a Scryfall printings dump (JSON list)."""
+        with open(path, encoding="utf-8") as fh:
+            if path.endswith(".jsonl"):
+                return cls.from_dataset(json.loads(line) for line in fh if line.strip())
+            return cls.from_scryfall(json.load(fh), today)
+
+    # -- Queries ------------------------------------------------------
+    def resolve(self, names: Sequence[str]) -> np.ndarray:
+        """Id of each name (exact, then folded), −1 where unknown."""
+        get = self.ids.get
+        out = np.array([get(name, -1) for name in names], dtype=np.int64)
+        for j in np.flatnonzero(out < 0).tolist():
+            out[j] = self.folded.get(fold(names[j]), -1)
+        return out
+
+    def entry(self, i: int) -> Dict[str, object]:
+        last = int(self.last_printed[i])
+        interval = float(self.avg_interval[i])
+        return {
+            "card_name": self.names[i],
+            "risk": int(self.risk[i]),
+            "band": BANDS[self.band[i]][0],
+            "rationale": self.rationales[self.rationale[i]],
+            "reprints": int(self.reprints[i]) if self.reprints[i] >= 0 else None,
+            "avg_interval_days": round(interval, 1) if interval == interval else None,
+            "last_printed": str(np.datetime64(last, "D")) if last >= 0 else None,
+        }
+
+    def lookup(self, name: str) -> Optional[Dict[str, object]]:
+        i = int(self.resolve([name])[0])
+        return self.entry(i) if i >= 0 else None
+
+    def prices(self, names: Sequence[str], price_gbp: Callable[[str], Optional[float]]) -> np.ndarray:
+        """The ``prices`` column for ``exposure``: ``price_gbp(table name)``
+        of each card among ``names`` (called once per card), NaN elsewhere."""
+        prices = np.full(len(self), np.nan)
+        ids = self.resolve(list(names))
+        for i in np.unique(ids[ids >= 0]).tolist():
+            price = price_gbp(self.names[i])
+            if price is not None:
+                prices[i] = price
+        return prices
+
+    def exposure(
+        self,
+        names: Sequence[str],
+        qty: Sequence[int],
+        prices: np.ndarray,
+        top: int = 10,
+    ) -> Dict[str, object]:
+        """Value at risk of a deck or collection.
+
+        ``prices`` is the GBP price of every card in this table (aligned
+        with ``names`` of the table, NaN when unknown).  Repeated names
+        are summed; unknown cards are counted but not valued.
+        """
+        ids = self.resolve(list(names))
+        qty = np.asarray(qty, dtype=np.float64)
+        raw = np.asarray(prices, dtype=np.float64)
+        prices = np.nan_to_num(raw)
+        known = ids >= 0
+        held = np.bincount(ids[known], weights=qty[known], minlength=len(self))
+        rows = np.flatnonzero(held)
+        value = held[rows] * prices[rows]
+        at_risk = value * self.risk[rows] / 100.0
+        bands = self.band[rows]
+        by_band = {
+            name: {
+                "cards": int(held[rows][bands == b].sum()),
+                "value_gbp": round(float(value[bands == b].sum()), 2),
+                "value_at_risk_gbp": round(float(at_risk[bands == b].sum()), 2),
+            }
+            for b, (name, _lo) in enumerate(BANDS)
+        }
+        worst = rows[np.lexsort((rows, -at_risk))[:max(top, 0)]]
+        at_risk_by_row = dict(zip(rows.tolist(), at_risk.tolist()))
+        return {
+            "cards": int(qty.sum()),
+            "scored_cards": int(held.sum()),
+            "unknown_cards": int(qty[~known].sum()),
+            "unpriced_cards": int(held[rows][raw[rows] != raw[rows]].sum()),
+            "value_gbp": round(float(value.sum()), 2),
+            "value_at_risk_gbp": round(float(at_risk.sum()), 2),
+            "by_band": by_band,
+            "top": [
+                dict(self.entry(i), qty=int(held[i]), price_gbp=round(float(raw[i]), 2) if raw[i] == raw[i] else None,
+                     value_at_risk_gbp=round(at_risk_by_row[i], 2))
+                for i in worst.tolist()
+            ],
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python reprint_risk.py <reprint_risk_dataset.jsonl | default-cards.json> <card name>...")
+        sys.exit(2)
+    table = ReprintRisk.load(sys.argv[1])
+    for card_name in sys.argv[2:]:
+        print(json.dumps(table.lookup(card_name) or {"card_name": card_name, "risk": None}))
@@ -0,0 +1,531 @@
+"""
+BM25 Retrieval over Retrieval Packs
+===================================
+
+``retrieval_packs.jsonl`` holds one chunk per line – ``chunk_id``,
+``doc_id``, ``text`` and a ``meta`` object (``commander_name``, ``topic``,
+``source``, ``cards``, ``rule_refs``, ``persona_tags``).  This module
+indexes those chunks so a prompt can be grounded with the few most
+relevant ones:
+
+* **Inverted index** – every text token maps to a posting of
+  (chunk, term frequency) pairs; a query scores only the postings of its
+  own tokens with Okapi BM25 (``K1``, ``B``), accumulated into one
+  dense score array per segment.
+* **Metadata filters** – every ``FILTER_FIELDS`` value has its own
+  posting of chunks, so ``{"commander_name": ..., "topic": [...]}``
+  becomes a boolean mask: values of one field are OR‑ed, fields AND‑ed.
+  Values match case‑insensitively.
+* **Compact segments** – one directory per segment with one ``.npy`` file
+  per column (``uint16`` chunk ids when the segment has at most 65 536
+  chunks, ``uint8`` term frequencies, vocabulary as a UTF‑8 blob plus
+  offsets, the source lines as a blob for the hits), loaded memory‑mapped
+  like ``card_store.CardStore``.
+* **Incremental rebuild** – ``meta.json`` records how many bytes of the
+  packs file are indexed.  ``refresh`` indexes only the lines appended
+  since into a new segment; once there are more than ``MAX_SEGMENTS``
+  they are merged into one.  A packs file that shrank or whose head
+  changed is rebuilt from scratch.
+* **Safe for several processes** – writers hold an ``flock`` on
+  ``<directory>.lock`` and pick up whatever another process already
+  indexed.  A build is written to a sibling temporary directory and
+  renamed into place, new segments are renamed in whole, and
+  ``meta.json`` is replaced atomically, so readers never map a
+  half-written file.
+
+Document frequencies and the average chunk length are global across
+segments, so scores do not depend on how the packs were appended.
+
+    python retrieval.py build retrieval_packs.jsonl retrieval_index/
+    python retrieval.py query retrieval_index/ "kaust eldrazi monument" [k]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from store_files import staging_dir, swap_into_place, write_json, writer_lock
+
+INDEX_VERSION = 2
+K1 = 1.2
+B = 0.75
+MAX_SEGMENTS = 8
+HEAD_BYTES = 4096
+# MaxScore: stop widening the candidate pool once it holds 1/SEEN_FRACTION
+# of a segment, and keep a float32 safety margin on the bound.
+SEEN_FRACTION = 4
+SLACK = 1.001
+PROBE_COST = 8
+
+FILTER_FIELDS: Tuple[str, ...] = ("commander_name", "topic", "source", "cards", "rule_refs", "persona_tags")
+
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their this to was "
+    "were will with".split()
+)
+
+
+def tokens(text: str) -> List[str]:
+    """Lower‑case ASCII word tokens of ``text`` without stopwords."""
+    folded = unicodedata.normalize("NFKD", str(text))
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch)).casefold().replace("æ", "ae")
+    return [t for t in TOKEN_RE.findall(folded) if t not in STOPWORDS]
+
+
+def field_key(field: str, value: object) -> str:
+    return f"{field}\x1f{str(value).strip().casefold()}"
+
+
+def field_values(meta: Mapping[str, object]) -> Iterable[str]:
+    for field in FILTER_FIELDS:
+        value = meta.get(field)
+        if value is None or value == "":
+            continue
+        for item in value if isinstance(value, (list, tuple)) else (value,):
+            if item is not None and item != "":
+                yield field_key(field, item)
+
+
+class Hit(NamedTuple):
+    chunk_id: str
+    doc_id: str
+    score: float
+    text: str
+    meta: Dict[str, object]
+
+
+def _blob(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unblob(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    return [raw[a:b].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def _postings(table: Dict[str, List[int]], extra: Optional[Dict[str, List[int]]] = None):
+    """Sorted keys, posting offsets and concatenated postings of ``table``."""
+    keys = sorted(table)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(table[k]) for k in keys], out=offsets[1:])
+    docs = [d for k in keys for d in table[k]]
+    return keys, offsets, docs, ([f for k in keys for f in extra[k]] if extra is not None else None)
+
+
+class Segment:
+    """One immutable batch of chunks; chunk ids are local to the segment."""
+
+    COLUMNS = (
+        "terms", "term_offsets", "post_offsets", "post_docs", "post_tf", "doc_len",
+        "fields", "field_offsets", "field_post_offsets", "field_docs", "records", "record_offsets",
+    )
+
+    def __init__(self, columns: Mapping[str, np.ndarray]):
+        for name in self.COLUMNS:
+            # Plain ndarray views of the memory maps: np.memmap slicing is slow.
+            setattr(self, name, np.asarray(columns[name]))
+        self.count = len(self.doc_len)
+        self.total_len = int(np.sum(self.doc_len, dtype=np.int64))
+        self.term_ids = {t: i for i, t in enumerate(_unblob(self.terms, self.term_offsets))}
+        self.field_ids = {f: i for i, f in enumerate(_unblob(self.fields, self.field_offsets))}
+
+    @classmethod
+    def build(cls, lines: Iterable[bytes]) -> "Segment":
+        """Index raw packs lines; blank lines and lines without text are skipped."""
+        records: List[str] = []
+        doc_len: List[int] = []
+        term_docs: Dict[str, List[int]] = {}
+        term_tf: Dict[str, List[int]] = {}
+        field_docs: Dict[str, List[int]] = {}
+        for line in lines:
+            raw = line.decode("utf-8").strip()
+            if not raw:
+                continue
+            row = json.loads(raw)
+            words = tokens(row.get("text", ""))
+            if not words:
+                continue
+            doc = len(records)
+            records.append(raw)
+            doc_len.append(len(words))
+            for term, tf in Counter(words).items():
+                term_docs.setdefault(term, []).append(doc)
+                term_tf.setdefault(term, []).append(min(tf, 255))
+            for key in dict.fromkeys(field_values(row.get("meta") or {})):
+                field_docs.setdefault(key, []).append(doc)
+        doc_dtype = np.uint16 if len(records) <= 1 << 16 else np.uint32
+        terms, post_offsets, docs, tfs = _postings(term_docs, term_tf)
+        fields, field_post_offsets, fdocs, _ = _postings(field_docs)
+        term_blob, term_offsets = _blob(terms)
+        field_blob, field_offsets = _blob(fields)
+        record_blob, record_offsets = _blob(records)
+        return cls({
+            "terms": term_blob,
+            "term_offsets": term_offsets,
+            "post_offsets": post_offsets,
+            "post_docs": np.array(docs, dtype=doc_dtype),
+            "post_tf": np.array(tfs, dtype=np.uint8),
+            "doc_len": np.array(doc_len, dtype=np.uint32),
+            "fields": field_blob,
+            "field_offsets": field_offsets,
+            "field_post_offsets": field_post_offsets,
+            "field_docs": np.array(fdocs, dtype=doc_dtype),
+            "records": record_blob,
+            "record_offsets": record_offsets,
+        })
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.COLUMNS:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "Segment":
+        mode = "r" if mmap else None
+        return cls({name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in cls.COLUMNS})
+
+    def lines(self) -> Iterable[bytes]:
+        raw = self.records.tobytes()
+        for a, b in zip(self.record_offsets[:-1].tolist(), self.record_offsets[1:].tolist()):
+            yield raw[a:b]
+
+    def df(self, term: str) -> int:
+        i = self.term_ids.get(term)
+        return 0 if i is None else int(self.post_offsets[i + 1] - self.post_offsets[i])
+
+    def mask(self, keys: Sequence[Sequence[str]]) -> Optional[np.ndarray]:
+        """Chunks matching every group of ``keys`` (any key within a group)."""
+        allowed = None
+        for group in keys:
+            hit = np.zeros(self.count, dtype=bool)
+            for key in group:
+                i = self.field_ids.get(key)
+                if i is not None:
+                    hit[self.field_docs[self.field_post_offsets[i]:self.field_post_offsets[i + 1]]] = True
+            allowed = hit if allowed is None else allowed & hit
+        return allowed
+
+    def norms(self, avgdl: float) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 length normalisation ``K1 × (1 − B + B × len / avgdl)`` per chunk,
+        and per term the largest ``tf / (tf + norm)`` in its posting."""
+        norm = (K1 * (1.0 - B + B * self.doc_len.astype(np.float32) / np.float32(avgdl))).astype(np.float32)
+        if not len(self.post_docs):
+            return norm, np.zeros(0, dtype=np.float32)
+        tf = self.post_tf.astype(np.float32)
+        return norm, np.maximum.reduceat(tf / (tf + norm[self.post_docs]), self.post_offsets[:-1])
+
+    def search(
+        self, weights: Sequence[Tuple[str, float]], norm: np.ndarray, caps: np.ndarray, k: int, allowed: Optional[np.ndarray]
+    ):
+        """Top ``k`` (score, chunk) pairs, best first; ties keep chunk order.
+
+        Terms are scored rarest first.  A term adds at most ``weight ×
+        caps[term]`` to any chunk, so once the k‑th best partial score among
+        the chunks seen so far beats that bound summed over the terms left,
+        no unseen chunk can make the cut and the common terms' long
+        postings are only probed for the chunks already seen (MaxScore).
+        A selective filter starts out that way, with the allowed chunks as
+        the pool.
+        """
+        postings = []
+        for term, weight in weights:
+            i = self.term_ids.get(term)
+            if i is not None:
+                postings.append((weight, float(caps[i]) * weight, int(self.post_offsets[i]), int(self.post_offsets[i + 1])))
+        postings.sort(key=lambda p: -p[0])
+        left = sum(bound for _w, bound, _a, _b in postings)
+        scores = np.zeros(self.count, dtype=np.float32)
+        seen: List[np.ndarray] = []
+        seen_len = 0
+        found = member = None
+        if allowed is not None:
+            pool = np.flatnonzero(allowed)
+            if len(pool) <= self.count // SEEN_FRACTION:
+                found, member = pool, allowed
+        for weight, bound, a, b in postings:
+            if found is None and seen and seen_len <= self.count // SEEN_FRACTION:
+                pool = np.unique(np.concatenate(seen)) if len(seen) > 1 else np.asarray(seen[0])
+                if allowed is not None:
+                    pool = pool[allowed[pool]]
+                if len(pool) >= k and left * SLACK < np.partition(scores[pool], len(pool) - k)[len(pool) - k]:
+                    found = pool
+            left -= bound
+            docs = self.post_docs[a:b]
+            tf = self.post_tf[a:b]
+            # Gather through a membership mask or binary‑search the pool,
+            # whichever touches fewer entries.
+            if found is not None and len(docs) <= len(found) * PROBE_COST:
+                if member is None:
+                    member = np.zeros(self.count, dtype=bool)
+                    member[found] = True
+                keep = member[docs]
+                docs, tf = docs[keep], tf[keep]
+            elif found is not None:
+                at = np.minimum(np.searchsorted(docs, found), len(docs) - 1)
+                hit = docs[at] == found
+                docs, tf = found[hit], tf[at[hit]]
+            else:
+                seen.append(docs)
+                seen_len += len(docs)
+            tf = tf.astype(np.float32)
+            # Chunk ids are unique within a posting, so fancy += is exact.
+            scores[docs] += weight * tf / (tf + norm[docs])
+        if found is None:
+            found = np.flatnonzero(scores)
+            if allowed is not None:
+                found = found[allowed[found]]
+        else:
+            found = found[scores[found] > 0]
+        if len(found) > k:
+            cut = np.partition(scores[found], len(found) - k)[len(found) - k]
+            found = found[scores[found] >= cut]
+        order = np.lexsort((found, -scores[found]))[:k]
+        return [(float(scores[d]), int(d)) for d in found[order]]
+
+    def record(self, doc: int) -> Dict[str, object]:
+        a, b = self.record_offsets[doc], self.record_offsets[doc + 1]
+        return json.loads(self.records[a:b].tobytes().decode("utf-8"))
+
+
+FilterValue = Union[str, Sequence[str]]
+
+
+class RetrievalIndex:
+    """BM25 index over a packs file, stored as segments under ``directory``."""
+
+    def __init__(self, directory: str, segments: Sequence[Segment], meta: Mapping[str, object]):
+        self.directory = directory
+        self.meta: Dict[str, object] = dict(meta)
+        self._use(segments)
+
+    def _use(self, segments: Sequence[Segment]):
+        # One assignment, so a search running during refresh() sees either
+        # the old segments with their statistics or the new ones.
+        count = sum(s.count for s in segments)
+        avgdl = sum(s.total_len for s in segments) / count if count else 1.0
+        self._view = (list(segments), [s.norms(avgdl) for s in segments], count)
+
+    @property
+    def segments(self) -> List[Segment]:
+        return self._view[0]
+
+    def __len__(self) -> int:
+        return self._view[2]
+
+    # -- Persistence --------------------------------------------------
+    @classmethod
+    def build(cls, packs_path: str, directory: str) -> "RetrievalIndex":
+        """Index the complete lines of the packs file into ``directory`` (replacing it)."""
+        with writer_lock(directory):
+            return cls._build(packs_path, directory)
+
+    @classmethod
+    def _build(cls, packs_path: str, directory: str) -> "RetrievalIndex":
+        # Caller holds writer_lock(directory).
+        with open(packs_path, "rb") as fh:
+            data = fh.read()
+        end = data.rfind(b"\n") + 1
+        segment = Segment.build(data[:end].splitlines())
+        staging = staging_dir(directory)
+        try:
+            index = cls(staging, [segment], {
+                "version": INDEX_VERSION,
+                "source_bytes": end,
+                "source_head": _head_digest(data[:end]),
+                "segments": ["seg-000000"],
+                "next_segment": 1,
+            })
+            segment.save(os.path.join(staging, "seg-000000"))
+            index._write_meta()
+            swap_into_place(staging, directory)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        index.directory = directory
+        return index
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "RetrievalIndex":
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported retrieval index version {meta.get('version')}")
+        segments = [Segment.load(os.path.join(directory, name), mmap=mmap) for name in meta["segments"]]
+        return cls(directory, segments, meta)
+
+    @classmethod
+    def open(cls, packs_path: str, directory: str) -> "RetrievalIndex":
+        """Load the index in ``directory`` and catch it up with ``packs_path``."""
+        try:
+            index = cls.load(directory)
+        except (OSError, ValueError, KeyError):
+            with writer_lock(directory):
+                # Another process may have finished building while we waited.
+                try:
+                    index = cls.load(directory)
+                except (OSError, ValueError, KeyError):
+                    return cls._build(packs_path, directory)
+        index.refresh(packs_path)
+        return index
+
+    def _write_meta(self):
+        write_json(os.path.join(self.directory, "meta.json"), self.meta)
+
+    def refresh(self, packs_path: str) -> int:
+        """Index lines appended to ``packs_path`` since the last build; returns how many.
+
+        A file that shrank or was rewritten is rebuilt from scratch; a
+        trailing line without its newline waits for the next refresh.
+        Lines another process already indexed into ``directory`` are
+        picked up from there rather than indexed again.
+        """
+        if os.path.getsize(packs_path) == int(self.meta["source_bytes"]):
+            return 0
+        with writer_lock(self.directory):
+            before = len(self)
+            self._adopt()
+            return len(self) - before + self._refresh(packs_path)
+
+    def _adopt(self):
+        """Switch to the on-disk index if another process moved it on."""
+        try:
+            with open(os.path.join(self.directory, "meta.json"), encoding="utf-8") as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return
+        if meta == self.meta:
+            return
+        try:
+            current = type(self).load(self.directory)
+        except (OSError, ValueError, KeyError):
+            return
+        self.meta = current.meta
+        self._use(current.segments)
+
+    def _refresh(self, packs_path: str) -> int:
+        # Caller holds writer_lock(self.directory).
+        done = int(self.meta["source_bytes"])
+        size = os.path.getsize(packs_path)
+        if size == done:
+            return 0
+        with open(packs_path, "rb") as fh:
+            head = fh.read(min(done, HEAD_BYTES))
+            if size < done or _head_digest(head) != self.meta["source_head"]:
+                fresh = type(self)._build(packs_path, self.directory)
+                self.meta = fresh.meta
+                self._use(fresh.segments)
+                return len(fresh)
+            fh.seek(done)
+            tail = fh.read(size - done)
+        end = tail.rfind(b"\n") + 1
+        if not end:
+            return 0
+        if done < HEAD_BYTES:
+            self.meta["source_head"] = _head_digest(head + tail[:end])
+        segment = Segment.build(tail[:end].splitlines())
+        names = list(self.meta["segments"])
+        segments = self.segments
+        if segment.count:
+            names.append(self._save_segment(segment))
+            segments = segments + [segment]
+        self.meta["source_bytes"] = done + end
+        if len(names) > MAX_SEGMENTS:
+            names, segments = self._merge(names, segments)
+        self.meta["segments"] = names
+        self._write_meta()
+        self._use(segments)
+        for stale in set(os.listdir(self.directory)) - set(names) - {"meta.json"}:
+            if stale.startswith(("seg-", ".seg-")):
+                shutil.rmtree(os.path.join(self.directory, stale), ignore_errors=True)
+        return segment.count
+
+    def _save_segment(self, segment: Segment) -> str:
+        """Write ``segment`` under the next free name, renamed into place whole."""
+        name = f"seg-{int(self.meta['next_segment']):06d}"
+        staging = os.path.join(self.directory, f".{name}")
+        shutil.rmtree(staging, ignore_errors=True)
+        segment.save(staging)
+        os.replace(staging, os.path.join(self.directory, name))
+        self.meta["next_segment"] = int(self.meta["next_segment"]) + 1
+        return name
+
+    def _merge(self, names: List[str], segments: List[Segment]) -> Tuple[List[str], List[Segment]]:
+        merged = Segment.build(line for segment in segments for line in segment.lines())
+        return [self._save_segment(merged)], [merged]
+
+    # -- Queries ------------------------------------------------------
+    @staticmethod
+    def _weights(query: str, segments: Sequence[Segment], count: int) -> List[Tuple[str, float]]:
+        """BM25 weight ``idf × (K1 + 1)`` of each distinct query token."""
+        out = []
+        for term in dict.fromkeys(tokens(query)):
+            df = sum(segment.df(term) for segment in segments)
+            if df:
+                out.append((term, math.log(1.0 + (count - df + 0.5) / (df + 0.5)) * (K1 + 1.0)))
+        return out
+
+    def search(self, query: str, k: int = 5, filters: Optional[Mapping[str, FilterValue]] = None) -> List[Hit]:
+        """The ``k`` chunks scoring highest for ``query`` among those matching ``filters``.
+
+        ``filters`` maps ``FILTER_FIELDS`` names to a value or a list of
+        accepted values.  Chunks sharing no token with the query are never
+        returned; ties keep packs order.
+        """
+        if k <= 0:
+            return []
+        keys = []
+        for field, value in (filters or {}).items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unknown retrieval filter {field!r}")
+            values = [value] if isinstance(value, str) else list(value)
+            keys.append([field_key(field, v) for v in values])
+        segments, norms, count = self._view
+        weights = self._weights(query, segments, count)
+        if not weights:
+            return []
+        best: List[Tuple[float, int, int, Segment]] = []
+        for s, segment in enumerate(segments):
+            allowed = segment.mask(keys) if keys else None
+            if allowed is not None and not allowed.any():
+                continue
+            for score, doc in segment.search(weights, *norms[s], k, allowed):
+                best.append((-score, s, doc, segment))
+        hits = []
+        for neg, _s, doc, segment in heapq.nsmallest(k, best, key=lambda h: h[:3]):
+            row = segment.record(doc)
+            hits.append(Hit(str(row.get("chunk_id", "")), str(row.get("doc_id", "")), -neg,
+                            str(row.get("text", "")), dict(row.get("meta") or {})))
+        return hits
+
+
+def _head_digest(data: bytes) -> str:
+    return hashlib.sha1(data[:HEAD_BYTES]).hexdigest()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "build":
+        built = RetrievalIndex.build(sys.argv[2], sys.argv[3])
+        print(f"Indexed {len(built)} chunks into {sys.argv[3]}")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "query":
+        found = RetrievalIndex.load(sys.argv[2]).search(sys.argv[3], int(sys.argv[4]) if len(sys.argv) > 4 else 5)
+        for hit in found:
+            print(f"{hit.score:7.3f}  {hit.chunk_id}\n         {hit.text}")
+    else:
+        print("usage: python retrieval.py build <packs.jsonl> <index_dir> | query <index_dir> <text> [k]")
+        sys.exit(2)
@@ -0,0 +1,249 @@
+"""
+Comprehensive Rules Lookup
+==========================
+
+``mtg_rules_dataset.json`` lists rules explanations, each with a
+``topic``, a ``rule_reference`` string such as ``"CR 704.5a; CR 119.6"``
+or ``"CR 702.25a-e"``, a ``plain_explanation``, an ``example`` and its
+``sources``.  ``RulesIndex`` answers three kinds of query without
+scanning the entries:
+
+* **Rule numbers** – references are parsed into CR numbers (letter
+  ranges expanded) and placed in the rule tree chapter → section → rule
+  → sub‑rule (``7`` → ``704`` → ``704.5`` → ``704.5a``).  Every node is
+  keyed by its number and stores the entries citing exactly it and,
+  precomputed, every entry in its subtree, so ``lookup("704.5")`` (all
+  of 704.5a, 704.5b, …) and ``lookup("704.5a", prefix=False)`` are a
+  single dict hit.  ``613.1`` is not a prefix of ``613.10``.
+* **Keywords** – topic, explanation and example words map to weighted
+  postings (topic words count double); ``search`` sums idf × weight over
+  the query's words.
+* **Citations** – ``citations`` turns free text, e.g. an LLM reply, into
+  the entries it should cite: CR numbers it mentions, then keyword
+  matches.
+
+Pure Python, so the lookup works without NumPy.
+
+    python rules_index.py 704.5
+    python rules_index.py "commander damage"
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import sys
+import unicodedata
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+RULES_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mtg_rules_dataset.json")
+
+# "CR 702.25a-e", "613.3c", "CR 614", "702.139h (Companion)".
+REFERENCE_RE = re.compile(r"^\s*(?:CR\s*)?(\d{3})(?:\.(\d+)([a-z])?(?:\s*[-–]\s*([a-z]))?)?", re.IGNORECASE)
+# Rule numbers quoted in free text: "CR 704.5a", "rule 903.9", "613.7b".
+MENTION_RE = re.compile(r"\b(?:(?:CR|rules?)\s*(\d{3}(?:\.\d+[a-z]?)?)|(\d{3}\.\d+[a-z]?))\b", re.IGNORECASE)
+NUMBER_RE = re.compile(r"^(\d)$|^(\d{3})(?:\.(\d+)([a-z])?)?$")
+WORD_RE = re.compile(r"[a-z]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can for from has have if in into is it its of on or that the their them then "
+    "there they this to was were when which while will with you your".split()
+)
+FIELD_WEIGHTS = (("topic", 2.0), ("plain_explanation", 1.0), ("example", 0.5))
+
+
+class RuleEntry(NamedTuple):
+    topic: str
+    rules: Tuple[str, ...]
+    rule_reference: str
+    plain_explanation: str
+    example: str
+    sources: Tuple[str, ...]
+
+
+class RuleNode(NamedTuple):
+    exact: Tuple[int, ...]
+    subtree: Tuple[int, ...]
+    children: Tuple[str, ...]
+
+
+def words(text: str) -> List[str]:
+    folded = unicodedata.normalize("NFKD", str(text))
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch)).casefold().replace("æ", "ae")
+    return [w for w in WORD_RE.findall(folded) if w not in STOPWORDS and len(w) > 1]
+
+
+def parse_reference(reference: str) -> List[str]:
+    """CR numbers in a ``rule_reference`` string; ``a-e`` ranges are expanded."""
+    numbers = []
+    for part in str(reference).split(";"):
+        m = REFERENCE_RE.match(part)
+        if not m:
+            continue
+        section, rule, first, last = m.groups()
+        if rule is None:
+            numbers.append(section)
+        elif first is None:
+            numbers.append(f"{section}.{rule}")
+        else:
+            first, last = first.lower(), (last or first).lower()
+            numbers.extend(f"{section}.{rule}{chr(c)}" for c in range(ord(first), ord(last) + 1))
+    return list(dict.fromkeys(numbers))
+
+
+def normalise_number(text: str) -> Optional[str]:
+    """``"CR 704.5A"`` → ``"704.5a"``; ``None`` if it is not a CR number."""
+    text = re.sub(r"^(?:CR|rules?)\s*", "", str(text).strip(), flags=re.IGNORECASE).rstrip(".").lower()
+    return text if NUMBER_RE.match(text) else None
+
+
+def parent(number: str) -> Optional[str]:
+    """The enclosing node: 704.5a → 704.5 → 704 → 7 → None."""
+    m = NUMBER_RE.match(number)
+    chapter, section, rule, letter = m.groups()
+    if chapter:
+        return None
+    if rule is None:
+        return section[0]
+    if letter is None:
+        return section
+    return f"{section}.{rule}"
+
+
+def depth(number: str) -> int:
+    up = parent(number)
+    return 0 if up is None else 1 + depth(up)
+
+
+def sort_key(number: str) -> Tuple[int, int, str]:
+    chapter, section, rule, letter = NUMBER_RE.match(number).groups()
+    if chapter:
+        return (int(chapter) * 100, -2, "")
+    return (int(section), int(rule) if rule else -1, letter or "")
+
+
+class RulesIndex:
+    """Read‑only rule number and keyword index over rules entries."""
+
+    def __init__(self, entries: Sequence[RuleEntry]):
+        self.entries: List[RuleEntry] = list(entries)
+        exact: Dict[str, List[int]] = {}
+        for i, entry in enumerate(self.entries):
+            for number in entry.rules:
+                exact.setdefault(number, []).append(i)
+                node = parent(number)
+                while node is not None:
+                    exact.setdefault(node, [])
+                    node = parent(node)
+        children: Dict[str, List[str]] = {}
+        for number in exact:
+            up = parent(number)
+            if up is not None:
+                children.setdefault(up, []).append(number)
+        self.nodes: Dict[str, RuleNode] = {}
+        for number in sorted(exact, key=depth, reverse=True):
+            # Deepest first, so every child node exists before its parent.
+            kids = tuple(sorted(children.get(number, ()), key=sort_key))
+            subtree = list(exact[number])
+            for kid in kids:
+                subtree.extend(self.nodes[kid].subtree)
+            self.nodes[number] = RuleNode(tuple(exact[number]), tuple(dict.fromkeys(subtree)), kids)
+
+        postings: Dict[str, Dict[int, float]] = {}
+        for i, entry in enumerate(self.entries):
+            for field, weight in FIELD_WEIGHTS:
+                for word in set(words(getattr(entry, field))):
+                    posting = postings.setdefault(word, {})
+                    posting[i] = max(posting.get(i, 0.0), weight)
+        n = len(self.entries)
+        self.postings: Dict[str, Tuple[float, Dict[int, float]]] = {
+            word: (math.log(1.0 + (n - len(p) + 0.5) / (len(p) + 0.5)), p) for word, p in postings.items()
+        }
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping[str, object]]) -> "RulesIndex":
+        entries = []
+        for row in rows:
+            reference = str(row.get("rule_reference") or "")
+            entries.append(RuleEntry(
+                str(row.get("topic") or ""),
+                tuple(parse_reference(reference)),
+                reference,
+                str(row.get("plain_explanation") or ""),
+                str(row.get("example") or ""),
+                tuple(str(s) for s in row.get("sources") or ()),
+            ))
+        return cls(entries)
+
+    @classmethod
+    def load(cls, path: str = RULES_DATASET) -> "RulesIndex":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_rows(json.load(fh))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def node(self, number: str) -> Optional[RuleNode]:
+        key = normalise_number(number)
+        return self.nodes.get(key) if key else None
+
+    def lookup(self, number: str, prefix: bool = True) -> List[RuleEntry]:
+        """Entries citing ``number`` (and, with ``prefix``, any rule beneath it)."""
+        node = self.node(number)
+        if node is None:
+            return []
+        return [self.entries[i] for i in (node.subtree if prefix else node.exact)]
+
+    def scores(self, query: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for word in dict.fromkeys(words(query)):
+            hit = self.postings.get(word)
+            if hit is None:
+                continue
+            idf, posting = hit
+            for i, weight in posting.items():
+                scores[i] = scores.get(i, 0.0) + idf * weight
+        return scores
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, RuleEntry]]:
+        """The ``k`` entries whose words best match ``query``; ties keep dataset order."""
+        ranked = sorted(self.scores(query).items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(round(score, 3), self.entries[i]) for i, score in ranked]
+
+    def citations(self, text: str, k: int = 3, min_score: float = 4.0) -> List[RuleEntry]:
+        """Entries ``text`` should cite: rules it names (exact node first,
+        else the node's subtree), then keyword matches scoring at least
+        ``min_score``, at most ``k`` in all."""
+        picked: List[int] = []
+        for m in MENTION_RE.finditer(text):
+            node = self.node(m.group(1) or m.group(2))
+            if node is not None:
+                picked.extend(node.exact or node.subtree)
+        for i, score in sorted(self.scores(text).items(), key=lambda item: (-item[1], item[0])):
+            if score < min_score:
+                break
+            picked.append(i)
+        return [self.entries[i] for i in list(dict.fromkeys(picked))[:k]]
+
+
+def entry_json(entry: RuleEntry) -> Dict[str, object]:
+    return {
+        "topic": entry.topic,
+        "rules": [f"CR {number}" for number in entry.rules],
+        "rule_reference": entry.rule_reference,
+        "plain_explanation": entry.plain_explanation,
+        "example": entry.example,
+        "sources": list(entry.sources),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python rules_index.py <CR number | keywords>")
+        sys.exit(2)
+    index = RulesIndex.load()
+    query = " ".join(sys.argv[1:])
+    found = index.lookup(query) if normalise_number(query) else [e for _s, e in index.search(query)]
+    for entry in found:
+        print(f"{entry.rule_reference:28s} {entry.topic}")
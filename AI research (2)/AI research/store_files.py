@@ -0,0 +1,76 @@
+"""
+Store Directory Writes
+======================
+
+The compiled stores (``retrieval``, ``synergy_store``) live in
+directories that several backend workers may open, and rebuild, at the
+same time.  These helpers keep that safe:
+
+* ``writer_lock`` – an exclusive ``flock`` on ``<directory>.lock`` so
+  only one process writes a store at a time.
+* ``staging_dir`` / ``swap_into_place`` – a store is written to a
+  sibling temporary directory and renamed over the old one, so readers
+  never map a half‑written ``.npy`` file.
+* ``write_json`` – ``meta.json`` replaced atomically.
+
+Pure Python; without ``fcntl`` (Windows) the lock is a no‑op and a
+single writer is assumed.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@contextlib.contextmanager
+def writer_lock(directory: str) -> Iterator[None]:
+    """Hold the exclusive cross-process lock for writing ``directory``.
+
+    Not re-entrant: a process that already holds it must not take it again.
+    """
+    path = os.path.abspath(directory) + ".lock"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def staging_dir(directory: str) -> str:
+    """A new empty directory next to ``directory`` to build its replacement in."""
+    parent, base = os.path.split(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f".{base}-", dir=parent)
+
+
+def swap_into_place(staging: str, directory: str):
+    """Rename the finished ``staging`` directory to ``directory``, removing the old one."""
+    retired = None
+    if os.path.isdir(directory):
+        retired = staging_dir(directory)
+        os.replace(directory, retired)
+    os.replace(staging, directory)
+    if retired is not None:
+        # Processes still mapping the old files keep them until they close.
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+def write_json(path: str, data: object):
+    """Write ``data`` to ``path`` through a temporary file and an atomic rename."""
+    with open(path + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,116 @@
+"""
+Commander Synergy Scores
+========================
+
+``synergy_dataset.jsonl`` holds one row per (commander, card) observation
+with a ``synergy_score`` in [0, 1].  This module compiles those rows into
+a lookup the replacement engine can query per violation:
+
+* **Score table** – ``commander → {card → score}``; repeated rows for the
+  same pair are averaged, so each lookup is a pair of dict hits.
+* **Positional view** – for a given ``CardIndex`` the scores of one
+  commander are re‑keyed by card position and cached, so ranking a
+  tier's candidates never touches card names.
+* **Ranked order** – a scored card's combined score does not depend on
+  the query, so each commander's positions are also kept sorted by it;
+  a query walks that list until enough cards pass its filters.
+
+Ranking itself lives in ``CardIndex.ranked_candidates``; ``combined_score``
+defines how synergy and price are blended.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+def combined_score(synergy: float, price_gbp: float, weight: float) -> float:
+    """Blend a synergy score with price; higher is better.
+
+    The price term ``1 / (1 + price)`` is 1 for free cards and falls
+    towards 0, so with ``weight = 0`` cheapest first is unchanged.
+    """
+    return weight * synergy + (1.0 - weight) / (1.0 + price_gbp)
+
+
+class SynergyTable:
+    """Read‑only (commander, card) → synergy score lookup."""
+
+    def __init__(self, scores: Mapping[str, Mapping[str, float]]):
+        self._scores: Dict[str, Dict[str, float]] = {c: dict(cards) for c, cards in scores.items()}
+        self._index = None
+        self._positions: Dict[str, Dict[int, float]] = {}
+        self._ranked: Dict[Tuple[str, float], List[int]] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping[str, object]]) -> "SynergyTable":
+        totals: Dict[Tuple[str, str], List[float]] = {}
+        for row in rows:
+            commander, card = row.get("commander_name"), row.get("card_name")
+            score = row.get("synergy_score")
+            if not commander or not card or score is None:
+                continue
+            total = totals.setdefault((str(commander), str(card)), [0.0, 0])
+            total[0] += float(score)
+            total[1] += 1
+        scores: Dict[str, Dict[str, float]] = {}
+        for (commander, card), (total, count) in totals.items():
+            scores.setdefault(commander, {})[card] = round(total / count, 4)
+        return cls(scores)
+
+    @classmethod
+    def load(cls, path: str) -> "SynergyTable":
+        """Read a JSON‑lines synergy dataset; blank lines are skipped."""
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_rows(json.loads(line) for line in fh if line.strip())
+
+    def __len__(self) -> int:
+        return sum(len(cards) for cards in self._scores.values())
+
+    def commanders(self) -> List[str]:
+        return list(self._scores)
+
+    def score(self, commander: str, card_name: str) -> Optional[float]:
+        return self._scores.get(commander, {}).get(card_name)
+
+    def scores(self, commander: str, card_names: Iterable[str]) -> List[Optional[float]]:
+        """Batch form of ``score`` for one commander."""
+        cards = self._scores.get(commander, {})
+        return [cards.get(name) for name in card_names]
+
+    def positions(self, commander: str, index) -> Dict[int, float]:
+        """Scores for ``commander`` keyed by position in ``index``.
+
+        Cards missing from the index are dropped.  The mapping is cached
+        per commander and discarded when a different index is passed.
+        """
+        if index is not self._index:
+            self._index = index
+            self._positions = {}
+            self._ranked = {}
+        cached = self._positions.get(commander)
+        if cached is None:
+            position = index.position
+            cached = {
+                position[name]: score
+                for name, score in self._scores.get(commander, {}).items()
+                if name in position
+            }
+            self._positions[commander] = cached
+        return cached
+
+    def ranked(self, commander: str, index, weight: float) -> List[int]:
+        """Scored positions for ``commander``, best ``combined_score`` first.
+
+        Ties keep the index's (price, database order) rank.  Cached per
+        (commander, weight) alongside ``positions``.
+        """
+        scores = self.positions(commander, index)
+        key = (commander, weight)
+        cached = self._ranked.get(key)
+        if cached is None:
+            prices, rank = index.prices, index.rank
+            cached = sorted(scores, key=lambda i: (-combined_score(scores[i], prices[i], weight), rank[i]))
+            self._ranked[key] = cached
+        return cached
@@ -0,0 +1,327 @@
+"""
+Columnar Commander Synergy Store
+================================
+
+``synergy_dataset.jsonl`` has to be parsed line by line before anything
+can be looked up.  This module compiles it once into a directory of
+``.npy`` columns that load memory‑mapped in milliseconds, like
+``card_store.CardStore``::
+
+    python synergy_store.py build synergy_dataset.jsonl synergy_store/
+
+Commander and card names are interned (ids in name order) and repeated
+(commander, card) rows are averaged, as ``SynergyTable`` does.  Columns
+(``n`` pairs, ``F`` features):
+
+  ``commanders`` / ``cards`` – UTF‑8 name blobs plus ``*_offsets``.
+  ``row_start``  – ``int64`` (commanders + 1): rows of commander ``c`` are
+                   ``row_start[c]:row_start[c + 1]``, best score first
+                   (ties by card name), so a top‑N query is one slice.
+  ``card``       – ``uint32`` card id per row.
+  ``score``      – ``float64`` mean ``synergy_score`` per row.
+  ``features``   – ``float64`` ``n × F`` mean feature matrix, NaN where a
+                   row lacked the feature; names in ``meta.json``.
+
+Scores and features are stored rounded to ``DECIMALS`` places, as they
+are served, so a query converts its slice with one ``tolist()`` per
+column and never rounds per value.
+  ``pair_key`` / ``pair_row`` – ``commander × cards + card`` keys in
+                   ascending order and the row each one is stored at, so
+                   scoring a batch of pairs is one ``searchsorted``.
+
+Everything is vectorised over the rows, so the same layout holds
+millions of observations.  ``build`` compiles into a sibling temporary
+directory and renames it into place under ``store_files.writer_lock``,
+so backend workers opening a stale store rebuild it once and never map
+a half‑written column.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+from itertools import repeat
+from operator import itemgetter
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from store_files import staging_dir, swap_into_place, write_json, writer_lock
+
+STORE_VERSION = 2
+DECIMALS = 4
+
+
+def _blob(names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [n.encode("utf-8") for n in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _names(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    return [raw[a:b].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+class SynergyStore:
+    """Read‑only columnar (commander, card) → synergy score and features."""
+
+    COLUMNS = ("row_start", "card", "score", "features", "pair_key", "pair_row")
+
+    def __init__(
+        self,
+        commanders: Sequence[str],
+        cards: Sequence[str],
+        feature_names: Sequence[str],
+        columns: Mapping[str, np.ndarray],
+    ):
+        self.commanders: List[str] = list(commanders)
+        self.cards: List[str] = list(cards)
+        self.feature_names: List[str] = list(feature_names)
+        for name in self.COLUMNS:
+            # Plain ndarray views of the memory maps: np.memmap slicing is slow.
+            setattr(self, name, np.asarray(columns[name]))
+        self.commander_ids: Dict[str, int] = {name: i for i, name in enumerate(self.commanders)}
+        self.card_ids: Dict[str, int] = {name: i for i, name in enumerate(self.cards)}
+        self._folded: Optional[Dict[str, int]] = None
+        # Plain ints: indexing the column costs more than the slice it bounds.
+        self._bounds: List[int] = self.row_start.tolist()
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    # -- Builders -----------------------------------------------------
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping[str, object]]) -> "SynergyStore":
+        commander_ids: Dict[str, int] = {}
+        card_ids: Dict[str, int] = {}
+        feature_ids: Dict[str, int] = {}
+        commander_col: List[int] = []
+        card_col: List[int] = []
+        scores: List[float] = []
+        feature_cells: List[Tuple[int, int, float]] = []
+        for row in rows:
+            commander, card = row.get("commander_name"), row.get("card_name")
+            score = row.get("synergy_score")
+            if not commander or not card or score is None:
+                continue
+            r = len(scores)
+            commander_col.append(commander_ids.setdefault(str(commander), len(commander_ids)))
+            card_col.append(card_ids.setdefault(str(card), len(card_ids)))
+            scores.append(float(score))
+            for name, value in (row.get("features") or {}).items():
+                if isinstance(value, (int, float)):
+                    feature_cells.append((r, feature_ids.setdefault(str(name), len(feature_ids)), float(value)))
+
+        # Re-number names in sorted order so ids (and score ties) are stable.
+        commanders, cards = sorted(commander_ids), sorted(card_ids)
+        remap_commander = np.empty(len(commanders), dtype=np.int64)
+        remap_commander[[commander_ids[n] for n in commanders]] = np.arange(len(commanders))
+        remap_card = np.empty(len(cards), dtype=np.int64)
+        remap_card[[card_ids[n] for n in cards]] = np.arange(len(cards))
+        commander_arr = remap_commander[np.array(commander_col, dtype=np.int64)]
+        card_arr = remap_card[np.array(card_col, dtype=np.int64)]
+
+        # Average repeated pairs; np.unique also sorts the keys.
+        keys, inverse, counts = np.unique(commander_arr * max(len(cards), 1) + card_arr,
+                                          return_inverse=True, return_counts=True)
+        score = np.round(np.bincount(inverse, weights=np.array(scores), minlength=len(keys)) / counts, DECIMALS)
+        features = np.full((len(keys), len(feature_ids)), np.nan)
+        if feature_cells:
+            cells = np.array(feature_cells)
+            rows_, cols = inverse[cells[:, 0].astype(np.int64)], cells[:, 1].astype(np.int64)
+            flat = rows_ * len(feature_ids) + cols
+            total = np.bincount(flat, weights=cells[:, 2], minlength=features.size)
+            seen = np.bincount(flat, minlength=features.size)
+            filled = seen > 0
+            features.reshape(-1)[filled] = np.round(total[filled] / seen[filled], DECIMALS)
+
+        pair_commander = keys // max(len(cards), 1)
+        pair_card = keys % max(len(cards), 1)
+        order = np.lexsort((pair_card, -score, pair_commander))
+        pair_row = np.empty(len(keys), dtype=np.int64)
+        pair_row[order] = np.arange(len(keys))
+        row_start = np.searchsorted(pair_commander[order], np.arange(len(commanders) + 1)).astype(np.int64)
+        return cls(commanders, cards, sorted(feature_ids, key=feature_ids.get), {
+            "row_start": row_start,
+            "card": pair_card[order].astype(np.uint32),
+            "score": score[order],
+            "features": features[order],
+            "pair_key": keys.astype(np.int64),
+            "pair_row": pair_row.astype(np.uint32 if len(keys) < 1 << 32 else np.int64),
+        })
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "SynergyStore":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_rows(json.loads(line) for line in fh if line.strip())
+
+    # -- Persistence --------------------------------------------------
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        blobs = {}
+        blobs["commanders"], blobs["commander_offsets"] = _blob(self.commanders)
+        blobs["cards"], blobs["card_offsets"] = _blob(self.cards)
+        for name, array in list(blobs.items()) + [(c, getattr(self, c)) for c in self.COLUMNS]:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+        write_json(os.path.join(directory, "meta.json"), {
+            "version": STORE_VERSION,
+            "count": len(self),
+            "commanders": len(self.commanders),
+            "cards": len(self.cards),
+            "features": self.feature_names,
+        })
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "SynergyStore":
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported synergy store version {meta.get('version')}")
+        mode = "r" if mmap else None
+
+        def column(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+
+        return cls(
+            _names(column("commanders"), column("commander_offsets")),
+            _names(column("cards"), column("card_offsets")),
+            meta["features"],
+            {name: column(name) for name in cls.COLUMNS},
+        )
+
+    # -- Queries ------------------------------------------------------
+    def commander_id(self, name: str) -> Optional[int]:
+        """Id of ``name``; falls back to a case‑insensitive match."""
+        i = self.commander_ids.get(name)
+        if i is None:
+            if self._folded is None:
+                self._folded = {n.casefold(): j for j, n in enumerate(self.commanders)}
+            i = self._folded.get(str(name).strip().casefold())
+        return i
+
+    def rows(self, start: int, end: int) -> List[Dict[str, object]]:
+        """Rows ``start:end`` as card dicts (one slice per column)."""
+        names, cards = self.feature_names, self.cards
+        features = self.features[start:end]
+        partial = np.isnan(features).any(axis=1).tolist()
+        return [
+            {
+                "card_name": cards[card],
+                "synergy_score": score,
+                "features": {n: v for n, v in zip(names, values) if v == v} if gaps else dict(zip(names, values)),
+            }
+            for card, score, values, gaps in zip(
+                self.card[start:end].tolist(), self.score[start:end].tolist(), features.tolist(), partial
+            )
+        ]
+
+    def row(self, r: int) -> Dict[str, object]:
+        return self.rows(r, r + 1)[0]
+
+    def top(self, commander: str, n: int = 10, offset: int = 0) -> Optional[List[Dict[str, object]]]:
+        """The ``n`` best‑scoring cards for ``commander`` (None if unknown)."""
+        c = self.commander_id(commander)
+        if c is None:
+            return None
+        start, end = self._bounds[c], self._bounds[c + 1]
+        first = start + max(offset, 0)
+        return self.rows(first, max(first, min(end, first + max(n, 0))))
+
+    def pair_rows(self, commander_ids, card_ids) -> np.ndarray:
+        """Row of each (commander id, card id) pair, −1 where absent or an id is −1."""
+        commander_ids = np.asarray(commander_ids, dtype=np.int64)
+        card_ids = np.asarray(card_ids, dtype=np.int64)
+        rows = np.full(len(commander_ids), -1, dtype=np.int64)
+        if not len(self.pair_key):
+            return rows
+        keys = commander_ids * len(self.cards) + card_ids
+        # Searching in key order walks pair_key forwards instead of
+        # jumping across it once per pair: several times faster at 1M rows.
+        order = np.argsort(keys, kind="stable")
+        at = np.empty(len(keys), dtype=np.int64)
+        at[order] = np.searchsorted(self.pair_key, keys[order])
+        np.minimum(at, len(self.pair_key) - 1, out=at)
+        found = (commander_ids >= 0) & (card_ids >= 0) & (self.pair_key[at] == keys)
+        rows[found] = self.pair_row[at[found]]
+        return rows
+
+    def score_pairs(self, pairs: Iterable[Tuple[str, str]]) -> List[Optional[float]]:
+        """Scores for (commander, card) name pairs; None for unscored pairs."""
+        pairs = list(pairs)
+        commanders = list(map(itemgetter(0), pairs))
+        # Exact names resolve in C through dict.get; only misses are folded.
+        commander_ids = np.fromiter(map(self.commander_ids.get, commanders, repeat(-1)), np.int64, len(pairs))
+        for j in np.flatnonzero(commander_ids < 0).tolist():
+            c = self.commander_id(commanders[j])
+            if c is not None:
+                commander_ids[j] = c
+        card_ids = np.fromiter(map(self.card_ids.get, map(itemgetter(1), pairs), repeat(-1)), np.int64, len(pairs))
+        rows = self.pair_rows(commander_ids, card_ids)
+        if not len(self.score):
+            return [None] * len(rows)
+        return np.where(rows >= 0, self.score[np.maximum(rows, 0)], None).tolist()
+
+    def scores(self) -> Dict[str, Dict[str, float]]:
+        """``commander → {card → score}`` for ``SynergyTable``."""
+        cards, card, score = self.cards, self.card.tolist(), self.score.tolist()
+        bounds = self._bounds
+        return {
+            commander: {cards[card[r]]: score[r] for r in range(bounds[c], bounds[c + 1])}
+            for c, commander in enumerate(self.commanders)
+        }
+
+
+def build(dataset_path: str, out_dir: str) -> SynergyStore:
+    """Compile a synergy JSON‑lines dataset into ``out_dir`` (replacing it)."""
+    with writer_lock(out_dir):
+        return _build(dataset_path, out_dir)
+
+
+def _build(dataset_path: str, out_dir: str) -> SynergyStore:
+    # Caller holds writer_lock(out_dir).
+    store = SynergyStore.from_jsonl(dataset_path)
+    staging = staging_dir(out_dir)
+    try:
+        store.save(staging)
+        swap_into_place(staging, out_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return store
+
+
+def stale(dataset_path: str, directory: str) -> bool:
+    """True when ``directory`` holds no store, one older than the dataset or
+    one written by another ``STORE_VERSION``."""
+    meta = os.path.join(directory, "meta.json")
+    if not os.path.exists(meta):
+        return True
+    with open(meta, encoding="utf-8") as fh:
+        if json.load(fh).get("version") != STORE_VERSION:
+            return True
+    return os.path.exists(dataset_path) and os.path.getmtime(dataset_path) > os.path.getmtime(meta)
+
+
+def open_store(dataset_path: str, directory: str) -> SynergyStore:
+    """Load the store in ``directory``, rebuilding it first if it is stale.
+
+    Processes racing on a stale store rebuild it once; the rest wait for
+    the lock and load the result.
+    """
+    if stale(dataset_path, directory):
+        with writer_lock(directory):
+            if stale(dataset_path, directory):
+                return _build(dataset_path, directory)
+    return SynergyStore.load(directory)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "build":
+        print("usage: python synergy_store.py build <synergy_dataset.jsonl> <out_dir>")
+        sys.exit(2)
+    built = build(sys.argv[2], sys.argv[3])
+    print(f"Wrote {len(built)} pairs for {len(built.commanders)} commanders to {sys.argv[3]}")
@@ -0,0 +1,66 @@
+"""
+Shared setup for the engine tests.
+
+The engine modules are imported from the directory above.  The
+replacement engine keeps its database and every cache built from it in
+module globals; `engine_state` puts them back after each test, so a test
+may swap in its own database or tables by plain assignment.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ENGINE_DIR not in sys.path:
+    sys.path.insert(0, ENGINE_DIR)
+
+import replacement_engine  # noqa: E402
+
+_STATE = [name for name in vars(replacement_engine) if name.lstrip("_")[:1].isupper() and name.lstrip("_").isupper()]
+
+
+@pytest.fixture(autouse=True)
+def engine_state():
+    saved = {name: getattr(replacement_engine, name) for name in _STATE}
+    yield
+    for name, value in saved.items():
+        setattr(replacement_engine, name, value)
+
+
+@pytest.fixture
+def engine():
+    return replacement_engine
+
+
+def card(colours, price, roles, banned=(), oracle_id=None):
+    return {
+        "oracle_id": oracle_id,
+        "color_identity": list(colours),
+        "price_gbp": price,
+        "banned_in": list(banned),
+        "roles": list(roles),
+    }
+
+
+@pytest.fixture
+def small_database(engine):
+    # No name is on the bundled banlist, so bans come only from banned_in.
+    database = {
+        "Cheap Rock": card("", 0.5, ["Ramp"], oracle_id="rock"),
+        "Green Ramp": card("G", 1.0, ["Ramp"], oracle_id="green"),
+        "Blue Draw": card("U", 2.0, ["Draw"], oracle_id="blue"),
+        "Mid Rock": card("", 8.0, ["Ramp", "Fixing"], oracle_id="mid"),
+        "Banned Rock": card("", 0.1, ["Ramp"], banned=["Commander", "Modern"], oracle_id="banned"),
+        "Pricey Rock": card("", 40.0, ["Ramp"], oracle_id="pricey"),
+        "Red Ramp": card("R", 3.0, ["Ramp", "Combo Piece"], oracle_id="red"),
+        "Plain Land": card("", 0.0, [], oracle_id="land"),
+    }
+    engine.CARD_DATABASE = database
+    engine.PRICE_TABLE = {}
+    engine._SYNERGY = engine.SynergyTable({})
+    engine.rebuild_index()
+    return database
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from test_card_index import FORMATS, synthetic_database
+
+
+@pytest.fixture
+def synthetic(engine):
+    engine.CARD_DATABASE = database = synthetic_database(500, seed=5)
+    engine.PRICE_TABLE = {"MagicMadhouse": {name: data["price_gbp"] for name, data in database.items()}}
+    engine.rebuild_index()
+    return database
+
+
+def random_decks(database, count, seed):
+    rng = random.Random(seed)
+    names = list(database)
+    return [
+        {
+            "fmt": rng.choice(FORMATS),
+            "budget_gbp": rng.choice([1.0, 5.0, 20.0]),
+            "persona": rng.choice(["Budget Brewer", "Combo Johnny", "Nobody"]),
+            "color_identity": rng.sample("WUBRG", rng.randint(1, 3)),
+            "decklist": [{"card_name": n, "qty": 1} for n in rng.sample(names, 30)],
+            "owned_cards": rng.sample(names, 10),
+        }
+        for _ in range(count)
+    ]
+
+
+def test_vectorised_analysis_matches_the_per_card_loop(engine, synthetic):
+    for deck in random_decks(synthetic, 10, seed=1):
+        assert engine.analyse_deck(vectorized=True, **deck) == engine.analyse_deck(**deck)
+
+
+def test_batch_analysis_matches_one_deck_at_a_time(engine, synthetic):
+    decks = random_decks(synthetic, 12, seed=2)
+    memo = engine.ReplacementMemo()
+    assert engine.analyse_decks(decks, memo=memo) == [engine.analyse_deck(**deck) for deck in decks]
+    assert memo.hits > 0 and memo.misses == len(memo)
+
+
+@pytest.mark.parametrize("persona, commander", [(None, None), ("Combo Johnny", None)])
+def test_memo_results_equal_direct_calls(engine, synthetic, persona, commander):
+    memo = engine.ReplacementMemo(maxsize=8)
+    rng = random.Random(3)
+    names = list(synthetic)
+    for _ in range(200):
+        name = rng.choice(names)
+        args = (name, rng.choice(FORMATS), rng.choice([1.0, 50.0]), rng.sample("WUBRG", rng.randint(1, 3)))
+        expected = engine.propose_replacements(*args, commander=commander, persona=persona)
+        assert memo.replacements(*args, commander=commander, persona=persona) == expected
+    assert len(memo) <= 8
+
+
+def test_memo_hands_out_copies(engine, synthetic):
+    memo = engine.ReplacementMemo()
+    name = next(iter(synthetic))
+    first = memo.replacements(name, "Commander", 5.0, "WUBRG")
+    first[0]["price"]["GBP"] = -1
+    first.clear()
+    assert memo.replacements(name, "Commander", 5.0, "WUBRG") == engine.propose_replacements(
+        name, "Commander", 5.0, "WUBRG"
+    )
+    assert memo.hits == 1
+
+
+def test_memo_empties_when_the_index_is_rebuilt(engine, synthetic):
+    memo = engine.ReplacementMemo()
+    name = next(iter(synthetic))
+    memo.replacements(name, "Commander", 5.0, "WUBRG")
+    for entry in synthetic.values():
+        entry["price_gbp"] = 0.01
+    engine.rebuild_index()
+    assert memo.replacements(name, "Commander", 5.0, "WUBRG") == engine.propose_replacements(
+        name, "Commander", 5.0, "WUBRG"
+    )
+    assert (memo.hits, len(memo)) == (0, 1)
+
+
+def test_process_pool_matches_in_process(engine, synthetic):
+    # Forked workers inherit the synthetic database.
+    decks = random_decks(synthetic, 6, seed=4)
+    assert engine.analyse_decks(decks, processes=2, chunk_size=2) == engine.analyse_decks(decks)
+
+
+def test_analyse_deck_reports_violations_and_costs(engine):
+    deck = [{"card_name": "Mana Crypt", "qty": 1}, {"card_name": "Island", "qty": 2}]
+    report = engine.analyse_deck("Commander", 5.0, "Budget Brewer", ["U", "R"], deck, split_basket=True)
+    assert [v["original_card"] for v in report["violations"]] == ["Mana Crypt"]
+    assert report["violations"][0]["issue"] == "Price, Format"
+    assert report["notes"].startswith("Budget Brewer persona")
+    assert report["split_basket"]["currency"] == "GBP"
+    assert "split_basket" not in engine.analyse_deck("Commander", 5.0, "Nobody", ["U"], deck)
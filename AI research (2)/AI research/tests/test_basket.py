@@ -0,0 +1,129 @@
+import itertools
+import random
+
+import pytest
+
+import basket
+from basket import Shipping, missing_cards, normalise_prices, solve_basket
+
+
+def brute_force(cards, prices, shipping):
+    markets = list(prices)
+    best = float("inf")
+    priced = [(name, qty) for name, qty in cards if any(name in prices[m] for m in markets)]
+    for assign in itertools.product(range(len(markets)), repeat=len(priced)):
+        subtotal = [0.0] * len(markets)
+        for (name, qty), k in zip(priced, assign):
+            price = prices[markets[k]].get(name)
+            if price is None:
+                break
+            subtotal[k] += price * qty
+        else:
+            total = sum(subtotal)
+            for k, market in enumerate(markets):
+                terms = shipping.get(market, Shipping())
+                if subtotal[k] > 0 and (terms.free_over is None or subtotal[k] < terms.free_over):
+                    total += terms.cost
+            best = min(best, total)
+    return best
+
+
+def random_instance(rng, n_cards, n_markets):
+    markets = [f"M{k}" for k in range(n_markets)]
+    cards = [(f"Card {i}", rng.choice([1, 1, 2, 4])) for i in range(n_cards)]
+    prices = {
+        m: {name: round(rng.uniform(0.1, 12.0), 2) for name, _q in cards if rng.random() < 0.8}
+        for m in markets
+    }
+    shipping = {
+        m: Shipping(round(rng.uniform(0.5, 5.0), 2), rng.choice([None, 10.0, 25.0, 40.0]))
+        for m in markets
+    }
+    return cards, prices, shipping
+
+
+def check_basket(result, cards, prices, shipping):
+    lines = result["lines"]
+    assert [line["card_name"] for line in lines] + result["unpriced"] == [
+        name for name, _q in cards if any(name in p for p in prices.values())
+    ] + [name for name, _q in cards if not any(name in p for p in prices.values())]
+    for line in lines:
+        assert line["card_name"] in prices[line["market"]]
+    assert result["total"] == pytest.approx(result["items_total"] + result["shipping_total"], abs=0.011)
+    assert result["lower_bound"] <= result["total"] + 1e-9
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_small_baskets_are_solved_exactly(seed):
+    rng = random.Random(seed)
+    cards, prices, shipping = random_instance(rng, rng.randint(1, 7), rng.randint(1, 4))
+    result = solve_basket(cards, prices, shipping)
+    check_basket(result, cards, prices, shipping)
+    assert result["optimal"] and result["gap"] == 0
+    if result["lines"]:
+        assert result["total"] == pytest.approx(brute_force(cards, prices, shipping), abs=0.011)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_the_heuristic_brackets_the_optimum(seed, monkeypatch):
+    monkeypatch.setattr(basket, "EXACT_ASSIGNMENTS", 1)
+    rng = random.Random(100 + seed)
+    cards, prices, shipping = random_instance(rng, rng.randint(2, 7), rng.randint(2, 4))
+    result = solve_basket(cards, prices, shipping)
+    check_basket(result, cards, prices, shipping)
+    if result["lines"]:
+        best = brute_force(cards, prices, shipping)
+        assert result["lower_bound"] - 0.011 <= best <= result["total"] + 0.011
+        assert result["gap"] == pytest.approx(max(0.0, result["total"] - result["lower_bound"]), abs=0.011)
+
+
+def test_free_shipping_can_beat_the_cheapest_prices():
+    prices = {"Far": {"A": 5.0, "B": 5.0}, "Near": {"A": 6.0, "B": 6.0}}
+    shipping = {"Far": Shipping(10.0), "Near": Shipping(3.0, free_over=12.0)}
+    result = solve_basket([("A", 1), ("B", 1)], prices, shipping)
+    assert {line["market"] for line in result["lines"]} == {"Near"}
+    assert (result["total"], result["shipping_total"]) == (12.0, 0.0)
+
+
+def test_unpriced_cards_and_empty_inputs():
+    result = solve_basket([("A", 1), ("Ghost", 2)], {"M": {"A": 1.0}})
+    assert result["unpriced"] == ["Ghost"] and result["total"] == 1.0
+    assert solve_basket([], {"M": {}})["total"] == 0.0
+    assert solve_basket([("A", 1)], {})["unpriced"] == ["A"]
+
+
+def test_too_many_markets():
+    with pytest.raises(ValueError):
+        solve_basket([("A", 1)], {f"M{k}": {"A": 1.0} for k in range(basket.MAX_MARKETS + 1)})
+
+
+def test_normalise_prices_converts_and_drops_unknown_currencies():
+    prices, terms = normalise_prices(
+        {"US": {"A": 2.0, "B": None}, "EU": {"A": 1.0}, "XX": {"A": 1.0}},
+        {"US": "USD", "EU": "EUR", "XX": "XYZ"},
+        {"USD": 0.5, "EUR": 0.8},
+        {"US": Shipping(4.0, 40.0)},
+    )
+    assert prices == {"US": {"A": 1.0}, "EU": {"A": 0.8}}
+    assert terms == {"US": Shipping(2.0, 20.0), "EU": Shipping()}
+
+
+def test_missing_cards_merges_duplicates_and_skips_owned():
+    deck = [{"card_name": "A", "qty": 2}, {"card_name": "B"}, {"card_name": "A"}, {"card_name": "C", "qty": 1}]
+    assert missing_cards(deck, ["C"]) == [("A", 3), ("B", 1)]
+
+
+def test_engine_cost_to_finish(engine):
+    deck = [{"card_name": "Sol Ring", "qty": 1}, {"card_name": "Arcane Signet", "qty": 1},
+            {"card_name": "Island", "qty": 1}]
+    totals, best = engine.compute_cost_to_finish(deck, ["Island"], engine.PRICE_TABLE)
+    assert {t["market"] for t in totals} == set(engine.PRICE_TABLE)
+    assert best["total_gbp"] == min(t["total_gbp"] for t in totals if not t["missing_cards"])
+    split = engine.compute_split_basket(deck, ["Island"], engine.PRICE_TABLE)
+    assert split["currency"] == "GBP" and split["optimal"]
+    assert {line["card_name"] for line in split["lines"]} == {"Sol Ring", "Arcane Signet"}
+    # Buying everything from the best single market is one possible split.
+    cost, free_over = engine.MARKET_SHIPPING[best["market"]]
+    rate = engine.FX_TO_GBP[best["currency"]]
+    single = best["total_gbp"] + (cost * rate if free_over is None or best["total"] < free_over else 0.0)
+    assert split["total"] <= single + 0.01
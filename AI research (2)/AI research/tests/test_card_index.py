@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from card_index import CardIndex, colour_mask
+
+FORMATS = ["Commander", "Modern", "Legacy", "Vintage", "Pauper", "Standard"]
+ROLES = ["Ramp", "Draw", "Removal", "Fixing", "Protection", "Combo Piece", "Utility"]
+
+
+def synthetic_database(n, seed=7):
+    rng = random.Random(seed)
+    return {
+        f"Card {i}": {
+            "oracle_id": f"oid-{i}",
+            "color_identity": rng.sample("WUBRG", rng.choice([0, 1, 1, 2, 3])),
+            "price_gbp": round(rng.lognormvariate(0.3, 1.3), 2),
+            "banned_in": rng.sample(FORMATS, rng.choice([0, 0, 1, 3])),
+            "roles": rng.sample(ROLES, rng.choice([1, 1, 2, 3])),
+        }
+        for i in range(n)
+    }
+
+
+def linear_candidates(database, roles, fmt, deck_colours, max_price=float("inf"), exclude=None):
+    """The scan the index replaces: filter everything, then sort by price."""
+    names = list(database)
+    matches = [
+        i for i, name in enumerate(names)
+        if name != exclude
+        and set(database[name]["roles"]) & set(roles)
+        and fmt not in database[name]["banned_in"]
+        and set(database[name]["color_identity"]) <= set(deck_colours)
+        and database[name]["price_gbp"] <= max_price
+    ]
+    return sorted(matches, key=lambda i: (database[names[i]]["price_gbp"], i))
+
+
+def test_colour_mask():
+    assert colour_mask([]) == 0
+    assert colour_mask("WUBRG") == 0b11111
+    assert colour_mask(["g", " U", "Green", "X"]) == colour_mask("UG") == 0b10010
+
+
+def test_candidates_are_filtered_and_cheapest_first(small_database):
+    index = CardIndex(small_database)
+    names = lambda positions: [index.names[i] for i in positions]  # noqa: E731
+    assert names(index.candidates(["Ramp"], "Commander", colour_mask("G"))) == [
+        "Cheap Rock", "Green Ramp", "Mid Rock", "Pricey Rock",
+    ]
+    assert names(index.candidates(["Ramp"], "Vintage", colour_mask("G"), max_price=1.0)) == [
+        "Banned Rock", "Cheap Rock", "Green Ramp",
+    ]
+    assert names(index.candidates(["Draw"], "Commander", colour_mask("G"))) == []
+
+
+def test_cards_with_several_shared_roles_appear_once(small_database):
+    index = CardIndex(small_database)
+    found = list(index.candidates(["Ramp", "Fixing", "Combo Piece"], "Commander", colour_mask("R")))
+    assert len(found) == len(set(found))
+    assert [index.names[i] for i in found] == ["Cheap Rock", "Red Ramp", "Mid Rock", "Pricey Rock"]
+
+
+def test_exclude_and_is_banned(small_database):
+    index = CardIndex(small_database)
+    cheap = index.position["Cheap Rock"]
+    assert cheap not in index.candidates(["Ramp"], "Commander", 0, exclude=cheap)
+    banned = index.position["Banned Rock"]
+    assert index.is_banned(banned, "Modern") and not index.is_banned(banned, "Legacy")
+    assert index.banned_bitset("Legacy") == bytearray()
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_candidates_match_a_linear_scan(seed):
+    database = synthetic_database(400, seed)
+    index = CardIndex(database)
+    rng = random.Random(seed)
+    for _ in range(50):
+        roles = rng.sample(ROLES, rng.choice([1, 2]))
+        fmt = rng.choice(FORMATS)
+        colours = rng.sample("WUBRG", rng.randint(0, 5))
+        bound = rng.choice([0.5, 2.0, 10.0, float("inf")])
+        exclude = rng.choice(list(database))
+        got = list(index.candidates(roles, fmt, colour_mask(colours), bound, index.position[exclude]))
+        assert got == linear_candidates(database, roles, fmt, colours, bound, exclude)
+
+
+def test_index_notices_added_cards(engine, small_database):
+    index = engine.get_index()
+    assert engine.get_index() is index
+    small_database["Another Rock"] = {"color_identity": [], "price_gbp": 0.2, "banned_in": [], "roles": ["Ramp"]}
+    assert engine.get_index() is not index
+    assert "Another Rock" in engine.get_index().position
+
+
+def test_propose_replacements_fills_tiers_in_price_order(engine, small_database):
+    suggestions = engine.propose_replacements("Cheap Rock", "Commander", 5.0, ["G"])
+    assert [(s["card_name"], s["tier"]) for s in suggestions] == [
+        ("Green Ramp", "Budget"), ("Mid Rock", "Mid"), ("Pricey Rock", "Premium"),
+    ]
+    first = suggestions[0]
+    assert first["oracle_id"] == "green" and first["price"] == {"GBP": 1.0} and first["roles"] == ["Ramp"]
+    assert len(first["reason"].split()) < 25
+    assert "synergy" not in first and "score" not in first
+    assert engine.propose_replacements("Cheap Rock", "Commander", 5.0, ["G"], max_suggestions=1) == suggestions[:1]
+
+
+def test_unknown_cards_are_replaced_as_utility(engine, small_database):
+    assert engine.propose_replacements("Nothing Like It", "Commander", 5.0, "WUBRG") == []
+
+
+def test_propose_replacements_matches_a_linear_scan(engine):
+    engine.CARD_DATABASE = database = synthetic_database(600, seed=11)
+    engine.rebuild_index()
+    rng = random.Random(11)
+    for name in rng.sample(list(database), 40):
+        fmt = rng.choice(FORMATS)
+        colours = rng.sample("WUBRG", rng.randint(1, 5))
+        expected, chosen = [], set()
+        for tier, bound in engine.DEFAULT_TIERS:
+            for i in linear_candidates(database, database[name]["roles"], fmt, colours, bound, name):
+                if len(expected) < 5 and i not in chosen:
+                    chosen.add(i)
+                    expected.append((f"Card {i}", tier))
+        got = engine.propose_replacements(name, fmt, 5.0, colours)
+        assert [(s["card_name"], s["tier"]) for s in got] == expected
@@ -0,0 +1,164 @@
+import json
+import random
+import string
+
+import pytest
+
+from card_names import (FOLDED_CONFIDENCE, FUZZY_MAX_CONFIDENCE, VARIANT_CONFIDENCE, NameNormalizer, Resolution,
+                        fold, max_edits, osa_distance, read_records, strip_annotations)
+
+NAMES = ["Lightning Bolt", "Sensei's Divining Top", "Counterspell", "Forest", "Fire // Ice", "Cyclonic Rift",
+         "Æther Vial", "Llanowar Elves", "Birds of Paradise", "Swords to Plowshares", "Sword of Fire and Ice"]
+ALIASES = [{"alias": "L. Bolt", "normalized_name": "Lightning Bolt", "confidence": 0.8},
+           {"alias": "SDT", "normalized_name": "Sensei's Divining Top"},
+           {"alias": "Counterspell", "normalized_name": "Mana Leak", "confidence": 0.9},
+           {"alias": "", "normalized_name": "Nothing"}]
+CONFUSIONS = [{"alias": "Llanowar Elves", "variant": "Elvish Mystic"},
+              {"alias": "Forest", "variant": "Forest (Full Art)"},
+              {"alias": "Counterspell", "variant": "Counter Spell"}]
+
+
+@pytest.fixture
+def normalizer():
+    return NameNormalizer(NAMES, ALIASES, CONFUSIONS)
+
+
+def osa(a, b):
+    """Unbounded optimal string alignment distance, straight from the recurrence."""
+    d = [[i + j if not i * j else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def typo(rng, word):
+    i = rng.randrange(len(word))
+    edit = rng.choice("dist")
+    if edit == "d":
+        return word[:i] + word[i + 1:]
+    if edit == "i":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    if edit == "s":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    return word[:i] + word[i + 1:i + 2] + word[i] + word[i + 2:] if i + 1 < len(word) else word
+
+
+@pytest.mark.parametrize("name, key", [
+    ("Sensei’s Divining-Top", "senseisdiviningtop"),
+    ("Æther Vial", "aethervial"),
+    ("Lim-Dûl's Vault", "limdulsvault"),
+    ("  SKULL clamp ", "skullclamp"),
+    ("", ""),
+    (None, ""),
+])
+def test_fold(name, key):
+    assert fold(name) == key
+
+
+@pytest.mark.parametrize("name, bare", [
+    ("Sol Ring (CMR) 472", "Sol Ring"),
+    ("Forest (Full Art)", "Forest"),
+    ("Counterspell [PLST] (Foil)", "Counterspell"),
+    ("Sol Ring ^Have,#37d67a^", "Sol Ring"),
+    ("(Full Art)", "(Full Art)"),
+    ("Ponder", "Ponder"),
+])
+def test_strip_annotations(name, bare):
+    assert strip_annotations(name) == bare
+
+
+def test_osa_distance_matches_the_recurrence():
+    rng = random.Random(1)
+    for _ in range(2000):
+        a = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 8)))
+        limit = rng.randint(0, 3)
+        assert osa_distance(a, b, limit) == min(osa(a, b), limit + 1), (a, b, limit)
+
+
+def test_max_edits():
+    assert [max_edits("x" * n) for n in (7, 8, 13, 14)] == [0, 1, 1, 2]
+
+
+def test_rules(normalizer):
+    assert normalizer.resolve("Lightning Bolt") == Resolution("Lightning Bolt", 1.0, "exact")
+    assert normalizer.resolve(" lightning  BOLT") == Resolution("Lightning Bolt", FOLDED_CONFIDENCE, "folded")
+    assert normalizer.resolve("aether vial") == Resolution("Æther Vial", FOLDED_CONFIDENCE, "folded")
+    assert normalizer.resolve("L. Bolt") == Resolution("Lightning Bolt", 0.8, "alias")
+    assert normalizer.resolve("sdt") == Resolution("Sensei's Divining Top", 0.8, "alias")
+    assert normalizer.resolve("Counter Spell") == Resolution("Counterspell", FOLDED_CONFIDENCE, "folded")
+    assert normalizer.resolve("Forest (Full Art)") == Resolution("Forest", VARIANT_CONFIDENCE, "variant")
+    assert normalizer.resolve("L. Bolt (M11) 149") == Resolution("Lightning Bolt", 0.8, "variant")
+    assert normalizer.resolve("Fire") == Resolution("Fire", 0.0, "unknown")
+    assert normalizer.resolve("Fire // Ice") == Resolution("Fire // Ice", 1.0, "exact")
+    assert normalizer.resolve("Lightning Bolt // Nope") == Resolution("Lightning Bolt", VARIANT_CONFIDENCE, "variant")
+    assert normalizer.resolve("Cyclonic Rfit") == Resolution("Cyclonic Rift", FUZZY_MAX_CONFIDENCE, "fuzzy")
+    assert normalizer.resolve("Nothing Like It") == Resolution("Nothing Like It", 0.0, "unknown")
+
+
+def test_known_names_win_over_aliases_and_confusions(normalizer):
+    # A known name is never an alias of another card ...
+    assert normalizer.resolve("Counterspell") == Resolution("Counterspell", 1.0, "exact")
+    # ... and distinct cards listed as confusions are both known.
+    assert normalizer.resolve("Elvish Mystic") == Resolution("Elvish Mystic", 1.0, "exact")
+    assert normalizer.resolve("Llanowar Elves").name == "Llanowar Elves"
+    assert "forestfullart" not in normalizer.table and len(normalizer) == len(NAMES) + 3
+
+
+def test_close_ties_stay_unresolved():
+    normalizer = NameNormalizer(["Sword of Fire", "Sword of Fire and Ice", "Sword of Fira"])
+    assert normalizer.resolve("Sword of Fir").rule == "unknown"
+    assert normalizer.resolve("Sword of Fire and Ic") == Resolution("Sword of Fire and Ice", 0.9, "fuzzy")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_one_edit_typos_match_a_brute_force_search(seed):
+    rng = random.Random(seed)
+    names = ["".join(rng.choice("abcde ") for _ in range(rng.randint(6, 18))).strip() or "x" for _ in range(300)]
+    normalizer = NameNormalizer(names)
+    keys = normalizer.table
+    for _ in range(400):
+        key = typo(rng, fold(rng.choice(names)))
+        if key in keys or not max_edits(key):
+            continue
+        # osa_distance is checked against the recurrence above; bounded, it keeps this scan fast.
+        distance = {k: osa_distance(key, k, 1) for k in keys if max_edits(k)}
+        best = min(distance.values(), default=99)
+        if best != 1:
+            continue
+        targets = {keys[k][0] for k, d in distance.items() if d == 1}
+        got = normalizer.resolve(key)
+        if len(targets) == 1:
+            assert got == Resolution(targets.pop(), round(min(FUZZY_MAX_CONFIDENCE, 1 - 1 / len(key)), 3), "fuzzy")
+        else:
+            assert got.rule == "unknown"
+
+
+def test_load_and_read_records(tmp_path):
+    (tmp_path / "aliases.jsonl").write_text(json.dumps(ALIASES[0]) + "\n\n")
+    (tmp_path / "confusions.json").write_text(json.dumps(CONFUSIONS))
+    (tmp_path / "cards.csv").write_text("card_name,other\nLightning Bolt,x\n\n Sol Ring ,y\n")
+    (tmp_path / "meta.json").write_text(json.dumps([{"commander_name": "Atraxa", "top_cards": [{"card_name": "Sol Ring"}]},
+                                                   "not a row"]))
+    (tmp_path / "object.json").write_text(json.dumps({"card_name": "Ignored"}))
+    assert read_records(str(tmp_path / "object.json")) == []
+    sources = [str(tmp_path / f) for f in ("cards.csv", "meta.json", "object.json", "missing.jsonl")]
+    normalizer = NameNormalizer.load(str(tmp_path / "aliases.jsonl"), str(tmp_path / "confusions.json"), sources)
+    assert {v[0] for v in normalizer.table.values()} == {"Lightning Bolt", "Sol Ring", "Atraxa", "Llanowar Elves",
+                                                         "Elvish Mystic", "Forest", "Counterspell"}
+    assert normalizer.resolve("l. bolt").rule == "alias"
+    empty = NameNormalizer.load(str(tmp_path / "none.jsonl"), str(tmp_path / "none.json"), ())
+    assert len(empty) == 0 and empty.resolve("Sol Ring") == Resolution("Sol Ring", 0.0, "unknown")
+
+
+def test_bundled_datasets():
+    normalizer = NameNormalizer.load()
+    assert normalizer.resolve("L. Bolt").name == "Lightning Bolt"
+    assert normalizer.resolve("Counter Spell").name == "Counterspell"
+    assert normalizer.resolve("Sol Ring (CMR) 472") == Resolution("Sol Ring", VARIANT_CONFIDENCE, "variant")
+    assert normalizer.resolve("Cyclonic Rfit").name == "Cyclonic Rift"
+    for variant in ("Elvish Mystic", "Noble Hierarch", "Damnation"):
+        assert normalizer.resolve(variant) == Resolution(variant, 1.0, "exact")
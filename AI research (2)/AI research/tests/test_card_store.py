@@ -0,0 +1,133 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from card_index import colour_mask
+from card_store import SCRYFALL_MARKETS, CardStore, build, classify_roles
+
+BULK = [
+    {
+        "name": "Sol Ring", "oracle_id": "oid-sol", "color_identity": [], "type_line": "Artifact",
+        "oracle_text": "{T}: Add {C}{C}.", "legalities": {"commander": "legal", "vintage": "restricted"},
+        "prices": {"usd": "2.00", "eur": "1.50", "usd_foil": None, "tix": ""},
+    },
+    {
+        "name": "Sol Ring", "oracle_id": "oid-sol", "color_identity": [], "type_line": "Artifact",
+        "oracle_text": "{T}: Add {C}{C}.", "legalities": {"commander": "legal"},
+        "prices": {"usd": "1.00", "eur": "3.00", "usd_foil": "9.00"},
+    },
+    {
+        "name": "Fire // Ice", "card_faces": [
+            {"oracle_id": "oid-fire", "oracle_text": "Fire deals 2 damage to any target."},
+            {"oracle_text": "Tap target permanent. Draw a card."},
+        ],
+        "color_identity": ["R", "U"], "type_line": "Instant // Instant",
+        "legalities": {"commander": "legal", "modern": "legal"}, "prices": {"eur": "0.40"},
+    },
+    {"name": "Soldier", "oracle_id": "oid-token", "layout": "token"},
+    {"name": "No Oracle"},
+]
+
+
+@pytest.fixture
+def bulk_store():
+    return CardStore.from_bulk(BULK, usd_to_gbp=0.5, eur_to_gbp=1.0)
+
+
+@pytest.mark.parametrize("type_line, text, roles", [
+    ("Artifact", "{T}: Add {C}{C}.", ["Ramp"]),
+    ("Sorcery", "Destroy target creature. Draw a card.", ["Draw", "Removal"]),
+    ("Land", "{T}: Add {W} or {U}.", ["Fixing"]),
+    ("Creature", "Flying", ["Utility"]),
+])
+def test_classify_roles(type_line, text, roles):
+    assert classify_roles(type_line, text) == roles
+
+
+def test_from_bulk_merges_printings_and_skips_tokens(bulk_store):
+    assert bulk_store.names == ["Sol Ring", "Fire // Ice"]
+    sol = bulk_store["Sol Ring"]
+    assert sol["oracle_id"] == "oid-sol" and sol["roles"] == ["Ramp"]
+    # Cheapest price per market across printings; GBP from USD when known.
+    row = dict(zip((m[0] for m in SCRYFALL_MARKETS), bulk_store.prices[0].tolist()))
+    assert (row["TCGplayer"], row["Cardmarket"], row["TCGplayer Foil"]) == (1.0, 1.5, 9.0)
+    assert sol["price_gbp"] == 0.5
+    assert math.isnan(row["MTGO"])
+    assert "Commander" not in sol["banned_in"] and "Modern" in sol["banned_in"]
+
+
+def test_split_cards_are_found_by_their_front_face(bulk_store):
+    assert "Fire" in bulk_store and bulk_store["Fire"] == bulk_store["Fire // Ice"]
+    fire = bulk_store["Fire"]
+    assert fire["color_identity"] == ["U", "R"] and fire["price_gbp"] == pytest.approx(0.4)
+    assert set(fire["roles"]) == {"Draw", "Removal"}
+
+
+def test_save_and_load_round_trip(bulk_store, tmp_path):
+    bulk_store.save(str(tmp_path))
+    for mmap in (True, False):
+        loaded = CardStore.load(str(tmp_path), mmap=mmap)
+        assert loaded.names == bulk_store.names
+        assert {name: loaded[name] for name in ("Sol Ring", "Fire")} == {
+            name: bulk_store[name] for name in ("Sol Ring", "Fire")
+        }
+        np.testing.assert_array_equal(loaded.prices, bulk_store.prices)
+
+
+def test_load_rejects_other_versions(bulk_store, tmp_path):
+    bulk_store.save(str(tmp_path))
+    meta = tmp_path / "meta.json"
+    meta.write_text(json.dumps(dict(json.loads(meta.read_text()), version=99)))
+    with pytest.raises(ValueError):
+        CardStore.load(str(tmp_path))
+
+
+def test_build_from_an_mtgjson_dump(tmp_path):
+    dump = tmp_path / "AtomicCards.json"
+    dump.write_text(json.dumps({"data": {"Counterspell": [{
+        "identifiers": {"scryfallOracleId": "oid-counter"}, "colorIdentity": ["U"], "type": "Instant",
+        "text": "Counter target spell.", "legalities": {"Commander": "Legal", "Standard": "Not_legal"},
+    }]}}))
+    built = build(str(dump), str(tmp_path / "store"))
+    loaded = CardStore.load(str(tmp_path / "store"))
+    assert loaded["Counterspell"] == built["Counterspell"]
+    assert loaded["Counterspell"]["roles"] == ["Control"]
+    assert "Standard" in loaded["Counterspell"]["banned_in"]
+
+
+def test_from_database_keeps_entries_and_prices(engine):
+    store = CardStore.from_database(engine.CARD_DATABASE, engine.PRICE_TABLE)
+    assert CardStore.from_database(store) is store
+    for name, entry in engine.CARD_DATABASE.items():
+        got = store[name]
+        assert got["price_gbp"] == pytest.approx(entry["price_gbp"])
+        assert set(got["color_identity"]) == set(entry["color_identity"])
+        assert set(got["banned_in"]) == set(entry["banned_in"]) and set(got["roles"]) == set(entry["roles"])
+    table = store.price_table()
+    for market, prices in engine.PRICE_TABLE.items():
+        assert dict(table[market]) == pytest.approx(prices)
+    assert store.market_currencies()["TCGplayer"] == "USD"
+
+
+def test_violation_masks_match_the_per_card_helpers(engine):
+    store = CardStore.from_database(engine.CARD_DATABASE)
+    names = list(engine.CARD_DATABASE) + ["Unknown Card"]
+    rows = store.indices(names)
+    assert rows[-1] == -1
+    deck = ["G", "U"]
+    over, banned, off = store.violation_masks(rows, "Commander", 5.0, colour_mask(deck))
+    for i, name in enumerate(names):
+        assert over[i] == (not engine.within_budget(name, 5.0))
+        assert banned[i] == (name in engine.CARD_DATABASE and "Commander" in engine.CARD_DATABASE[name]["banned_in"])
+        assert off[i] == (not engine.color_identity_ok(name, deck))
+
+
+def test_engine_can_run_from_a_loaded_store(engine, tmp_path):
+    CardStore.from_database(engine.CARD_DATABASE, engine.PRICE_TABLE).save(str(tmp_path))
+    expected = engine.propose_replacements("Sol Ring", "Commander", 5.0, ["U"])
+    engine.load_card_database(str(tmp_path))
+    assert isinstance(engine.CARD_DATABASE, CardStore)
+    got = engine.propose_replacements("Sol Ring", "Commander", 5.0, ["U"])
+    assert [s["card_name"] for s in got] == [s["card_name"] for s in expected]
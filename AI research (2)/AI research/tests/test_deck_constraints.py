@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+FORMATS = ["Commander", "Modern", "Legacy", "Vintage", "Pauper", "Standard"]
+
+
+def per_card(engine, names, fmt, budget, colours, quantities=None):
+    quantities = quantities or [1] * len(names)
+    return [engine.check_card_constraints(n, fmt, budget, colours, q) for n, q in zip(names, quantities)]
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+@pytest.mark.parametrize("colours", [[], ["U"], ["R", "G"], list("WUBRG")])
+def test_deck_check_matches_the_per_card_check(engine, fmt, colours):
+    names = list(engine.CARD_DATABASE) + ["Black Lotus", "Not A Real Card"]
+    quantities = [2 if i % 3 == 0 else 1 for i in range(len(names))]
+    got = engine.check_deck_constraints(names, fmt, 5.0, colours, quantities)
+    assert got == per_card(engine, names, fmt, 5.0, colours, quantities)
+
+
+def test_restricted_cards_only_violate_above_the_copy_limit(engine):
+    assert engine.check_deck_constraints(["Sol Ring"], "Vintage", 5.0, [], [1]) == [[]]
+    assert engine.check_deck_constraints(["Sol Ring"], "Vintage", 5.0, [], [2]) == [["Restricted"]]
+    assert engine.check_deck_constraints(["Mana Crypt"], "Commander", 5.0, ["G"]) == [["Price", "Format"]]
+
+
+def test_a_price_equal_to_the_budget_is_not_a_violation(engine):
+    price = engine.CARD_DATABASE["Arcane Signet"]["price_gbp"]
+    assert engine.check_deck_constraints(["Arcane Signet"], "Commander", price, []) == [[]]
+
+
+def test_many_decks_with_different_colours_in_one_pass(engine):
+    rng = random.Random(3)
+    names = list(engine.CARD_DATABASE) + ["Unknown"]
+    decks = [rng.sample(names, rng.randint(0, len(names))) for _ in range(20)]
+    colours = [rng.sample("WUBRG", rng.randint(0, 5)) for _ in decks]
+    quantities = [[rng.choice([1, 1, 2]) for _ in deck] for deck in decks]
+    got = engine.check_decks_constraints(decks, "Vintage", 3.0, colours, quantities)
+    assert got == [
+        per_card(engine, deck, "Vintage", 3.0, c, q) for deck, c, q in zip(decks, colours, quantities)
+    ]
+
+
+def test_deck_check_follows_a_replaced_database(engine, small_database):
+    names = list(small_database)
+    assert engine.check_deck_constraints(names, "Modern", 2.0, ["U"]) == per_card(engine, names, "Modern", 2.0, ["U"])
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+import eval_harness
+from eval_harness import (
+    ERROR, FAIL, PASS, SKIPPED, CaseResult, iter_run_cases, load_cases, regressions, report, run_case,
+)
+
+
+def case(id, kind, input, expected):
+    return {"id": id, "type": kind, "input": input, "expected_output": expected}
+
+
+@pytest.fixture(scope="module")
+def bundled():
+    return load_cases()
+
+
+def test_statuses(engine):
+    keep = case("case_1", "mulligan_advice", {"hand": ["Island", "Island", "Bolt"]}, {"keep": True})
+    assert run_case(keep).status == PASS and run_case(keep).got == {"keep": True}
+    ship = case("case_2", "mulligan_advice", {"hand": ["Island", "Bolt", "Bolt"]}, {"keep": True})
+    result = run_case(ship)
+    assert (result.status, result.detail) == (FAIL, "expected keep=True")
+    broken = run_case(case("case_3", "legality_check", {"format": "Modern"}, {}))
+    assert broken.status == ERROR and broken.detail == "KeyError: 'deck'" and broken.got is None
+    ungraded = run_case(case("case_4", "mulligan_advice", {"hand": ["Island", "Bolt"]}, {}))
+    assert ungraded.status == FAIL and ungraded.detail == "KeyError: 'keep'"
+    skipped = run_case(case("case_5", "trivia", {}, {}))
+    assert (skipped.status, skipped.target, skipped.ms) == (SKIPPED, "engine", 0.0)
+
+
+def test_engine_runners_call_the_engine(engine):
+    deck = ["Sol Ring", "Island", "Mana Crypt"]
+    got = run_case(case("c", "legality_check", {"format": "Commander", "deck": deck}, {"legal": True, "illegal_cards": []})).got
+    assert got["illegal_cards"] == [c for c in deck if not engine.is_legal(c, "Commander")]
+    got = run_case(case("c", "replacement_suggestion", {"card": "Mana Crypt", "budget_gbp": 5}, {"replacements": []})).got
+    assert got["replacements"] == [s["card_name"] for s in engine.propose_replacements("Mana Crypt", "Commander", 5.0, "WUBRG")]
+    cards = sorted(next(iter(eval_harness.known_combos()))[0])
+    got = run_case(case("c", "combo_explanation", {"cards": cards + ["Island"]}, {})).got
+    assert got["combo"] is not None
+    assert run_case(case("c", "combo_explanation", {"cards": ["Island"]}, {})).got == {"combo": None, "explanation": None}
+
+
+def test_graders():
+    assert eval_harness.grade_legality({"legal": False, "illegal_cards": ["B", "A"]}, {"legal": False, "illegal_cards": ["A", "B"]})[0]
+    assert eval_harness.grade_replacements({"replacements": ["X", "Y"]}, {"replacements": ["Z", "Y"]}) == (True, "1/2 expected suggested")
+    assert eval_harness.grade_synergy({"synergy_score": 0.54}, {"synergy_score": 0.5})[0]
+    assert not eval_harness.grade_synergy({"synergy_score": 0.56}, {"synergy_score": 0.5})[0]
+    assert eval_harness.grade_synergy({"synergy_score": None}, {"synergy_score": 0.5}) == (False, "no synergy score")
+    assert eval_harness.grade_cost({"cost_gbp": 10.005}, {"cost_gbp": 10.0})[0]
+    assert eval_harness.grade_cost({"cost_gbp": None}, {"cost_gbp": 10.0}) == (False, "no GBP total")
+
+
+def test_bundled_cases_run_without_errors(engine, bundled):
+    result = report(iter_run_cases(bundled))
+    assert result["summary"]["cases"] == len(bundled) and result["summary"]["skipped"] == 0
+    assert all(row["errors"] == 0 for row in result["types"].values())
+    assert result["types"]["mulligan_advice"]["accuracy"] == 1.0
+    assert [c["id"] for c in result["cases"]][:3] == ["case_1", "case_2", "case_3"]
+
+
+def test_process_pool_matches_in_process(engine, bundled):
+    def key(results):
+        return [(r.id, r.status, r.got, r.detail) for r in results]
+
+    cases = bundled[:60]
+    assert key(iter_run_cases(cases, processes=2, chunk_size=7)) == key(iter_run_cases(cases))
+
+
+def test_unknown_target():
+    with pytest.raises(ValueError):
+        next(iter_run_cases([], target="cloud"))
+
+
+def result(id, kind, status, ms=1.0):
+    return CaseResult(id, kind, "engine", status, ms, None, "" if status == PASS else "why")
+
+
+def test_report_orders_cases_and_summarises_types():
+    results = [result("case_10", "a", PASS, 4.0), result("case_2", "a", FAIL, 2.0), result("case_1", "a", ERROR, 1.0),
+               result("case_3", "b", SKIPPED, 0.0)]
+    data = report(results)
+    assert [c["id"] for c in data["cases"]] == ["case_1", "case_2", "case_3", "case_10"]
+    assert data["types"]["a"] == {
+        "cases": 3, "passed": 1, "failed": 1, "errors": 1, "skipped": 0, "accuracy": 0.3333,
+        "p50_ms": 2.0, "p95_ms": 4.0, "total_ms": 7.0,
+    }
+    assert data["types"]["b"]["accuracy"] is None and data["types"]["b"]["p95_ms"] == 0.0
+    assert data["summary"] == {"cases": 4, "passed": 1, "skipped": 1, "accuracy": 0.3333}
+    assert json.loads(eval_harness.dumps(data)) == json.loads(json.dumps(data))
+    assert report([])["summary"]["accuracy"] is None
+
+
+def test_regressions():
+    baseline = report([result("case_1", "a", PASS, 2.0), result("case_2", "a", PASS, 2.0), result("case_3", "b", PASS, 10.0)])
+    same = report([result("case_1", "a", PASS, 2.5), result("case_2", "a", PASS, 2.9), result("case_3", "b", PASS, 1.0),
+                   result("case_4", "new", FAIL, 99.0)])
+    assert regressions(baseline, same) == []
+    worse = report([result("case_1", "a", PASS, 2.0), result("case_2", "a", FAIL, 2.0), result("case_3", "b", PASS, 16.0)])
+    assert regressions(baseline, worse) == [
+        "a: accuracy 1.0 -> 0.5",
+        "b: p95 10.0ms -> 16.0ms",
+        "case_2 (a): pass -> fail why",
+    ]
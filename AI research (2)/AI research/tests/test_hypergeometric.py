@@ -0,0 +1,120 @@
+import itertools
+import math
+import random
+
+import numpy as np
+import pytest
+
+from hypergeometric import (MAX_CATEGORIES, at_least, curve_table, draws_by_turn, log_comb, parse_scenario,
+                            with_mulligans)
+
+
+def exact(deck_size, counts, minimum, draws):
+    """Multivariate hypergeometric by enumerating every split of the draws."""
+    draws = min(draws, deck_size)
+    rest = deck_size - sum(counts)
+    hits = 0
+    for xs in itertools.product(*(range(m, min(c, draws) + 1) for c, m in zip(counts, minimum))):
+        if sum(xs) <= draws:
+            hits += math.prod(math.comb(c, x) for c, x in zip(counts, xs)) * math.comb(rest, draws - sum(xs))
+    return hits / math.comb(deck_size, draws)
+
+
+def test_documented_example():
+    assert at_least(99, 37, 2, 7)[0] == pytest.approx(0.8142, abs=1e-4)
+
+
+def test_log_comb():
+    n, k = np.array([0, 5, 5, 5, 60, 3]), np.array([0, 0, 2, 5, 30, 4])
+    got = log_comb(n, k)
+    assert got[:5] == pytest.approx([math.log(math.comb(a, b)) for a, b in zip(n[:5], k[:5])])
+    assert got[5] == -np.inf and log_comb(4, -1)[()] == -np.inf
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_at_least_matches_enumeration(seed):
+    rng = random.Random(seed)
+    deck, counts, minimum, draws, want = [], [], [], [], []
+    for _ in range(60):
+        n = rng.randint(1, 100)
+        c = [rng.randint(0, n // 3) for _ in range(3)]
+        m = [rng.randint(0, 3) for _ in c]
+        d = rng.randint(0, 20)
+        deck.append(n), counts.append(c), minimum.append(m), draws.append(d)
+        want.append(exact(n, c, m, d))
+    assert at_least(deck, counts, minimum, draws) == pytest.approx(want, abs=1e-9)
+
+
+def test_large_decks_stay_in_float_range():
+    got = at_least([1000, 1000], [[400, 300], [1, 0]], [[20, 15], [1, 0]], [60, 60])
+    assert got == pytest.approx([exact(1000, [400, 300], [20, 15], 60), 0.06], rel=1e-9)
+
+
+def test_at_least_rejects_overfull_decks():
+    with pytest.raises(ValueError):
+        at_least(10, [[6, 5]], [[1, 1]], 7)
+    with pytest.raises(ValueError):
+        at_least(10, [-1], [0], 7)
+
+
+def test_draws_by_turn_and_mulligans():
+    assert draws_by_turn([0, 1, 2, 5], False).tolist() == [7, 7, 8, 11]
+    assert draws_by_turn([0, 1, 2, 5], True).tolist() == [7, 8, 9, 12]
+    # Keep a hit on the first hand, or mulligan a miss and hit on the next.
+    assert with_mulligans(0.5, 0.5, 1) == pytest.approx(0.75)
+    assert with_mulligans([0.3, 0.6], 0.3, 0).tolist() == pytest.approx([0.3, 0.6])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_curve_table_matches_enumeration(seed):
+    rng = random.Random(seed)
+    scenarios = []
+    for _ in range(8):
+        n = rng.randint(20, 100)
+        scenarios.append({"deck_size": n, "hand_size": rng.randint(0, 7), "turns": rng.randint(0, 6),
+                          "mulligans": rng.randint(0, 2),
+                          "categories": [{"count": rng.randint(0, n // 4), "min": rng.randint(0, 2)}
+                                         for _ in range(rng.randint(1, 3))]})
+    for s, got in zip(scenarios, curve_table(scenarios)):
+        counts, minimum = [c["count"] for c in s["categories"]], [c["min"] for c in s["categories"]]
+        p = lambda draws: exact(s["deck_size"], counts, minimum, draws)
+        opening = p(s["hand_size"])
+        assert [c["turn"] for c in got["curve"]] == list(range(s["turns"] + 1))
+        for entry in got["curve"]:
+            t = entry["turn"]
+            play = s["hand_size"] + max(t - 1, 0)
+            draw = s["hand_size"] + t
+            assert (entry["draws_play"], entry["draws_draw"]) == (min(play, s["deck_size"]), min(draw, s["deck_size"]))
+            assert entry["play"] == pytest.approx(1 - (1 - opening) ** s["mulligans"] * (1 - p(play)), abs=1e-6)
+            assert entry["draw"] == pytest.approx(1 - (1 - opening) ** s["mulligans"] * (1 - p(draw)), abs=1e-6)
+
+
+def test_parse_scenario_defaults():
+    s = parse_scenario({"deck_size": "60", "categories": [{"count": 24}, {"name": "ramp", "count": 8, "min": 0}]})
+    assert s == {"deck_size": 60, "hand_size": 7, "turns": 10, "mulligans": 0,
+                 "categories": [{"name": "category 1", "count": 24, "min": 1}, {"name": "ramp", "count": 8, "min": 0}]}
+    assert curve_table([]) == []
+
+
+@pytest.mark.parametrize("scenario, error", [
+    ([], "each scenario must be an object"),
+    ({"categories": [{"count": 1}]}, "'deck_size' must be an integer"),
+    ({"deck_size": True, "categories": [{"count": 1}]}, "'deck_size' must be an integer"),
+    ({"deck_size": float("inf"), "categories": [{"count": 1}]}, "'deck_size' must be an integer"),
+    ({"deck_size": float("nan"), "categories": [{"count": 1}]}, "'deck_size' must be an integer"),
+    ({"deck_size": 0, "categories": [{"count": 1}]}, "'deck_size' must be between 1 and 1000"),
+    ({"deck_size": 60}, f"'categories' must list 1 to {MAX_CATEGORIES} categories"),
+    ({"deck_size": 60, "categories": []}, f"'categories' must list 1 to {MAX_CATEGORIES} categories"),
+    ({"deck_size": 60, "categories": [{"count": 1}] * 9}, f"'categories' must list 1 to {MAX_CATEGORIES} categories"),
+    ({"deck_size": 60, "categories": ["lands"]}, "each category must be an object"),
+    ({"deck_size": 60, "categories": [{"count": 61}]}, "'count' must be between 0 and 60"),
+    ({"deck_size": 60, "categories": [{"count": 40}, {"count": 21}]}, "category counts add up to more than 'deck_size'"),
+    ({"deck_size": 60, "categories": [{"count": 4, "min": -1}]}, "'min' must be between 0 and 60"),
+    ({"deck_size": 5, "hand_size": 7, "categories": [{"count": 1}]}, "'hand_size' must be between 0 and 5"),
+    ({"deck_size": 60, "turns": 41, "categories": [{"count": 1}]}, "'turns' must be between 0 and 40"),
+    ({"deck_size": 60, "mulligans": "two", "categories": [{"count": 1}]}, "'mulligans' must be an integer"),
+])
+def test_parse_scenario_rejects(scenario, error):
+    with pytest.raises(ValueError) as e:
+        parse_scenario(scenario)
+    assert str(e.value) == error
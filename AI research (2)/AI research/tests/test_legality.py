@@ -0,0 +1,106 @@
+import pytest
+
+from legality import BANNED, LEGAL, NOT_LEGAL, RESTRICTED, LegalityMatrix, banlist_entries, scryfall_entries
+
+ENTRIES = [
+    ("Sol Ring", "Vintage", RESTRICTED),
+    ("Sol Ring", "Legacy", BANNED),
+    ("Mana Crypt", "Commander", BANNED),
+    ("Lotus", "Pauper", NOT_LEGAL),
+    ("Lotus", "Pauper", LEGAL),
+    ("Brainstorm", "Vintage", RESTRICTED),
+    ("Brainstorm", "Modern", NOT_LEGAL),
+]
+
+
+@pytest.fixture
+def matrix():
+    return LegalityMatrix.compile(ENTRIES, names=["Island", "Sol Ring"])
+
+
+def test_statuses_and_later_entries_win(matrix):
+    assert matrix.names[:2] == ["Island", "Sol Ring"]
+    assert matrix.status("Sol Ring", "Vintage") == RESTRICTED
+    assert matrix.status("Sol Ring", "Legacy") == BANNED
+    assert matrix.status("Lotus", "Pauper") == LEGAL
+    assert matrix.status("Island", "Vintage") == LEGAL
+    assert matrix.status("Unknown", "Vintage") == LEGAL
+    assert matrix.status("Sol Ring", "Unknown Format") == LEGAL
+    assert matrix.is_legal("Sol Ring", "Vintage") and not matrix.is_legal("Brainstorm", "Modern")
+    assert matrix.legalities("Sol Ring")["Legacy"] == "banned"
+
+
+def test_unplayable_rows_follow_updates(matrix):
+    sol = matrix.position["Sol Ring"]
+    assert matrix.unplayable_rows("Legacy") == [sol]
+    freed = matrix.updated([("Sol Ring", "Legacy", LEGAL), ("New Card", "Legacy", BANNED)])
+    assert freed.unplayable_rows("Legacy") == [freed.position["New Card"]]
+    assert freed.position["Sol Ring"] == sol
+    # The original is untouched.
+    assert matrix.status("Sol Ring", "Legacy") == BANNED
+
+
+def test_adding_formats_widens_rows_without_losing_statuses(matrix):
+    wider = matrix.updated((f"Card {f}", f"Format {f}", BANNED) for f in range(9))
+    assert wider.stride > matrix.stride
+    for name, fmt, _code in ENTRIES[:4] + ENTRIES[5:]:
+        assert wider.status(name, fmt) == matrix.status(name, fmt)
+    assert wider.status("Card 8", "Format 8") == BANNED
+
+
+def test_vectorised_statuses_match_lookups(matrix):
+    names = ["Sol Ring", "Island", "Brainstorm", "Nobody", "Lotus", "Mana Crypt"]
+    for fmt in matrix.formats + ["Nothing"]:
+        got = matrix.statuses(matrix.rows(names), fmt).tolist()
+        assert got == [matrix.status(n, fmt) for n in names]
+
+
+def test_check_deck_counts_repeated_entries_towards_the_restricted_limit(matrix):
+    deck = ["Sol Ring", "Brainstorm", "Brainstorm", "Island", "Sol Ring"]
+    assert matrix.check_deck(deck, "Vintage", [1, 1, 1, 4, 0]) == {
+        "banned": [], "not_legal": [], "restricted": ["Brainstorm"],
+    }
+    assert matrix.check_deck(deck, "Vintage")["restricted"] == ["Sol Ring", "Brainstorm"]
+    assert matrix.check_deck(deck, "Modern")["not_legal"] == ["Brainstorm"]
+    assert matrix.check_deck(deck, "Legacy")["banned"] == ["Sol Ring"]
+
+
+def test_from_bitmask_marks_set_bits_banned():
+    matrix = LegalityMatrix.from_bitmask(["A", "B"], ["Modern", "Legacy"], [0b10, 0b01])
+    assert matrix.status("A", "Legacy") == BANNED and matrix.status("A", "Modern") == LEGAL
+    assert matrix.unplayable_rows("Modern") == [1]
+
+
+def test_sources(tmp_path):
+    path = tmp_path / "banlist.csv"
+    path.write_text(
+        "\ncard_name,format,legality_status\n"
+        "Sol Ring,Vintage,Restricted\nMana Crypt,Commander,Banned\n,Modern,Banned\nRule,Modern,Rule Text\n"
+    )
+    assert list(banlist_entries(str(path))) == [
+        ("Sol Ring", "Vintage", RESTRICTED), ("Mana Crypt", "Commander", BANNED),
+    ]
+    entries = set(scryfall_entries([
+        {"name": "Sol Ring", "legalities": {"vintage": "restricted", "commander": "legal", "modern": "not_legal"}},
+        {"name": "No Legalities"},
+    ]))
+    assert {("Sol Ring", "Vintage", RESTRICTED), ("Sol Ring", "Commander", LEGAL),
+            ("Sol Ring", "Modern", NOT_LEGAL)} <= entries
+    assert all(name == "Sol Ring" for name, _fmt, _code in entries)
+
+
+def test_engine_uses_the_bundled_banlist_and_scryfall_overrides(engine):
+    assert engine.get_legality().status("Sol Ring", "Vintage") == RESTRICTED
+    assert engine.check_card_constraints("Sol Ring", "Vintage", 100, [], qty=2) == ["Restricted"]
+    engine.load_legalities([{"name": "Sol Ring", "legalities": {"vintage": "banned"}}])
+    assert engine.check_card_constraints("Sol Ring", "Vintage", 100, []) == ["Format"]
+    assert engine.get_index().is_banned(engine.get_index().position["Sol Ring"], "Vintage")
+
+
+def test_banlist_path_can_be_overridden(engine, tmp_path, monkeypatch):
+    path = tmp_path / "banlist.csv"
+    path.write_text("card_name,format,legality_status\nIsland,Commander,Banned\n")
+    monkeypatch.setenv("BANLIST_DATASET_PATH", str(path))
+    engine.rebuild_index()
+    assert not engine.is_legal("Island", "Commander")
+    assert engine.get_legality().status("Sol Ring", "Vintage") == LEGAL
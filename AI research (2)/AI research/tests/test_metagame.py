@@ -0,0 +1,122 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from metagame import MetagameMatrix, parse_rate
+
+
+@pytest.mark.parametrize("value, rate", [
+    ("61%", 0.61), (" 7.5 % ", 0.075), ("100%", 1.0), ("61", 0.61), (0.61, 0.61), (61, 0.61), (1, 1.0),
+    ("150%", None), (250, None), ("—", None), ("", None), (None, None), ("-5%", None), ("61 percent", None),
+])
+def test_parse_rate(value, rate):
+    assert parse_rate(value) == (None if rate is None else pytest.approx(rate))
+
+
+def random_rows(rng, commanders=40, cards=120):
+    rows = []
+    for c in range(commanders):
+        picks = rng.sample(range(cards), rng.randint(0, 15))
+        top_cards = [{"card_name": f"Card {p}", "inclusion_rate": f"{rng.randint(1, 100)}%"} for p in picks]
+        top_cards.append({"card_name": f"Card {cards + c}", "inclusion_rate": "—"})
+        rows.append({"commander_name": f"Commander {c}", "popularity_rank": c + 1, "themes": ["T"], "trend": "Up",
+                     "top_cards": top_cards})
+    rows.append({"commander_name": "", "top_cards": [{"card_name": "Card 0", "inclusion_rate": "50%"}]})
+    return rows
+
+
+def reference_rates(rows):
+    rates = {}
+    for row in rows:
+        if not row["commander_name"]:
+            continue
+        table = rates.setdefault(row["commander_name"], {})
+        for card in row["top_cards"]:
+            rate = parse_rate(card["inclusion_rate"])
+            if rate is not None:
+                table[card["card_name"]] = max(rate, table.get(card["card_name"], 0.0))
+    return rates
+
+
+def cosine(table, deck):
+    norm = math.sqrt(sum(r * r for r in table.values()))
+    dot = sum(table.get(card, 0.0) for card in deck)
+    return dot / (norm * math.sqrt(max(len(deck), 1))) if norm else 0.0
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_report_matches_a_dict_reference(seed):
+    rng = random.Random(seed)
+    rows = random_rows(rng)
+    matrix = MetagameMatrix.from_rows(rows)
+    rates = reference_rates(rows)
+    for _ in range(15):
+        deck = set(rng.sample([f"Card {i}" for i in range(130)], rng.randint(0, 40)))
+        commander = rng.choice([None, f"commander {rng.randrange(40)}"])
+        k = rng.choice([0, 1, 5, 100])
+        got = matrix.report(list(deck) + ["Not A Card"], commander, k, missing=4)
+
+        known = deck & set(matrix.cards)
+        similar = sorted((s for s in ((c, cosine(t, known)) for c, t in rates.items()) if s[1] > 0),
+                         key=lambda s: -s[1])[:k]
+        # Equal similarities may come out in either order.
+        got_similar = got["similar_commanders"]
+        assert [s["similarity"] for s in got_similar] == pytest.approx([s for _, s in similar], abs=1e-4)
+        for s in got_similar:
+            assert cosine(rates[s["commander"]], known) == pytest.approx(s["similarity"], abs=1e-4)
+        assert got["known_cards"] == len(known)
+
+        if commander:
+            name = matrix.commanders[matrix.commander_id(commander)]
+        else:
+            name = got_similar[0]["commander"] if got_similar else None
+        if name is None:
+            assert got["meta"] is None
+            continue
+        table = rates[name]
+        meta = got["meta"]
+        assert meta["commander"] == name and meta["trend"] == "Up"
+        total = sum(table.values())
+        played = {c for c in table if c in deck}
+        assert meta["meta_score"] == pytest.approx(sum(table[c] for c in played) / total if total else 0.0, abs=1e-4)
+        assert (meta["staples_played"], meta["staples"]) == (len(played), len(table))
+        assert {i["card_name"] for i in meta["included"]} == played
+        missing = [c for c in table if c not in deck]
+        assert len(meta["missing_staples"]) == min(4, len(missing))
+        rates_shown = [m["inclusion_rate"] for m in meta["missing_staples"]]
+        assert rates_shown == sorted(rates_shown, reverse=True)
+        assert rates_shown == pytest.approx(sorted((table[c] for c in missing), reverse=True)[:4], abs=1e-4)
+
+
+def test_duplicates_keep_the_highest_rate_and_names_fold():
+    matrix = MetagameMatrix.from_rows([
+        {"commander_name": "Atraxa", "top_cards": [{"card_name": "Sol Ring", "inclusion_rate": "40%"},
+                                                   {"card_name": "Sol Ring", "inclusion_rate": "70%"},
+                                                   {"card_name": "", "inclusion_rate": "90%"}]},
+        {"commander_name": "Atraxa", "top_cards": [{"card_name": "Doubling Season", "inclusion_rate": "55%"}]},
+    ])
+    assert matrix.commanders == ["Atraxa"] and len(matrix) == 2
+    report = matrix.report([" sol ring ", "DOUBLING SEASON"], " atraxa ")
+    assert report["meta"]["meta_score"] == 1.0
+    assert [i["card_name"] for i in report["meta"]["included"]] == ["Sol Ring", "Doubling Season"]
+    assert report["meta"]["included"][0]["inclusion_rate"] == pytest.approx(0.7)
+
+
+def test_unknown_commander_and_empty_decks():
+    matrix = MetagameMatrix.from_rows(random_rows(random.Random(7)))
+    report = matrix.report(["Card 1"], "Nobody")
+    assert report["commander_found"] is False and report["meta"] is None
+    empty = matrix.report([], None)
+    assert empty == {"known_cards": 0, "commander_found": False, "meta": None, "similar_commanders": []}
+    nothing = MetagameMatrix.from_rows([])
+    assert nothing.report(["Sol Ring"])["similar_commanders"] == [] and len(nothing) == 0
+    assert np.all(matrix.similarity(np.zeros(0, dtype=np.int64)) == 0)
+
+
+def test_bundled_dataset():
+    matrix = MetagameMatrix.load()
+    assert len(matrix.commanders) > 20
+    report = matrix.report(["Farseek", "Temur Ascendancy"], "The Ur-Dragon")
+    assert report["meta"]["staples_played"] == 2 and report["similar_commanders"][0]["commander"] == "The Ur-Dragon"
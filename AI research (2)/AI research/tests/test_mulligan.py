@@ -0,0 +1,142 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from hypergeometric import at_least
+from mulligan import (MAX_CATEGORIES, bottom, category_counts, keep_hand, keepable, parse_config, simulate,
+                      wilson)
+
+DECK = {"land": 37, "ramp": 12, "other": 50}
+
+
+def meets(kept, lo, hi):
+    return all(l <= k <= h for k, l, h in zip(kept, lo, hi))
+
+
+def brute_keepable(hand, lo, hi, keep_size):
+    """Try every way of keeping ``keep_size`` of the hand's cards."""
+    return any(sum(kept) == keep_size and meets(kept, lo, hi)
+               for kept in itertools.product(*(range(n + 1) for n in hand)))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_keepable_and_bottom_match_brute_force(seed):
+    rng = random.Random(seed)
+    hands = np.array([[rng.randint(0, 4) for _ in range(3)] for _ in range(200)])
+    clauses = [[rng.choice([0, 0, 1, 2]) for _ in range(3)] for _ in range(4)]
+    lo = np.array(clauses)
+    hi = np.array([[rng.choice([l, l + 1, 9]) for l in row] for row in clauses])
+    for keep_size in range(0, 8):
+        got = keepable(hands, lo, hi, keep_size)
+        for h, hand in enumerate(hands.tolist()):
+            assert got[h].tolist() == [brute_keepable(hand, lo[r], hi[r], keep_size) for r in range(len(lo))]
+        for r in range(len(lo)):
+            rows = np.flatnonzero(got[:, r])
+            kept = bottom(hands[rows], lo[[r] * len(rows)], hi[[r] * len(rows)], keep_size)
+            for hand, k in zip(hands[rows].tolist(), kept.tolist()):
+                assert sum(k) == keep_size and meets(k, lo[r], hi[r]) and all(a <= b for a, b in zip(k, hand))
+
+
+def test_category_counts():
+    cards = np.array([[0, 1, 1, 2], [2, 2, 2, 2]], dtype=np.int8)
+    assert category_counts(cards, 4).tolist() == [[1, 2, 1, 0], [0, 0, 4, 0]]
+
+
+def test_keep_hand():
+    keep = [{"land": 2, "ramp": 1}, {"land": [1, 1], "ramp": 2}]
+    assert keep_hand({"land": 2, "ramp": 1, "other": 4}, keep)
+    assert keep_hand({"land": 1, "ramp": 2, "other": 4}, keep)
+    assert not keep_hand({"land": 0, "ramp": 3, "other": 4}, keep)
+    # One land too many for the clause until a mulligan bottoms it.
+    assert keep_hand({"land": 2, "ramp": 2, "other": 0}, [{"land": [1, 1], "ramp": 2}], mulligans=1)
+    assert not keep_hand({"land": 2, "ramp": 2, "other": 0}, [{"land": [1, 1], "ramp": 2}])
+    # A minimum larger than the hand is never met.
+    assert not keep_hand({"land": 1}, {"land": 2}) and keep_hand({"land": 2}, {"land": 2})
+
+
+def test_wilson():
+    low, high = wilson(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-4) and high == pytest.approx(0.5962, abs=1e-4)
+    assert wilson(0, 0) == (0.0, 1.0) and wilson(0, 10)[0] == 0.0 and wilson(10, 10)[1] == pytest.approx(1.0)
+
+
+def close(estimate, p, hands):
+    assert estimate["low"] <= estimate["p"] <= estimate["high"]
+    assert abs(estimate["p"] - p) <= 5 * max((p * (1 - p) / hands) ** 0.5, 1e-4)
+
+
+def test_simulation_matches_the_hypergeometric_odds():
+    hands = 40000
+    got = simulate({"deck": DECK, "keep": {"land": 2, "ramp": 1}, "max_mulligans": 2, "hands": hands, "seed": 3})
+    p = float(at_least(99, [[37, 12]], [[2, 1]], 7)[0])
+    assert got["deck_size"] == 99 and got["hands"] == hands and got["seed"] == 3
+    close(got["keep_opening"], p, hands)
+    # With minimums only, bottoming never breaks a keepable hand.
+    for m, entry in enumerate(got["kept_after"]):
+        assert (entry["mulligans"], entry["hand_size"]) == (m, 7 - m)
+        close(entry, (1 - p) ** m * (p if m < 2 else 1), hands)
+    close(got["forced_keep"], (1 - p) ** 3, hands)
+    mean = sum(e["p"] * e["hand_size"] for e in got["kept_after"])
+    assert got["mean_hand_size"] == pytest.approx(mean, abs=1e-3)
+    assert got["goal"] is None
+
+
+@pytest.mark.parametrize("on_draw", [False, True])
+def test_goal_without_mulligans_is_hypergeometric(on_draw):
+    hands = 30000
+    got = simulate({"deck": DECK, "keep": {"land": 0}, "max_mulligans": 0, "goal": {"land": 4}, "turn": 4,
+                    "on_draw": on_draw, "hands": hands})
+    assert got["goal"]["turn"] == 4 and got["goal"]["on_draw"] is on_draw
+    close(got["goal"], float(at_least(99, 37, 4, 10 + on_draw)[0]), hands)
+
+
+def test_free_mulligan_keeps_seven():
+    got = simulate({"deck": DECK, "keep": {"land": 3}, "free_mulligan": True, "hands": 1000})
+    assert [e["hand_size"] for e in got["kept_after"]] == [7, 7, 6, 5]
+
+
+def test_results_depend_only_on_the_seed():
+    config = {"deck": DECK, "keep": {"land": 2}, "goal": {"land": 3}, "turn": 2, "hands": 20000, "seed": 11}
+    once = simulate(config)
+    assert simulate(config) == once
+    assert simulate(config, processes=2) == once
+    assert simulate({**config, "seed": 12}) != once
+
+
+def test_parse_config_defaults():
+    sim = parse_config({"deck": {"land": "40", "other": 59}, "keep": {"land": [2, 4]}})
+    assert sim["categories"] == ["land", "other"] and sim["counts"] == [40, 59]
+    assert (sim["hand_size"], sim["max_mulligans"], sim["hands"], sim["seed"]) == (7, 3, 100000, 0)
+    assert sim["keep_lo"].tolist() == [[2, 0]] and sim["keep_hi"].tolist() == [[4, 7]]
+    assert sim["goal_lo"] is None and sim["extra_draws"] == 0
+
+
+@pytest.mark.parametrize("config, error", [
+    ([], "the simulation config must be an object"),
+    ({"keep": {"land": 2}}, f"'deck' must map 1 to {MAX_CATEGORIES} categories to card counts"),
+    ({"deck": {}, "keep": {"land": 2}}, f"'deck' must map 1 to {MAX_CATEGORIES} categories to card counts"),
+    ({"deck": {"land": "many"}, "keep": {"land": 2}}, "'land' must be an integer"),
+    ({"deck": {"land": float("inf")}, "keep": {"land": 2}}, "'land' must be an integer"),
+    ({"deck": {"land": 0}, "keep": {"land": 2}}, "the deck must hold 1 to 1000 cards"),
+    ({"deck": DECK}, "'keep' must be a clause or a list of clauses"),
+    ({"deck": DECK, "keep": []}, "'keep' must be a clause or a list of clauses"),
+    ({"deck": DECK, "keep": ["land"]}, "each 'keep' clause must be an object"),
+    ({"deck": DECK, "keep": {"lands": 2}}, "'keep' uses 'lands', which is not a deck category"),
+    ({"deck": DECK, "keep": {"land": -1}}, "'keep' bounds must be a minimum or a [min, max] pair"),
+    ({"deck": DECK, "keep": {"land": [3, 2]}}, "'keep' bounds must be a minimum or a [min, max] pair"),
+    ({"deck": DECK, "keep": {"land": 2.5}}, "'keep' bounds must be a minimum or a [min, max] pair"),
+    ({"deck": DECK, "keep": {"land": True}}, "'keep' bounds must be a minimum or a [min, max] pair"),
+    ({"deck": DECK, "keep": {"land": 2}, "goal": [{"land": 3}, {"ramp": 1}]}, "'goal' must be a single clause"),
+    ({"deck": {"land": 8}, "keep": {"land": 2}, "goal": {"land": 3}, "turn": 5}, "the deck runs out of cards before 'turn'"),
+    ({"deck": DECK, "keep": {"land": 2}, "hand_size": 0}, "'hand_size' must be between 1 and 99"),
+    ({"deck": DECK, "keep": {"land": 2}, "max_mulligans": 8}, "'max_mulligans' must be between 0 and 7"),
+    ({"deck": DECK, "keep": {"land": 2}, "hands": 0}, "'hands' must be between 1 and 100000000"),
+    ({"deck": DECK, "keep": {"land": 2}, "seed": -1}, "'seed' must be between 0 and 9223372036854775807"),
+    ({"deck": DECK, "keep": {"land": 2}, "turn": float("nan")}, "'turn' must be an integer"),
+])
+def test_parse_config_rejects(config, error):
+    with pytest.raises(ValueError) as e:
+        parse_config(config)
+    assert str(e.value) == error
@@ -0,0 +1,103 @@
+import json
+import math
+import random
+
+import numpy as np
+import pytest
+
+from personas import FEATURES, PersonaTable, compile_weights
+from synergy import SynergyTable
+from test_card_index import FORMATS, linear_candidates, synthetic_database
+
+DATASET = {
+    "personas": [
+        {"persona_name": "Budget Brewer", "priorities": {"budget": "high", "power": "medium", "theme": "moderate"}},
+        {"persona_name": "Competitive Spike", "priorities": {"budget": "low", "power": "very high", "theme": "low"}},
+        {"persona_name": "Casual Brewer", "priorities": {"budget": "sky high"}},
+    ],
+    "adjustments": [{"persona_name": "Budget Brewer", "adjustment_rules": ["Prefer cheap cards."]}],
+    "tones": [{"persona_name": "Competitive Spike", "tone_style": "Terse"}],
+}
+
+
+def test_weights_follow_the_priority_levels():
+    weights = dict(zip(FEATURES, compile_weights({"budget": "high", "power": "Low ", "theme": "unknown"})))
+    assert sum(weights.values()) == pytest.approx(1.0)
+    assert weights["price"] == pytest.approx(3 / 8) and weights["power"] == pytest.approx(1 / 8)
+    assert weights["synergy"] == weights["role_match"] == pytest.approx(2 / 8)
+
+
+def test_personas_resolve_by_name_or_unique_word():
+    table = PersonaTable.from_dataset(DATASET)
+    assert table.names() == ["Budget Brewer", "Competitive Spike", "Casual Brewer"]
+    assert table.resolve(" budget brewer").name == "Budget Brewer"
+    assert table.resolve("SPIKE").name == "Competitive Spike"
+    # "brewer" names two personas, so it names neither.
+    assert table.resolve("brewer") is None and table.resolve(None) is None
+    assert table.resolve("Budget Brewer").rules == ("Prefer cheap cards.",)
+    assert table.resolve("Spike").tone == "Terse"
+    assert table.matrix().shape == (3, len(FEATURES))
+
+
+def persona_ranking(engine, database, name, fmt, colours, persona, synergy):
+    """Score every match in each tier's own price band and sort."""
+    index = engine.get_index()
+    w = persona.weights
+    top_power = max(math.log1p(p) for p in index.prices)
+    roles = list(dict.fromkeys(database[name]["roles"]))
+    expected, low = [], -math.inf
+    for tier, bound in engine.DEFAULT_TIERS:
+        scored = []
+        for i in linear_candidates(database, roles, fmt, colours, bound, name):
+            price = index.prices[i]
+            if price <= low:
+                continue
+            shared = len(set(roles) & set(index.roles[i]))
+            score = (w[0] / (1 + price) + w[1] * math.log1p(price) / top_power
+                     + w[2] * synergy.get(i, 0.0) + w[3] * shared / len(roles))
+            scored.append((-score, index.rank[i], i))
+        for _neg, _rank, i in sorted(scored)[:5 - len(expected)]:
+            expected.append((index.names[i], tier, round(-_neg, 4)))
+        low = max(low, bound)
+    return expected
+
+
+@pytest.mark.parametrize("persona_name, commander", [
+    ("Budget Brewer", None), ("Competitive Spike", None), ("Combo Johnny", "Cmdr"),
+])
+def test_persona_replacements_match_a_full_sort(engine, persona_name, commander):
+    engine.CARD_DATABASE = database = synthetic_database(500, seed=13)
+    engine.rebuild_index()
+    rng = random.Random(13)
+    names = list(database)
+    engine._SYNERGY = SynergyTable({"Cmdr": {n: round(rng.random(), 2) for n in rng.sample(names, 100)}})
+    persona = engine.get_personas().resolve(persona_name)
+    synergy = engine.get_synergy().positions(commander, engine.get_index()) if commander else {}
+    suggested = 0
+    for name in rng.sample(names, 25):
+        fmt = rng.choice(FORMATS)
+        colours = rng.sample("WUBRG", rng.randint(1, 5))
+        got = engine.propose_replacements(name, fmt, 5.0, colours, commander=commander, persona=persona_name)
+        expected = persona_ranking(engine, database, name, fmt, colours, persona, synergy)
+        assert [(s["card_name"], s["tier"]) for s in got] == [(n, t) for n, t, _s in expected]
+        assert [s["score"] for s in got] == pytest.approx([s for _n, _t, s in expected], abs=1e-4)
+        suggested += len(got)
+    assert suggested > 50
+
+
+def test_unknown_persona_ranks_cheapest_first(engine, small_database):
+    plain = engine.propose_replacements("Cheap Rock", "Commander", 5.0, ["G"])
+    assert engine.propose_replacements("Cheap Rock", "Commander", 5.0, ["G"], persona="Nobody") == plain
+
+
+def test_persona_dataset_can_be_replaced(engine, tmp_path, monkeypatch):
+    path = tmp_path / "personas.json"
+    path.write_text(json.dumps(DATASET))
+    monkeypatch.setenv("PERSONA_DATASET_PATH", str(path))
+    engine._PERSONAS = None
+    assert engine.get_personas().names() == ["Budget Brewer", "Competitive Spike", "Casual Brewer"]
+    scorer = engine.get_persona_scorer()
+    assert engine.get_persona_scorer() is scorer
+    engine.load_persona_dataset(str(path))
+    assert engine.get_persona_scorer() is not scorer
+    assert np.allclose(scorer.static[:, 0], 1 / (1 + np.asarray(engine.get_index().prices)))
@@ -0,0 +1,196 @@
+import csv
+import json
+import math
+import random
+
+import numpy as np
+import pytest
+
+from printings import (FINISHES, LANGUAGES, PRICE_FIELDS, PrintingStore, collector_number, language_code,
+                       scan_finish)
+
+SETS = ["NCC", "CMR", "M11", "2XM"]
+
+
+def random_cards(rng, n=400):
+    cards = []
+    for i in range(n):
+        finishes = rng.choice([["nonfoil"], ["foil"], ["nonfoil", "foil"], ["etched"], ["nonfoil", "foil", "etched"]])
+        prices = {f: (f"{rng.uniform(0.1, 90):.2f}" if rng.random() < 0.7 else None) for f in PRICE_FIELDS}
+        cards.append({
+            "set": rng.choice(SETS).lower(), "collector_number": str(rng.randint(1, 60)),
+            "lang": rng.choice(["en", "en", "en", "ja", "de", "zhs"]), "name": f"Card {rng.randint(0, 80)}",
+            "id": f"{i:08d}-0000-0000-0000-000000000000", "finishes": finishes, "prices": prices,
+            "digital": rng.random() < 0.05,
+        })
+    return cards
+
+
+def reference(cards):
+    """(SET, number, lang) -> (name, id, finishes, prices) of the first paper printing."""
+    table = {}
+    for card in cards:
+        key = (card["set"].upper(), card["collector_number"], card["lang"])
+        if card["digital"]:
+            continue
+        if key not in table:
+            table[key] = [card["name"], card["id"], set(card["finishes"]), card["prices"]]
+        elif table[key][0] == card["name"]:
+            table[key][2] |= set(card["finishes"])
+    return table
+
+
+def price(prices, currency, finish):
+    field = currency if finish == "nonfoil" else f"{currency}_{finish}"
+    raw = prices.get(field)
+    return None if raw is None else float(raw)
+
+
+def random_scans(rng, n=500):
+    scans = []
+    for _ in range(n):
+        scan = {"set_code": rng.choice(SETS + ["XXX"]).lower(), "collector_number": str(rng.randint(1, 62)),
+                "language": rng.choice(["en", "Japanese", "ja", "de", "German", "ko", "Klingon", ""]),
+                "foil": rng.choice([True, False, "yes", "no", "etched", ""])}
+        if rng.random() < 0.3:
+            scan["card_name"] = f"Card {rng.randint(0, 80)}"
+        scans.append(scan)
+    return scans
+
+
+def check(store, cards, scans):
+    table = reference(cards)
+    got = store.resolve(scans)
+    assert len(got["rows"]) == len(scans)
+    resolved = english = unpriced = 0
+    total_usd = total_eur = 0.0
+    for scan, row in zip(scans, got["rows"]):
+        key = (scan["set_code"].upper(), scan["collector_number"], language_code(scan["language"]))
+        finish = scan_finish(scan)
+        assert (row["set"], row["collector_number"], row["finish"]) == (key[0], key[1], finish)
+        hit = table.get(key)
+        en = table.get(key[:2] + ("en",))
+        if hit is None and en is None:
+            assert row["match"] is None and "card_name" not in row
+            continue
+        resolved += 1
+        match = "exact" if hit is not None else "english"
+        english += match == "english"
+        name, scryfall_id, finishes, prices = hit or en
+        assert (row["match"], row["card_name"], row["scryfall_id"]) == (match, name, scryfall_id)
+        assert row["finish_known"] == (finish in finishes)
+        usd, eur = price(prices, "usd", finish), price(prices, "eur", finish)
+        if en is not None and hit is not None and hit is not en:
+            usd = usd if usd is not None else price(en[3], "usd", finish)
+            eur = eur if eur is not None else price(en[3], "eur", finish)
+        assert row["usd"] == (None if usd is None else pytest.approx(usd, abs=0.006))
+        assert row["eur"] == (None if eur is None else pytest.approx(eur, abs=0.006))
+        unpriced += usd is None and eur is None
+        total_usd += usd or 0.0
+        total_eur += eur or 0.0
+        if scan.get("card_name"):
+            assert row["name_mismatch"] == (scan["card_name"] != name)
+        else:
+            assert "name_mismatch" not in row
+    assert (got["resolved"], got["unresolved"]) == (resolved, len(scans) - resolved)
+    assert (got["english_fallback"], got["unpriced"]) == (english, unpriced)
+    assert got["name_mismatches"] == sum(r.get("name_mismatch", False) for r in got["rows"])
+    assert got["total_usd"] == pytest.approx(total_usd, abs=0.01 * len(scans))
+    assert got["total_eur"] == pytest.approx(total_eur, abs=0.01 * len(scans))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_resolve_matches_a_dict_reference(seed):
+    rng = random.Random(seed)
+    cards = random_cards(rng)
+    check(PrintingStore.from_scryfall(cards), cards, random_scans(rng))
+
+
+def test_saved_stores_resolve_the_same(tmp_path):
+    rng = random.Random(5)
+    cards = random_cards(rng)
+    built = PrintingStore.from_scryfall(cards)
+    built.save(str(tmp_path / "store"))
+    meta = json.loads((tmp_path / "store" / "meta.json").read_text())
+    assert meta["count"] == len(built) and meta["languages"] == list(LANGUAGES)
+    scans = random_scans(rng)
+    for mmap in (True, False):
+        loaded = PrintingStore.load(str(tmp_path / "store"), mmap=mmap)
+        assert (loaded.sets, loaded.numbers, loaded.cards, loaded.conflicts) == (built.sets, built.numbers,
+                                                                                 built.cards, built.conflicts)
+        check(loaded, cards, scans)
+    (tmp_path / "dump.json").write_text(json.dumps(cards))
+    check(PrintingStore.load(str(tmp_path / "dump.json")), cards, scans)
+
+
+def test_unsupported_store_version(tmp_path):
+    PrintingStore.from_scryfall([]).save(str(tmp_path))
+    meta = json.loads((tmp_path / "meta.json").read_text())
+    (tmp_path / "meta.json").write_text(json.dumps({**meta, "version": 99}))
+    with pytest.raises(ValueError, match="Unsupported printings store version 99"):
+        PrintingStore.load(str(tmp_path))
+
+
+def test_conflicting_printings_keep_the_first():
+    store = PrintingStore.from_scryfall([
+        {"set": "cmr", "collector_number": "472", "lang": "en", "name": "Sol Ring", "id": "a", "finishes": ["nonfoil"]},
+        {"set": "CMR", "collector_number": "0472", "lang": "en", "name": "Sol Ring", "id": "b", "finishes": ["foil"]},
+        {"set": "CMR", "collector_number": "472", "lang": "en", "name": "Arcane Signet", "id": "c"},
+        {"set": "CMR", "collector_number": "", "lang": "en", "name": "No Number", "id": "d"},
+        {"set": "CMR", "collector_number": "1", "lang": "xx", "name": "No Language", "id": "e"},
+        {"set": "CMR", "collector_number": "2", "lang": "en", "name": "Old Style", "id": "f", "nonfoil": True,
+         "foil": False},
+    ])
+    assert len(store) == 2 and store.conflicts == 1
+    rows = store.resolve([{"set": "cmr", "collector_number": "472", "finish": "foil"},
+                          {"set": "cmr", "collector_number": "2", "foil": True}])["rows"]
+    assert (rows[0]["scryfall_id"], rows[0]["finish_known"]) == ("a", True)
+    assert rows[1]["finish_known"] is False and rows[1]["usd"] is None
+
+
+def test_labelled_scans(tmp_path):
+    path = tmp_path / "labels.csv"
+    with open(path, "w", newline="") as fh:
+        writer = csv.DictWriter(fh, ["card_name", "set_code", "collector_number", "foil", "language", "usd_foil"])
+        writer.writeheader()
+        writer.writerow({"card_name": " Farseek ", "set_code": "NCC", "collector_number": "274", "foil": "yes",
+                         "language": "Japanese", "usd_foil": "0.25"})
+        writer.writerow({"card_name": "Sol Ring", "set_code": "CMR", "collector_number": "472", "foil": "no",
+                         "language": "English", "usd_foil": ""})
+    store = PrintingStore.load(str(path))
+    got = store.resolve([{"set": "ncc", "collector_number": "274", "lang": "ja", "foil": "foil",
+                          "card_name": "FARSEEK (Japanese)"}])
+    row = got["rows"][0]
+    assert (row["card_name"], row["match"], row["finish_known"], row["usd"]) == ("Farseek", "exact", True, 0.25)
+    assert row["name_mismatch"] is False and row["scryfall_id"] is None
+
+
+def test_empty_store_and_bad_rows():
+    store = PrintingStore.from_scryfall([])
+    got = store.resolve([{"set": "CMR", "collector_number": "1"}])
+    assert got["resolved"] == 0 and got["rows"][0]["match"] is None and got["total_usd"] == 0.0
+    assert store.resolve([])["rows"] == []
+    with pytest.raises(ValueError, match="each scanned row must be an object"):
+        store.resolve([["CMR", "1"]])
+
+
+@pytest.mark.parametrize("value, code", [
+    ("en", "en"), ("Japanese", "ja"), (" SIMPLIFIED_CHINESE ", "zhs"), ("zht", "zht"), (None, "en"), ("", "en"),
+    ("Klingon", ""), (3, ""),
+])
+def test_language_code(value, code):
+    assert language_code(value) == code
+
+
+@pytest.mark.parametrize("scan, finish", [
+    ({}, "nonfoil"), ({"foil": True}, "foil"), ({"foil": "Yes"}, "foil"), ({"foil": "etched"}, "etched"),
+    ({"foil": "no"}, "nonfoil"), ({"finish": "Etched", "foil": False}, "etched"), ({"finish": "shiny"}, "nonfoil"),
+])
+def test_scan_finish(scan, finish):
+    assert scan_finish(scan) == finish and finish in FINISHES
+
+
+def test_collector_number():
+    assert [collector_number(n) for n in ("089", "0", " 12a ", None, 7)] == ["89", "0", "12a", "", "7"]
+    assert math.isnan(PrintingStore.from_scryfall([{"set": "a", "collector_number": "1", "name": "x"}]).prices[0, 0])
+    assert np.all(PrintingStore.from_scryfall([]).key == np.zeros(0))
@@ -0,0 +1,169 @@
+import datetime
+import json
+import math
+import random
+
+import numpy as np
+import pytest
+
+from reprint_risk import BANDS, RATIONALES, ReprintRisk, fold
+
+TODAY = datetime.date(2024, 6, 1)
+
+
+def random_printings(rng, cards=60):
+    rows = []
+    for c in range(cards):
+        reserved = rng.random() < 0.1
+        for _ in range(rng.randint(1, 9)):
+            day = datetime.date(1993, 8, 5) + datetime.timedelta(days=rng.randrange(11000))
+            rows.append((f"Card {c}", day.isoformat(), reserved))
+    rows.append(("", "2020-01-01", False))
+    rows.append(("No Date", None, False))
+    rng.shuffle(rows)
+    return rows
+
+
+def reference(rows, today=TODAY):
+    """Per card: (risk, reprints, avg interval, last printed, rationale), straight from the formula."""
+    dates, reserved = {}, {}
+    for name, released, is_reserved in rows:
+        if name and released:
+            dates.setdefault(name, set()).add(datetime.date.fromisoformat(released))
+            reserved[name] = reserved.get(name, False) or is_reserved
+    out = {}
+    for name, days in dates.items():
+        days = sorted(days)
+        reprints = len(days) - 1
+        interval = (days[-1] - days[0]).days / reprints if reprints else None
+        since = max((today - days[-1]).days, 0)
+        count = min(reprints, 6) / 6
+        pace = min(max((6 * 365 - interval) / (5 * 365), 0), 1) if reprints else 0.0
+        due = min(since / (max(interval, 1) if reprints else 5 * 365), 1)
+        risk = 0 if reserved[name] else round(100 * (0.45 * count + 0.35 * pace + 0.20 * due))
+        parts = []
+        if reserved[name]:
+            parts.append("Reserved list card; never reprinted")
+        elif not reprints:
+            parts.append("Never reprinted")
+        if reprints >= 3:
+            parts.append("Multiple past reprints")
+        if reprints and interval <= 2 * 365:
+            parts.append("Short average interval")
+        rationale = "; ".join(parts) or "Staple with moderate reprint history"
+        out[name] = (risk, reprints, interval, days[-1].isoformat(), rationale)
+    return out
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_printings_match_the_formula(seed):
+    rows = random_printings(random.Random(seed))
+    table = ReprintRisk.from_printings(rows, TODAY)
+    expected = reference(rows)
+    assert sorted(table.names) == sorted(expected)
+    for name, (risk, reprints, interval, last, rationale) in expected.items():
+        entry = table.lookup(name)
+        assert entry["risk"] == risk, name
+        assert (entry["reprints"], entry["last_printed"], entry["rationale"]) == (reprints, last, rationale)
+        assert entry["avg_interval_days"] == (None if interval is None else pytest.approx(interval, abs=0.06))
+        assert entry["band"] == [b for b, lo in BANDS if entry["risk"] >= lo][-1]
+
+
+def test_same_day_printings_count_once_and_reserved_scores_zero():
+    table = ReprintRisk.from_printings([
+        ("Bolt", "2010-01-01", False), ("Bolt", "2010-01-01", False), ("Bolt", "2011-01-01", False),
+        ("Lotus", "1993-08-05", True), ("Lotus", "1993-12-01", False),
+        ("Single", "2024-01-01", False),
+    ], TODAY)
+    assert table.lookup("Bolt")["reprints"] == 1 and table.lookup("Bolt")["avg_interval_days"] == 365.0
+    assert table.lookup("Lotus")["risk"] == 0 and table.lookup("Lotus")["band"] == "Low"
+    single = table.lookup("Single")
+    assert single["reprints"] == 0 and single["avg_interval_days"] is None and single["rationale"] == "Never reprinted"
+    assert len(ReprintRisk.from_printings([], TODAY)) == 0
+
+
+def test_bands_and_rationales():
+    table = ReprintRisk(["a", "b", "c", "d", "e"], np.array([0, 28, 29, 60, 61]), RATIONALES, np.zeros(5))
+    assert [BANDS[b][0] for b in table.band] == ["Low", "Low", "Medium", "Medium", "High"]
+    assert RATIONALES[0] == "Staple with moderate reprint history"
+    assert RATIONALES[1 | 2 | 8] == "Reserved list card; never reprinted; Multiple past reprints"
+
+
+def test_scryfall_skips_digital_cards_and_tokens():
+    table = ReprintRisk.from_scryfall([
+        {"name": "Bolt", "released_at": "2010-01-01"},
+        {"name": "Bolt", "released_at": "2012-01-01", "digital": True},
+        {"name": "Soldier", "released_at": "2012-01-01", "layout": "token"},
+        {"name": "Lotus", "released_at": "1993-08-05", "reserved": True},
+    ], TODAY)
+    assert table.names == ["Bolt", "Lotus"] and table.lookup("Bolt")["reprints"] == 0
+    assert table.lookup("Lotus")["risk"] == 0
+
+
+def test_dataset_keeps_the_latest_row(tmp_path):
+    rows = [
+        {"card_name": "Rift", "risk": 40, "rationale": "old", "last_reprint_date": "2019-01-01"},
+        {"card_name": "Rift", "risk": 90, "rationale": "new", "last_reprint_date": "2021-01-01"},
+        {"card_name": "Rift", "risk": 10, "rationale": "older", "last_reprint_date": "2018-01-01"},
+        {"card_name": "Top", "risk": 30, "rationale": "", "last_reprint_date": None},
+        {"card_name": "Unscored", "risk": None},
+    ]
+    path = tmp_path / "risk.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n")
+    table = ReprintRisk.load(str(path))
+    assert table.lookup("Rift") == {"card_name": "Rift", "risk": 90, "band": "High", "rationale": "new",
+                                    "reprints": None, "avg_interval_days": None, "last_printed": "2021-01-01"}
+    assert table.lookup("Top")["last_printed"] is None and table.lookup("Unscored") is None
+
+
+def test_names_resolve_exactly_then_folded():
+    table = ReprintRisk.from_printings([("Sensei's Divining Top", "2010-01-01", False),
+                                        ("Lim-Dûl's Vault", "1996-01-01", False)], TODAY)
+    assert fold("  Lim‑Dûl’s   VAULT ") == fold("Lim-Dul's Vault") == "lim-dul's vault"
+    assert table.resolve(["Sensei’s Divining Top", "lim-dul's vault", "Nothing"]).tolist() == [0, 1, -1]
+
+
+def test_exposure_matches_a_loop():
+    rng = random.Random(9)
+    table = ReprintRisk.from_printings(random_printings(rng), TODAY)
+    names = [rng.choice(table.names + ["Unknown A", "unknown b"]) for _ in range(80)]
+    names += [n.upper() for n in rng.sample(table.names, 5)]
+    qty = [rng.randint(1, 4) for _ in names]
+    price_of = {n: None if rng.random() < 0.2 else round(rng.uniform(0.1, 50), 2) for n in table.names}
+    calls = []
+    prices = table.prices(names, lambda n: calls.append(n) or price_of[n])
+    assert sorted(calls) == sorted(set(calls))
+    got = table.exposure(names, qty, prices, top=7)
+
+    held = {}
+    for name, q in zip(names, qty):
+        i = int(table.resolve([name])[0])
+        if i >= 0:
+            held[i] = held.get(i, 0) + q
+    risk_value = {i: q * (price_of[table.names[i]] or 0.0) * float(table.risk[i]) / 100 for i, q in held.items()}
+    assert got["cards"] == sum(qty) and got["scored_cards"] == sum(held.values())
+    assert got["unknown_cards"] == sum(q for n, q in zip(names, qty) if table.resolve([n])[0] < 0)
+    assert got["unpriced_cards"] == sum(q for i, q in held.items() if price_of[table.names[i]] is None)
+    assert got["value_at_risk_gbp"] == pytest.approx(sum(risk_value.values()), abs=0.01)
+    assert sum(b["cards"] for b in got["by_band"].values()) == got["scored_cards"]
+    assert sum(b["value_gbp"] for b in got["by_band"].values()) == pytest.approx(got["value_gbp"], abs=0.02)
+    worst = sorted(held, key=lambda i: (-risk_value[i], i))[:7]
+    assert [t["card_name"] for t in got["top"]] == [table.names[i] for i in worst]
+    for t in got["top"]:
+        price = price_of[t["card_name"]]
+        assert t["qty"] == held[table.ids[t["card_name"]]]
+        assert t["price_gbp"] == (None if price is None else price)
+    assert not math.isnan(got["value_gbp"])
+
+
+def test_exposure_of_nothing():
+    table = ReprintRisk.from_printings([("Bolt", "2010-01-01", False)], TODAY)
+    got = table.exposure([], [], table.prices([], lambda n: 1.0), top=5)
+    assert got["cards"] == 0 and got["top"] == [] and got["value_at_risk_gbp"] == 0.0
+    assert table.exposure(["Bolt"], [2], np.array([3.0]), top=0)["top"] == []
+
+
+def test_bundled_dataset_loads():
+    table = ReprintRisk.load()
+    assert len(table) > 10
+    assert table.lookup("Cyclonic Rift")["band"] == "High"
@@ -0,0 +1,180 @@
+import json
+import math
+import random
+from collections import Counter
+
+import pytest
+
+import retrieval
+from retrieval import B, K1, RetrievalIndex, Segment, tokens
+
+VOCAB = "ramp draw removal token sac counters mana rock elf dragon wrath tutor combo blink graveyard".split()
+COMMANDERS = ["Atraxa", "Kaust", "Meren"]
+TOPICS = ["synergy", "rules", "budget"]
+
+
+def chunk(i, text, **meta):
+    return {"doc_id": f"doc:{i}", "chunk_id": f"doc:{i}:1", "text": text, "meta": meta}
+
+
+def random_chunks(rng, n, start=0):
+    return [
+        chunk(i, " ".join(rng.choice(VOCAB) for _ in range(rng.randint(1, 12))),
+              commander_name=rng.choice(COMMANDERS), topic=rng.choice(TOPICS),
+              cards=rng.sample(["Sol Ring", "Arcane Signet", "Swords"], rng.randint(0, 2)))
+        for i in range(start, start + n)
+    ]
+
+
+def write_packs(path, rows, mode="w"):
+    with open(path, mode, encoding="utf-8") as fh:
+        fh.writelines(json.dumps(row) + "\n" for row in rows)
+
+
+def bm25(rows, query, filters=None):
+    """Every matching chunk's BM25 score, best first, ties in packs order."""
+    docs = [(row, Counter(tokens(row["text"]))) for row in rows if tokens(row["text"])]
+    avgdl = sum(sum(tf.values()) for _row, tf in docs) / len(docs)
+    scored = []
+    for position, (row, tf) in enumerate(docs):
+        meta = row["meta"]
+        if any(not matches(meta.get(field), values) for field, values in (filters or {}).items()):
+            continue
+        score = 0.0
+        for term in dict.fromkeys(tokens(query)):
+            df = sum(term in other for _r, other in docs)
+            if tf[term]:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5)) * (K1 + 1)
+                score += idf * tf[term] / (tf[term] + K1 * (1 - B + B * sum(tf.values()) / avgdl))
+        if score > 0:
+            scored.append((-score, position, row["chunk_id"]))
+    return [(chunk_id, -neg) for neg, _p, chunk_id in sorted(scored)]
+
+
+def matches(value, wanted):
+    wanted = [wanted] if isinstance(wanted, str) else wanted
+    have = value if isinstance(value, list) else [value]
+    return any(str(h).casefold() == w.casefold() for h in have for w in wanted)
+
+
+def check_hits(hits, expected, k):
+    assert [h.score for h in hits] == pytest.approx([s for _c, s in expected[:k]], rel=1e-4)
+    by_id = dict(expected)
+    for hit in hits:
+        assert by_id[hit.chunk_id] == pytest.approx(hit.score, rel=1e-4)
+    assert len({h.chunk_id for h in hits}) == len(hits)
+
+
+def test_tokens_fold_case_accents_and_stopwords():
+    assert tokens("The Éowyn's   Sol-Ring, and 2 Æther!") == ["eowyn", "s", "sol", "ring", "2", "aether"]
+    assert tokens("of the and") == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_search_matches_brute_force_bm25(tmp_path, seed):
+    rng = random.Random(seed)
+    rows = random_chunks(rng, 300)
+    write_packs(tmp_path / "packs.jsonl", rows)
+    index = RetrievalIndex.build(str(tmp_path / "packs.jsonl"), str(tmp_path / "index"))
+    assert len(index) == 300
+    for _ in range(20):
+        query = " ".join(rng.sample(VOCAB, rng.randint(1, 4)))
+        k = rng.choice([1, 3, 10])
+        filters = rng.choice([None, {"topic": "rules"}, {"commander_name": ["atraxa", "MEREN"], "cards": "Sol Ring"}])
+        check_hits(index.search(query, k, filters), bm25(rows, query, filters), k)
+
+
+def test_loaded_index_matches_the_built_one(tmp_path):
+    rows = random_chunks(random.Random(4), 120)
+    write_packs(tmp_path / "packs.jsonl", rows)
+    built = RetrievalIndex.build(str(tmp_path / "packs.jsonl"), str(tmp_path / "index"))
+    for mmap in (True, False):
+        loaded = RetrievalIndex.load(str(tmp_path / "index"), mmap=mmap)
+        assert loaded.search("ramp dragon wrath", 8) == built.search("ramp dragon wrath", 8)
+
+
+def test_skipped_lines_ties_and_edge_cases(tmp_path):
+    path = tmp_path / "packs.jsonl"
+    write_packs(path, [chunk(0, "sol ring ramp"), chunk(1, "the of and"), chunk(2, "sol ring ramp", topic="rules"),
+                       chunk(3, "wrath")])
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("\n   \n")
+    index = RetrievalIndex.build(str(path), str(tmp_path / "index"))
+    assert len(index) == 3
+    assert [h.chunk_id for h in index.search("ramp", 5)] == ["doc:0:1", "doc:2:1"]
+    hit = index.search("ramp", 5, {"topic": "RULES"})[0]
+    assert hit.doc_id == "doc:2" and hit.meta == {"topic": "rules"} and hit.text == "sol ring ramp"
+    assert index.search("ramp", 0) == [] and index.search("the", 5) == [] and index.search("dragon", 5) == []
+    with pytest.raises(ValueError):
+        index.search("ramp", 5, {"colour": "G"})
+
+
+def test_refresh_indexes_appended_lines(tmp_path):
+    rng = random.Random(8)
+    path = tmp_path / "packs.jsonl"
+    rows = random_chunks(rng, 50)
+    write_packs(path, rows)
+    index = RetrievalIndex.build(str(path), str(tmp_path / "index"))
+    assert index.refresh(str(path)) == 0
+    more = random_chunks(rng, 20, start=50)
+    write_packs(path, more, "a")
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(chunk(99, "dragon dragon")))
+    # The line without its newline waits for the next refresh.
+    assert index.refresh(str(path)) == 20
+    assert len(index.segments) == 2
+    check_hits(index.search("dragon tutor", 10), bm25(rows + more, "dragon tutor"), 10)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("\n")
+    assert index.refresh(str(path)) == 1
+    assert index.search("dragon", 1)[0].chunk_id == "doc:99:1"
+    # Another process opening the directory sees the same index.
+    assert len(RetrievalIndex.open(str(path), str(tmp_path / "index"))) == 71
+
+
+def test_rewritten_packs_are_rebuilt(tmp_path):
+    path = tmp_path / "packs.jsonl"
+    write_packs(path, [chunk(0, "sol ring"), chunk(1, "arcane signet")])
+    index = RetrievalIndex.build(str(path), str(tmp_path / "index"))
+    write_packs(path, [chunk(5, "wrath of god"), chunk(6, "sol ring"), chunk(7, "dragon")])
+    assert index.refresh(str(path)) == 3
+    assert [h.chunk_id for h in index.search("sol signet", 5)] == ["doc:6:1"]
+    write_packs(path, [chunk(8, "sol ring")])
+    assert index.refresh(str(path)) == 1 and len(index) == 1
+
+
+def test_segments_are_merged_past_the_limit(tmp_path):
+    rng = random.Random(2)
+    path = tmp_path / "packs.jsonl"
+    rows = random_chunks(rng, 10)
+    write_packs(path, rows)
+    index = RetrievalIndex.build(str(path), str(tmp_path / "index"))
+    for batch in range(retrieval.MAX_SEGMENTS):
+        more = random_chunks(rng, 5, start=10 + 5 * batch)
+        write_packs(path, more, "a")
+        rows += more
+        index.refresh(str(path))
+    assert len(index.segments) == 1 and len(index) == len(rows)
+    assert sorted(p.name for p in (tmp_path / "index").iterdir()) == ["meta.json", index.meta["segments"][0]]
+    check_hits(index.search("elf mana rock", 6), bm25(rows, "elf mana rock"), 6)
+
+
+def test_open_builds_a_missing_index_and_rejects_other_versions(tmp_path):
+    path = tmp_path / "packs.jsonl"
+    write_packs(path, [chunk(0, "sol ring")])
+    index = RetrievalIndex.open(str(path), str(tmp_path / "index"))
+    assert len(index) == 1
+    meta_path = tmp_path / "index" / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    meta_path.write_text(json.dumps({**meta, "version": retrieval.INDEX_VERSION + 1}))
+    with pytest.raises(ValueError):
+        RetrievalIndex.load(str(tmp_path / "index"))
+    assert len(RetrievalIndex.open(str(path), str(tmp_path / "index"))) == 1
+
+
+def test_segment_postings_cover_every_token():
+    rows = random_chunks(random.Random(6), 40)
+    segment = Segment.build(json.dumps(row).encode() for row in rows)
+    counts = Counter(t for row in rows for t in set(tokens(row["text"])))
+    assert {t: segment.df(t) for t in counts} == counts
+    assert [json.loads(line) for line in segment.lines()] == rows
@@ -0,0 +1,137 @@
+import math
+import re
+
+import pytest
+
+from rules_index import (
+    RULES_DATASET, RulesIndex, entry_json, normalise_number, parent, parse_reference, sort_key, words,
+)
+
+ROWS = [
+    {"topic": "Life Total", "rule_reference": "CR 704.5a; CR 119.6", "plain_explanation": "A player at 0 life loses.",
+     "example": "Combat damage drops you to 0.", "sources": ["Comprehensive Rules"]},
+    {"topic": "Legend Rule", "rule_reference": "CR 704.5j", "plain_explanation": "Two legendary permanents.",
+     "example": "", "sources": []},
+    {"topic": "Layers", "rule_reference": "CR 613.1; CR 613.10", "plain_explanation": "Continuous effects apply in layers.",
+     "example": "Humility and Opalescence.", "sources": ["Judge Academy"]},
+    {"topic": "Ward", "rule_reference": "CR 702.21a-c", "plain_explanation": "Ward counters a spell unless its cost is paid.",
+     "example": "", "sources": []},
+    {"topic": "Commander Damage", "rule_reference": "CR 903.10a", "plain_explanation": "21 combat damage from one commander.",
+     "example": "", "sources": []},
+    {"topic": "State-Based Actions", "rule_reference": "CR 704", "plain_explanation": "Checked whenever a player gets priority.",
+     "example": "", "sources": []},
+    {"topic": "No Reference", "rule_reference": "see the glossary", "plain_explanation": "Nothing to parse.",
+     "example": "", "sources": []},
+]
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return RulesIndex.from_rows(ROWS)
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return RulesIndex.load(RULES_DATASET)
+
+
+def test_references_and_numbers():
+    assert parse_reference("CR 704.5a; CR 119.6") == ["704.5a", "119.6"]
+    assert parse_reference("CR 702.25a-c; 702.25B") == ["702.25a", "702.25b", "702.25c"]
+    assert parse_reference("CR 614 ; 702.139h (Companion); glossary") == ["614", "702.139h"]
+    assert normalise_number(" CR 704.5A. ") == "704.5a" and normalise_number("rule 7") == "7"
+    assert normalise_number("704.5.1") is None and normalise_number("banana") is None
+    assert [parent(n) for n in ("704.5a", "704.5", "704", "7")] == ["704.5", "704", "7", None]
+    assert sorted(["613.10", "613.2", "613", "613.1b", "613.1"], key=sort_key) == ["613", "613.1", "613.1b", "613.2", "613.10"]
+
+
+def test_words_fold_accents_and_drop_stopwords():
+    assert words("The Æther Éowyn's state-based actions") == ["aether", "eowyn", "state", "based", "actions"]
+
+
+def beneath(rule, number):
+    """`rule` is `number` or inside it, by the CR numbering scheme."""
+    if rule == number:
+        return True
+    if re.fullmatch(r"\d", number):
+        return rule.startswith(number)
+    if re.fullmatch(r"\d{3}", number):
+        return rule.startswith(number + ".")
+    return re.fullmatch(re.escape(number) + r"[a-z]", rule) is not None
+
+
+def check_lookups(index):
+    numbers = {n for entry in index.entries for rule in entry.rules
+               for n in (rule, rule[0], rule[:3], rule.rstrip("abcdefghijklmnopqrstuvwxyz"))}
+    for number in numbers:
+        expected = [e for e in index.entries if any(beneath(r, number) for r in e.rules)]
+        got = index.lookup(number)
+        assert sorted(map(id, got)) == sorted(map(id, expected)), number
+        assert len(set(map(id, got))) == len(got)
+        exact = index.lookup(number, prefix=False)
+        assert exact == [e for e in index.entries if number in e.rules]
+        assert got[:len(exact)] == exact
+    return numbers
+
+
+def test_lookups_cover_the_subtree(rules):
+    check_lookups(rules)
+    assert [e.topic for e in rules.lookup("704.5")] == ["Life Total", "Legend Rule"]
+    assert [e.topic for e in rules.lookup("704")] == ["State-Based Actions", "Life Total", "Legend Rule"]
+    # 613.1 is not a prefix of 613.10.
+    assert [e.topic for e in rules.lookup("613.1", prefix=False)] == ["Layers"]
+    assert rules.node("613").children == ("613.1", "613.10")
+    assert rules.node("7").children == ("702", "704")
+    assert rules.lookup("702.21B")[0].topic == "Ward"
+    assert rules.lookup("999") == [] and rules.lookup("nonsense") == []
+
+
+def test_bundled_dataset_lookups(dataset):
+    assert len(dataset) > 50
+    assert len(check_lookups(dataset)) > 50
+
+
+def brute_force_search(index, query):
+    n = len(index.entries)
+    fields = []
+    for entry in index.entries:
+        weights = {}
+        for field, weight in (("example", 0.5), ("plain_explanation", 1.0), ("topic", 2.0)):
+            weights.update((w, weight) for w in words(getattr(entry, field)))
+        fields.append(weights)
+    scored = []
+    for i, entry_words in enumerate(fields):
+        score = 0.0
+        for word in dict.fromkeys(words(query)):
+            if word in entry_words:
+                df = sum(word in other for other in fields)
+                score += math.log(1 + (n - df + 0.5) / (df + 0.5)) * entry_words[word]
+        if score:
+            scored.append((-score, i))
+    return [(round(-neg, 3), index.entries[i]) for neg, i in sorted(scored)]
+
+
+@pytest.mark.parametrize("query", [
+    "commander damage", "legendary permanents", "combat damage life", "state based actions priority",
+    "layers humility", "ward counters spell", "the of and", "zzz",
+])
+def test_search_matches_a_brute_force_score(rules, dataset, query):
+    for index in (rules, dataset):
+        assert index.search(query, 5) == brute_force_search(index, query)[:5]
+
+
+def test_citations_prefer_named_rules(rules):
+    cited = rules.citations("Per CR 903.10a and rule 704.5 you lose; see 613.1b.")
+    assert [e.topic for e in cited] == ["Commander Damage", "Life Total", "Legend Rule"]
+    assert [e.topic for e in rules.citations("layers humility opalescence", k=1, min_score=1.0)] == ["Layers"]
+    assert rules.citations("layers", min_score=100.0) == []
+    assert rules.citations("704.5a 704.5a 119.6") == [rules.entries[0]]
+
+
+def test_entry_json():
+    entry = RulesIndex.from_rows(ROWS[:1]).entries[0]
+    assert entry_json(entry) == {
+        "topic": "Life Total", "rules": ["CR 704.5a", "CR 119.6"], "rule_reference": "CR 704.5a; CR 119.6",
+        "plain_explanation": "A player at 0 life loses.", "example": "Combat damage drops you to 0.",
+        "sources": ["Comprehensive Rules"],
+    }
@@ -0,0 +1,107 @@
+import json
+import random
+
+import pytest
+
+from card_index import CardIndex, colour_mask
+from synergy import SynergyTable, combined_score
+from test_card_index import FORMATS, ROLES, linear_candidates, synthetic_database
+
+WEIGHT = 0.7
+
+
+def random_scores(database, commanders, seed):
+    rng = random.Random(seed)
+    names = list(database)
+    return {c: {n: round(rng.random(), 2) for n in rng.sample(names, len(names) // 5)} for c in commanders}
+
+
+def brute_ranked(index, database, roles, fmt, colours, k, scores, max_price, exclude, skip):
+    matches = [
+        i for i in linear_candidates(database, roles, fmt, colours, max_price, index.names[exclude])
+        if i not in skip
+    ]
+    matches.sort(key=lambda i: (-combined_score(scores.get(i, 0.0), index.prices[i], WEIGHT), index.rank[i]))
+    return matches[:k]
+
+
+def test_combined_score_prefers_synergy_then_price():
+    assert combined_score(0.0, 0.0, 0.0) == 1.0
+    assert combined_score(0.0, 1.0, 0.0) > combined_score(0.0, 3.0, 0.0)
+    assert combined_score(0.9, 10.0, WEIGHT) > combined_score(0.1, 0.0, WEIGHT)
+
+
+def test_rows_for_the_same_pair_are_averaged(tmp_path):
+    path = tmp_path / "synergy.jsonl"
+    rows = [
+        {"commander_name": "Atraxa", "card_name": "Sol Ring", "synergy_score": 0.5},
+        {"commander_name": "Atraxa", "card_name": "Sol Ring", "synergy_score": 0.7},
+        {"commander_name": "Atraxa", "card_name": "Island", "synergy_score": None},
+        {"commander_name": "", "card_name": "Island", "synergy_score": 0.1},
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n")
+    table = SynergyTable.load(str(path))
+    assert table.commanders() == ["Atraxa"] and len(table) == 1
+    assert table.score("Atraxa", "Sol Ring") == pytest.approx(0.6)
+    assert table.scores("Atraxa", ["Sol Ring", "Island"]) == [pytest.approx(0.6), None]
+    assert table.score("Nobody", "Sol Ring") is None
+
+
+def test_positions_follow_the_index(small_database):
+    table = SynergyTable({"Cmdr": {"Green Ramp": 0.9, "Not Indexed": 0.5, "Cheap Rock": 0.1}})
+    index = CardIndex(small_database)
+    positions = table.positions("Cmdr", index)
+    assert positions == {index.position["Green Ramp"]: 0.9, index.position["Cheap Rock"]: 0.1}
+    assert table.positions("Cmdr", index) is positions
+    assert table.positions("Cmdr", CardIndex(small_database)) is not positions
+    ranked = table.ranked("Cmdr", index, WEIGHT)
+    assert [index.names[i] for i in ranked] == ["Green Ramp", "Cheap Rock"]
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_ranked_candidates_match_a_full_sort(seed):
+    database = synthetic_database(400, seed)
+    index = CardIndex(database)
+    table = SynergyTable(random_scores(database, ["A", "B"], seed))
+    rng = random.Random(seed)
+    for _ in range(60):
+        commander = rng.choice(["A", "B"])
+        scores = table.positions(commander, index)
+        roles = rng.sample(ROLES, rng.choice([1, 2]))
+        fmt = rng.choice(FORMATS)
+        colours = rng.sample("WUBRG", rng.randint(1, 5))
+        k = rng.choice([1, 3, 5])
+        bound = rng.choice([2.0, 10.0, float("inf")])
+        exclude = rng.randrange(index.size)
+        skip = set(rng.sample(range(index.size), 40))
+        got = index.ranked_candidates(
+            roles, fmt, colour_mask(colours), k, scores, table.ranked(commander, index, WEIGHT),
+            WEIGHT, bound, exclude, skip,
+        )
+        assert got == brute_ranked(index, database, roles, fmt, colours, k, scores, bound, exclude, skip)
+    assert index.ranked_candidates(["Ramp"], "Commander", 31, 0, {}, [], WEIGHT) == []
+
+
+def test_commander_replacements_carry_synergy_and_match_a_full_sort(engine):
+    engine.CARD_DATABASE = database = synthetic_database(500, seed=9)
+    engine.rebuild_index()
+    engine._SYNERGY = table = SynergyTable(random_scores(database, ["Cmdr"], 9))
+    index = engine.get_index()
+    scores = table.positions("Cmdr", index)
+    rng = random.Random(9)
+    for name in rng.sample(list(database), 30):
+        fmt = rng.choice(FORMATS)
+        colours = rng.sample("WUBRG", rng.randint(1, 5))
+        expected, chosen = [], set()
+        for tier, bound in engine.DEFAULT_TIERS:
+            picked = brute_ranked(index, database, database[name]["roles"], fmt, colours,
+                                  5 - len(expected), scores, bound, index.position[name], chosen)
+            chosen.update(picked)
+            expected += [(index.names[i], tier, scores.get(i, 0.0)) for i in picked]
+        got = engine.propose_replacements(name, fmt, 5.0, colours, commander="Cmdr")
+        assert [(s["card_name"], s["tier"], s["synergy"]) for s in got] == expected
+
+
+def test_unknown_commander_falls_back_to_cheapest_first(engine, small_database):
+    plain = engine.propose_replacements("Cheap Rock", "Commander", 5.0, ["G"])
+    assert engine.propose_replacements("Cheap Rock", "Commander", 5.0, ["G"], commander="Nobody") == plain
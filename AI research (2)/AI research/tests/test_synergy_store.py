@@ -0,0 +1,129 @@
+import json
+import os
+import random
+
+import pytest
+
+from synergy_store import STORE_VERSION, SynergyStore, open_store, stale
+
+FEATURES = ["usage_z", "text_similarity", "role_match"]
+
+
+def random_rows(rng, commanders=6, cards=40, n=300):
+    """Rows over a few commanders; a pair repeats at most twice and every
+    value is a sixteenth, so means and rounding are exact."""
+    rows, seen = [], {}
+    while len(rows) < n:
+        pair = (f"Commander {rng.randrange(commanders)}", f"Card {rng.randrange(cards):02d}")
+        if seen.get(pair, 0) == 2:
+            continue
+        seen[pair] = seen.get(pair, 0) + 1
+        features = {f: rng.randrange(-16, 17) / 16 for f in rng.sample(FEATURES, rng.randint(0, 3))}
+        rows.append({"commander_name": pair[0], "card_name": pair[1], "synergy_score": rng.randrange(17) / 16,
+                     "features": features})
+    return rows
+
+
+def reference(rows):
+    """commander -> [(card, mean score, mean features)], best first, ties by name."""
+    pairs = {}
+    for row in rows:
+        pair = pairs.setdefault((row["commander_name"], row["card_name"]), ([], {}))
+        pair[0].append(row["synergy_score"])
+        for name, value in row["features"].items():
+            pair[1].setdefault(name, []).append(value)
+    out = {}
+    for (commander, card), (scores, features) in pairs.items():
+        out.setdefault(commander, []).append({
+            "card_name": card, "synergy_score": round(sum(scores) / len(scores), 4),
+            "features": {n: round(sum(v) / len(v), 4) for n, v in features.items()},
+        })
+    for cards in out.values():
+        cards.sort(key=lambda c: (-c["synergy_score"], c["card_name"]))
+    return out
+
+
+def test_top_matches_a_reference_grouping():
+    rows = random_rows(random.Random(1))
+    store = SynergyStore.from_rows(rows)
+    expected = reference(rows)
+    assert store.commanders == sorted(expected)
+    assert len(store) == sum(map(len, expected.values()))
+    for commander, cards in expected.items():
+        assert store.top(commander, 1000) == cards
+        assert store.top(commander, 3, offset=2) == cards[2:5]
+    assert store.scores() == {c: {row["card_name"]: row["synergy_score"] for row in cards} for c, cards in expected.items()}
+
+
+def test_top_bounds_and_names():
+    store = SynergyStore.from_rows(random_rows(random.Random(2)))
+    assert store.top("commander 3", 2) == store.top("Commander 3", 2) == store.top("  COMMANDER 3 ", 2)
+    assert store.top("Nobody") is None
+    assert store.top("Commander 3", 0) == [] and store.top("Commander 3", 5, offset=10 ** 6) == []
+    assert store.top("Commander 3", 2, offset=-5) == store.top("Commander 3", 2)
+
+
+def test_score_pairs_match_the_reference():
+    rng = random.Random(3)
+    rows = random_rows(rng)
+    store = SynergyStore.from_rows(rows)
+    expected = {(c, row["card_name"]): row["synergy_score"] for c, cards in reference(rows).items() for row in cards}
+    pairs = [(f"Commander {rng.randrange(8)}", f"Card {rng.randrange(45):02d}") for _ in range(2000)]
+    assert store.score_pairs(pairs) == [expected.get(p) for p in pairs]
+    assert store.score_pairs([("commander 1", "Card 00"), ("Commander 1", "card 00")])[1] is None
+    assert store.score_pairs([]) == []
+
+
+def test_rows_without_a_commander_card_or_score_are_skipped():
+    store = SynergyStore.from_rows([
+        {"commander_name": "A", "card_name": "X", "synergy_score": 0.5, "features": {"usage_z": "high", "ok": True}},
+        {"commander_name": "", "card_name": "X", "synergy_score": 0.5},
+        {"commander_name": "A", "card_name": "Y"},
+        {"commander_name": "A", "card_name": None, "synergy_score": 1.0},
+    ])
+    assert store.top("A") == [{"card_name": "X", "synergy_score": 0.5, "features": {"ok": 1.0}}]
+    empty = SynergyStore.from_rows([])
+    assert len(empty) == 0 and empty.top("A") is None and empty.score_pairs([("A", "X")]) == [None]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = SynergyStore.from_rows(random_rows(random.Random(4)))
+    store.save(str(tmp_path))
+    for mmap in (True, False):
+        loaded = SynergyStore.load(str(tmp_path), mmap=mmap)
+        assert loaded.commanders == store.commanders and loaded.cards == store.cards
+        assert loaded.scores() == store.scores()
+        assert loaded.top("Commander 0", 50) == store.top("Commander 0", 50)
+    meta = json.loads((tmp_path / "meta.json").read_text())
+    (tmp_path / "meta.json").write_text(json.dumps({**meta, "version": STORE_VERSION + 1}))
+    with pytest.raises(ValueError):
+        SynergyStore.load(str(tmp_path))
+
+
+def test_open_store_rebuilds_when_stale(tmp_path):
+    dataset = tmp_path / "synergy.jsonl"
+    directory = str(tmp_path / "store")
+    dataset.write_text("\n".join(json.dumps(r) for r in random_rows(random.Random(5), n=50)) + "\n\n")
+    assert stale(str(dataset), directory)
+    first = open_store(str(dataset), directory)
+    assert not stale(str(dataset), directory)
+    assert open_store(str(dataset), directory).scores() == first.scores()
+    dataset.write_text(json.dumps({"commander_name": "New", "card_name": "Card", "synergy_score": 1}) + "\n")
+    later = os.path.getmtime(os.path.join(directory, "meta.json")) + 10
+    os.utime(dataset, (later, later))
+    assert stale(str(dataset), directory)
+    assert open_store(str(dataset), directory).commanders == ["New"]
+
+
+def test_engine_loads_a_compiled_store_like_the_jsonl(engine, tmp_path):
+    rows = random_rows(random.Random(6), n=80)
+    dataset = tmp_path / "synergy.jsonl"
+    dataset.write_text("\n".join(json.dumps(r) for r in rows) + "\n")
+    SynergyStore.from_rows(rows).save(str(tmp_path / "store"))
+    from_store = engine.load_synergy_dataset(str(tmp_path / "store"))
+    assert engine.get_synergy() is from_store
+    from_jsonl = engine.load_synergy_dataset(str(dataset))
+    assert sorted(from_store.commanders()) == sorted(from_jsonl.commanders())
+    for commander in from_jsonl.commanders():
+        cards = sorted({r["card_name"] for r in rows}) + ["Nothing"]
+        assert from_store.scores(commander, cards) == pytest.approx(from_jsonl.scores(commander, cards))
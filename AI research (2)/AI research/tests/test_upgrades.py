@@ -0,0 +1,123 @@
+import itertools
+import math
+import random
+
+import pytest
+
+from upgrades import MAX_CELLS, Candidate, Slot, budget_unit, solve_upgrade_columns, solve_upgrades
+
+ROLES = ["Ramp", "Draw", "Removal"]
+
+
+def random_instance(rng):
+    slots = [Slot(f"Out {i}", rng.choice(ROLES), round(rng.random(), 2)) for i in range(rng.randint(1, 5))]
+    candidates = [
+        Candidate(f"In {i}", rng.choice(ROLES), round(rng.random(), 2), rng.choice([0.0, round(rng.uniform(0.1, 8), 2)]))
+        for i in range(rng.randint(0, 9))
+    ]
+    return slots, candidates, rng.choice([0.0, 1.0, 5.0, 12.0])
+
+
+def brute_force(slots, candidates, budget, unit):
+    cells = math.floor(budget / unit + 1e-9)
+    best = 0.0
+    for size in range(min(len(candidates), len(slots)) + 1):
+        for bought in itertools.combinations(candidates, size):
+            if sum(math.ceil(c.cost / unit - 1e-9) for c in bought) > cells:
+                continue
+            gain = 0.0
+            for role in ROLES:
+                ins = sorted((c.value for c in bought if c.role == role), reverse=True)
+                outs = sorted(s.value for s in slots if s.role == role)
+                if len(ins) > len(outs):
+                    break
+                gain += sum(ins) - sum(outs[:len(ins)])
+            else:
+                best = max(best, gain)
+    return best
+
+
+def check_plan(plan, slots, candidates, budget):
+    by_name = {c.name: c for c in candidates}
+    slot_by_name = {s.name: s for s in slots}
+    outs = [swap["out"] for swap in plan["swaps"]]
+    ins = [swap["in"] for swap in plan["swaps"]]
+    assert len(set(outs)) == len(outs) and len(set(ins)) == len(ins)
+    for swap in plan["swaps"]:
+        assert slot_by_name[swap["out"]].role == by_name[swap["in"]].role == swap["role"]
+    assert plan["spent"] == pytest.approx(sum(by_name[n].cost for n in ins), abs=0.01)
+    assert plan["spent"] <= budget + 1e-9
+    assert plan["gain"] == pytest.approx(sum(swap["gain"] for swap in plan["swaps"]), abs=1e-3)
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_plans_are_optimal_on_small_instances(seed):
+    rng = random.Random(seed)
+    slots, candidates, budget = random_instance(rng)
+    plan = solve_upgrades(slots, candidates, budget)
+    check_plan(plan, slots, candidates, budget)
+    assert plan["gain"] == pytest.approx(brute_force(slots, candidates, budget, plan["unit"]), abs=1e-3)
+
+
+def test_columns_and_tuples_agree():
+    rng = random.Random(7)
+    for _ in range(30):
+        slots, candidates, budget = random_instance(rng)
+        columns = tuple(zip(*candidates)) or ((), (), (), ())
+        assert solve_upgrade_columns(slots, *columns, budget=budget) == solve_upgrades(slots, candidates, budget)
+
+
+def test_many_candidates_with_a_small_plan():
+    # Enough candidates that the block prefilter in _group_candidates runs.
+    rng = random.Random(11)
+    slots = [Slot(f"Out {i}", "Ramp", 0.1 * i) for i in range(3)]
+    candidates = [Candidate(f"In {i}", "Ramp", round(rng.random(), 3), round(rng.uniform(0, 10), 2)) for i in range(2000)]
+    plan = solve_upgrades(slots, candidates, 6.0)
+    check_plan(plan, slots, candidates, 6.0)
+    # A candidate with three others at least as cheap and as valuable is
+    # never needed for three swaps; brute force over the rest.
+    useful = [
+        c for c in candidates
+        if c.cost <= 6.0 and sum(o.cost <= c.cost and o.value >= c.value for o in candidates if o is not c) < 3
+    ]
+    assert plan["gain"] == pytest.approx(brute_force(slots, useful, 6.0, plan["unit"]), abs=1e-3)
+
+
+def test_budget_unit_keeps_the_table_narrow():
+    assert budget_unit(5.0) == 0.01
+    assert budget_unit(1000.0) * MAX_CELLS >= 1000.0
+    plan = solve_upgrades([Slot("Out", "Ramp", 0.0)], [Candidate("In", "Ramp", 1.0, 0.003)], 0.0)
+    assert plan["swaps"] == [] and plan["budget"] == 0.0
+
+
+def test_free_cards_and_weaker_candidates():
+    slots = [Slot("Weak", "Ramp", 0.2), Slot("Strong", "Ramp", 0.9)]
+    candidates = [Candidate("Owned", "Ramp", 0.5, 0.0), Candidate("Worse", "Ramp", 0.1, 0.0)]
+    plan = solve_upgrades(slots, candidates, 0.0)
+    assert plan["swaps"] == [{"out": "Weak", "in": "Owned", "role": "Ramp", "cost": 0.0, "gain": 0.3}]
+
+
+@pytest.fixture
+def upgrade_deck(engine, small_database):
+    return [{"card_name": "Cheap Rock", "qty": 1}, {"card_name": "Blue Draw", "qty": 1},
+            {"card_name": "Plain Land", "qty": 10}]
+
+
+def test_plan_upgrades_filters_candidates(engine, upgrade_deck):
+    values = {"Cheap Rock": 0.1, "Blue Draw": 0.2, "Green Ramp": 0.9, "Red Ramp": 0.95,
+              "Banned Rock": 1.0, "Mid Rock": 0.5, "Not In Database": 1.0}
+    plan = engine.plan_upgrades(upgrade_deck, 10.0, "Commander", ["G", "U"], values=values)
+    # Red Ramp is off colour and Banned Rock is banned in Commander.
+    assert [(s["out"], s["in"]) for s in plan["swaps"]] == [("Cheap Rock", "Green Ramp")]
+    assert plan["currency"] == "GBP" and plan["spent"] == 1.0
+    owned = engine.plan_upgrades(upgrade_deck, 0.0, "Commander", ["G", "U"], values=values, owned_cards=["Green Ramp"])
+    assert owned["swaps"][0]["in"] == "Green Ramp" and owned["spent"] == 0.0
+
+
+def test_plan_upgrades_values_cards_by_commander_synergy(engine, upgrade_deck):
+    engine._SYNERGY = engine.SynergyTable({"Cmdr": {"Mid Rock": 0.8, "Cheap Rock": 0.3, "Green Ramp": 0.6}})
+    plan = engine.plan_upgrades(upgrade_deck, 10.0, "Commander", ["G"], commander="Cmdr")
+    assert [(s["out"], s["in"], s["gain"]) for s in plan["swaps"]] == [("Cheap Rock", "Mid Rock", 0.5)]
+    assert engine.plan_upgrades(upgrade_deck, 5.0, "Commander", ["G"], commander="Cmdr")["swaps"][0]["in"] == "Green Ramp"
+    with pytest.raises(ValueError):
+        engine.plan_upgrades(upgrade_deck, 5.0, "Commander", ["G"])
@@ -0,0 +1,241 @@
+"""
+Budget‑Constrained Deck Upgrades
+================================
+
+Per‑card checks only flag cards that break a rule.  This module answers
+the player's question "I have £50 – what are the best upgrades?": given
+the deck's cards, candidate cards with a value (e.g. commander synergy)
+and a price, and a total budget, pick the set of swaps that adds the most
+value without spending more than the budget.
+
+Role coverage
+-------------
+
+A swap replaces a card with a candidate of the same *primary* role (the
+first role listed for each card), so every role keeps as many cards
+whose main job it is.  A candidate is bought at most once and each deck
+card is swapped at most once.
+
+Method
+------
+
+Because swaps never cross primary roles, each role is an independent
+group.  Within a group the total gain of ``j`` swaps is the value of the
+``j`` candidates bought minus the value of the ``j`` weakest deck cards
+of that role, whichever way they are paired.  Groups are therefore
+solved exactly by a 0/1 knapsack over the group's candidates with the
+number of swaps as a second state dimension, and groups are chained
+through one budget array, so the whole plan is a single DP:
+
+* Budget is measured in whole ``unit``s (a penny, or coarser for large
+  budgets so the table stays at most ``MAX_CELLS`` wide).  Prices are
+  rounded *up* to a unit, so a plan never exceeds the budget and is
+  optimal for the rounded prices.
+* A candidate can only be in a group's best plan if fewer than ``m``
+  other candidates (``m`` = the group's deck cards worth upgrading) are
+  at least as cheap and at least as valuable, so dominated candidates
+  are pruned before the DP; of thousands, typically a few dozen remain.
+* Each candidate is one vectorised NumPy update of the group's
+  ``(swaps, budget)`` table, restricted to the swap counts where it
+  would still pair with a weaker deck card and, from below, by its
+  dominators: exchanging a purchase for an earlier (at least as
+  valuable) candidate that is no dearer never hurts, so some best plan
+  takes a candidate only after all ``d`` of those, i.e. from ``d`` swaps
+  up.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Widest budget table; larger budgets use a coarser unit than one penny.
+MAX_CELLS = 2000
+
+
+class Slot(NamedTuple):
+    """A deck card that may be swapped out."""
+
+    name: str
+    role: str
+    value: float
+
+
+class Candidate(NamedTuple):
+    """A card that may be swapped in, at ``cost`` (0 when already owned)."""
+
+    name: str
+    role: str
+    value: float
+    cost: float
+
+
+def budget_unit(budget: float) -> float:
+    """Smallest whole‑penny unit that keeps ``budget`` within ``MAX_CELLS`` units."""
+    return max(0.01, math.ceil(budget / MAX_CELLS * 100) / 100)
+
+
+def _group_candidates(values: np.ndarray, costs: np.ndarray, m: int) -> np.ndarray:
+    """Positions (in ``values``) of candidates that can appear in a best plan of at most ``m`` swaps.
+
+    Scanning cheapest first, a candidate is dropped once ``m`` cards seen
+    so far are worth at least as much.  Most drops are decided in NumPy
+    first: a card worth no more than the ``m``‑th best of an earlier block
+    of the scan would be dropped anyway, so the heap only sees the rest.
+    """
+    order = np.lexsort((-values, costs))
+    scan = values[order]
+    block = max(4 * m, 64)
+    full = len(scan) // block
+    if full > 1:
+        nth = np.partition(scan[:full * block].reshape(full, block), block - m, axis=1)[:, block - m]
+        floor = np.full(len(scan), -np.inf)
+        floor[block:] = np.repeat(np.maximum.accumulate(nth), block)[:len(scan) - block]
+        survivors = scan > floor
+        order, scan = order[survivors], scan[survivors]
+    top: List[float] = []
+    kept: List[int] = []
+    for i, value in zip(order.tolist(), scan.tolist()):
+        if len(top) >= m and top[0] >= value:
+            continue
+        kept.append(i)
+        if len(top) < m:
+            heapq.heappush(top, value)
+        else:
+            heapq.heapreplace(top, value)
+    return np.array(kept, dtype=np.intp)
+
+
+def solve_upgrades(
+    slots: Iterable[Slot],
+    candidates: Iterable[Candidate],
+    budget: float,
+    unit: Optional[float] = None,
+) -> Dict[str, object]:
+    """Most valuable set of swaps costing at most ``budget`` in total.
+
+    Returns the swaps (``out``, ``in``, ``role``, ``cost``, ``gain``),
+    the amount ``spent``, the total ``gain`` and the ``unit`` prices
+    were rounded up to.  Candidates that cost more than the budget, or
+    are not worth more than any deck card of their role, are ignored.
+    """
+    columns = tuple(zip(*candidates)) or ((), (), (), ())
+    return solve_upgrade_columns(slots, *columns, budget=budget, unit=unit)
+
+
+def solve_upgrade_columns(
+    slots: Iterable[Slot],
+    names: Sequence[str],
+    roles: Sequence[str],
+    values: Sequence[float],
+    costs: Sequence[float],
+    budget: float,
+    unit: Optional[float] = None,
+) -> Dict[str, object]:
+    """``solve_upgrades`` for candidates given as columns (arrays or sequences).
+
+    Candidate ``i`` is ``Candidate(names[i], roles[i], values[i], costs[i])``;
+    callers with thousands of candidates pass NumPy arrays rather than a
+    tuple per card, and only the chosen names are read.
+    """
+    slots = list(slots)
+    roles = np.asarray(roles, dtype=str)
+    values = np.asarray(values, dtype=np.float64)
+    costs = np.asarray(costs, dtype=np.float64)
+    budget = max(0.0, float(budget))
+    unit = budget_unit(budget) if unit is None else unit
+    cells = int(math.floor(budget / unit + 1e-9))
+    unit_costs = np.maximum(np.ceil(costs / unit - 1e-9), 0).astype(np.int64)
+    affordable = unit_costs <= cells
+
+    by_role: Dict[str, List[Slot]] = {}
+    for slot in slots:
+        by_role.setdefault(slot.role, []).append(slot)
+
+    # float32 halves the memory traffic of the table updates; reported
+    # gains are recomputed from the card values.
+    best = np.zeros(cells + 1, dtype=np.float32)
+    # Per group: (weakest slots first, candidate positions in DP order, their
+    # costs, per-candidate first swap count and "taken" mask, best swap count
+    # per budget).
+    stages: List[Tuple[List[Slot], List[int], List[int], List[Tuple[int, np.ndarray]], np.ndarray]] = []
+    for role, group in by_role.items():
+        group = sorted(group, key=lambda s: s.value)
+        pool = np.flatnonzero(affordable & (roles == role))
+        if not pool.size:
+            continue
+        top_value = values[pool].max()
+        group = [s for s in group if s.value < top_value]
+        if not group:
+            continue
+        pool = pool[values[pool] > group[0].value]
+        kept = np.sort(pool[_group_candidates(values[pool], unit_costs[pool], len(group))])
+        kept = kept[np.lexsort((unit_costs[kept], -values[kept]))]
+        kept_costs = unit_costs[kept]
+        order = kept.tolist()
+        weights = kept_costs.tolist()
+        out_values = np.array([s.value for s in group], dtype=np.float32)
+        gains = values[kept].astype(np.float32)
+        # The k-th candidate taken (most valuable first) pairs with the k-th
+        # weakest slot; the group total does not depend on pairing.  A best
+        # plan never takes a candidate as a losing pair (dropping its least
+        # valuable purchase would do better), so only slots worth less than
+        # it are considered.
+        weaker = np.searchsorted(out_values, gains).tolist()
+        # Earlier candidates (at least as valuable) that are no dearer.
+        dominators = np.tril(kept_costs[None, :] <= kept_costs[:, None], -1).sum(axis=1).tolist()
+        table = np.full((len(group) + 1, cells + 1), -np.inf, dtype=np.float32)
+        table[0] = best
+        masks: List[Tuple[int, np.ndarray]] = []
+        for t, (value, w) in enumerate(zip(gains, weights)):
+            rows = min(weaker[t], t + 1)
+            first = min(dominators[t], rows)
+            take = table[first:rows, :cells + 1 - w] + (value - out_values[first:rows])[:, None]
+            target = table[first + 1:rows + 1, w:]
+            taken = take > target
+            np.maximum(target, take, out=target)
+            masks.append((first, taken))
+        swaps = table.argmax(axis=0)
+        best = table[swaps, np.arange(cells + 1)]
+        stages.append((group, order, weights, masks, swaps))
+
+    chosen: List[Tuple[Slot, Candidate]] = []
+    b = cells
+    for group, order, weights, masks, swaps in reversed(stages):
+        k = int(swaps[b])
+        bought: List[Candidate] = []
+        for t in range(len(order) - 1, -1, -1):
+            if not k:
+                break
+            w = weights[t]
+            first, mask = masks[t]
+            if b >= w and first < k <= first + len(mask) and mask[k - 1 - first, b - w]:
+                j = order[t]
+                bought.append(Candidate(names[j], group[0].role, float(values[j]), float(costs[j])))
+                k -= 1
+                b -= w
+        # Strongest purchase replaces the strongest of the slots given up.
+        bought.sort(key=lambda c: -c.value)
+        given_up = sorted(group[:len(bought)], key=lambda s: -s.value)
+        chosen.extend(zip(given_up, bought))
+
+    swaps_out = [
+        {
+            "out": slot.name,
+            "in": c.name,
+            "role": slot.role,
+            "cost": round(c.cost, 2),
+            "gain": round(c.value - slot.value, 4),
+        }
+        for slot, c in sorted(chosen, key=lambda pair: (pair[0].role, -(pair[1].value - pair[0].value)))
+    ]
+    return {
+        "swaps": swaps_out,
+        "spent": round(sum(c.cost for _slot, c in chosen), 2),
+        "gain": round(sum(c.value - slot.value for slot, c in chosen), 4),
+        "budget": round(budget, 2),
+        "unit": unit,
+    }
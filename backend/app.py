@@ -1,15 +1,41 @@
 # backend/app.py
+import csv
 import hmac
+import math
 import os
 import re
+import sys
 import time
 from collections import Counter, defaultdict
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 import requests
 from flask import Flask, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
 
+# Sibling modules must import both as `gunicorn backend.app:app` (repo root)
+# and `python app.py` / `from app import app` (backend dir).
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from price_refresher import HotKeyTracker, PriceRefresher  # noqa: E402
+import deadline  # noqa: E402
+from collections_store import (  # noqa: E402
+    CollectionStore, CollectionTooLarge, iter_collection_rows, normalize_card_name, text_stream,
+)
+from tiered_cache import Namespace, TieredCache  # noqa: E402
+from replacements import (  # noqa: E402
+    DEFAULT_ENGINE_DIR, DEFAULT_METAGAME_PATH, DEFAULT_REPRINT_RISK_PATH, MetagameService, MulliganService,
+    PrintingsService, ProbabilityService, ReplacementService, ReprintRiskService, decklist, engine_fx_to_gbp,
+)
+from synergy_service import DEFAULT_SYNERGY_DATASET, SynergyService  # noqa: E402
+from name_service import CardNameService  # noqa: E402
+from grounding import (  # noqa: E402
+    DEFAULT_PACKS_PATH, DEFAULT_RULES_PATH, GroundingService, RulesService, grounded_system_prompt,
+)
+
 # -------------------------
 # Optional OpenAI import
 # -------------------------
@@ -72,6 +98,76 @@ MAX_PROMPT_CHARS = int(os.getenv("LEGACY_MAX_PROMPT_CHARS", "4000"))
 MAX_DECK_TEXT_CHARS = int(os.getenv("LEGACY_MAX_DECK_TEXT_CHARS", "30000"))
 RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("LEGACY_RATE_LIMIT_WINDOW_SECONDS", "60"))
 RATE_LIMIT_MAX_REQUESTS = int(os.getenv("LEGACY_RATE_LIMIT_MAX_REQUESTS", "30"))
+PRICE_CACHE_TTL_SECONDS = int(os.getenv("PRICE_CACHE_TTL_SECONDS", "21600"))
+PRICE_REFRESHER_ENABLED = os.getenv("PRICE_REFRESHER_ENABLED", "1") == "1"
+PRICE_REFRESH_LEAD_SECONDS = int(os.getenv("PRICE_REFRESH_LEAD_SECONDS", "600"))
+# Upstream refreshes per minute for the whole host. Every gunicorn worker
+# (WEB_CONCURRENCY of them, gunicorn's own default) runs its own refresher,
+# so each gets an equal share.
+PRICE_REFRESH_BUDGET_PER_MIN = int(os.getenv("PRICE_REFRESH_BUDGET_PER_MIN", "60"))
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+PRICE_REFRESH_INTERVAL_SECONDS = float(os.getenv("PRICE_REFRESH_INTERVAL_SECONDS", "5"))
+# Decayed hit score a key needs to count as hot; 1.5 ~= two lookups within a half-life.
+PRICE_HOT_MIN_SCORE = float(os.getenv("PRICE_HOT_MIN_SCORE", "1.5"))
+PRICE_HOT_MAX_KEYS = int(os.getenv("PRICE_HOT_MAX_KEYS", "2000"))
+# Shared on-disk L2 for upstream responses; empty string disables L2 (L1 only).
+UPSTREAM_CACHE_PATH = os.getenv("UPSTREAM_CACHE_PATH", os.path.join(BACKEND_DIR, ".cache", "upstream.sqlite3"))
+CARD_CACHE_TTL_SECONDS = int(os.getenv("CARD_CACHE_TTL_SECONDS", "604800"))
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "86400"))
+COMBO_CACHE_TTL_SECONDS = int(os.getenv("COMBO_CACHE_TTL_SECONDS", "86400"))
+FX_CACHE_TTL_SECONDS = int(os.getenv("FX_CACHE_TTL_SECONDS", "43200"))
+FX_RATES_URL = os.getenv("FX_RATES_URL", "https://api.frankfurter.app/latest")
+# Overall budget per request for upstream work; LEGACY_ROUTE_DEADLINES overrides it
+# per path, e.g. "/deckcheck=20,/api/collections/cost=15". 0 disables.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("LEGACY_REQUEST_DEADLINE_SECONDS", "25"))
+ROUTE_DEADLINES = deadline.parse_route_deadlines(os.getenv("LEGACY_ROUTE_DEADLINES", ""))
+COLLECTIONS_DB_PATH = os.getenv("COLLECTIONS_DB_PATH", os.path.join(BACKEND_DIR, ".data", "collections.sqlite3"))
+COLLECTION_MAX_BYTES = int(os.getenv("COLLECTION_MAX_BYTES", str(20 * 1024 * 1024)))
+COLLECTION_MAX_ROWS = int(os.getenv("COLLECTION_MAX_ROWS", "100000"))
+COLLECTION_TTL_DAYS = int(os.getenv("COLLECTION_TTL_DAYS", "90"))
+UPSTREAM_CACHE_L1_MAX = int(os.getenv("UPSTREAM_CACHE_L1_MAX", "5000"))
+UPSTREAM_CACHE_L2_MAX = int(os.getenv("UPSTREAM_CACHE_L2_MAX", "200000"))
+REPLACEMENT_ENGINE_DIR = os.getenv("REPLACEMENT_ENGINE_DIR", DEFAULT_ENGINE_DIR)
+# Used while the FX fetch fails, and cached for FX_FALLBACK_TTL_SECONDS so an
+# outage costs one upstream attempt per TTL rather than one per price. The
+# defaults are the engine's currency.FX_TO_GBP, shared with every module.
+_FX_TO_GBP = engine_fx_to_gbp(REPLACEMENT_ENGINE_DIR)
+FX_FALLBACK_USD_GBP = float(os.getenv("FX_FALLBACK_USD_GBP", str(_FX_TO_GBP["USD"])))
+FX_FALLBACK_USD_EUR = float(os.getenv("FX_FALLBACK_USD_EUR", str(round(_FX_TO_GBP["USD"] / _FX_TO_GBP["EUR"], 4))))
+FX_FALLBACK_TTL_SECONDS = int(os.getenv("FX_FALLBACK_TTL_SECONDS", "300"))
+# Replacement engine: build its indexes when the worker imports the app.
+REPLACEMENTS_PRELOAD = os.getenv("REPLACEMENTS_PRELOAD", "1") == "1"
+REPLACEMENTS_MAX_BATCH = int(os.getenv("REPLACEMENTS_MAX_BATCH", "50"))
+# Suggestion lists the shared replacement memo keeps, least recently used evicted first.
+REPLACEMENTS_MEMO_SIZE = int(os.getenv("REPLACEMENTS_MEMO_SIZE", "20000"))
+# Precomputed reprint scores, or a Scryfall default_cards dump to score.
+REPRINT_RISK_PATH = os.getenv("REPRINT_RISK_PATH", DEFAULT_REPRINT_RISK_PATH)
+REPRINT_RISK_MAX_TOP = int(os.getenv("REPRINT_RISK_MAX_TOP", "100"))
+METAGAME_DATASET_PATH = os.getenv("METAGAME_DATASET_PATH", DEFAULT_METAGAME_PATH)
+METAGAME_MAX_SIMILAR = int(os.getenv("METAGAME_MAX_SIMILAR", "20"))
+PROBABILITY_MAX_SCENARIOS = int(os.getenv("PROBABILITY_MAX_SCENARIOS", "100"))
+MULLIGAN_MAX_HANDS = int(os.getenv("MULLIGAN_MAX_HANDS", "1000000"))
+# Printings for /api/scans/resolve: a Scryfall all_cards dump or a compiled
+# printings store. None is bundled, so the route answers 503 until this is set.
+PRINTINGS_PATH = os.getenv("PRINTINGS_PATH", "")
+SCANS_MAX_ROWS = int(os.getenv("SCANS_MAX_ROWS", "20000"))
+# Retrieval grounding for /api: BM25 over the research retrieval packs.
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "1") == "1"
+RETRIEVAL_PRELOAD = os.getenv("RETRIEVAL_PRELOAD", "1") == "1"
+RETRIEVAL_PACKS_PATH = os.getenv("RETRIEVAL_PACKS_PATH", DEFAULT_PACKS_PATH)
+RETRIEVAL_INDEX_DIR = os.getenv("RETRIEVAL_INDEX_DIR", os.path.join(BACKEND_DIR, ".cache", "retrieval"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_REFRESH_SECONDS = float(os.getenv("RETRIEVAL_REFRESH_SECONDS", "30"))
+RETRIEVAL_RETRY_SECONDS = float(os.getenv("RETRIEVAL_RETRY_SECONDS", "60"))
+RULES_DATASET_PATH = os.getenv("RULES_DATASET_PATH", DEFAULT_RULES_PATH)
+RULES_MAX_RESULTS = int(os.getenv("RULES_MAX_RESULTS", "20"))
+# Columnar commander synergy store, rebuilt from the dataset when older.
+SYNERGY_DATASET = os.getenv("SYNERGY_DATASET", DEFAULT_SYNERGY_DATASET)
+SYNERGY_STORE_DIR = os.getenv("SYNERGY_STORE_DIR", os.path.join(BACKEND_DIR, ".cache", "synergy_store"))
+SYNERGY_MAX_TOP = int(os.getenv("SYNERGY_MAX_TOP", "200"))
+SYNERGY_MAX_PAIRS = int(os.getenv("SYNERGY_MAX_PAIRS", "10000"))
+# Offline alias/variant rewrites below this confidence are not applied.
+CARD_NAME_MIN_CONFIDENCE = float(os.getenv("CARD_NAME_MIN_CONFIDENCE", "0.75"))
 
 SCRYFALL = "https://api.scryfall.com"
 SPELLBOOK = "https://commanderspellbook.com/api"
@@ -80,18 +176,54 @@ SPELLBOOK = "https://commanderspellbook.com/api"
 # Utilities
 # -------------------------
 def http_get(url, **kwargs):
-    kwargs.setdefault("timeout", 12)
+    # Raises deadline.DeadlineExceeded once the request's budget is spent,
+    # including when a timeout capped by the budget is what cut the call short.
+    default = kwargs.get("timeout", 12)
+    kwargs["timeout"] = deadline.timeout_for(default)
     try:
         r = requests.get(url, **kwargs)
         return r
     except Exception:
+        if kwargs["timeout"] < default and deadline.expired():
+            deadline.note_partial()
+            raise deadline.DeadlineExceeded()
         class R:
             status_code = 599
             def json(self): return {}
             text = "request_failed"
         return R()
 
-PRICE_CACHE: Dict[Tuple[str, str], float] = {}
+UPSTREAM_CACHE = TieredCache(UPSTREAM_CACHE_PATH, {
+    "card": Namespace(CARD_CACHE_TTL_SECONDS, UPSTREAM_CACHE_L1_MAX, UPSTREAM_CACHE_L2_MAX),
+    "search": Namespace(SEARCH_CACHE_TTL_SECONDS, UPSTREAM_CACHE_L1_MAX, UPSTREAM_CACHE_L2_MAX),
+    "price": Namespace(PRICE_CACHE_TTL_SECONDS, UPSTREAM_CACHE_L1_MAX, UPSTREAM_CACHE_L2_MAX),
+    "combo": Namespace(COMBO_CACHE_TTL_SECONDS, UPSTREAM_CACHE_L1_MAX, UPSTREAM_CACHE_L2_MAX),
+    "fx": Namespace(FX_CACHE_TTL_SECONDS, 4, 16),
+    "fx_fallback": Namespace(FX_FALLBACK_TTL_SECONDS, 4, 16),
+})
+COLLECTIONS = CollectionStore(COLLECTIONS_DB_PATH, max_rows=COLLECTION_MAX_ROWS, ttl_seconds=COLLECTION_TTL_DAYS * 86400)
+REPLACEMENTS = ReplacementService(REPLACEMENT_ENGINE_DIR, memo_size=REPLACEMENTS_MEMO_SIZE)
+REPRINT_RISK = ReprintRiskService(REPLACEMENT_ENGINE_DIR, REPRINT_RISK_PATH)
+METAGAME = MetagameService(REPLACEMENT_ENGINE_DIR, METAGAME_DATASET_PATH)
+PROBABILITY = ProbabilityService(REPLACEMENT_ENGINE_DIR)
+MULLIGAN = MulliganService(REPLACEMENT_ENGINE_DIR)
+PRINTINGS = PrintingsService(REPLACEMENT_ENGINE_DIR, PRINTINGS_PATH)
+if REPLACEMENTS_PRELOAD:
+    # Each warms on its own: one bad dataset only 503s its own routes.
+    for service in (REPLACEMENTS, REPRINT_RISK, METAGAME, PROBABILITY, MULLIGAN, PRINTINGS):
+        service.warm()
+GROUNDING = GroundingService(RETRIEVAL_PACKS_PATH, RETRIEVAL_INDEX_DIR, REPLACEMENT_ENGINE_DIR,
+                             k=RETRIEVAL_TOP_K, refresh_seconds=RETRIEVAL_REFRESH_SECONDS,
+                             retry_seconds=RETRIEVAL_RETRY_SECONDS)
+if RETRIEVAL_ENABLED and RETRIEVAL_PRELOAD:
+    GROUNDING.warm()
+RULES = RulesService(RULES_DATASET_PATH, REPLACEMENT_ENGINE_DIR)
+RULES.warm()
+CARD_NAMES = CardNameService(REPLACEMENT_ENGINE_DIR, CARD_NAME_MIN_CONFIDENCE)
+CARD_NAMES.warm()
+SYNERGY = SynergyService(SYNERGY_DATASET, SYNERGY_STORE_DIR, REPLACEMENT_ENGINE_DIR)
+if REPLACEMENTS_PRELOAD:
+    SYNERGY.warm()
 RATE_LIMITS: Dict[str, Tuple[int, float]] = {}
 
 def client_ip() -> str:
@@ -144,70 +276,230 @@ def legacy_rate_limit():
         return resp
     return None
 
-def scryfall_price(card_name: str, currency: str = "USD") -> float:
-    """
-    Best-effort unit price via Scryfall. Supports USD and EUR.
-    Falls back to 0 if price unavailable. GBP -> USD.
-    """
-    currency = (currency or "USD").upper()
-    key = (card_name.lower(), currency)
-    if key in PRICE_CACHE:
-        return PRICE_CACHE[key]
+# Scryfall price fields kept from each /cards/named payload.
+PRICE_FIELDS = ("usd", "usd_foil", "usd_etched", "eur", "eur_foil", "eur_etched", "tix")
+FINISHES = ("nonfoil", "foil", "etched")
 
+def fetch_price_record(card_name: str) -> Dict[str, Optional[float]]:
+    """Every currency/finish price for a card from a single upstream call."""
     r = http_get(f"{SCRYFALL}/cards/named", params={"exact": card_name})
     if r.status_code != 200:
-        PRICE_CACHE[key] = 0.0
+        return {}
+
+    prices = (r.json() or {}).get("prices") or {}
+    record: Dict[str, Optional[float]] = {}
+    for field in PRICE_FIELDS:
+        raw = prices.get(field)
+        try:
+            record[field] = float(raw) if raw not in (None, "", "null") else None
+        except Exception:
+            record[field] = None
+    return record
+
+def fetch_fx_rates() -> Dict[str, float]:
+    r = http_get(FX_RATES_URL, params={"from": "USD", "to": "EUR,GBP"})
+    if r.status_code != 200:
+        return {}
+    rates = (r.json() or {}).get("rates") or {}
+    try:
+        return {"USD": 1.0, "EUR": float(rates["EUR"]), "GBP": float(rates["GBP"])}
+    except Exception:
+        return {}
+
+def fx_rates() -> Dict[str, float]:
+    """Units of each currency per 1 USD, cached locally for FX_CACHE_TTL_SECONDS;
+    the fallback rates after a failed fetch for FX_FALLBACK_TTL_SECONDS."""
+    rates = UPSTREAM_CACHE.get("fx", "USD") or UPSTREAM_CACHE.get("fx_fallback", "USD")
+    if rates is None:
+        rates = fetch_fx_rates()
+        if rates:
+            UPSTREAM_CACHE.set("fx", "USD", rates)
+        else:
+            rates = {"USD": 1.0, "EUR": FX_FALLBACK_USD_EUR, "GBP": FX_FALLBACK_USD_GBP}
+            UPSTREAM_CACHE.set("fx_fallback", "USD", rates)
+    return rates
+
+def unit_price(record: Dict[str, Optional[float]], currency: str, finish: str = "nonfoil") -> float:
+    """
+    Price for one currency/finish out of a price record.
+    A missing finish falls back to the other finishes of the same currency;
+    GBP is converted from USD (or EUR) using the cached FX table.
+    """
+    finish = finish if finish in FINISHES else "nonfoil"
+    order = [finish] + [f for f in FINISHES if f != finish]
+
+    def pick(prefix: str) -> Optional[float]:
+        for f in order:
+            val = record.get(prefix if f == "nonfoil" else f"{prefix}_{f}")
+            if val is not None:
+                return val
+        return None
+
+    if currency == "TIX":
+        return record.get("tix") or 0.0
+    if currency in ("USD", "EUR"):
+        return pick(currency.lower()) or 0.0
+    if currency == "GBP":
+        rates = fx_rates()
+        usd = pick("usd")
+        if usd is not None:
+            return round(usd * rates["GBP"], 2)
+        eur = pick("eur")
+        if eur is not None:
+            return round(eur / rates["EUR"] * rates["GBP"], 2)
         return 0.0
+    return pick("usd") or 0.0
 
-    data = r.json() or {}
-    prices = data.get("prices") or {}
+def price_record(card_name: str) -> Dict[str, Optional[float]]:
+    """
+    Cached price record for a card: one upstream fetch serves every
+    currency and finish. Entries live for PRICE_CACHE_TTL_SECONDS; hot
+    cards are kept fresh by the background refresher. A failed fetch
+    returns {} and is never cached.
+    """
+    key = card_name.lower()
+    PRICE_HOT_KEYS.touch(key)
+    cached = UPSTREAM_CACHE.get_entry("price", key)
+    if cached is not None:
+        return cached.value
 
-    if currency == "EUR":
-        raw = prices.get("eur")
-    else:
-        raw = prices.get("usd")  # GBP (and anything else) treated as USD
+    record = fetch_price_record(card_name)
+    if record:
+        UPSTREAM_CACHE.set("price", key, record)
+    return record
+
+def scryfall_price(card_name: str, currency: str = "USD", finish: str = "nonfoil") -> float:
+    """
+    Best-effort unit price via Scryfall. Supports USD, EUR, TIX and GBP
+    (converted). Falls back to 0 if price unavailable.
+    """
+    return unit_price(price_record(card_name), (currency or "USD").upper(), finish)
 
+def price_gbp(card_name: str) -> Optional[float]:
+    """Cached GBP price of a card (nonfoil, else another finish); None when it is
+    unpriced, the fetch failed or the request ran out of time."""
     try:
-        val = float(raw) if raw not in (None, "", "null") else 0.0
-    except Exception:
-        val = 0.0
+        record = price_record(card_name)
+        if all(record.get(f) is None for f in PRICE_FIELDS if f != "tix"):
+            return None
+        return unit_price(record, "GBP")
+    except deadline.DeadlineExceeded:
+        return None
 
-    PRICE_CACHE[key] = val
-    return val
+def refresh_price_key(key: str):
+    record = fetch_price_record(key)
+    if not record:
+        # Counted as a refresher error; the cached record stays until it expires.
+        raise RuntimeError(f"price fetch failed for {key!r}")
+    UPSTREAM_CACHE.set("price", key, record)
+
+def price_fetched_at(key: str):
+    return UPSTREAM_CACHE.peek_stored_at("price", key)
+
+PRICE_HOT_KEYS = HotKeyTracker(
+    half_life_seconds=PRICE_CACHE_TTL_SECONDS / 4,
+    min_score=PRICE_HOT_MIN_SCORE,
+    max_keys=PRICE_HOT_MAX_KEYS,
+)
+PRICE_REFRESHER = PriceRefresher(
+    PRICE_HOT_KEYS,
+    fetched_at=price_fetched_at,
+    refresh=refresh_price_key,
+    ttl_seconds=PRICE_CACHE_TTL_SECONDS,
+    lead_seconds=PRICE_REFRESH_LEAD_SECONDS,
+    budget_per_minute=max(1, PRICE_REFRESH_BUDGET_PER_MIN // WEB_CONCURRENCY),
+    interval_seconds=PRICE_REFRESH_INTERVAL_SECONDS,
+)
+
+@app.before_request
+def start_request_deadline():
+    deadline.start(ROUTE_DEADLINES.get(request.path, REQUEST_DEADLINE_SECONDS))
+    return None
+
+@app.teardown_request
+def clear_request_deadline(_exc):
+    deadline.clear()
+
+@app.errorhandler(deadline.DeadlineExceeded)
+def deadline_exceeded(_exc):
+    return jsonify({"ok": False, "error": "deadline_exceeded"}), 504
+
+@app.before_request
+def start_price_refresher():
+    if PRICE_REFRESHER_ENABLED:
+        PRICE_REFRESHER.ensure_started()
+    return None
 
 LINE_RE = re.compile(r"^\s*(\d+)\s*[xX]?\s+(.+?)\s*$")
+# Trailing finish markers as written by Moxfield/Archidekt/MTGO exports.
+FINISH_RE = re.compile(r"\s*(?:\*(f|e)\*|[(\[](foil|etched)[)\]])\s*$", re.IGNORECASE)
 
-def parse_deck_text(deck_text: str) -> Dict[str, int]:
-    counts: Dict[str, int] = defaultdict(int)
+def split_finish(name: str) -> Tuple[str, Optional[str]]:
+    """Strip a trailing finish marker: ("Sol Ring *F*") -> ("Sol Ring", "foil")."""
+    m = FINISH_RE.search(name)
+    if not m:
+        return name, None
+    marker = (m.group(1) or m.group(2)).lower()
+    return name[:m.start()].strip(), ("etched" if marker in ("e", "etched") else "foil")
+
+def parse_deck_entries(deck_text: str, default_finish: str = "nonfoil",
+                       renamed: Optional[Dict[str, Dict[str, object]]] = None) -> Dict[Tuple[str, str], int]:
+    """Quantities keyed by (canonical card name, finish); unmarked lines use
+    default_finish. Names CARD_NAMES rewrote are recorded in `renamed`."""
+    counts: Dict[Tuple[str, str], int] = defaultdict(int)
     for raw in (deck_text or "").splitlines():
         m = LINE_RE.match(raw)
         if not m:
             continue
         qty = int(m.group(1))
-        name = m.group(2).strip()
+        name, finish = split_finish(m.group(2).strip())
         if qty > 0 and name:
-            counts[name] += qty
+            counts[(CARD_NAMES.canonical(name, renamed), finish or default_finish)] += qty
     return counts
 
-def compute_rows(deck_counts: Dict[str, int], owned: Dict[str, int], currency: str):
+def parse_deck_text(deck_text: str, renamed: Optional[Dict[str, Dict[str, object]]] = None) -> Dict[str, int]:
+    counts: Dict[str, int] = defaultdict(int)
+    for (name, _finish), qty in parse_deck_entries(deck_text, renamed=renamed).items():
+        counts[name] += qty
+    return counts
+
+def compute_rows(deck_entries: Dict[Tuple[str, str], int], owned: Dict[str, int], currency: str):
+    """`owned` is keyed by normalize_card_name(). Returns (rows, total, unpriced)."""
     rows = []
+    unpriced = []
     total = 0.0
-    for name, want in deck_counts.items():
-        have = int(owned.get(name, 0) or 0)
-        need = max(0, want - have)
+    # Owned copies count toward any finish of the same card.
+    remaining = defaultdict(int)
+    for name, _finish in deck_entries:
+        key = normalize_card_name(name)
+        remaining[key] = int(owned.get(key, 0) or 0)
+    for (name, finish), want in deck_entries.items():
+        key = normalize_card_name(name)
+        have = min(want, remaining[key])
+        remaining[key] -= have
+        need = want - have
         if need <= 0:
             continue
-        unit = scryfall_price(name, currency)
+        try:
+            record = price_record(name)
+            unit = unit_price(record, currency, finish) if record else None
+        except deadline.DeadlineExceeded:
+            unit = None
+        if unit is None:
+            # Out of time or upstream failed: cached prices still resolve, the rest are left unpriced.
+            unpriced.append({"card": name, "finish": finish, "need": need})
+            continue
         sub = round(unit * need, 2)
         total += sub
         rows.append({
             "card": name,
+            "finish": finish,
             "need": need,
             "unit": unit,
             "subtotal": sub,
         })
     rows.sort(key=lambda r: (-r["subtotal"], r["card"]))
-    return rows, round(total, 2)
+    return rows, round(total, 2), unpriced
 
 # -------------------------
 # Routes
@@ -220,17 +512,20 @@ def root():
 def healthz():
     return "ok"
 
-@app.route("/debug")
-def debug():
+def debug_access_allowed() -> bool:
     # Legacy backend debug output is operationally useful but should never be public in production.
     # We only allow it when either:
     # - the app is explicitly running in debug mode, or
     # - a dedicated debug token is configured and supplied by the caller.
-    app_debug = bool(getattr(app, "debug", False))
-    if not app_debug:
-        provided = (request.headers.get("X-Debug-Token") or request.args.get("token") or "").strip()
-        if not DEBUG_ROUTE_TOKEN or not provided or not hmac.compare_digest(provided, DEBUG_ROUTE_TOKEN):
-            return jsonify({"ok": False, "error": "Not found"}), 404
+    if bool(getattr(app, "debug", False)):
+        return True
+    provided = (request.headers.get("X-Debug-Token") or request.args.get("token") or "").strip()
+    return bool(DEBUG_ROUTE_TOKEN and provided and hmac.compare_digest(provided, DEBUG_ROUTE_TOKEN))
+
+@app.route("/debug")
+def debug():
+    if not debug_access_allowed():
+        return jsonify({"ok": False, "error": "Not found"}), 404
     return jsonify({
         "use_openai": USE_OPENAI,
         "has_openai_key": bool(OPENAI_KEY),
@@ -239,8 +534,50 @@ def debug():
         "temp": TEMP,
         "maxtok": MAXTOK,
         "allowed_origins": ALLOWED_ORIGINS,
+        "price_refresher": PRICE_REFRESHER.metrics(),
+        "upstream_cache": UPSTREAM_CACHE.metrics(),
+        "replacements": REPLACEMENTS.metrics(),
+        "reprint_risk": REPRINT_RISK.metrics(),
+        "metagame": METAGAME.metrics(),
+        "probability": PROBABILITY.metrics(),
+        "mulligan": MULLIGAN.metrics(),
+        "printings": PRINTINGS.metrics(),
+        "grounding": GROUNDING.metrics(),
+        "rules": RULES.metrics(),
+        "synergy": SYNERGY.metrics(),
+        "card_names": CARD_NAMES.metrics(),
     })
 
+@app.route("/metrics")
+def metrics():
+    # Prometheus text format; same access rule as /debug.
+    if not debug_access_allowed():
+        return jsonify({"ok": False, "error": "Not found"}), 404
+    m = PRICE_REFRESHER.metrics()
+    lines = [
+        "# TYPE price_refresh_lag_seconds gauge",
+        f"price_refresh_lag_seconds {m['last_lag_seconds']}",
+        "# TYPE price_refresh_lag_max_seconds gauge",
+        f"price_refresh_lag_max_seconds {m['max_lag_seconds']}",
+        "# TYPE price_refresh_total counter",
+        f"price_refresh_total {m['refreshed']}",
+        "# TYPE price_refresh_errors_total counter",
+        f"price_refresh_errors_total {m['errors']}",
+        "# TYPE price_refresh_deferred_total counter",
+        f"price_refresh_deferred_total {m['deferred_for_budget']}",
+        "# TYPE price_hot_keys gauge",
+        f"price_hot_keys {m['hot_keys']}",
+        "# TYPE price_hot_keys_expired gauge",
+        f"price_hot_keys_expired {m['expired_hot_keys']}",
+    ]
+    c = UPSTREAM_CACHE.metrics()
+    for metric, field in (("upstream_cache_l1_hits_total", "l1_hits"),
+                          ("upstream_cache_l2_hits_total", "l2_hits"),
+                          ("upstream_cache_misses_total", "misses")):
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f'{metric}{{ns="{ns}"}} {c[ns][field]}' for ns in UPSTREAM_CACHE.namespaces)
+    return ("\n".join(lines) + "\n", 200, {"Content-Type": "text/plain; version=0.0.4"})
+
 @app.route("/api", methods=["POST"])
 def api():
     auth_error = require_legacy_api_auth()
@@ -249,28 +586,42 @@ def api():
     data, body_error = guarded_json_body(MAX_PROMPT_CHARS + 1000)
     if body_error:
         return body_error
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
     prompt = data.get("prompt", "")
     mode = data.get("mode", "default")
     if not prompt:
         return jsonify({"ok": False, "error": "Missing prompt"}), 400
+    if not isinstance(prompt, str):
+        return jsonify({"ok": False, "error": "Invalid 'prompt'"}), 400
+    if not isinstance(mode, str):
+        return jsonify({"ok": False, "error": "Invalid 'mode'"}), 400
     if len(prompt) > MAX_PROMPT_CHARS:
         return jsonify({"ok": False, "error": "Prompt too long"}), 400
 
     if not (USE_OPENAI and OPENAI_KEY and OPENAI_AVAILABLE):
         return jsonify({"ok": True, "reply": f"[{mode}] {prompt}"}), 200
 
+    # Optional retrieval filters: {"commander": "...", "filters": {"topic": [...], ...}}.
+    filters = dict(data.get("filters") or {}) if isinstance(data.get("filters"), dict) else {}
+    if isinstance(data.get("commander"), str) and data["commander"].strip():
+        filters["commander_name"] = data["commander"].strip()
+    hits = GROUNDING.retrieve(prompt, filters) if RETRIEVAL_ENABLED else []
     try:
-        client = OpenAI(api_key=OPENAI_KEY)
+        client = OpenAI(api_key=OPENAI_KEY, timeout=deadline.timeout_for(60.0))
         completion = client.chat.completions.create(
             model=MODEL,
             messages=[
-                {"role": "system", "content": mode_to_system_prompt(mode)},
+                {"role": "system", "content": grounded_system_prompt(mode_to_system_prompt(mode), hits)},
                 {"role": "user", "content": prompt},
             ],
             max_completion_tokens=MAXTOK,
         )
         reply = completion.choices[0].message.content
-        return jsonify({"ok": True, "reply": reply}), 200
+        body = {"ok": True, "reply": reply, "sources": [h["chunk_id"] for h in hits]}
+        if mode == "rules":
+            body["citations"] = RULES.citations(prompt, reply or "")
+        return jsonify(body), 200
     except Exception:
         return jsonify({"ok": True, "reply": f"[echo:{mode}] {prompt}"}), 200
 
@@ -288,6 +639,22 @@ def search():
         return jsonify({"ok": False, "error": "Missing name"}), 400
     return jsonify({"ok": True, "data": search_card(name)})
 
+@app.route("/rules")
+def rules():
+    """?ref=704.5 (add exact=1 to skip sub-rules) or ?q=keywords."""
+    if not RULES.available:
+        return jsonify({"ok": False, "error": "Rules index unavailable"}), 503
+    ref = (request.args.get("ref") or "").strip()
+    query = (request.args.get("q") or "").strip()
+    if ref:
+        exact = request.args.get("exact", "0") in ("1", "true", "yes")
+        found = RULES.lookup(ref, prefix=not exact)
+        return jsonify({"ok": True, "ref": ref, "rules": found["rules"][:RULES_MAX_RESULTS],
+                        "total": len(found["rules"]), "children": found["children"]})
+    if query:
+        return jsonify({"ok": True, "q": query, "rules": RULES.search(query[:MAX_PROMPT_CHARS], RULES_MAX_RESULTS)})
+    return jsonify({"ok": False, "error": "Missing ref or q"}), 400
+
 @app.route("/api/collections/cost", methods=["POST", "OPTIONS"])
 def collections_cost():
     if request.method == "OPTIONS":
@@ -296,44 +663,495 @@ def collections_cost():
     data, body_error = guarded_json_body(MAX_DECK_TEXT_CHARS + 10000)
     if body_error:
         return body_error
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
     deck_text = data.get("deck_text") or data.get("deckText") or ""
-    currency = (data.get("currency") or "USD").upper()
-    owned = data.get("owned") or {}
+    if not isinstance(deck_text, str):
+        return jsonify({"ok": False, "error": "Invalid 'deck_text'"}), 400
+    currency = data.get("currency") or "USD"
+    if not isinstance(currency, str):
+        return jsonify({"ok": False, "error": "Invalid 'currency'"}), 400
+    currency = currency.upper()
+    owned_raw = data.get("owned") or {}
+    collection_id = data.get("collection_id") or data.get("collectionId") or ""
+    if not isinstance(collection_id, str):
+        return jsonify({"ok": False, "error": "Invalid 'collection_id'"}), 400
+    collection_id = collection_id.strip()
+    finish = data.get("finish") or "nonfoil"
+    if not isinstance(finish, str):
+        return jsonify({"ok": False, "error": "Invalid 'finish'"}), 400
+    finish = finish.lower()
+    if finish not in FINISHES:
+        return jsonify({"ok": False, "error": f"Unsupported finish '{finish}'"}), 400
 
     if not deck_text.strip():
         return jsonify({"ok": False, "error": "Missing 'deck_text'/'deckText'"}), 400
 
-    deck_counts = parse_deck_text(deck_text)
-    rows, total = compute_rows(deck_counts, owned, currency)
+    renamed: Dict[str, Dict[str, object]] = {}
+    deck_entries = parse_deck_entries(deck_text, default_finish=finish, renamed=renamed)
+    if collection_id:
+        if not COLLECTIONS.exists(collection_id):
+            return jsonify({"ok": False, "error": "Unknown collection"}), 404
+        owned = COLLECTIONS.owned_for(collection_id, (normalize_card_name(n) for n, _ in deck_entries))
+    else:
+        owned = defaultdict(int)
+        for name, qty in (owned_raw.items() if isinstance(owned_raw, dict) else []):
+            try:
+                # Keyed like deck lines and stored collections, so "L. Bolt" owns "Lightning Bolt".
+                owned[normalize_card_name(CARD_NAMES.canonical(name))] += int(qty or 0)
+            except (TypeError, ValueError, OverflowError):
+                continue
+    rows, total, unpriced = compute_rows(deck_entries, owned, currency)
 
-    return jsonify({
+    body = {
         "ok": True,
         "currency": currency,
         "rows": rows,
         "total": total,
-        "usedOwned": bool(owned),
-    }), 200
+        "usedOwned": bool(owned_raw) or bool(collection_id),
+    }
+    if unpriced:
+        body.update({"partial": True, "unpriced": unpriced})
+    if renamed:
+        body["renamed"] = renamed
+    return jsonify(body), 200
 
 @app.route("/api/collections/cost-to-finish", methods=["POST", "OPTIONS"])
 def collections_cost_alias():
     return collections_cost()
 
+def replacement_deck(data, split_basket=False):
+    """analyse_deck arguments from a request deck, or (None, error response).
+
+    `split_basket` is the default for the deck's own "split_basket" flag:
+    the multi-market basket costs more than the rest of the analysis, so
+    batches only solve it for decks that ask.
+    """
+    if not isinstance(data, dict):
+        return None, (jsonify({"ok": False, "error": "Each deck must be an object"}), 400)
+    deck_text = data.get("deck_text") or data.get("deckText") or ""
+    if not isinstance(deck_text, str) or not deck_text.strip():
+        return None, (jsonify({"ok": False, "error": "Missing 'deck_text'/'deckText'"}), 400)
+    if len(deck_text) > MAX_DECK_TEXT_CHARS:
+        return None, (jsonify({"ok": False, "error": "Deck text too long"}), 400)
+    try:
+        budget = float(data.get("budget_gbp", data.get("budgetGbp", 5.0)))
+    except (TypeError, ValueError):
+        return None, (jsonify({"ok": False, "error": "Invalid 'budget_gbp'"}), 400)
+    if not math.isfinite(budget):
+        return None, (jsonify({"ok": False, "error": "Invalid 'budget_gbp'"}), 400)
+    commander = data.get("commander") or ""
+    if not isinstance(commander, str):
+        return None, (jsonify({"ok": False, "error": "Invalid 'commander'"}), 400)
+    split_basket = data.get("split_basket", data.get("splitBasket", split_basket))
+    if not isinstance(split_basket, bool):
+        return None, (jsonify({"ok": False, "error": "Invalid 'split_basket'"}), 400)
+
+    counts = parse_deck_text(deck_text)
+    commander = commander.strip() or None
+    colours = data.get("color_identity", data.get("colorIdentity"))
+    if colours is None and commander:
+        commander_data = fetch_card_data(commander)
+        if not commander_data.get("ok"):
+            return None, (jsonify({"ok": False, "error": "Commander not found"}), 404)
+        colours = commander_data["data"].get("color_identity", [])
+    if not isinstance(colours, list):
+        return None, (jsonify({"ok": False, "error": "Missing 'color_identity' or 'commander'"}), 400)
+
+    owned_raw = data.get("owned") or {}
+    if isinstance(owned_raw, list):
+        valid_owned = all(isinstance(n, str) for n in owned_raw)
+    else:
+        valid_owned = isinstance(owned_raw, dict)
+    if not valid_owned:
+        return None, (jsonify({"ok": False, "error": "Invalid 'owned'"}), 400)
+    collection_id = data.get("collection_id") or data.get("collectionId") or ""
+    if not isinstance(collection_id, str):
+        return None, (jsonify({"ok": False, "error": "Invalid 'collection_id'"}), 400)
+    collection_id = collection_id.strip()
+    if collection_id:
+        if not COLLECTIONS.exists(collection_id):
+            return None, (jsonify({"ok": False, "error": "Unknown collection"}), 404)
+        have = COLLECTIONS.owned_for(collection_id, (normalize_card_name(n) for n in counts))
+        owned = [n for n in counts if have.get(normalize_card_name(n), 0) > 0]
+    elif isinstance(owned_raw, dict):
+        owned = [CARD_NAMES.canonical(str(n)) for n, qty in owned_raw.items() if qty]
+    else:
+        owned = [CARD_NAMES.canonical(n) for n in owned_raw]
+
+    return {
+        "fmt": str(data.get("format") or "Commander"),
+        "budget_gbp": budget,
+        "persona": str(data.get("persona") or ""),
+        "color_identity": [str(c) for c in colours],
+        "decklist": decklist(counts),
+        "owned_cards": owned,
+        "commander": commander,
+        "split_basket": split_basket,
+    }, None
+
+@app.route("/api/replacements", methods=["POST"])
+def replacements():
+    """Replacement suggestions and cost-to-finish for one deck."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    data, body_error = guarded_json_body(MAX_DECK_TEXT_CHARS + 10000)
+    if body_error:
+        return body_error
+    if not REPLACEMENTS.available:
+        return jsonify({"ok": False, "error": "replacements_unavailable"}), 503
+    deck, deck_error = replacement_deck(data, split_basket=True)
+    if deck_error:
+        return deck_error
+    return jsonify({"ok": True, **REPLACEMENTS.analyse(deck)}), 200
+
+@app.route("/api/replacements/batch", methods=["POST"])
+def replacements_batch():
+    """Up to REPLACEMENTS_MAX_BATCH decks in one call; results keep input order."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    data, body_error = guarded_json_body(REPLACEMENTS_MAX_BATCH * (MAX_DECK_TEXT_CHARS + 10000))
+    if body_error:
+        return body_error
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
+    if not REPLACEMENTS.available:
+        return jsonify({"ok": False, "error": "replacements_unavailable"}), 503
+    raw_decks = data.get("decks")
+    if not isinstance(raw_decks, list) or not raw_decks:
+        return jsonify({"ok": False, "error": "Missing 'decks'"}), 400
+    if len(raw_decks) > REPLACEMENTS_MAX_BATCH:
+        return jsonify({"ok": False, "error": f"At most {REPLACEMENTS_MAX_BATCH} decks per batch"}), 413
+    decks = []
+    for i, raw in enumerate(raw_decks):
+        deck, deck_error = replacement_deck(raw)
+        if deck_error:
+            resp, status = deck_error
+            return jsonify({**resp.get_json(), "deck": i}), status
+        decks.append(deck)
+    return jsonify({"ok": True, "results": REPLACEMENTS.analyse_batch(decks)}), 200
+
+@app.route("/api/reprint-risk", methods=["POST"])
+def reprint_risk():
+    """Reprint risk and GBP value at risk of a deck (deck_text) or a whole
+    stored collection (collection_id); `top` riskiest cards are listed."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    data, body_error = guarded_json_body(MAX_DECK_TEXT_CHARS + 10000)
+    if body_error:
+        return body_error
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
+    try:
+        top = min(max(int(data.get("top", 10)), 0), REPRINT_RISK_MAX_TOP)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"ok": False, "error": "Invalid 'top'"}), 400
+    deck_text = data.get("deck_text") or data.get("deckText") or ""
+    if not isinstance(deck_text, str):
+        return jsonify({"ok": False, "error": "Invalid 'deck_text'"}), 400
+    collection_id = data.get("collection_id") or data.get("collectionId") or ""
+    if not isinstance(collection_id, str):
+        return jsonify({"ok": False, "error": "Invalid 'collection_id'"}), 400
+    collection_id = collection_id.strip()
+    if collection_id:
+        if not COLLECTIONS.exists(collection_id):
+            return jsonify({"ok": False, "error": "Unknown collection"}), 404
+        counts = COLLECTIONS.cards(collection_id)
+    elif deck_text.strip():
+        if len(deck_text) > MAX_DECK_TEXT_CHARS:
+            return jsonify({"ok": False, "error": "Deck text too long"}), 400
+        counts = parse_deck_text(deck_text)
+    else:
+        return jsonify({"ok": False, "error": "Missing 'deck_text' or 'collection_id'"}), 400
+    if not REPRINT_RISK.available:
+        return jsonify({"ok": False, "error": "reprint_risk_unavailable"}), 503
+    # Scored cards are priced from the cached Scryfall records; any left
+    # unpriced when the deadline runs out make the response partial.
+    body = {"ok": True, **REPRINT_RISK.reprint_exposure(decklist(counts), top, price_gbp)}
+    if deadline.was_partial():
+        body["partial"] = True
+    return jsonify(body), 200
+
+@app.route("/api/metagame", methods=["POST"])
+def metagame():
+    """How meta a deck is for its commander (or the commander it most
+    resembles), the staples it is missing and the `k` closest commanders."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    data, body_error = guarded_json_body(MAX_DECK_TEXT_CHARS + 10000)
+    if body_error:
+        return body_error
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
+    deck_text = data.get("deck_text") or data.get("deckText") or ""
+    if not isinstance(deck_text, str) or not deck_text.strip():
+        return jsonify({"ok": False, "error": "Missing 'deck_text'/'deckText'"}), 400
+    if len(deck_text) > MAX_DECK_TEXT_CHARS:
+        return jsonify({"ok": False, "error": "Deck text too long"}), 400
+    commander = data.get("commander") or ""
+    if not isinstance(commander, str):
+        return jsonify({"ok": False, "error": "Invalid 'commander'"}), 400
+    try:
+        k = min(max(int(data.get("k", 5)), 0), METAGAME_MAX_SIMILAR)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"ok": False, "error": "Invalid 'k'"}), 400
+    if not METAGAME.available:
+        return jsonify({"ok": False, "error": "metagame_unavailable"}), 503
+    commander = commander.strip() or None
+    result = METAGAME.metagame(decklist(parse_deck_text(deck_text)), commander, k)
+    if commander and not result["commander_found"]:
+        return jsonify({"ok": False, "error": "Commander not in metagame data", **result}), 404
+    return jsonify({"ok": True, **result}), 200
+
+@app.route("/api/probability", methods=["POST"])
+def probability():
+    """Hypergeometric draw odds by turn, on the play and on the draw, for
+    one scenario or {"scenarios": [...]}; see hypergeometric.parse_scenario."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    data, body_error = guarded_json_body(PROBABILITY_MAX_SCENARIOS * 2000)
+    if body_error:
+        return body_error
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
+    scenarios = data.get("scenarios", [data])
+    if not isinstance(scenarios, list) or not scenarios:
+        return jsonify({"ok": False, "error": "Missing 'scenarios'"}), 400
+    if len(scenarios) > PROBABILITY_MAX_SCENARIOS:
+        return jsonify({"ok": False, "error": f"At most {PROBABILITY_MAX_SCENARIOS} scenarios per request"}), 413
+    if not PROBABILITY.available:
+        return jsonify({"ok": False, "error": "probability_unavailable"}), 503
+    try:
+        results = PROBABILITY.probability(scenarios)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, "results": results}), 200
+
+@app.route("/api/mulligan", methods=["POST"])
+def mulligan():
+    """Monte Carlo keep rates, London mulligan depth and turn goals for a
+    deck of card categories; see mulligan.parse_config. `hands` is capped
+    at MULLIGAN_MAX_HANDS."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    data, body_error = guarded_json_body(20000)
+    if body_error:
+        return body_error
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
+    try:
+        hands = min(max(int(data.get("hands", 100000)), 1), MULLIGAN_MAX_HANDS)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"ok": False, "error": "Invalid 'hands'"}), 400
+    if not MULLIGAN.available:
+        return jsonify({"ok": False, "error": "mulligan_unavailable"}), 503
+    try:
+        result = MULLIGAN.mulligan({**data, "hands": hands})
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, **result}), 200
+
+@app.route("/api/scans/resolve", methods=["POST"])
+def scans_resolve():
+    """Resolve scanned cards (set code, collector number, language, foil)
+    to printings and their price for the scanned finish, in one batch.
+    Rows come as JSON objects ("rows") or the scanner's CSV export ("csv")."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    data, body_error = guarded_json_body(SCANS_MAX_ROWS * 200)
+    if body_error:
+        return body_error
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
+    rows, csv_text = data.get("rows"), data.get("csv")
+    if rows is None and isinstance(csv_text, str):
+        try:
+            rows = list(csv.DictReader(line for line in csv_text.splitlines() if line.strip()))
+        except csv.Error:
+            return jsonify({"ok": False, "error": "Invalid CSV"}), 400
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"ok": False, "error": "Missing 'rows' or 'csv'"}), 400
+    if len(rows) > SCANS_MAX_ROWS:
+        return jsonify({"ok": False, "error": f"At most {SCANS_MAX_ROWS} rows per request"}), 400
+    currency = data.get("currency") or "USD"
+    if not isinstance(currency, str):
+        return jsonify({"ok": False, "error": "Invalid 'currency'"}), 400
+    currency = currency.upper()
+    if currency not in ("USD", "EUR", "GBP"):
+        return jsonify({"ok": False, "error": f"Unsupported currency '{currency}'"}), 400
+    if not PRINTINGS.available:
+        return jsonify({"ok": False, "error": "printings_unavailable"}), 503
+    try:
+        result = PRINTINGS.scans(rows)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    total = 0.0
+    for row in result["rows"]:
+        if row.get("usd") is None and row.get("eur") is None:
+            continue
+        # usd/eur are already the scanned finish's prices.
+        row["price"] = unit_price({"usd": row["usd"], "eur": row["eur"]}, currency)
+        total += row["price"]
+    return jsonify({"ok": True, "currency": currency, "total": round(total, 2), **result}), 200
+
+@app.route("/api/synergy", methods=["GET"])
+def synergy_top():
+    """Top-N cards for ?commander= (n, offset optional)."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    commander = (request.args.get("commander") or "").strip()
+    if not commander:
+        return jsonify({"ok": False, "error": "Missing commander"}), 400
+    try:
+        n = min(max(int(request.args.get("n", "20")), 1), SYNERGY_MAX_TOP)
+        offset = max(int(request.args.get("offset", "0")), 0)
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid 'n' or 'offset'"}), 400
+    if not SYNERGY.available:
+        return jsonify({"ok": False, "error": "synergy_unavailable"}), 503
+    cards = SYNERGY.top(commander, n, offset)
+    if cards is None:
+        return jsonify({"ok": False, "error": "Unknown commander"}), 404
+    return jsonify({"ok": True, "commander": commander, "cards": cards}), 200
+
+@app.route("/api/synergy/score", methods=["POST"])
+def synergy_score():
+    """Scores for {"pairs": [[commander, card], ...]} (or objects with
+    commander/card_name); null where the pair has no score."""
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    data, body_error = guarded_json_body(SYNERGY_MAX_PAIRS * 200)
+    if body_error:
+        return body_error
+    raw = data.get("pairs") if isinstance(data, dict) else None
+    if not isinstance(raw, list):
+        return jsonify({"ok": False, "error": "Missing 'pairs'"}), 400
+    if len(raw) > SYNERGY_MAX_PAIRS:
+        return jsonify({"ok": False, "error": f"At most {SYNERGY_MAX_PAIRS} pairs per request"}), 413
+    pairs = []
+    for item in raw:
+        if isinstance(item, dict):
+            item = (item.get("commander"), item.get("card_name") or item.get("card"))
+        if not isinstance(item, (list, tuple)) or len(item) != 2 or not all(isinstance(x, str) for x in item):
+            return jsonify({"ok": False, "error": "Each pair must be [commander, card]"}), 400
+        pairs.append((item[0], item[1]))
+    if not SYNERGY.available:
+        return jsonify({"ok": False, "error": "synergy_unavailable"}), 503
+    return jsonify({"ok": True, "scores": SYNERGY.score_pairs(pairs)}), 200
+
+def canonical_collection_rows(rows):
+    """Collection rows keyed by canonical card name (see parse_deck_entries)."""
+    for entry in rows:
+        yield None if entry is None else (normalize_card_name(CARD_NAMES.canonical(entry[0])), entry[1])
+
+def upload_collection_format() -> str:
+    fmt = (request.args.get("format") or "").lower()
+    if fmt in ("csv", "ndjson"):
+        return fmt
+    ctype = (request.mimetype or "").lower()
+    upload = request.files.get("file")
+    filename = (upload.filename or "").lower() if upload else ""
+    if "ndjson" in ctype or "jsonl" in ctype or filename.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+@app.route("/api/collections", methods=["POST"])
+@app.route("/api/collections/<collection_id>", methods=["PUT"])
+def upload_collection(collection_id=None):
+    """
+    Stream a collection upload (raw CSV/NDJSON body or multipart 'file')
+    into the collection store. POST creates a collection, PUT replaces one.
+    Card names are canonicalised through CARD_NAMES, like deck names.
+    """
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    if request.content_length is not None and request.content_length > COLLECTION_MAX_BYTES:
+        return jsonify({"ok": False, "error": "Request body too large"}), 413
+    if collection_id is not None and not COLLECTIONS.exists(collection_id):
+        return jsonify({"ok": False, "error": "Unknown collection"}), 404
+
+    # Counted as the body streams in, so chunked uploads (no Content-Length)
+    # and multipart parsing are capped too.
+    request.max_content_length = COLLECTION_MAX_BYTES
+    try:
+        upload = request.files.get("file")
+        stream = text_stream(upload.stream if upload else request.stream)
+        rows = iter_collection_rows(stream, upload_collection_format())
+        summary = COLLECTIONS.save(canonical_collection_rows(rows), collection_id)
+    except (CollectionTooLarge, RequestEntityTooLarge) as e:
+        error = str(e) if isinstance(e, CollectionTooLarge) else "Request body too large"
+        return jsonify({"ok": False, "error": error}), 413
+    except csv.Error:
+        return jsonify({"ok": False, "error": "Invalid CSV"}), 400
+    return jsonify({"ok": True, **summary}), 200
+
+@app.route("/api/collections/<collection_id>", methods=["GET", "DELETE"])
+def collection_detail(collection_id):
+    auth_error = require_legacy_api_auth()
+    if auth_error:
+        return auth_error
+    if request.method == "DELETE":
+        if not COLLECTIONS.delete(collection_id):
+            return jsonify({"ok": False, "error": "Unknown collection"}), 404
+        return jsonify({"ok": True}), 200
+    summary = COLLECTIONS.summary(collection_id)
+    if not summary:
+        return jsonify({"ok": False, "error": "Unknown collection"}), 404
+    return jsonify({"ok": True, **summary}), 200
+
 @app.route("/deckcheck", methods=["POST"])
 def deckcheck():
     data, body_error = guarded_json_body(MAX_DECK_TEXT_CHARS + 10000)
     if body_error:
         return body_error
-    commander_name = (data.get("commander") or "").strip()
-    card_names = data.get("cards", [])
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "error": "Expected a JSON object"}), 400
+    commander_name = data.get("commander") or ""
+    if not isinstance(commander_name, str):
+        return jsonify({"ok": False, "error": "Invalid 'commander'"}), 400
+    commander_name = commander_name.strip()
+    card_names = data.get("cards") or []
+    if not isinstance(card_names, list) or not all(isinstance(n, str) for n in card_names):
+        return jsonify({"ok": False, "error": "Invalid 'cards'"}), 400
+    fmt = data.get("format") or ""
+    if not isinstance(fmt, str):
+        return jsonify({"ok": False, "error": "Invalid 'format'"}), 400
+    fmt = fmt.strip().lower()
     if not commander_name:
         return jsonify({"ok": False, "error": "Missing commander"}), 400
 
-    commander_data = fetch_card_data(commander_name)
+    try:
+        commander_data = fetch_card_data(commander_name)
+    except deadline.DeadlineExceeded:
+        return jsonify({"ok": False, "error": "deadline_exceeded"}), 504
     if not commander_data or not commander_data.get("ok"):
         return jsonify({"ok": False, "error": "Commander not found"}), 404
 
-    cards_data = [fetch_card_data(n) for n in card_names if n]
-    cards_data = [c for c in cards_data if c.get("ok")]
+    cards_data = []
+    unchecked = []
+    for n in card_names:
+        if not n:
+            continue
+        try:
+            c = fetch_card_data(n)
+        except deadline.DeadlineExceeded:
+            # Keep going: cached cards still resolve without upstream calls.
+            c = {"ok": False}
+        if c.get("ok"):
+            cards_data.append(c)
+        else:
+            # Out of time, unknown or upstream failure: listed, never dropped silently.
+            unchecked.append(n)
 
     mana_curve_counter = Counter()
     color_counter = Counter()
@@ -368,7 +1186,7 @@ def deckcheck():
 
     combos = fetch_combos_for_cards([c["data"]["name"] for c in cards_data])
 
-    return jsonify({
+    body = {
         "ok": True,
         "commander": commander_data["data"],
         "checked_count": len(cards_data),
@@ -377,7 +1195,12 @@ def deckcheck():
         "colors": colors,
         "types": types,
         "combos": combos
-    })
+    }
+    if fmt:
+        body["format_legality"] = check_format_legality(cards_data, fmt)
+    if unchecked or deadline.was_partial():
+        body.update({"partial": True, "unchecked": unchecked})
+    return jsonify(body)
 
 # -------------------------
 # Helpers
@@ -392,66 +1215,98 @@ def mode_to_system_prompt(mode: str) -> str:
     }
     return prompts.get(mode, prompts["default"])
 
+def card_summary(card):
+    return {
+        "id": card.get("id"),
+        "name": card.get("name"),
+        "colors": card.get("colors", []),
+        "color_identity": card.get("color_identity", []),
+        "cmc": card.get("cmc", 0),
+        "type_line": card.get("type_line"),
+        "image_normal": (card.get("image_uris") or {}).get("normal"),
+        "image_small": (card.get("image_uris") or {}).get("small"),
+        "oracle_text": card.get("oracle_text", ""),
+        "set": card.get("set"),
+        "set_name": card.get("set_name"),
+        "rarity": card.get("rarity"),
+        "scryfall_uri": card.get("scryfall_uri"),
+        "legalities": card.get("legalities") or {},
+    }
+
+# Copies of a restricted card a deck may run.
+RESTRICTED_LIMIT = 1
+
+def check_format_legality(cards_data, fmt: str):
+    # One dict lookup per card in the Scryfall legalities kept by card_summary;
+    # repeated entries count as copies towards the restricted limit. Cards
+    # cached before legalities were kept are reported as unknown.
+    copies = Counter()
+    cards = {}
+    for c in cards_data:
+        name = c["data"]["name"]
+        copies[name] += 1
+        cards.setdefault(name, c["data"])
+    result = {"format": fmt, "banned": [], "not_legal": [], "restricted": [], "unknown": []}
+    for name, d in cards.items():
+        legalities = d.get("legalities")
+        if not legalities:
+            result["unknown"].append(name)
+            continue
+        status = legalities.get(fmt, "not_legal")
+        if status == "restricted":
+            if copies[name] > RESTRICTED_LIMIT:
+                result["restricted"].append(name)
+        elif status in ("banned", "not_legal"):
+            result[status].append(name)
+    return result
+
 def fetch_card_data(name: str):
+    name = CARD_NAMES.canonical(name)
+    key = name.lower()
+    cached = UPSTREAM_CACHE.get("card", key)
+    if cached is not None:
+        return {"ok": True, "data": cached}
     r = http_get(f"{SCRYFALL}/cards/named", params={"exact": name})
     if r.status_code != 200:
         return {"ok": False}
-    card = r.json()
-    return {
-        "ok": True,
-        "data": {
-            "id": card.get("id"),
-            "name": card.get("name"),
-            "colors": card.get("colors", []),
-            "color_identity": card.get("color_identity", []),
-            "cmc": card.get("cmc", 0),
-            "type_line": card.get("type_line"),
-            "image_normal": (card.get("image_uris") or {}).get("normal"),
-            "image_small": (card.get("image_uris") or {}).get("small"),
-            "oracle_text": card.get("oracle_text", ""),
-            "set": card.get("set"),
-            "set_name": card.get("set_name"),
-            "rarity": card.get("rarity"),
-            "scryfall_uri": card.get("scryfall_uri")
-        }
-    }
+    data = card_summary(r.json())
+    UPSTREAM_CACHE.set("card", key, data)
+    return {"ok": True, "data": data}
 
 def search_card(name: str):
+    key = name.lower()
+    cached = UPSTREAM_CACHE.get("search", key)
+    if cached is not None:
+        return {"ok": True, "data": cached}
     r = http_get(f"{SCRYFALL}/cards/named", params={"fuzzy": name})
     if r.status_code != 200:
         return {"ok": False}
-    card = r.json()
-    return {
-        "ok": True,
-        "data": {
-            "id": card.get("id"),
-            "name": card.get("name"),
-            "colors": card.get("colors", []),
-            "color_identity": card.get("color_identity", []),
-            "cmc": card.get("cmc", 0),
-            "type_line": card.get("type_line"),
-            "image_normal": (card.get("image_uris") or {}).get("normal"),
-            "image_small": (card.get("image_uris") or {}).get("small"),
-            "oracle_text": card.get("oracle_text", ""),
-            "set": card.get("set"),
-            "set_name": card.get("set_name"),
-            "rarity": card.get("rarity"),
-            "scryfall_uri": card.get("scryfall_uri")
-        }
-    }
+    data = card_summary(r.json())
+    UPSTREAM_CACHE.set("search", key, data)
+    # A fuzzy hit also answers later exact lookups of the canonical name.
+    if data.get("name"):
+        UPSTREAM_CACHE.set("card", data["name"].lower(), data)
+    return {"ok": True, "data": data}
 
 def fetch_combos_for_cards(card_names):
     results = []
     for name in card_names:
-        r = http_get(f"{SPELLBOOK}/combo/search", params={"cards": name})
-        if r.status_code == 200:
+        combos = UPSTREAM_CACHE.get("combo", name.lower())
+        if combos is None:
+            try:
+                r = http_get(f"{SPELLBOOK}/combo/search", params={"cards": name})
+            except deadline.DeadlineExceeded:
+                continue
+            if r.status_code != 200:
+                continue
             j = (r.json() or {})
-            for combo in j.get("results", []):
-                results.append({
-                    "name": combo.get("name"),
-                    "description": combo.get("description"),
-                    "link": combo.get("permalink")
-                })
+            combos = [{
+                "name": combo.get("name"),
+                "description": combo.get("description"),
+                "link": combo.get("permalink")
+            } for combo in j.get("results", [])]
+            UPSTREAM_CACHE.set("combo", name.lower(), combos)
+        results.extend(combos)
     seen = set()
     deduped = []
     for c in results:
@@ -0,0 +1,76 @@
+# backend/bench/bench_cache_cold_start.py
+"""
+Cold-start hit rate of the upstream cache after a restart.
+
+Warms a TieredCache with a Zipf-distributed card workload, then builds a
+fresh instance on the same L2 file (what a new gunicorn worker sees) and
+replays a new sample of the same workload. Compares against L1-only.
+
+    python backend/bench/bench_cache_cold_start.py [--cards 5000] [--lookups 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tiered_cache import Namespace, TieredCache  # noqa: E402
+
+NAMESPACES = {
+    "card": Namespace(604800),
+    "search": Namespace(86400),
+    "price": Namespace(21600),
+    "combo": Namespace(86400),
+}
+
+
+def workload(cards: int, lookups: int, seed: int):
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(cards)]
+    names = [f"card-{i}" for i in range(cards)]
+    nss = list(NAMESPACES)
+    picks = rng.choices(names, weights=weights, k=lookups)
+    return [(nss[i % len(nss)], name) for i, name in enumerate(picks)]
+
+
+def replay(cache: TieredCache, ops):
+    t0 = time.perf_counter()
+    for ns, key in ops:
+        if cache.get(ns, key) is None:
+            cache.set(ns, key, {"name": key, "usd": 1.0})
+    elapsed = time.perf_counter() - t0
+    l1 = sum(s["l1_hits"] for s in cache.stats.values())
+    l2 = sum(s["l2_hits"] for s in cache.stats.values())
+    miss = sum(s["misses"] for s in cache.stats.values())
+    total = l1 + l2 + miss
+    return {
+        "hit_rate": round((l1 + l2) / total, 4),
+        "l1_hits": l1,
+        "l2_hits": l2,
+        "misses": miss,
+        "us_per_lookup": round(elapsed / len(ops) * 1e6, 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=5000)
+    ap.add_argument("--lookups", type=int, default=20000)
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "upstream.sqlite3")
+    warm = TieredCache(path, NAMESPACES)
+    print("warm-up          ", replay(warm, workload(args.cards, args.lookups, seed=1)))
+
+    after_restart = TieredCache(path, NAMESPACES)
+    print("restart, L1+L2   ", replay(after_restart, workload(args.cards, args.lookups, seed=2)))
+
+    l1_only = TieredCache(None, NAMESPACES)
+    print("restart, L1 only ", replay(l1_only, workload(args.cards, args.lookups, seed=2)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/bench/bench_replacements_api.py
+"""
+Latency of /api/replacements and /api/replacements/batch.
+
+Points the engine at the synthetic --cards database from the engine's
+bench_replacements, warms it the way a worker does at start, then sends
+--requests single-deck requests and --requests / 10 batch requests of
+--batch decks through the Flask test client (routing, auth, JSON and
+analysis; no network) and reports p50/p95/p99 against the targets below.
+
+Targets on one core with a 30k-card database: single deck p99 under
+50ms, batch of 10 decks p99 under 400ms.
+
+    python backend/bench/bench_replacements_api.py [--cards 30000] [--requests 300] [--batch 10]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+
+TARGETS_MS = {"single": 50.0, "batch": 400.0}
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cards", type=int, default=30000)
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--batch", type=int, default=10)
+    args = ap.parse_args()
+
+    os.environ.update({
+        "REQUIRE_LEGACY_API_AUTH": "1",
+        "LEGACY_API_TOKEN": "bench",
+        "LEGACY_RATE_LIMIT_MAX_REQUESTS": str(10 ** 9),
+        "PRICE_REFRESHER_ENABLED": "0",
+        "UPSTREAM_CACHE_PATH": "",
+        "REPLACEMENTS_PRELOAD": "0",
+        "REPLACEMENTS_MAX_BATCH": str(args.batch),
+    })
+    import app as backend  # noqa: E402
+
+    engine = backend.REPLACEMENTS.warm()
+    sys.path.append(os.path.join(backend.REPLACEMENT_ENGINE_DIR, "bench"))
+    from bench_replacements import FORMATS, synthetic_database  # noqa: E402
+
+    # Same work as warm() at worker start, on the synthetic database.
+    engine.CARD_DATABASE = synthetic_database(args.cards)
+    t0 = time.perf_counter()
+    engine.rebuild_index()
+    engine.get_store()
+    warm = time.perf_counter() - t0
+
+    rng = random.Random(4)
+    names = list(engine.CARD_DATABASE)
+    weights = [1.0 / (rank + 10) for rank in range(len(names))]
+
+    def deck():
+        cards = list(dict.fromkeys(rng.choices(names, weights=weights, k=120)))[:100]
+        return {
+            "deck_text": "\n".join(f"1 {c}" for c in cards),
+            "format": rng.choice(FORMATS),
+            "budget_gbp": rng.choice([2.0, 5.0, 10.0]),
+            "color_identity": rng.sample("WUBRG", rng.choice([1, 2, 3, 5])),
+        }
+
+    client = backend.app.test_client()
+    headers = {"Authorization": "Bearer bench"}
+    timings = {"single": [], "batch": []}
+    for kind, path, count, body in (
+        ("single", "/api/replacements", args.requests, deck),
+        ("batch", "/api/replacements/batch", max(1, args.requests // 10),
+         lambda: {"decks": [deck() for _ in range(args.batch)]}),
+    ):
+        for _ in range(count):
+            payload = body()
+            t0 = time.perf_counter()
+            resp = client.post(path, json=payload, headers=headers)
+            timings[kind].append((time.perf_counter() - t0) * 1e3)
+            assert resp.status_code == 200, resp.get_json()
+
+    print(f"cards={args.cards} warm={warm * 1e3:.0f}ms memo={backend.REPLACEMENTS.metrics()}")
+    for kind, samples in timings.items():
+        p99 = percentile(samples, 99)
+        label = kind if kind == "single" else f"batch of {args.batch}"
+        print(f"{label:12s} n={len(samples):4d} p50={statistics.median(samples):7.1f}ms "
+              f"p95={percentile(samples, 95):7.1f}ms p99={p99:7.1f}ms "
+              f"target<{TARGETS_MS[kind]:.0f}ms {'ok' if p99 < TARGETS_MS[kind] else 'MISSED'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# backend/collections_store.py
+"""
+Server-side owned-card collections for cost-to-finish.
+
+Collections are uploaded once as CSV or NDJSON (parsed as a stream, never
+held as a request body), stored in SQLite keyed by (collection id,
+normalized card name), and later diffed against a deck with one indexed
+lookup per deck card, so cost is O(deck) whatever the collection size.
+"""
+import csv
+import io
+import json
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+_PUNCT = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-",
+    "\u00a0": " ",
+})
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_card_name(name: str) -> str:
+    """Case/accents/punctuation-insensitive key: "Lim-Dûl’s Vault" -> "lim-dul's vault"."""
+    name = unicodedata.normalize("NFKD", (name or "").translate(_PUNCT))
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    return _SPACE_RE.sub(" ", name).strip().casefold()
+
+
+_NAME_FIELDS = ("name", "card", "card_name", "cardname", "card name")
+_QTY_FIELDS = ("quantity", "qty", "count", "amount")
+
+
+def _row_entry(row: Dict[str, object]) -> Optional[Tuple[str, int]]:
+    lowered = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+    name = next((lowered[f] for f in _NAME_FIELDS if lowered.get(f)), None)
+    if not name:
+        return None
+    raw_qty = next((lowered[f] for f in _QTY_FIELDS if lowered.get(f) not in (None, "")), 1)
+    try:
+        qty = int(float(raw_qty))
+    except (TypeError, ValueError):
+        return None
+    if qty <= 0:
+        return None
+    return normalize_card_name(str(name)), qty
+
+
+def iter_collection_rows(stream: Iterable[str], fmt: str) -> Iterator[Optional[Tuple[str, int]]]:
+    """
+    Yield (normalized name, qty) per input row, or None for rows that
+    could not be read. `fmt` is "csv" (header row required; Moxfield,
+    Deckbox and ManaBox exports work) or "ndjson".
+    """
+    if fmt == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            yield _row_entry(obj) if isinstance(obj, dict) else None
+        return
+    for row in csv.DictReader(stream):
+        yield _row_entry(row)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    total_cards INTEGER NOT NULL,
+    unique_cards INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS collection_cards (
+    collection_id TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    qty INTEGER NOT NULL,
+    PRIMARY KEY (collection_id, name_key)
+) WITHOUT ROWID;
+"""
+
+
+class CollectionTooLarge(Exception):
+    pass
+
+
+class CollectionStore:
+    def __init__(self, path: str, max_rows: int = 100000, ttl_seconds: float = 90 * 86400):
+        self.path = path
+        self.max_rows = max_rows
+        self.ttl = ttl_seconds
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != pid:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def save(self, rows: Iterable[Optional[Tuple[str, int]]], collection_id: Optional[str] = None) -> Dict[str, object]:
+        """Store a collection (replacing `collection_id` if given); returns a summary."""
+        counts: Dict[str, int] = {}
+        read = skipped = 0
+        for entry in rows:
+            read += 1
+            if read > self.max_rows:
+                raise CollectionTooLarge(f"Collections are limited to {self.max_rows} rows")
+            if entry is None:
+                skipped += 1
+                continue
+            key, qty = entry
+            counts[key] = counts.get(key, 0) + qty
+
+        cid = collection_id or secrets.token_urlsafe(16)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._purge_expired(conn, now)
+            conn.execute("DELETE FROM collection_cards WHERE collection_id = ?", (cid,))
+            conn.executemany(
+                "INSERT INTO collection_cards (collection_id, name_key, qty) VALUES (?, ?, ?)",
+                ((cid, k, q) for k, q in counts.items()),
+            )
+            conn.execute(
+                "INSERT INTO collections (id, created_at, updated_at, total_cards, unique_cards) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at,"
+                " total_cards = excluded.total_cards, unique_cards = excluded.unique_cards",
+                (cid, now, now, sum(counts.values()), len(counts)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {"collectionId": cid, "totalCards": sum(counts.values()), "uniqueCards": len(counts),
+                "rows": read, "skippedRows": skipped}
+
+    def _purge_expired(self, conn: sqlite3.Connection, now: float):
+        cutoff = now - self.ttl
+        conn.execute(
+            "DELETE FROM collection_cards WHERE collection_id IN (SELECT id FROM collections WHERE updated_at < ?)",
+            (cutoff,),
+        )
+        conn.execute("DELETE FROM collections WHERE updated_at < ?", (cutoff,))
+
+    def summary(self, collection_id: str) -> Optional[Dict[str, object]]:
+        row = self._conn().execute(
+            "SELECT created_at, updated_at, total_cards, unique_cards FROM collections WHERE id = ?",
+            (collection_id,),
+        ).fetchone()
+        if not row or time.time() - row[1] > self.ttl:
+            return None
+        return {"collectionId": collection_id, "createdAt": row[0], "updatedAt": row[1],
+                "totalCards": row[2], "uniqueCards": row[3]}
+
+    def exists(self, collection_id: str) -> bool:
+        return self.summary(collection_id) is not None
+
+    def owned_for(self, collection_id: str, name_keys: Iterable[str]) -> Dict[str, int]:
+        """Owned quantities for just the given normalized names (one PK probe each)."""
+        keys = list(dict.fromkeys(name_keys))
+        out: Dict[str, int] = {}
+        conn = self._conn()
+        # Stay under SQLite's default bound-parameter limit.
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, qty in conn.execute(
+                f"SELECT name_key, qty FROM collection_cards WHERE collection_id = ? AND name_key IN ({marks})",
+                [collection_id, *chunk],
+            ):
+                out[key] = qty
+        return out
+
+    def cards(self, collection_id: str) -> Dict[str, int]:
+        """Every (normalized name, qty) in the collection."""
+        return dict(self._conn().execute(
+            "SELECT name_key, qty FROM collection_cards WHERE collection_id = ?", (collection_id,)
+        ))
+
+    def delete(self, collection_id: str) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM collection_cards WHERE collection_id = ?", (collection_id,))
+        cur = conn.execute("DELETE FROM collections WHERE id = ?", (collection_id,))
+        conn.execute("COMMIT")
+        return cur.rowcount > 0
+
+
+def text_stream(binary, encoding: str = "utf-8-sig") -> io.TextIOWrapper:
+    return io.TextIOWrapper(binary, encoding=encoding, errors="replace", newline="")
@@ -0,0 +1,77 @@
+# backend/deadline.py
+"""
+Request-scoped deadlines for upstream calls.
+
+A route starts a deadline when the request begins; `http_get` asks for the
+remaining budget to shrink its own timeout and raises DeadlineExceeded once
+the budget is gone, so loops over cards stop paying for upstream calls and
+return what they have. Helpers that swallow the exception call
+`note_partial()` so the route can flag its response with `partial: true`.
+
+State lives in contextvars, so threads outside a request (e.g. the price
+refresher) never inherit a deadline.
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+_partial: ContextVar[bool] = ContextVar("request_partial", default=False)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def start(seconds: Optional[float]):
+    _deadline.set(time.monotonic() + seconds if seconds and seconds > 0 else None)
+    _partial.set(False)
+
+
+def clear():
+    _deadline.set(None)
+    _partial.set(False)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left, or None when no deadline is active."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def timeout_for(default: float, floor: float = 0.05) -> float:
+    """`default` capped by the remaining budget; raises once it is used up."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= floor:
+        _partial.set(True)
+        raise DeadlineExceeded()
+    return min(default, left)
+
+
+def note_partial():
+    _partial.set(True)
+
+
+def was_partial() -> bool:
+    return _partial.get()
+
+
+def parse_route_deadlines(raw: str) -> Dict[str, float]:
+    """"/deckcheck=20,/api/collections/cost=15" -> {"/deckcheck": 20.0, ...}"""
+    out: Dict[str, float] = {}
+    for part in (raw or "").split(","):
+        path, sep, seconds = part.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            out[path.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return out
@@ -0,0 +1,147 @@
+# backend/grounding.py
+"""
+Retrieval grounding for /api prompts.
+
+The research packs ("AI research (2)/AI research/retrieval_packs.jsonl")
+are indexed by the engine's `retrieval` module: BM25 over the chunk
+text with metadata filters, stored as memory-mapped segments under
+`index_dir`. GroundingService is an EngineService: `warm()` loads that
+index (building it on first use) once per worker, retrying a failed
+load after `retry_seconds`; `retrieve()` catches it up with lines
+appended to the packs file at most every `refresh_seconds` and returns
+the top chunks, which `grounded_system_prompt()` appends to the mode's
+system prompt.
+
+Like ReplacementService, the index needs NumPy; without it the service
+is unavailable and /api falls back to the plain system prompt.
+
+RulesService wraps the engine's `rules_index` (pure Python) over
+mtg_rules_dataset.json: CR number and keyword lookups for /rules, and
+citations for rules-mode /api replies.
+"""
+import os
+import time
+from typing import Dict, List, Mapping, Optional, Sequence
+
+from replacements import DEFAULT_ENGINE_DIR, EngineService
+
+DEFAULT_PACKS_PATH = os.path.join(DEFAULT_ENGINE_DIR, "retrieval_packs.jsonl")
+DEFAULT_RULES_PATH = os.path.join(DEFAULT_ENGINE_DIR, "mtg_rules_dataset.json")
+
+
+class GroundingService(EngineService):
+    module = "retrieval"
+
+    def __init__(self, packs_path: str, index_dir: str, engine_dir: str = DEFAULT_ENGINE_DIR,
+                 k: int = 4, refresh_seconds: float = 30.0, retry_seconds: float = 60.0):
+        super().__init__(engine_dir)
+        self.packs_path = packs_path
+        self.index_dir = index_dir
+        self.k = k
+        self.refresh_seconds = refresh_seconds
+        # A packs file that appears later or a transient disk error does
+        # not disable grounding for the worker's lifetime.
+        self.retry_seconds = retry_seconds
+        self.queries = 0
+        self.failures = 0
+        self._checked = 0.0
+
+    def load(self, engine):
+        """Load (or build) the retrieval index."""
+        index = engine.RetrievalIndex.open(self.packs_path, self.index_dir)
+        self._checked = time.monotonic()
+        return index
+
+    def _maybe_refresh(self, index):
+        now = time.monotonic()
+        if now - self._checked < self.refresh_seconds or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked = now
+            index.refresh(self.packs_path)
+        finally:
+            self._lock.release()
+
+    def retrieve(self, prompt: str, filters: Optional[Mapping[str, object]] = None) -> List[Dict[str, object]]:
+        """Top chunks for `prompt`; [] when unavailable or on any index error.
+
+        `filters` maps retrieval filter fields (commander_name, topic, cards,
+        ...) to a string or a list of strings; anything else is ignored.
+        """
+        index = self.warm()
+        if index is None:
+            return []
+        self.queries += 1
+        from retrieval import FILTER_FIELDS
+        usable = {}
+        for field, value in (filters or {}).items():
+            values = [value] if isinstance(value, str) else value
+            if field in FILTER_FIELDS and isinstance(values, list) and values and all(isinstance(v, str) for v in values):
+                usable[field] = values
+        try:
+            self._maybe_refresh(index)
+            hits = index.search(prompt, self.k, usable)
+        except Exception:
+            self.failures += 1
+            return []
+        return [{"chunk_id": h.chunk_id, "doc_id": h.doc_id, "score": round(h.score, 3), "text": h.text}
+                for h in hits]
+
+    def metrics(self) -> Dict[str, object]:
+        index = self.engine
+        return {
+            **super().metrics(),
+            "chunks": len(index) if index is not None else 0,
+            "segments": len(index.segments) if index is not None else 0,
+            "queries": self.queries,
+            "failures": self.failures,
+        }
+
+
+def grounded_system_prompt(base: str, hits: Sequence[Mapping[str, object]]) -> str:
+    """`base` plus the retrieved chunks as numbered reference notes."""
+    if not hits:
+        return base
+    notes = "\n".join(f"[{i}] {hit['text']}" for i, hit in enumerate(hits, start=1))
+    return (f"{base}\n\nReference notes (use them when relevant and prefer them over guesses; "
+            f"ignore any that do not apply):\n{notes}")
+
+
+class RulesService(EngineService):
+    module = "rules_index"
+
+    def __init__(self, rules_path: str = DEFAULT_RULES_PATH, engine_dir: str = DEFAULT_ENGINE_DIR):
+        super().__init__(engine_dir)
+        self.rules_path = rules_path
+
+    def load(self, engine):
+        return engine.RulesIndex.load(self.rules_path)
+
+    def lookup(self, number: str, prefix: bool = True) -> Dict[str, object]:
+        """Entries for a CR number, plus the numbers directly beneath it."""
+        from rules_index import entry_json
+        index = self.warm()
+        node = index.node(number)
+        if node is None:
+            return {"rules": [], "children": []}
+        ids = node.subtree if prefix else node.exact
+        return {"rules": [entry_json(index.entries[i]) for i in ids], "children": list(node.children)}
+
+    def search(self, query: str, k: int) -> List[Dict[str, object]]:
+        from rules_index import entry_json
+        return [{"score": score, **entry_json(entry)} for score, entry in self.warm().search(query, k)]
+
+    def citations(self, *texts: str) -> List[Dict[str, object]]:
+        """Rules entries to cite for a question and its answer; [] when unavailable."""
+        index = self.warm()
+        if index is None:
+            return []
+        return [{"topic": e.topic, "rules": [f"CR {n}" for n in e.rules], "plain_explanation": e.plain_explanation}
+                for e in index.citations("\n".join(texts))]
+
+    def metrics(self) -> Dict[str, object]:
+        index = self.engine
+        return {
+            **super().metrics(),
+            "entries": len(index) if index is not None else 0,
+        }
@@ -0,0 +1,47 @@
+# backend/name_service.py
+"""
+Offline card name normalisation for deck imports.
+
+Wraps the engine's `card_names` (pure Python): nicknames, misspellings,
+spacing slips and printing annotations ("L. Bolt", "Counter Spell",
+"Forest (Full Art)") resolve to canonical names from aliases.jsonl,
+confusions.json and the bundled card lists, so deck parsing and exact
+Scryfall lookups see names Scryfall knows. `canonical()` only rewrites
+at or above `min_confidence`; anything else passes through unchanged.
+"""
+from typing import Dict, Optional
+
+from replacements import DEFAULT_ENGINE_DIR, EngineService
+
+
+class CardNameService(EngineService):
+    module = "card_names"
+
+    def __init__(self, engine_dir: str = DEFAULT_ENGINE_DIR, min_confidence: float = 0.75):
+        super().__init__(engine_dir)
+        self.min_confidence = min_confidence
+        self.rewrites = 0
+
+    def load(self, engine):
+        return engine.NameNormalizer.load()
+
+    def canonical(self, name: str, renamed: Optional[Dict[str, Dict[str, object]]] = None) -> str:
+        """`name` rewritten to its canonical spelling; `renamed` collects the rewrites."""
+        normalizer = self.warm()
+        if normalizer is None:
+            return name
+        hit = normalizer.resolve(name)
+        if hit.name == name or hit.confidence < self.min_confidence:
+            return name
+        self.rewrites += 1
+        if renamed is not None:
+            renamed[name] = {"name": hit.name, "confidence": hit.confidence, "rule": hit.rule}
+        return hit.name
+
+    def metrics(self) -> Dict[str, object]:
+        normalizer = self.engine
+        return {
+            **super().metrics(),
+            "names": len(normalizer) if normalizer is not None else 0,
+            "rewrites": self.rewrites,
+        }
@@ -0,0 +1,179 @@
+# backend/price_refresher.py
+"""
+Background refresher for hot price keys.
+
+The request path records every card price lookup in a HotKeyTracker.
+A PriceRefresher thread periodically re-fetches the hottest keys shortly
+before their cache entry expires, spending at most `budget_per_minute`
+upstream requests, so popular cards never take a request-path miss.
+The budget is per process: each gunicorn worker runs its own refresher,
+so app.py gives each one its share of PRICE_REFRESH_BUDGET_PER_MIN.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+PriceKey = Hashable
+
+
+class HotKeyTracker:
+    """Exponentially decayed hit counter per price key."""
+
+    def __init__(self, half_life_seconds: float = 900.0, min_score: float = 1.5, max_keys: int = 2000):
+        self.half_life = max(1.0, half_life_seconds)
+        self.min_score = min_score
+        self.max_keys = max_keys
+        self._scores: Dict[PriceKey, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, seen: float, now: float) -> float:
+        return score * 0.5 ** ((now - seen) / self.half_life)
+
+    def touch(self, key: PriceKey, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            score, seen = self._scores.get(key, (0.0, now))
+            self._scores[key] = (self._decayed(score, seen, now) + 1.0, now)
+            if len(self._scores) > self.max_keys * 4:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        ranked = sorted(
+            ((self._decayed(s, seen, now), k, seen) for k, (s, seen) in self._scores.items()),
+            reverse=True,
+        )
+        self._scores = {k: (s, now) for s, k, _ in ranked[: self.max_keys] if s >= self.min_score / 4}
+
+    def hot(self, now: Optional[float] = None) -> List[PriceKey]:
+        """Hot keys, hottest first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            ranked = [(self._decayed(s, seen, now), k) for k, (s, seen) in self._scores.items()]
+        ranked = [(s, k) for s, k in ranked if s >= self.min_score]
+        ranked.sort(reverse=True)
+        return [k for _, k in ranked[: self.max_keys]]
+
+
+class PriceRefresher:
+    """
+    Refreshes hot keys ahead of expiry.
+
+    `fetched_at(key)` returns when the cached value was fetched (or None if
+    the key is not cached) and `refresh(key)` re-fetches and stores it.
+    A key is due `lead_seconds` before it expires; refresh lag is how long
+    after that point the refresh actually happened.
+    """
+
+    def __init__(
+        self,
+        tracker: HotKeyTracker,
+        fetched_at: Callable[[PriceKey], Optional[float]],
+        refresh: Callable[[PriceKey], None],
+        ttl_seconds: float,
+        lead_seconds: float = 120.0,
+        budget_per_minute: int = 60,
+        interval_seconds: float = 5.0,
+    ):
+        self.tracker = tracker
+        self.fetched_at = fetched_at
+        self.refresh = refresh
+        self.ttl = ttl_seconds
+        self.lead = min(lead_seconds, ttl_seconds)
+        self.budget_per_minute = max(1, budget_per_minute)
+        self.interval = interval_seconds
+        self._tokens = float(self.budget_per_minute)
+        self._tokens_at = time.time()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self.stats = {
+            "cycles": 0,
+            "refreshed": 0,
+            "errors": 0,
+            "deferred_for_budget": 0,
+            "hot_keys": 0,
+            "expired_hot_keys": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+            "last_cycle_at": None,
+        }
+
+    def _take_token(self, now: float) -> bool:
+        self._tokens = min(
+            float(self.budget_per_minute),
+            self._tokens + (now - self._tokens_at) * self.budget_per_minute / 60.0,
+        )
+        self._tokens_at = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """One refresh pass over the hot set; returns the number of refreshes."""
+        now = time.time() if now is None else now
+        hot = self.tracker.hot(now)
+        due: List[Tuple[float, PriceKey]] = []
+        expired = 0
+        for key in hot:
+            fetched = self.fetched_at(key)
+            if fetched is None:
+                due.append((now, key))
+                continue
+            if now - fetched >= self.ttl:
+                expired += 1
+            due_at = fetched + self.ttl - self.lead
+            if now >= due_at:
+                due.append((due_at, key))
+        # Oldest-due first so the budget goes to the keys closest to a miss.
+        due.sort(key=lambda item: item[0])
+
+        refreshed = 0
+        cycle_lag = 0.0
+        for i, (due_at, key) in enumerate(due):
+            if not self._take_token(time.time()):
+                self.stats["deferred_for_budget"] += len(due) - i
+                break
+            try:
+                self.refresh(key)
+                refreshed += 1
+                cycle_lag = max(cycle_lag, time.time() - due_at)
+            except Exception:
+                self.stats["errors"] += 1
+
+        self.stats["cycles"] += 1
+        self.stats["refreshed"] += refreshed
+        self.stats["hot_keys"] = len(hot)
+        self.stats["expired_hot_keys"] = expired
+        self.stats["last_lag_seconds"] = round(cycle_lag, 3)
+        self.stats["max_lag_seconds"] = round(max(self.stats["max_lag_seconds"], cycle_lag), 3)
+        self.stats["last_cycle_at"] = now
+        return refreshed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                self.stats["errors"] += 1
+
+    def ensure_started(self):
+        # Gunicorn forks workers after import, so the thread is started lazily
+        # (and restarted) per process rather than at module load.
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        self._pid = pid
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="price-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def metrics(self) -> Dict[str, object]:
+        out = dict(self.stats)
+        out["budget_per_minute"] = self.budget_per_minute
+        out["running"] = bool(self._thread and self._thread.is_alive() and self._pid == os.getpid())
+        return out
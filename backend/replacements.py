@@ -0,0 +1,217 @@
+# backend/replacements.py
+"""
+Replacement engine behind /api/replacements and the other engine routes.
+
+The engine lives with the research code ("AI research (2)/AI research");
+each service here puts that directory on sys.path, imports it, and loads
+only the datasets its routes need once per worker (`warm()`), so requests
+only pay for the analysis itself and a dataset that fails to load takes
+down its own routes (503) and no others:
+
+- ReplacementService: candidate index, legality matrix, card store and
+  synergy table, plus a ReplacementMemo of the `memo_size` most recently
+  used suggestion lists shared by every request the worker serves;
+- ReprintRiskService, MetagameService, PrintingsService: the reprint
+  risk table, metagame matrix and printings index;
+- ProbabilityService, MulliganService: the hypergeometric and mulligan
+  engines (no data).
+
+The engine's own CARD_STORE_PATH / SYNERGY_DATASET_PATH /
+BANLIST_DATASET_PATH environment variables pick the replacement data.
+The other services import their own engine module (`reprint_risk`,
+`metagame`, `hypergeometric`, `mulligan`, `printings`) and load from
+the `dataset_path` app.py gives them. Nothing is bundled for
+PRINTINGS_PATH, so PrintingsService (/api/scans/resolve) answers 503
+until it names a Scryfall dump or compiled store.
+
+The engine needs NumPy; when it cannot be imported the services report
+themselves unavailable and the routes answer 503, like the optional
+OpenAI client.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+DEFAULT_ENGINE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "AI research (2)", "AI research"
+)
+DEFAULT_REPRINT_RISK_PATH = os.path.join(DEFAULT_ENGINE_DIR, "reprint_risk_dataset.jsonl")
+DEFAULT_METAGAME_PATH = os.path.join(DEFAULT_ENGINE_DIR, "commander_metagame.json")
+
+
+def engine_fx_to_gbp(engine_dir: str = DEFAULT_ENGINE_DIR) -> Dict[str, float]:
+    """The engine's fallback FX table (`currency.FX_TO_GBP`, pure Python)."""
+    if engine_dir not in sys.path:
+        sys.path.append(engine_dir)
+    from currency import FX_TO_GBP
+    return dict(FX_TO_GBP)
+
+
+class EngineService:
+    """One slice of the engine: `module` imported and loaded on first use by `load()`."""
+
+    module = "replacement_engine"
+    # Seconds before a failed load is tried again; None keeps the first error.
+    retry_seconds: Optional[float] = None
+
+    def __init__(self, engine_dir: str = DEFAULT_ENGINE_DIR):
+        self.engine_dir = engine_dir
+        self.engine = None
+        self.error: Optional[str] = None
+        self.warm_seconds: Optional[float] = None
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.warm() is not None
+
+    def load(self, engine):
+        """Build what the service's routes need from the imported `module`
+        and return what `warm()` hands out; raising marks it unavailable."""
+        return engine
+
+    def warm(self):
+        """Import `module` and load this service's data; returns `load()`'s result or None."""
+        if self.engine is not None or self._backing_off():
+            return self.engine
+        with self._lock:
+            if self.engine is not None or self._backing_off():
+                return self.engine
+            t0 = time.perf_counter()
+            try:
+                # Appended, so engine modules never shadow backend ones.
+                if self.engine_dir not in sys.path:
+                    sys.path.append(self.engine_dir)
+                engine = self.load(importlib.import_module(self.module))
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                self._failed_at = time.monotonic()
+                return None
+            self.warm_seconds = round(time.perf_counter() - t0, 3)
+            self.error = None
+            self.engine = engine
+        return self.engine
+
+    def _backing_off(self) -> bool:
+        if self._failed_at is None:
+            return False
+        return self.retry_seconds is None or time.monotonic() - self._failed_at < self.retry_seconds
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "available": self.engine is not None,
+            "error": self.error,
+            "warm_seconds": self.warm_seconds,
+        }
+
+
+class ReplacementService(EngineService):
+    def __init__(self, engine_dir: str = DEFAULT_ENGINE_DIR, memo_size: int = 20000):
+        super().__init__(engine_dir)
+        self.memo_size = memo_size
+        self.memo = None
+
+    def load(self, engine):
+        engine.get_index()
+        engine.get_store()
+        engine.get_synergy()
+        self.memo = engine.ReplacementMemo(self.memo_size)
+        return engine
+
+    def analyse(self, deck: Dict[str, object]) -> Dict[str, object]:
+        """`deck` holds analyse_deck keyword arguments."""
+        return self.warm().analyse_deck(vectorized=True, memo=self.memo, **deck)
+
+    def analyse_batch(self, decks: Iterable[Dict[str, object]]) -> List[Dict[str, object]]:
+        return self.warm().analyse_decks(decks, memo=self.memo)
+
+    def metrics(self) -> Dict[str, object]:
+        memo = self.memo
+        return {
+            **super().metrics(),
+            "memo_hits": memo.hits if memo else 0,
+            "memo_misses": memo.misses if memo else 0,
+            "memo_entries": len(memo) if memo else 0,
+        }
+
+
+class ReprintRiskService(EngineService):
+    module = "reprint_risk"
+
+    def __init__(self, engine_dir: str = DEFAULT_ENGINE_DIR, dataset_path: str = DEFAULT_REPRINT_RISK_PATH):
+        super().__init__(engine_dir)
+        self.dataset_path = dataset_path
+
+    def load(self, engine):
+        if not os.path.exists(self.dataset_path):
+            return engine.ReprintRisk.from_dataset([])
+        return engine.ReprintRisk.load(self.dataset_path)
+
+    def reprint_exposure(self, cards: List[Dict[str, object]], top: int,
+                         price_gbp: Callable[[str], Optional[float]]) -> Dict[str, object]:
+        """`price_gbp(name)` is the GBP price of a card the risk table knows, or None."""
+        risk = self.warm()
+        names = [item["card_name"] for item in cards]
+        return risk.exposure(names, [item["qty"] for item in cards], risk.prices(names, price_gbp), top)
+
+
+class MetagameService(EngineService):
+    module = "metagame"
+
+    def __init__(self, engine_dir: str = DEFAULT_ENGINE_DIR, dataset_path: str = DEFAULT_METAGAME_PATH):
+        super().__init__(engine_dir)
+        self.dataset_path = dataset_path
+
+    def load(self, engine):
+        if not os.path.exists(self.dataset_path):
+            return engine.MetagameMatrix.from_rows([])
+        return engine.MetagameMatrix.load(self.dataset_path)
+
+    def metagame(self, cards: List[Dict[str, object]], commander: Optional[str], k: int) -> Dict[str, object]:
+        return self.warm().report((item["card_name"] for item in cards), commander, k)
+
+
+class ProbabilityService(EngineService):
+    module = "hypergeometric"
+
+    def probability(self, scenarios: List[Dict[str, object]]) -> List[Dict[str, object]]:
+        """Raises ValueError for an invalid scenario."""
+        return self.warm().curve_table(scenarios)
+
+
+class MulliganService(EngineService):
+    module = "mulligan"
+
+    def mulligan(self, config: Dict[str, object]) -> Dict[str, object]:
+        """Raises ValueError for an invalid config."""
+        return self.warm().simulate(config)
+
+
+class PrintingsService(EngineService):
+    module = "printings"
+
+    def __init__(self, engine_dir: str = DEFAULT_ENGINE_DIR, dataset_path: str = ""):
+        super().__init__(engine_dir)
+        self.dataset_path = dataset_path
+
+    def load(self, engine):
+        if not self.dataset_path:
+            raise FileNotFoundError("no printings dataset: set PRINTINGS_PATH to a Scryfall dump or compiled store")
+        if self.dataset_path.endswith(".csv"):
+            # Labelled scans such as ocr_labels.csv carry no prices.
+            raise ValueError(f"{self.dataset_path} is a labelled-scan CSV; printings need a Scryfall dump "
+                             "or compiled store")
+        return engine.PrintingStore.load(self.dataset_path)
+
+    def scans(self, rows: List[Dict[str, object]]) -> Dict[str, object]:
+        """Raises ValueError for a malformed row."""
+        return self.warm().resolve(rows)
+
+
+def decklist(counts: Dict[str, int]) -> List[Dict[str, object]]:
+    """parse_deck_text() output in the engine's decklist shape."""
+    return [{"card_name": name, "qty": qty} for name, qty in counts.items()]
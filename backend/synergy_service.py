@@ -0,0 +1,48 @@
+# backend/synergy_service.py
+"""
+Commander synergy lookups behind /api/synergy.
+
+The engine's `synergy_store` compiles synergy_dataset.jsonl into
+memory-mapped columns (interned names, scores and features stored as
+served, rows sorted by commander and score), so a top-N query is one slice and
+a batch of pairs is one searchsorted. `warm()` opens the store in
+`store_dir` through `synergy_store.open_store`, which first rebuilds it
+(once across workers, renamed into place whole) when it is missing or
+older than the dataset. Named synergy_service so it cannot shadow the engine's
+own `synergy` module on sys.path.
+
+The store needs NumPy; without it the routes answer 503.
+"""
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from replacements import DEFAULT_ENGINE_DIR, EngineService
+
+DEFAULT_SYNERGY_DATASET = os.path.join(DEFAULT_ENGINE_DIR, "synergy_dataset.jsonl")
+
+
+class SynergyService(EngineService):
+    module = "synergy_store"
+
+    def __init__(self, dataset_path: str, store_dir: str, engine_dir: str = DEFAULT_ENGINE_DIR):
+        super().__init__(engine_dir)
+        self.dataset_path = dataset_path
+        self.store_dir = store_dir
+
+    def load(self, engine):
+        """Open (building if stale) the synergy store."""
+        return engine.open_store(self.dataset_path, self.store_dir)
+
+    def top(self, commander: str, n: int, offset: int = 0) -> Optional[List[Dict[str, object]]]:
+        return self.warm().top(commander, n, offset)
+
+    def score_pairs(self, pairs: Iterable[Tuple[str, str]]) -> List[Optional[float]]:
+        return self.warm().score_pairs(pairs)
+
+    def metrics(self) -> Dict[str, object]:
+        store = self.engine
+        return {
+            **super().metrics(),
+            "pairs": len(store) if store is not None else 0,
+            "commanders": len(store.commanders) if store is not None else 0,
+        }
@@ -0,0 +1,128 @@
+# backend/tests/conftest.py
+"""
+Shared setup for the backend tests.
+
+app.py reads its configuration when it is imported, so the environment is
+set here first: a known API token, nothing preloaded, no background price
+refresher and every on-disk cache or store under a temporary directory.
+Upstream HTTP is never reached: `offline` makes every `requests.get` fail,
+and tests that need an upstream answer patch `app.requests.get` themselves.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+API_TOKEN = "test-token"
+DEBUG_TOKEN = "debug-token"
+
+os.environ.update({
+    "LEGACY_API_TOKEN": API_TOKEN,
+    "LEGACY_DEBUG_TOKEN": DEBUG_TOKEN,
+    "REQUIRE_LEGACY_API_AUTH": "1",
+    "LEGACY_RATE_LIMIT_MAX_REQUESTS": "1000000",
+    "USE_OPENAI": "0",
+    "REPLACEMENTS_PRELOAD": "0",
+    "RETRIEVAL_PRELOAD": "0",
+    "PRICE_REFRESHER_ENABLED": "0",
+    "UPSTREAM_CACHE_PATH": "",
+    "COLLECTIONS_DB_PATH": os.path.join(DATA_DIR, "collections.sqlite3"),
+    "RETRIEVAL_INDEX_DIR": os.path.join(DATA_DIR, "retrieval"),
+    "SYNERGY_STORE_DIR": os.path.join(DATA_DIR, "synergy_store"),
+})
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import app as backend_app  # noqa: E402
+from tiered_cache import TieredCache  # noqa: E402
+
+
+class UpstreamDown(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    def fail(*_args, **_kwargs):
+        raise UpstreamDown("network disabled in tests")
+
+    monkeypatch.setattr(backend_app.requests, "get", fail)
+    # A fresh L1-only cache per test, so no test sees another's prices.
+    monkeypatch.setattr(backend_app, "UPSTREAM_CACHE", TieredCache(None, backend_app.UPSTREAM_CACHE.namespaces))
+    backend_app.RATE_LIMITS.clear()
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = "" if status_code == 200 else "error"
+
+    def json(self):
+        return self.payload
+
+
+class FakeScryfall:
+    """Answers /cards/named from `prices` (card name -> Scryfall `prices`
+    object) and `cards` (card name -> full payload); everything else 404s."""
+
+    def __init__(self):
+        self.prices = {}
+        self.cards = {}
+        self.calls = []
+
+    def get(self, url, params=None, **_kwargs):
+        name = (params or {}).get("exact")
+        self.calls.append((url, name))
+        if url.endswith("/cards/named") and name in self.cards:
+            return FakeResponse(200, self.cards[name])
+        if url.endswith("/cards/named") and name in self.prices:
+            return FakeResponse(200, {"name": name, "prices": self.prices[name]})
+        return FakeResponse(404, {"object": "error"})
+
+
+@pytest.fixture
+def scryfall(monkeypatch):
+    fake = FakeScryfall()
+    monkeypatch.setattr(backend_app.requests, "get", fake.get)
+    return fake
+
+
+@pytest.fixture
+def app_module():
+    return backend_app
+
+
+@pytest.fixture
+def client():
+    """Test client that sends the legacy API token with every request."""
+    test_client = backend_app.app.test_client()
+    test_client.environ_base["HTTP_X_LEGACY_API_TOKEN"] = API_TOKEN
+    return test_client
+
+
+@pytest.fixture
+def anonymous_client():
+    return backend_app.app.test_client()
+
+
+@pytest.fixture
+def debug_headers():
+    return {"X-Debug-Token": DEBUG_TOKEN}
+
+
+@pytest.fixture
+def unavailable(monkeypatch):
+    """Replaces an app service (by attribute name) with one whose engine
+    module cannot be imported, so its routes answer 503."""
+    from replacements import EngineService
+
+    def swap(attribute):
+        service = EngineService()
+        service.module = "missing_engine_module"
+        monkeypatch.setattr(backend_app, attribute, service)
+        return service
+    return swap
@@ -0,0 +1,82 @@
+import pytest
+
+from collections_store import CollectionStore
+from name_service import CardNameService
+
+
+@pytest.fixture
+def priced(scryfall):
+    for name in ("Lightning Bolt", "Counterspell", "Sol Ring"):
+        scryfall.prices[name] = {"usd": "1.00"}
+    return scryfall
+
+
+@pytest.fixture
+def collections(app_module, tmp_path, monkeypatch):
+    store = CollectionStore(str(tmp_path / "names.sqlite3"))
+    monkeypatch.setattr(app_module, "COLLECTIONS", store)
+    return store
+
+
+def test_deck_lines_are_canonicalised(app_module):
+    renamed = {}
+    entries = app_module.parse_deck_entries("1 L. Bolt\n2 Counter Spell *F*\n1 Forest (Full Art)\n1 Bolt", renamed=renamed)
+    assert entries == {("Lightning Bolt", "nonfoil"): 2, ("Counterspell", "foil"): 2, ("Forest", "nonfoil"): 1}
+    assert renamed == {
+        "L. Bolt": {"name": "Lightning Bolt", "confidence": 0.8, "rule": "alias"},
+        "Counter Spell": {"name": "Counterspell", "confidence": 0.95, "rule": "folded"},
+        "Forest (Full Art)": {"name": "Forest", "confidence": 0.95, "rule": "variant"},
+        "Bolt": {"name": "Lightning Bolt", "confidence": 0.8, "rule": "alias"},
+    }
+    assert app_module.parse_deck_text("1 Elvish Mystic\n1 Mystery Card") == {"Elvish Mystic": 1, "Mystery Card": 1}
+
+
+def test_low_confidence_rewrites_are_not_applied(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.CARD_NAMES, "min_confidence", 0.9)
+    renamed = {}
+    assert app_module.parse_deck_text("1 L. Bolt\n1 Counter Spell", renamed) == {"L. Bolt": 1, "Counterspell": 1}
+    assert list(renamed) == ["Counter Spell"]
+
+
+def test_cost_reports_renames_and_owns_aliases(client, priced):
+    body = client.post("/api/collections/cost", json={
+        "deck_text": "2 L. Bolt\n1 Counter Spell\n1 Sol Ring", "owned": {"Bolt": 1, "counterspell": 1, "Sol Ring": "x"},
+    }).get_json()
+    assert [(r["card"], r["need"]) for r in body["rows"]] == [("Lightning Bolt", 1), ("Sol Ring", 1)]
+    assert set(body["renamed"]) == {"L. Bolt", "Counter Spell"} and body["usedOwned"] is True
+    # Exact lookups only ever see canonical names.
+    assert {name for _url, name in priced.calls} == {"Lightning Bolt", "Sol Ring"}
+
+
+@pytest.mark.parametrize("qty", ["Infinity", "-Infinity", "NaN", "[2]", "{}"])
+def test_cost_skips_unreadable_owned_quantities(client, priced, qty):
+    raw = '{"deck_text": "1 Sol Ring", "owned": {"Sol Ring": %s, "Lightning Bolt": 1}}' % qty
+    resp = client.post("/api/collections/cost", data=raw, content_type="application/json")
+    assert resp.status_code == 200
+    assert [r["card"] for r in resp.get_json()["rows"]] == ["Sol Ring"]
+
+
+def test_uploaded_collections_are_canonicalised(client, collections, priced):
+    resp = client.post("/api/collections", data="name,quantity\nL. Bolt,2\nCounter Spell,1\nSol Ring (CMR) 472,1\n",
+                       content_type="text/csv")
+    cid = resp.get_json()["collectionId"]
+    assert collections.cards(cid) == {"lightning bolt": 2, "counterspell": 1, "sol ring": 1}
+    body = client.post("/api/collections/cost", json={"deck_text": "3 Lightning Bolt\n1 Counterspell",
+                                                      "collection_id": cid}).get_json()
+    assert [(r["card"], r["need"]) for r in body["rows"]] == [("Lightning Bolt", 1)]
+
+
+def test_names_pass_through_without_the_engine(client, app_module, monkeypatch):
+    service = CardNameService()
+    service.module = "missing_engine_module"
+    monkeypatch.setattr(app_module, "CARD_NAMES", service)
+    renamed = {}
+    assert app_module.parse_deck_text("1 L. Bolt", renamed) == {"L. Bolt": 1} and renamed == {}
+    assert client.post("/api/collections/cost", json={"deck_text": "1 L. Bolt"}).get_json()["ok"] is True
+    assert service.metrics()["available"] is False and service.metrics()["names"] == 0
+
+
+def test_debug_reports_the_normaliser(client, app_module, debug_headers):
+    app_module.parse_deck_text("1 L. Bolt")
+    stats = client.get("/debug", headers=debug_headers).get_json()["card_names"]
+    assert stats["available"] is True and stats["names"] > 100 and stats["rewrites"] >= 1
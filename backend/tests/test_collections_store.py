@@ -0,0 +1,124 @@
+import io
+import time
+
+import pytest
+
+from collections_store import CollectionStore, CollectionTooLarge, iter_collection_rows, normalize_card_name
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CollectionStore(str(tmp_path / "collections.sqlite3"), max_rows=10)
+
+
+@pytest.fixture
+def collections(app_module, tmp_path, monkeypatch):
+    store = CollectionStore(str(tmp_path / "app-collections.sqlite3"), max_rows=10)
+    monkeypatch.setattr(app_module, "COLLECTIONS", store)
+    return store
+
+
+def test_normalize_card_name_ignores_case_accents_and_punctuation():
+    assert normalize_card_name("Lim-Dûl’s  Vault ") == "lim-dul's vault"
+    assert normalize_card_name("SOL RING") == normalize_card_name("sol ring")
+
+
+def test_csv_rows_accept_common_export_headers():
+    stream = io.StringIO("Count,Name,Edition\n4,Lightning Bolt,M10\n,Sol Ring,C21\n0,Island,\nx,Forest,\n")
+    assert list(iter_collection_rows(stream, "csv")) == [("lightning bolt", 4), ("sol ring", 1), None, None]
+
+
+def test_ndjson_rows_skip_unreadable_lines():
+    stream = io.StringIO('{"name": "Sol Ring", "qty": 2}\n\nnot json\n[1, 2]\n{"card": "Island"}\n')
+    assert list(iter_collection_rows(stream, "ndjson")) == [("sol ring", 2), None, None, ("island", 1)]
+
+
+def test_save_merges_duplicate_names_and_reports_skipped_rows(store):
+    summary = store.save([("sol ring", 1), None, ("sol ring", 2), ("island", 10)])
+    assert summary["totalCards"] == 13 and summary["uniqueCards"] == 2
+    assert (summary["rows"], summary["skippedRows"]) == (4, 1)
+    cid = summary["collectionId"]
+    assert store.owned_for(cid, ["sol ring", "forest", "sol ring"]) == {"sol ring": 3}
+    assert store.cards(cid) == {"sol ring": 3, "island": 10}
+
+
+def test_save_with_an_id_replaces_the_collection(store):
+    cid = store.save([("sol ring", 1)])["collectionId"]
+    store.save([("island", 2)], cid)
+    assert store.cards(cid) == {"island": 2}
+
+
+def test_row_limit(store):
+    with pytest.raises(CollectionTooLarge):
+        store.save([("island", 1)] * 11)
+
+
+def test_owned_for_handles_more_names_than_one_query_binds(store):
+    cid = store.save([(f"card {i}", 1) for i in range(10)])["collectionId"]
+    names = [f"card {i}" for i in range(1200)]
+    assert len(store.owned_for(cid, names)) == 10
+
+
+def test_expired_collections_disappear(tmp_path):
+    store = CollectionStore(str(tmp_path / "collections.sqlite3"), ttl_seconds=60)
+    cid = store.save([("sol ring", 1)])["collectionId"]
+    store._conn().execute("UPDATE collections SET updated_at = ?", (time.time() - 61,))
+    assert not store.exists(cid)
+    # The next save purges it for good.
+    store.save([("island", 1)])
+    assert store.cards(cid) == {}
+
+
+def test_delete(store):
+    cid = store.save([("sol ring", 1)])["collectionId"]
+    assert store.delete(cid) is True
+    assert store.delete(cid) is False
+    assert store.summary(cid) is None
+
+
+def test_upload_get_replace_and_delete_a_collection(client, collections):
+    resp = client.post("/api/collections", data="name,quantity\nSol Ring,2\nIsland,5\n", content_type="text/csv")
+    assert resp.status_code == 200
+    cid = resp.get_json()["collectionId"]
+    assert client.get(f"/api/collections/{cid}").get_json()["totalCards"] == 7
+
+    resp = client.put(f"/api/collections/{cid}", data='{"name": "Forest", "qty": 3}\n',
+                      content_type="application/x-ndjson")
+    assert resp.get_json()["totalCards"] == 3
+    assert collections.cards(cid) == {"forest": 3}
+
+    assert client.delete(f"/api/collections/{cid}").status_code == 200
+    assert client.get(f"/api/collections/{cid}").status_code == 404
+    assert client.delete(f"/api/collections/{cid}").status_code == 404
+
+
+def test_multipart_upload_picks_the_format_from_the_filename(client, collections):
+    data = {"file": (io.BytesIO(b'{"name": "Sol Ring", "count": 4}\n'), "cards.jsonl")}
+    resp = client.post("/api/collections", data=data, content_type="multipart/form-data")
+    assert resp.status_code == 200
+    assert collections.cards(resp.get_json()["collectionId"]) == {"sol ring": 4}
+
+
+def test_upload_limits(client, collections):
+    rows = "name\n" + "Island\n" * 11
+    resp = client.post("/api/collections", data=rows, content_type="text/csv")
+    assert resp.status_code == 413
+    assert client.put("/api/collections/missing", data="name\nIsland\n", content_type="text/csv").status_code == 404
+
+
+def test_collection_routes_need_the_api_token(anonymous_client, collections):
+    assert anonymous_client.post("/api/collections", data="name\nIsland\n").status_code == 401
+    assert anonymous_client.get("/api/collections/anything").status_code == 401
+
+
+def test_cost_uses_a_stored_collection(client, collections, scryfall):
+    scryfall.prices["Sol Ring"] = {"usd": "1.50"}
+    scryfall.prices["Arcane Signet"] = {"usd": "0.50"}
+    cid = collections.save([("sol ring", 1)])["collectionId"]
+    body = client.post("/api/collections/cost", json={
+        "deck_text": "1 Sol Ring\n1 Arcane Signet", "collection_id": cid,
+    }).get_json()
+    assert [row["card"] for row in body["rows"]] == ["Arcane Signet"]
+    assert body["usedOwned"] is True
+    resp = client.post("/api/collections/cost", json={"deck_text": "1 Sol Ring", "collection_id": "missing"})
+    assert resp.status_code == 404
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+import deadline
+
+ATRAXA = {"name": "Atraxa, Praetors' Voice", "color_identity": ["W", "U", "B", "G"], "type_line": "Legendary Creature"}
+SOL_RING = {"name": "Sol Ring", "color_identity": [], "cmc": 1, "type_line": "Artifact"}
+
+
+@pytest.fixture(autouse=True)
+def no_leftover_deadline():
+    yield
+    deadline.clear()
+
+
+def test_timeout_is_capped_by_the_remaining_budget():
+    assert deadline.timeout_for(12) == 12
+    deadline.start(5)
+    assert 4 < deadline.timeout_for(12) <= 5
+    assert deadline.timeout_for(1) == 1
+    assert not deadline.expired() and not deadline.was_partial()
+
+
+def test_spent_budget_raises_and_marks_the_request_partial():
+    deadline.start(0.01)
+    time.sleep(0.02)
+    assert deadline.expired()
+    with pytest.raises(deadline.DeadlineExceeded):
+        deadline.timeout_for(12)
+    assert deadline.was_partial()
+    deadline.clear()
+    assert deadline.remaining() is None and not deadline.was_partial()
+
+
+def test_zero_seconds_disables_the_deadline():
+    deadline.start(0)
+    assert deadline.remaining() is None
+
+
+def test_parse_route_deadlines_skips_bad_entries():
+    assert deadline.parse_route_deadlines("/deckcheck=20, /api/collections/cost=15,/x,/y=soon") == {
+        "/deckcheck": 20.0, "/api/collections/cost": 15.0,
+    }
+    assert deadline.parse_route_deadlines("") == {}
+
+
+def slow_upstream(seconds):
+    def get(*_args, timeout=None, **_kwargs):
+        time.sleep(min(seconds, timeout))
+        raise TimeoutError("read timed out")
+    return get
+
+
+def test_http_get_raises_when_the_capped_timeout_cut_the_call(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.requests, "get", slow_upstream(1))
+    deadline.start(0.1)
+    with pytest.raises(deadline.DeadlineExceeded):
+        app_module.http_get("https://example.test")
+    assert deadline.was_partial()
+
+
+def test_http_get_returns_the_failure_stub_without_a_deadline(app_module):
+    assert app_module.http_get("https://example.test").status_code == 599
+
+
+def test_price_record_out_of_time_is_unpriced_and_not_cached(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.requests, "get", slow_upstream(1))
+    deadline.start(0.1)
+    rows, total, unpriced = app_module.compute_rows({("Sol Ring", "nonfoil"): 2}, {}, "USD")
+    assert (rows, total) == ([], 0.0)
+    assert unpriced == [{"card": "Sol Ring", "finish": "nonfoil", "need": 2}]
+    assert app_module.UPSTREAM_CACHE.get("price", "sol ring") is None
+
+
+def test_deckcheck_lists_cards_it_could_not_check(client, scryfall):
+    scryfall.cards[ATRAXA["name"]] = ATRAXA
+    scryfall.cards["Sol Ring"] = SOL_RING
+    body = client.post("/deckcheck", json={
+        "commander": ATRAXA["name"], "cards": ["Sol Ring", "Not A Card"],
+    }).get_json()
+    assert body["checked_count"] == 1
+    assert body["partial"] is True and body["unchecked"] == ["Not A Card"]
+
+
+def test_deckcheck_answers_504_when_the_route_deadline_runs_out(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "ROUTE_DEADLINES", {"/deckcheck": 0.1})
+    monkeypatch.setattr(app_module.requests, "get", slow_upstream(1))
+    resp = client.post("/deckcheck", json={"commander": ATRAXA["name"], "cards": ["Sol Ring"]})
+    assert resp.status_code == 504
+    assert resp.get_json()["error"] == "deadline_exceeded"
+
+
+def test_deckcheck_unknown_commander(client):
+    assert client.post("/deckcheck", json={"commander": "Nobody", "cards": []}).status_code == 404
+
+
+@pytest.mark.parametrize("body, error", [
+    ([ATRAXA["name"]], "Expected a JSON object"),
+    ({"commander": ["Atraxa"]}, "Invalid 'commander'"),
+    ({"commander": "Atraxa", "cards": "Sol Ring"}, "Invalid 'cards'"),
+    ({"commander": "Atraxa", "cards": ["Sol Ring", 3]}, "Invalid 'cards'"),
+    ({"commander": "Atraxa", "format": 1}, "Invalid 'format'"),
+    ({"cards": ["Sol Ring"]}, "Missing commander"),
+])
+def test_deckcheck_rejects_malformed_bodies(client, body, error):
+    resp = client.post("/deckcheck", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
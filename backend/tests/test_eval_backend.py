@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.fixture
+def harness(app_module):
+    # Warming a service puts the engine directory on sys.path.
+    app_module.REPLACEMENTS.warm()
+    import eval_harness
+    return eval_harness
+
+
+def test_backend_target_agrees_with_the_engine(harness):
+    checked = 0
+    for case in harness.load_cases():
+        engine, backend = harness.run_case(case, "engine"), harness.run_case(case, "backend")
+        assert backend.status != harness.ERROR, (case["id"], backend.detail)
+        if case["type"] not in harness.RUNNERS["backend"]:
+            assert backend.target == "engine"
+        elif case["type"] == "replacement_suggestion" and not backend.got["replacements"]:
+            # /api/replacements only suggests for cards that break a constraint.
+            continue
+        else:
+            assert backend.target == "backend"
+        assert backend.got == engine.got, case["id"]
+        checked += 1
+    assert checked > 150
+
+
+def test_backend_errors_are_reported_per_case(harness):
+    result = harness.run_case({"id": "x", "type": "legality_check", "input": {"format": "Modern", "deck": []},
+                               "expected_output": {"legal": True, "illegal_cards": []}}, "backend")
+    assert result.status == harness.ERROR
+    assert result.detail == "RuntimeError: /api/replacements returned 400: Missing 'deck_text'/'deckText'"
@@ -0,0 +1,42 @@
+ATRAXA = {
+    "name": "Atraxa, Praetors' Voice", "color_identity": ["W", "U", "B", "G"], "type_line": "Legendary Creature",
+    "legalities": {"commander": "legal", "vintage": "legal"},
+}
+SOL_RING = {"name": "Sol Ring", "color_identity": [], "legalities": {"commander": "legal", "vintage": "restricted",
+                                                                      "legacy": "banned", "modern": "not_legal"}}
+ISLAND = {"name": "Island", "color_identity": [], "legalities": {"commander": "legal", "vintage": "legal"}}
+
+
+def card(data):
+    return {"ok": True, "data": data}
+
+
+def test_restricted_cards_only_count_above_the_copy_limit(app_module):
+    check = app_module.check_format_legality
+    assert check([card(SOL_RING), card(ISLAND)], "vintage")["restricted"] == []
+    assert check([card(SOL_RING), card(ISLAND), card(SOL_RING)], "vintage")["restricted"] == ["Sol Ring"]
+
+
+def test_banned_not_legal_and_unknown(app_module):
+    check = app_module.check_format_legality
+    assert check([card(SOL_RING)], "legacy")["banned"] == ["Sol Ring"]
+    assert check([card(SOL_RING)], "modern")["not_legal"] == ["Sol Ring"]
+    # A format missing from the card's legalities is not legal there.
+    assert check([card(ISLAND)], "pauper")["not_legal"] == ["Island"]
+    cached_without_legalities = {"name": "Old Entry", "color_identity": []}
+    assert check([card(cached_without_legalities)], "vintage") == {
+        "format": "vintage", "banned": [], "not_legal": [], "restricted": [], "unknown": ["Old Entry"],
+    }
+
+
+def test_deckcheck_reports_format_legality(client, scryfall):
+    for data in (ATRAXA, SOL_RING, ISLAND):
+        scryfall.cards[data["name"]] = data
+    body = client.post("/deckcheck", json={
+        "commander": ATRAXA["name"], "cards": ["Sol Ring", "Sol Ring", "Island"], "format": " Vintage ",
+    }).get_json()
+    assert body["format_legality"] == {
+        "format": "vintage", "banned": [], "not_legal": [], "restricted": ["Sol Ring"], "unknown": [],
+    }
+    body = client.post("/deckcheck", json={"commander": ATRAXA["name"], "cards": ["Island"]}).get_json()
+    assert "format_legality" not in body
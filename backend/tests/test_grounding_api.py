@@ -0,0 +1,127 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from grounding import GroundingService, grounded_system_prompt
+
+CHUNKS = [
+    {"doc_id": "a", "chunk_id": "a:1", "text": "Sol Ring is banned in no commander pod",
+     "meta": {"commander_name": "Atraxa", "topic": "synergy", "cards": ["Sol Ring"]}},
+    {"doc_id": "b", "chunk_id": "b:1", "text": "Sol Ring taps for two colourless mana",
+     "meta": {"commander_name": "Kaust", "topic": "rules"}},
+    {"doc_id": "c", "chunk_id": "c:1", "text": "Proliferate adds counters", "meta": {"topic": "rules"}},
+]
+
+
+def write_packs(path, rows, mode="w"):
+    with open(path, mode, encoding="utf-8") as fh:
+        fh.writelines(json.dumps(row) + "\n" for row in rows)
+
+
+@pytest.fixture
+def grounding(tmp_path):
+    write_packs(tmp_path / "packs.jsonl", CHUNKS)
+    return GroundingService(str(tmp_path / "packs.jsonl"), str(tmp_path / "index"), refresh_seconds=0)
+
+
+def test_retrieve_returns_scored_chunks(grounding):
+    hits = grounding.retrieve("sol ring mana")
+    assert [h["chunk_id"] for h in hits] == ["b:1", "a:1"]
+    assert hits[0] == {"chunk_id": "b:1", "doc_id": "b", "score": hits[0]["score"], "text": CHUNKS[1]["text"]}
+    assert hits[0]["score"] == round(hits[0]["score"], 3) > hits[1]["score"]
+    assert grounding.metrics()["chunks"] == 3 and grounding.metrics()["queries"] == 1
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"commander_name": "atraxa"}, ["a:1"]),
+    ({"commander_name": ["Atraxa", "Kaust"], "topic": "rules"}, ["b:1"]),
+    # Unknown fields and values that are not strings are dropped.
+    ({"colour": "G"}, ["b:1", "a:1"]),
+    ({"topic": 3, "cards": [], "source": ["x", 1], "commander_name": {"name": "Atraxa"}}, ["b:1", "a:1"]),
+    (None, ["b:1", "a:1"]),
+])
+def test_retrieve_keeps_only_usable_filters(grounding, filters, expected):
+    assert [h["chunk_id"] for h in grounding.retrieve("sol ring mana", filters)] == expected
+    assert grounding.metrics()["failures"] == 0
+
+
+def test_retrieve_picks_up_appended_chunks(grounding):
+    grounding.warm()
+    write_packs(grounding.packs_path, [{"doc_id": "d", "chunk_id": "d:1", "text": "proliferate proliferate"}], "a")
+    assert grounding.retrieve("proliferate")[0]["chunk_id"] == "d:1"
+
+
+def test_retrieve_is_empty_without_an_index(tmp_path):
+    service = GroundingService(str(tmp_path / "missing.jsonl"), str(tmp_path / "index"))
+    assert service.retrieve("sol ring") == []
+    assert service.metrics()["available"] is False and service.metrics()["queries"] == 0
+
+
+def test_grounded_system_prompt_numbers_the_notes():
+    assert grounded_system_prompt("Base.", []) == "Base."
+    prompt = grounded_system_prompt("Base.", [{"text": "one"}, {"text": "two"}])
+    assert prompt.startswith("Base.\n\nReference notes") and prompt.endswith("\n[1] one\n[2] two")
+
+
+class FakeOpenAI:
+    requests = []
+
+    def __init__(self, api_key, timeout):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        FakeOpenAI.requests.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Answer."))])
+
+
+@pytest.fixture
+def openai(app_module, monkeypatch, grounding):
+    FakeOpenAI.requests = []
+    for name, value in (("USE_OPENAI", True), ("OPENAI_KEY", "key"), ("OPENAI_AVAILABLE", True),
+                        ("OpenAI", FakeOpenAI), ("GROUNDING", grounding)):
+        monkeypatch.setattr(app_module, name, value)
+    return FakeOpenAI
+
+
+def test_api_echoes_without_openai(client):
+    resp = client.post("/api", json={"prompt": "Is Sol Ring good?", "mode": "deck_builder"})
+    assert resp.get_json() == {"ok": True, "reply": "[deck_builder] Is Sol Ring good?"}
+
+
+def test_api_grounds_the_system_prompt(client, openai):
+    body = client.post("/api", json={"prompt": "sol ring mana", "commander": " Kaust ",
+                                     "filters": {"topic": ["rules", "synergy"]}}).get_json()
+    assert body == {"ok": True, "reply": "Answer.", "sources": ["b:1"]}
+    system, user = openai.requests[0]["messages"]
+    assert system["content"].endswith("[1] " + CHUNKS[1]["text"]) and user["content"] == "sol ring mana"
+    body = client.post("/api", json={"prompt": "sol ring mana", "filters": ["rules"]}).get_json()
+    assert body["sources"] == ["b:1", "a:1"]
+
+
+def test_api_answers_without_grounding_when_retrieval_is_down(client, openai, app_module, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, "GROUNDING", GroundingService(str(tmp_path / "missing.jsonl"), str(tmp_path / "x")))
+    body = client.post("/api", json={"prompt": "sol ring"}).get_json()
+    assert body == {"ok": True, "reply": "Answer.", "sources": []}
+    assert openai.requests[0]["messages"][0]["content"] == app_module.mode_to_system_prompt("default")
+
+
+@pytest.mark.parametrize("body, error", [
+    (["sol ring"], "Expected a JSON object"),
+    ({}, "Missing prompt"),
+    ({"prompt": ""}, "Missing prompt"),
+    ({"prompt": ["sol ring"]}, "Invalid 'prompt'"),
+    ({"prompt": 7}, "Invalid 'prompt'"),
+    ({"prompt": "sol ring", "mode": ["rules"]}, "Invalid 'mode'"),
+    ({"prompt": "x" * 4001}, "Prompt too long"),
+])
+def test_api_rejects_malformed_bodies(client, body, error):
+    resp = client.post("/api", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+def test_api_body_limits_and_auth(client, anonymous_client):
+    assert client.post("/api", data="{", content_type="application/json").get_json()["error"] == "Invalid JSON"
+    assert client.post("/api", json={"prompt": "x" * 6000}).status_code == 413
+    assert anonymous_client.post("/api", json={"prompt": "sol ring"}).status_code == 401
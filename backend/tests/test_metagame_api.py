@@ -0,0 +1,80 @@
+import pytest
+
+DECK = "1 Farseek\n1 Temur Ascendancy\n1 Sol Ring\n1 Not A Real Card"
+
+
+@pytest.fixture
+def matrix(app_module):
+    return app_module.METAGAME.warm()
+
+
+def names(app_module, deck_text):
+    return [item["card_name"] for item in app_module.decklist(app_module.parse_deck_text(deck_text))]
+
+
+def test_report_matches_the_engine(client, app_module, matrix):
+    body = client.post("/api/metagame", json={"deck_text": DECK, "commander": " The Ur-Dragon "}).get_json()
+    assert body == {"ok": True, **matrix.report(names(app_module, DECK), "The Ur-Dragon", 5)}
+    assert body["meta"]["commander"] == "The Ur-Dragon" and body["meta"]["staples_played"] == 2
+    assert len(body["similar_commanders"]) <= 5
+
+
+def test_without_a_commander_the_closest_one_is_used(client, app_module, matrix):
+    body = client.post("/api/metagame", json={"deckText": DECK, "k": 3}).get_json()
+    assert body == {"ok": True, **matrix.report(names(app_module, DECK), None, 3)}
+    assert body["meta"]["commander"] == body["similar_commanders"][0]["commander"]
+
+
+def test_unknown_commander(client, app_module, matrix):
+    resp = client.post("/api/metagame", json={"deck_text": DECK, "commander": "Nobody At All"})
+    assert resp.status_code == 404
+    body = resp.get_json()
+    assert body["error"] == "Commander not in metagame data" and body["ok"] is False
+    assert body["commander_found"] is False and body["meta"] is None
+
+
+def test_k_is_clamped(client, app_module, matrix, monkeypatch):
+    monkeypatch.setattr(app_module, "METAGAME_MAX_SIMILAR", 2)
+    assert len(client.post("/api/metagame", json={"deck_text": DECK, "k": 50}).get_json()["similar_commanders"]) == 2
+    assert client.post("/api/metagame", json={"deck_text": DECK, "k": -1}).get_json()["similar_commanders"] == []
+    assert len(client.post("/api/metagame", json={"deck_text": DECK, "k": "1"}).get_json()["similar_commanders"]) == 1
+
+
+@pytest.mark.parametrize("body, error", [
+    (["1 Sol Ring"], "Expected a JSON object"),
+    ({}, "Missing 'deck_text'/'deckText'"),
+    ({"deck_text": "  "}, "Missing 'deck_text'/'deckText'"),
+    ({"deck_text": ["1 Sol Ring"]}, "Missing 'deck_text'/'deckText'"),
+    ({"deck_text": "1 Sol Ring", "commander": 3}, "Invalid 'commander'"),
+    ({"deck_text": "1 Sol Ring", "commander": ["Atraxa"]}, "Invalid 'commander'"),
+    ({"deck_text": "1 Sol Ring", "k": "some"}, "Invalid 'k'"),
+    ({"deck_text": "1 Sol Ring", "k": None}, "Invalid 'k'"),
+    ({"deck_text": "1 Sol Ring", "k": {}}, "Invalid 'k'"),
+])
+def test_rejects_malformed_bodies(client, matrix, body, error):
+    resp = client.post("/api/metagame", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+@pytest.mark.parametrize("raw", ['{"deck_text": "1 Sol Ring", "k": Infinity}', '{"deck_text": "1 Sol Ring", "k": -Infinity}',
+                                 '{"deck_text": "1 Sol Ring", "k": NaN}'])
+def test_non_finite_k(client, matrix, raw):
+    resp = client.post("/api/metagame", data=raw, content_type="application/json")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": "Invalid 'k'"}
+
+
+def test_body_limits(client, app_module, matrix, monkeypatch):
+    assert client.post("/api/metagame", data="{", content_type="application/json").get_json()["error"] == "Invalid JSON"
+    monkeypatch.setattr(app_module, "MAX_DECK_TEXT_CHARS", 20)
+    resp = client.post("/api/metagame", json={"deck_text": "1 Sol Ring\n" * 5})
+    assert resp.status_code == 400 and resp.get_json()["error"] == "Deck text too long"
+    assert client.post("/api/metagame", json={"deck_text": "x" * 20000}).status_code == 413
+
+
+def test_auth_and_unavailable(client, anonymous_client, unavailable):
+    assert anonymous_client.post("/api/metagame", json={"deck_text": DECK}).status_code == 401
+    unavailable("METAGAME")
+    resp = client.post("/api/metagame", json={"deck_text": DECK})
+    assert resp.status_code == 503 and resp.get_json()["error"] == "metagame_unavailable"
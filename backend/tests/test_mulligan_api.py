@@ -0,0 +1,75 @@
+import pytest
+
+# The test client sends keys sorted, and category order seeds the deck, so keep them sorted here too.
+CONFIG = {"deck": {"land": 37, "other": 50, "ramp": 12}, "keep": [{"land": 2, "ramp": 1}, {"land": [1, 1], "ramp": 2}],
+          "goal": {"land": 4}, "turn": 4, "hands": 3000, "seed": 5}
+
+
+@pytest.fixture
+def engine(app_module):
+    return app_module.MULLIGAN.warm()
+
+
+def test_simulation_matches_the_engine(client, engine):
+    body = client.post("/api/mulligan", json=CONFIG).get_json()
+    assert body == {"ok": True, **engine.simulate(CONFIG)}
+    assert body["hands"] == 3000 and len(body["kept_after"]) == 4 and body["goal"]["turn"] == 4
+
+
+def test_hands_are_clamped(client, app_module, engine, monkeypatch):
+    monkeypatch.setattr(app_module, "MULLIGAN_MAX_HANDS", 500)
+    assert client.post("/api/mulligan", json={**CONFIG, "hands": 10 ** 9}).get_json()["hands"] == 500
+    assert client.post("/api/mulligan", json={**CONFIG, "hands": -4}).get_json()["hands"] == 1
+    assert client.post("/api/mulligan", json={**CONFIG, "hands": "20"}).get_json()["hands"] == 20
+    body = client.post("/api/mulligan", json={key: value for key, value in CONFIG.items() if key != "hands"})
+    assert body.get_json()["hands"] == 500
+
+
+@pytest.mark.parametrize("body, error", [
+    ([CONFIG], "Expected a JSON object"),
+    ({**CONFIG, "hands": "lots"}, "Invalid 'hands'"),
+    ({**CONFIG, "hands": None}, "Invalid 'hands'"),
+    ({**CONFIG, "hands": [10]}, "Invalid 'hands'"),
+    ({"keep": {"land": 2}, "hands": 10}, "'deck' must map 1 to 16 categories to card counts"),
+    ({**CONFIG, "deck": {"land": "x"}}, "'land' must be an integer"),
+    ({**CONFIG, "keep": None}, "'keep' must be a clause or a list of clauses"),
+    ({**CONFIG, "keep": {"lands": 2}}, "'keep' uses 'lands', which is not a deck category"),
+    ({**CONFIG, "keep": {"land": [2]}}, "'keep' bounds must be a minimum or a [min, max] pair"),
+    ({**CONFIG, "goal": [{"land": 4}, {"ramp": 1}]}, "'goal' must be a single clause"),
+    ({**CONFIG, "turn": 41}, "'turn' must be between 0 and 40"),
+    ({**CONFIG, "seed": "x"}, "'seed' must be an integer"),
+])
+def test_rejects_malformed_bodies(client, engine, body, error):
+    resp = client.post("/api/mulligan", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+@pytest.mark.parametrize("raw, error", [
+    ('{"deck": {"land": 40}, "keep": {"land": 2}, "hands": Infinity}', "Invalid 'hands'"),
+    ('{"deck": {"land": 40}, "keep": {"land": 2}, "hands": NaN}', "Invalid 'hands'"),
+    ('{"deck": {"land": -Infinity}, "keep": {"land": 2}, "hands": 10}', "'land' must be an integer"),
+    ('{"deck": {"land": 40}, "keep": {"land": 2}, "hands": 10, "seed": Infinity}', "'seed' must be an integer"),
+])
+def test_non_finite_numbers(client, engine, raw, error):
+    resp = client.post("/api/mulligan", data=raw, content_type="application/json")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+def test_a_minimum_above_the_hand_size_is_never_met(client, engine):
+    body = client.post("/api/mulligan", json={"deck": {"land": 3, "other": 2}, "hand_size": 2, "max_mulligans": 1,
+                                              "keep": {"land": 3}, "hands": 50}).get_json()
+    assert body["ok"] and body["keep_opening"]["p"] == 0.0 and body["forced_keep"]["p"] == 1.0
+
+
+def test_body_limit(client, engine):
+    assert client.post("/api/mulligan", data="{", content_type="application/json").get_json()["error"] == "Invalid JSON"
+    assert client.post("/api/mulligan", json={**CONFIG, "pad": "x" * 30000}).status_code == 413
+
+
+def test_auth_and_unavailable(client, anonymous_client, unavailable):
+    assert anonymous_client.post("/api/mulligan", json=CONFIG).status_code == 401
+    unavailable("MULLIGAN")
+    resp = client.post("/api/mulligan", json=CONFIG)
+    assert resp.status_code == 503 and resp.get_json()["error"] == "mulligan_unavailable"
@@ -0,0 +1,101 @@
+import pytest
+
+SOL_RING = {"usd": "1.50", "usd_foil": "4.00", "eur": "1.20", "eur_foil": None, "tix": "0.05"}
+
+
+def test_one_fetch_serves_every_currency_and_finish(app_module, scryfall):
+    scryfall.prices["Sol Ring"] = SOL_RING
+    assert app_module.scryfall_price("Sol Ring", "USD") == 1.5
+    assert app_module.scryfall_price("Sol Ring", "usd", "foil") == 4.0
+    assert app_module.scryfall_price("Sol Ring", "EUR") == 1.2
+    assert app_module.scryfall_price("Sol Ring", "TIX") == 0.05
+    assert len(scryfall.calls) == 1
+
+
+def test_missing_finish_falls_back_to_another_finish(app_module):
+    unit_price = app_module.unit_price
+    record = {"usd": None, "usd_foil": 4.0, "usd_etched": None, "eur": 1.2}
+    assert unit_price(record, "USD", "nonfoil") == 4.0
+    assert unit_price(record, "EUR", "foil") == 1.2
+    assert unit_price(record, "USD", "sparkly") == 4.0
+    assert unit_price({}, "USD") == 0.0
+
+
+def test_gbp_uses_fallback_rates_when_the_fx_fetch_fails(app_module, scryfall):
+    scryfall.prices["Sol Ring"] = SOL_RING
+    expected = round(1.5 * app_module.FX_FALLBACK_USD_GBP, 2)
+    assert app_module.scryfall_price("Sol Ring", "GBP") == expected
+    assert app_module.UPSTREAM_CACHE.get("fx_fallback", "USD")["GBP"] == app_module.FX_FALLBACK_USD_GBP
+    assert app_module.UPSTREAM_CACHE.get("fx", "USD") is None
+
+
+def test_price_gbp_is_none_for_unpriced_cards(app_module, scryfall):
+    scryfall.prices["Unpriced"] = {"usd": None, "eur": None, "tix": "0.01"}
+    assert app_module.price_gbp("Unpriced") is None
+    assert app_module.price_gbp("Unknown Card") is None
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Sol Ring *F*", ("Sol Ring", "foil")),
+    ("Sol Ring *E*", ("Sol Ring", "etched")),
+    ("Sol Ring (Foil)", ("Sol Ring", "foil")),
+    ("Sol Ring [etched]", ("Sol Ring", "etched")),
+    ("Sol Ring", ("Sol Ring", None)),
+])
+def test_split_finish(app_module, name, expected):
+    assert app_module.split_finish(name) == expected
+
+
+def test_cost_prices_each_finish_from_one_record(client, scryfall):
+    scryfall.prices["Sol Ring"] = SOL_RING
+    resp = client.post("/api/collections/cost", json={
+        "deck_text": "1 Sol Ring\n2 Sol Ring *F*", "currency": "usd",
+    })
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["currency"] == "USD"
+    assert {(r["finish"], r["need"], r["unit"]) for r in body["rows"]} == {("nonfoil", 1, 1.5), ("foil", 2, 4.0)}
+    assert body["total"] == 9.5
+    assert "partial" not in body
+    assert len(scryfall.calls) == 1
+
+
+def test_cost_counts_owned_copies_toward_any_finish(client, scryfall):
+    scryfall.prices["Sol Ring"] = SOL_RING
+    body = client.post("/api/collections/cost", json={
+        "deck_text": "1 Sol Ring *F*", "owned": {"Sol Ring": 1},
+    }).get_json()
+    assert body["rows"] == [] and body["total"] == 0 and body["usedOwned"] is True
+
+
+def test_cost_lists_failed_fetches_as_unpriced(app_module, client):
+    body = client.post("/api/collections/cost", json={"deck_text": "1 Sol Ring"}).get_json()
+    assert body["partial"] is True
+    assert body["unpriced"] == [{"card": "Sol Ring", "finish": "nonfoil", "need": 1}]
+    assert app_module.UPSTREAM_CACHE.get("price", "sol ring") is None
+
+
+@pytest.mark.parametrize("body, error", [
+    (["1 Sol Ring"], "Expected a JSON object"),
+    ({"deck_text": ["1 Sol Ring"]}, "Invalid 'deck_text'"),
+    ({"deck_text": "1 Sol Ring", "currency": 5}, "Invalid 'currency'"),
+    ({"deck_text": "1 Sol Ring", "finish": ["foil"]}, "Invalid 'finish'"),
+    ({"deck_text": "1 Sol Ring", "finish": "shiny"}, "Unsupported finish 'shiny'"),
+    ({"deck_text": "1 Sol Ring", "collection_id": 7}, "Invalid 'collection_id'"),
+    ({"deck_text": "   "}, "Missing 'deck_text'/'deckText'"),
+])
+def test_cost_rejects_malformed_bodies(client, body, error):
+    resp = client.post("/api/collections/cost", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+def test_cost_rejects_invalid_json(client):
+    resp = client.post("/api/collections/cost", data="{not json", content_type="application/json")
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Invalid JSON"
+
+
+def test_cost_rejects_oversized_bodies(app_module, client):
+    resp = client.post("/api/collections/cost", json={"deck_text": "x" * (app_module.MAX_DECK_TEXT_CHARS + 10001)})
+    assert resp.status_code == 413
@@ -0,0 +1,123 @@
+import pytest
+
+from price_refresher import HotKeyTracker, PriceRefresher
+
+
+def test_hot_keys_need_repeated_lookups_and_rank_hottest_first():
+    tracker = HotKeyTracker(half_life_seconds=100, min_score=1.5)
+    for _ in range(3):
+        tracker.touch("sol ring", now=0)
+    tracker.touch("arcane signet", now=0)
+    tracker.touch("arcane signet", now=0)
+    tracker.touch("island", now=0)
+    assert tracker.hot(now=0) == ["sol ring", "arcane signet"]
+
+
+def test_hot_keys_decay_with_half_life():
+    tracker = HotKeyTracker(half_life_seconds=100, min_score=1.5)
+    tracker.touch("sol ring", now=0)
+    tracker.touch("sol ring", now=0)
+    assert tracker.hot(now=0) == ["sol ring"]
+    # Two hits halve to one after a half-life, below the 1.5 threshold.
+    assert tracker.hot(now=100) == []
+
+
+def test_tracker_prunes_to_max_keys():
+    tracker = HotKeyTracker(half_life_seconds=100, min_score=0.1, max_keys=5)
+    for i in range(25):
+        tracker.touch(f"card {i}", now=0)
+    assert len(tracker._scores) <= 5 * 4
+    assert len(tracker.hot(now=0)) == 5
+
+
+def make_refresher(stored, tracker=None, **kwargs):
+    tracker = tracker or HotKeyTracker(half_life_seconds=1e6, min_score=1.5)
+    refreshed = []
+
+    def refresh(key):
+        if key == "broken":
+            raise RuntimeError("upstream failed")
+        refreshed.append(key)
+        stored[key] = 10_000.0
+
+    refresher = PriceRefresher(tracker, stored.get, refresh, ttl_seconds=600, lead_seconds=60, **kwargs)
+    return refresher, tracker, refreshed
+
+
+def touch_twice(tracker, *keys):
+    for key in keys:
+        tracker.touch(key, now=0)
+        tracker.touch(key, now=0)
+
+
+def test_run_once_refreshes_only_keys_due_before_expiry():
+    stored = {"fresh": 500.0, "due": 0.0}
+    refresher, tracker, refreshed = make_refresher(stored)
+    touch_twice(tracker, "fresh", "due", "uncached")
+    # At t=560 "due" (fetched at 0) is inside the 60s lead; "fresh" is not.
+    assert refresher.run_once(now=560) == 2
+    assert sorted(refreshed) == ["due", "uncached"]
+    assert refresher.stats["hot_keys"] == 3
+
+
+def test_run_once_spends_budget_on_the_oldest_due_keys_first():
+    stored = {"older": 0.0, "newer": 100.0, "newest": 200.0}
+    refresher, tracker, refreshed = make_refresher(stored, budget_per_minute=2)
+    touch_twice(tracker, "newest", "newer", "older")
+    assert refresher.run_once(now=900) == 2
+    assert refreshed == ["older", "newer"]
+    assert refresher.stats["deferred_for_budget"] == 1
+    assert refresher.stats["expired_hot_keys"] == 3
+
+
+def test_refresh_errors_are_counted_not_raised():
+    refresher, tracker, refreshed = make_refresher({"broken": 0.0, "ok": 0.0})
+    touch_twice(tracker, "broken", "ok")
+    assert refresher.run_once(now=600) == 1
+    assert refreshed == ["ok"]
+    assert refresher.stats["errors"] == 1
+
+
+def test_metrics_report_budget_and_thread_state():
+    refresher, _tracker, _refreshed = make_refresher({}, budget_per_minute=30, interval_seconds=3600)
+    assert refresher.metrics()["running"] is False
+    refresher.ensure_started()
+    try:
+        metrics = refresher.metrics()
+        assert metrics["running"] is True
+        assert metrics["budget_per_minute"] == 30
+    finally:
+        refresher.stop()
+
+
+def test_price_lookups_feed_the_hot_key_tracker(app_module, scryfall, monkeypatch):
+    tracker = HotKeyTracker(half_life_seconds=3600, min_score=1.5)
+    monkeypatch.setattr(app_module, "PRICE_HOT_KEYS", tracker)
+    scryfall.prices["Sol Ring"] = {"usd": "1.50"}
+    app_module.price_record("Sol Ring")
+    app_module.price_record("Sol Ring")
+    assert tracker.hot() == ["sol ring"]
+    # The second lookup was served from the cache.
+    assert len(scryfall.calls) == 1
+
+
+def test_refresh_price_key_replaces_the_cached_record(app_module, scryfall):
+    app_module.UPSTREAM_CACHE.set("price", "sol ring", {"usd": 1.0}, stored_at=0)
+    scryfall.prices["sol ring"] = {"usd": "2.00"}
+    app_module.refresh_price_key("sol ring")
+    assert app_module.UPSTREAM_CACHE.get("price", "sol ring")["usd"] == 2.0
+    assert app_module.price_fetched_at("sol ring") > 0
+
+
+def test_failed_refresh_keeps_the_cached_record(app_module):
+    app_module.UPSTREAM_CACHE.set("price", "sol ring", {"usd": 1.0})
+    with pytest.raises(RuntimeError):
+        app_module.refresh_price_key("sol ring")
+    assert app_module.UPSTREAM_CACHE.get("price", "sol ring") == {"usd": 1.0}
+
+
+def test_metrics_route_needs_the_debug_token(anonymous_client, debug_headers):
+    assert anonymous_client.get("/metrics").status_code == 404
+    resp = anonymous_client.get("/metrics", headers=debug_headers)
+    assert resp.status_code == 200
+    assert "price_refresh_total" in resp.get_data(as_text=True)
@@ -0,0 +1,67 @@
+import pytest
+
+LANDS = {"deck_size": 99, "turns": 3, "categories": [{"name": "lands", "count": 37, "min": 2}]}
+COMBO = {"deck_size": 60, "hand_size": 7, "turns": 2, "mulligans": 1,
+         "categories": [{"name": "lands", "count": 24, "min": 2}, {"name": "combo", "count": 4}]}
+
+
+@pytest.fixture
+def engine(app_module):
+    return app_module.PROBABILITY.warm()
+
+
+def test_single_scenario(client, engine):
+    body = client.post("/api/probability", json=LANDS).get_json()
+    assert body == {"ok": True, "results": engine.curve_table([LANDS])}
+    assert body["results"][0]["curve"][0]["play"] == pytest.approx(0.8142, abs=1e-4)
+
+
+def test_scenario_batch(client, engine):
+    body = client.post("/api/probability", json={"scenarios": [LANDS, COMBO]}).get_json()
+    assert body == {"ok": True, "results": engine.curve_table([LANDS, COMBO])}
+    assert [len(r["curve"]) for r in body["results"]] == [4, 3]
+
+
+@pytest.mark.parametrize("body, error", [
+    ([LANDS], "Expected a JSON object"),
+    ({"scenarios": []}, "Missing 'scenarios'"),
+    ({"scenarios": LANDS}, "Missing 'scenarios'"),
+    ({"scenarios": "lands"}, "Missing 'scenarios'"),
+    ({}, "'deck_size' must be an integer"),
+    ({"scenarios": [LANDS, "lands"]}, "each scenario must be an object"),
+    ({**LANDS, "deck_size": "ninety"}, "'deck_size' must be an integer"),
+    ({**LANDS, "categories": [{"count": 100}]}, "'count' must be between 0 and 99"),
+    ({**LANDS, "categories": [{"count": 60}, {"count": 40}]}, "category counts add up to more than 'deck_size'"),
+    ({**LANDS, "turns": 41}, "'turns' must be between 0 and 40"),
+    ({**LANDS, "categories": None}, "'categories' must list 1 to 8 categories"),
+])
+def test_rejects_malformed_bodies(client, engine, body, error):
+    resp = client.post("/api/probability", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+@pytest.mark.parametrize("raw, error", [
+    ('{"deck_size": Infinity, "categories": [{"count": 1}]}', "'deck_size' must be an integer"),
+    ('{"deck_size": 60, "categories": [{"count": -Infinity}]}', "'count' must be an integer"),
+    ('{"deck_size": 60, "turns": NaN, "categories": [{"count": 1}]}', "'turns' must be an integer"),
+])
+def test_non_finite_numbers(client, engine, raw, error):
+    resp = client.post("/api/probability", data=raw, content_type="application/json")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+def test_limits(client, app_module, engine, monkeypatch):
+    assert client.post("/api/probability", data="{", content_type="application/json").get_json()["error"] == "Invalid JSON"
+    monkeypatch.setattr(app_module, "PROBABILITY_MAX_SCENARIOS", 2)
+    resp = client.post("/api/probability", json={"scenarios": [LANDS] * 3})
+    assert resp.status_code == 413 and resp.get_json()["error"] == "At most 2 scenarios per request"
+    assert client.post("/api/probability", json={"scenarios": [LANDS], "pad": "x" * 5000}).status_code == 413
+
+
+def test_auth_and_unavailable(client, anonymous_client, unavailable):
+    assert anonymous_client.post("/api/probability", json=LANDS).status_code == 401
+    unavailable("PROBABILITY")
+    resp = client.post("/api/probability", json=LANDS)
+    assert resp.status_code == 503 and resp.get_json()["error"] == "probability_unavailable"
@@ -0,0 +1,113 @@
+import pytest
+
+DECK = "1 Mana Crypt\n1 Sol Ring\n2 Island"
+ATRAXA = {"name": "Atraxa, Praetors' Voice", "color_identity": ["W", "U", "B", "G"]}
+
+
+@pytest.fixture
+def engine(app_module):
+    return app_module.REPLACEMENTS.warm()
+
+
+def test_replacements_match_the_engine(client, engine):
+    resp = client.post("/api/replacements", json={
+        "deck_text": DECK, "color_identity": ["U"], "budget_gbp": 5, "persona": "Budget Brewer",
+        "owned": ["Island"],
+    })
+    assert resp.status_code == 200
+    body = resp.get_json()
+    expected = engine.analyse_deck(
+        "Commander", 5.0, "Budget Brewer", ["U"],
+        [{"card_name": "Mana Crypt", "qty": 1}, {"card_name": "Sol Ring", "qty": 1}, {"card_name": "Island", "qty": 2}],
+        owned_cards=["Island"], split_basket=True,
+    )
+    assert body == {"ok": True, **expected}
+    assert [v["original_card"] for v in body["violations"]] == ["Mana Crypt"]
+
+
+def test_commander_colours_come_from_scryfall(client, scryfall, engine):
+    scryfall.cards[ATRAXA["name"]] = ATRAXA
+    body = client.post("/api/replacements", json={"deck_text": "1 Goldspan Dragon", "commander": ATRAXA["name"]}).get_json()
+    assert body["violations"][0]["issue"] == "Price, Color"
+    resp = client.post("/api/replacements", json={"deck_text": "1 Sol Ring", "commander": "Nobody"})
+    assert resp.status_code == 404
+
+
+def test_batch_keeps_order_and_only_splits_baskets_on_request(client, engine):
+    decks = [
+        {"deck_text": "1 Mana Crypt", "color_identity": ["R"]},
+        {"deck_text": "1 Sol Ring", "color_identity": [], "split_basket": True},
+    ]
+    resp = client.post("/api/replacements/batch", json={"decks": decks})
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert [r["violations"][0]["original_card"] if r["violations"] else None for r in results] == ["Mana Crypt", None]
+    assert "split_basket" not in results[0] and "split_basket" in results[1]
+
+
+def test_debug_reports_memo_hits(client, engine, debug_headers):
+    for _ in range(2):
+        client.post("/api/replacements", json={"deck_text": "1 Mana Crypt", "color_identity": ["U"]})
+    metrics = client.get("/debug", headers=debug_headers).get_json()["replacements"]
+    assert metrics["available"] is True and metrics["memo_hits"] >= 1
+
+
+@pytest.mark.parametrize("body, error", [
+    (["1 Sol Ring"], "Each deck must be an object"),
+    ({"deck_text": ""}, "Missing 'deck_text'/'deckText'"),
+    ({"deck_text": ["1 Sol Ring"]}, "Missing 'deck_text'/'deckText'"),
+    ({"deck_text": "1 Sol Ring", "color_identity": [], "budget_gbp": "cheap"}, "Invalid 'budget_gbp'"),
+    ({"deck_text": "1 Sol Ring", "color_identity": [], "budget_gbp": "nan"}, "Invalid 'budget_gbp'"),
+    ({"deck_text": "1 Sol Ring", "color_identity": [], "budget_gbp": [5]}, "Invalid 'budget_gbp'"),
+    ({"deck_text": "1 Sol Ring", "commander": 3}, "Invalid 'commander'"),
+    ({"deck_text": "1 Sol Ring", "color_identity": [], "split_basket": "yes"}, "Invalid 'split_basket'"),
+    ({"deck_text": "1 Sol Ring"}, "Missing 'color_identity' or 'commander'"),
+    ({"deck_text": "1 Sol Ring", "color_identity": "U"}, "Missing 'color_identity' or 'commander'"),
+    ({"deck_text": "1 Sol Ring", "color_identity": [], "owned": "Sol Ring"}, "Invalid 'owned'"),
+    ({"deck_text": "1 Sol Ring", "color_identity": [], "owned": ["Sol Ring", 1]}, "Invalid 'owned'"),
+    ({"deck_text": "1 Sol Ring", "color_identity": [], "collection_id": 5}, "Invalid 'collection_id'"),
+])
+def test_replacements_reject_malformed_bodies(client, engine, body, error):
+    resp = client.post("/api/replacements", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+    resp = client.post("/api/replacements/batch", json={"decks": [{"deck_text": "1 Island", "color_identity": []}, body]})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error, "deck": 1}
+
+
+@pytest.mark.parametrize("body, status, error", [
+    ([{"deck_text": "1 Sol Ring"}], 400, "Expected a JSON object"),
+    ({"decks": []}, 400, "Missing 'decks'"),
+    ({"decks": {"deck_text": "1 Sol Ring"}}, 400, "Missing 'decks'"),
+])
+def test_batch_rejects_malformed_bodies(client, engine, body, status, error):
+    resp = client.post("/api/replacements/batch", json=body)
+    assert resp.status_code == status
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+def test_batch_size_limit(client, app_module, engine, monkeypatch):
+    monkeypatch.setattr(app_module, "REPLACEMENTS_MAX_BATCH", 2)
+    deck = {"deck_text": "1 Sol Ring", "color_identity": []}
+    assert client.post("/api/replacements/batch", json={"decks": [deck] * 3}).status_code == 413
+
+
+def test_invalid_json_and_unknown_collection(client, engine):
+    resp = client.post("/api/replacements", data="{", content_type="application/json")
+    assert resp.status_code == 400 and resp.get_json()["error"] == "Invalid JSON"
+    resp = client.post("/api/replacements", json={"deck_text": "1 Sol Ring", "color_identity": [], "collection_id": "x"})
+    assert resp.status_code == 404
+
+
+def test_replacements_need_the_api_token(anonymous_client):
+    assert anonymous_client.post("/api/replacements", json={"deck_text": "1 Sol Ring"}).status_code == 401
+    assert anonymous_client.post("/api/replacements/batch", json={"decks": []}).status_code == 401
+
+
+def test_unavailable_engine_answers_503(client, unavailable):
+    unavailable("REPLACEMENTS")
+    resp = client.post("/api/replacements", json={"deck_text": "1 Sol Ring", "color_identity": []})
+    assert resp.status_code == 503
+    assert resp.get_json()["error"] == "replacements_unavailable"
+    assert client.post("/api/replacements/batch", json={"decks": []}).status_code == 503
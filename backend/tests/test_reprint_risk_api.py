@@ -0,0 +1,84 @@
+import pytest
+
+from collections_store import CollectionStore
+
+DECK = "2 Cyclonic Rift\n1 Swords to Plowshares\n4 Island\n1 Lightning Bolt"
+
+
+@pytest.fixture
+def table(app_module):
+    return app_module.REPRINT_RISK.warm()
+
+
+@pytest.fixture
+def priced(scryfall):
+    scryfall.prices.update({"Cyclonic Rift": {"usd": "30.00"}, "Swords to Plowshares": {"usd": "2.00"}})
+    return scryfall
+
+
+def expected(app_module, table, counts, top):
+    names = list(counts)
+    return table.exposure(names, list(counts.values()), table.prices(names, app_module.price_gbp), top)
+
+
+def test_deck_exposure_matches_the_engine(client, app_module, table, priced):
+    body = client.post("/api/reprint-risk", json={"deck_text": DECK, "top": 2}).get_json()
+    assert body == {"ok": True, **expected(app_module, table, app_module.parse_deck_text(DECK), 2)}
+    assert body["top"][0]["card_name"] == "Cyclonic Rift" and body["top"][0]["qty"] == 2
+    assert body["cards"] == 8 and body["unpriced_cards"] >= 1 and body["value_at_risk_gbp"] > 0
+
+
+def test_collection_exposure(client, app_module, table, priced, tmp_path, monkeypatch):
+    store = CollectionStore(str(tmp_path / "collections.sqlite3"))
+    monkeypatch.setattr(app_module, "COLLECTIONS", store)
+    cid = store.save([("cyclonic rift", 3), ("island", 20)])["collectionId"]
+    body = client.post("/api/reprint-risk", json={"collectionId": f" {cid} ", "deck_text": DECK}).get_json()
+    assert body == {"ok": True, **expected(app_module, table, store.cards(cid), 10)}
+    assert body["cards"] == 23
+    resp = client.post("/api/reprint-risk", json={"collection_id": "missing"})
+    assert resp.status_code == 404 and resp.get_json()["error"] == "Unknown collection"
+
+
+def test_top_is_clamped(client, app_module, table, monkeypatch):
+    monkeypatch.setattr(app_module, "REPRINT_RISK_MAX_TOP", 1)
+    assert len(client.post("/api/reprint-risk", json={"deck_text": DECK, "top": 50}).get_json()["top"]) == 1
+    assert client.post("/api/reprint-risk", json={"deck_text": DECK, "top": -3}).get_json()["top"] == []
+    assert len(client.post("/api/reprint-risk", json={"deck_text": DECK, "top": "1"}).get_json()["top"]) == 1
+
+
+@pytest.mark.parametrize("body, error", [
+    (["1 Sol Ring"], "Expected a JSON object"),
+    ({}, "Missing 'deck_text' or 'collection_id'"),
+    ({"deck_text": "   "}, "Missing 'deck_text' or 'collection_id'"),
+    ({"deck_text": ["1 Sol Ring"]}, "Invalid 'deck_text'"),
+    ({"deck_text": "1 Sol Ring", "collection_id": 7}, "Invalid 'collection_id'"),
+    ({"deck_text": "1 Sol Ring", "top": "many"}, "Invalid 'top'"),
+    ({"deck_text": "1 Sol Ring", "top": [3]}, "Invalid 'top'"),
+    ({"deck_text": "1 Sol Ring", "top": None}, "Invalid 'top'"),
+])
+def test_rejects_malformed_bodies(client, table, body, error):
+    resp = client.post("/api/reprint-risk", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+@pytest.mark.parametrize("raw", ['{"deck_text": "1 Sol Ring", "top": Infinity}', '{"deck_text": "1 Sol Ring", "top": NaN}'])
+def test_non_finite_top(client, table, raw):
+    resp = client.post("/api/reprint-risk", data=raw, content_type="application/json")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": "Invalid 'top'"}
+
+
+def test_body_limits(client, app_module, table, monkeypatch):
+    assert client.post("/api/reprint-risk", data="{", content_type="application/json").get_json()["error"] == "Invalid JSON"
+    monkeypatch.setattr(app_module, "MAX_DECK_TEXT_CHARS", 20)
+    resp = client.post("/api/reprint-risk", json={"deck_text": "1 Sol Ring\n" * 5})
+    assert resp.status_code == 400 and resp.get_json()["error"] == "Deck text too long"
+    assert client.post("/api/reprint-risk", json={"deck_text": "x" * 20000}).status_code == 413
+
+
+def test_auth_and_unavailable(client, anonymous_client, unavailable):
+    assert anonymous_client.post("/api/reprint-risk", json={"deck_text": DECK}).status_code == 401
+    unavailable("REPRINT_RISK")
+    resp = client.post("/api/reprint-risk", json={"deck_text": DECK})
+    assert resp.status_code == 503 and resp.get_json()["error"] == "reprint_risk_unavailable"
@@ -0,0 +1,65 @@
+import pytest
+
+from rules_index import entry_json
+from test_grounding_api import FakeOpenAI
+
+
+@pytest.fixture
+def index(app_module):
+    return app_module.RULES.warm()
+
+
+def test_ref_lookups_include_sub_rules_unless_exact(client, index):
+    body = client.get("/rules?ref=CR 704.5").get_json()
+    assert body["ok"] is True and body["ref"] == "CR 704.5"
+    assert body["rules"] == [entry_json(e) for e in index.lookup("704.5")]
+    assert body["total"] == len(body["rules"]) > 1
+    assert body["children"] == list(index.node("704.5").children)
+    exact = client.get("/rules?ref=704.5a&exact=1").get_json()
+    assert exact["rules"] == [entry_json(e) for e in index.lookup("704.5a", prefix=False)]
+
+
+def test_ref_results_are_capped(client, app_module, index, monkeypatch):
+    monkeypatch.setattr(app_module, "RULES_MAX_RESULTS", 2)
+    body = client.get("/rules?ref=7").get_json()
+    assert len(body["rules"]) == 2 and body["total"] == len(index.lookup("7")) > 2
+    assert len(client.get("/rules?q=damage").get_json()["rules"]) == 2
+
+
+@pytest.mark.parametrize("ref", ["banana", "999", "704.5.1", "CR"])
+def test_unknown_refs_are_empty(client, index, ref):
+    assert client.get("/rules", query_string={"ref": ref}).get_json() == {
+        "ok": True, "ref": ref, "rules": [], "total": 0, "children": [],
+    }
+
+
+def test_keyword_search(client, index):
+    body = client.get("/rules?q=commander damage").get_json()
+    assert body["q"] == "commander damage"
+    assert body["rules"] == [{"score": s, **entry_json(e)} for s, e in index.search("commander damage", 20)]
+    assert body["rules"] and client.get("/rules?q=the of").get_json()["rules"] == []
+
+
+@pytest.mark.parametrize("query", ["", "?ref=", "?q=%20%20", "?ref=%20&q="])
+def test_missing_ref_and_q(client, index, query):
+    resp = client.get("/rules" + query)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": "Missing ref or q"}
+
+
+def test_unavailable_index_answers_503(client, unavailable):
+    unavailable("RULES")
+    resp = client.get("/rules?ref=704.5")
+    assert resp.status_code == 503
+    assert resp.get_json() == {"ok": False, "error": "Rules index unavailable"}
+
+
+def test_rules_mode_replies_cite_rules(client, app_module, index, monkeypatch):
+    FakeOpenAI.requests = []
+    for name, value in (("USE_OPENAI", True), ("OPENAI_KEY", "key"), ("OPENAI_AVAILABLE", True),
+                        ("OpenAI", FakeOpenAI), ("RETRIEVAL_ENABLED", False)):
+        monkeypatch.setattr(app_module, name, value)
+    body = client.post("/api", json={"prompt": "What does CR 704.5a say?", "mode": "rules"}).get_json()
+    assert body["reply"] == "Answer." and body["sources"] == []
+    assert body["citations"][0]["rules"] == [f"CR {n}" for n in index.lookup("704.5a", prefix=False)[0].rules]
+    assert "citations" not in client.post("/api", json={"prompt": "CR 704.5a"}).get_json()
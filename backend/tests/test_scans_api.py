@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from replacements import PrintingsService
+
+CARDS = [
+    {"set": "ncc", "collector_number": "274", "lang": "en", "name": "Farseek", "id": "farseek-en",
+     "finishes": ["nonfoil", "foil"], "prices": {"usd": "0.40", "usd_foil": "1.20", "eur": "0.30"}},
+    {"set": "ncc", "collector_number": "274", "lang": "ja", "name": "Farseek", "id": "farseek-ja",
+     "finishes": ["foil"], "prices": {}},
+    {"set": "cmr", "collector_number": "472", "lang": "en", "name": "Sol Ring", "id": "sol-ring",
+     "finishes": ["nonfoil", "etched"], "prices": {"usd": "1.50", "usd_etched": "4.00", "eur_etched": "3.50"}},
+]
+ROWS = [{"set_code": "NCC", "collector_number": "274", "language": "Japanese", "foil": "yes", "card_name": "Farseek"},
+        {"set": "cmr", "collector_number": "0472", "finish": "etched", "card_name": "Arcane Signet"},
+        {"set_code": "XXX", "collector_number": "1"}]
+
+
+@pytest.fixture
+def printings(app_module, tmp_path, monkeypatch):
+    dump = tmp_path / "default_cards.json"
+    dump.write_text(json.dumps(CARDS))
+    service = PrintingsService(app_module.REPLACEMENT_ENGINE_DIR, str(dump))
+    monkeypatch.setattr(app_module, "PRINTINGS", service)
+    return service
+
+
+def test_rows_resolve_to_printings(client, printings):
+    body = client.post("/api/scans/resolve", json={"rows": ROWS}).get_json()
+    expected = printings.scans(ROWS)
+    assert [{k: v for k, v in row.items() if k != "price"} for row in body["rows"]] == expected.pop("rows")
+    assert {k: v for k, v in body.items() if k != "rows"} == {"ok": True, "currency": "USD", "total": 5.2, **expected}
+    farseek, sol_ring, unknown = body["rows"]
+    # The Japanese foil has no price of its own and borrows the English one.
+    assert (farseek["scryfall_id"], farseek["match"], farseek["usd"], farseek["price"]) == ("farseek-ja", "exact", 1.2, 1.2)
+    assert farseek["name_mismatch"] is False and farseek["finish_known"] is True
+    assert (sol_ring["card_name"], sol_ring["price"], sol_ring["name_mismatch"]) == ("Sol Ring", 4.0, True)
+    assert unknown["match"] is None and "price" not in unknown
+    assert (body["resolved"], body["unresolved"], body["name_mismatches"]) == (2, 1, 1)
+
+
+def test_csv_and_currencies(client, printings):
+    csv_text = "set_code,collector_number,language,foil\nNCC,274,English,no\n\nCMR,472,English,etched\n"
+    body = client.post("/api/scans/resolve", json={"csv": csv_text, "currency": "eur"}).get_json()
+    assert body["currency"] == "EUR" and [r["price"] for r in body["rows"]] == [0.3, 3.5] and body["total"] == 3.8
+    gbp = client.post("/api/scans/resolve", json={"csv": csv_text, "currency": "GBP"}).get_json()
+    assert gbp["ok"] and all(r["price"] > 0 for r in gbp["rows"])
+    assert client.post("/api/scans/resolve", json={"rows": ROWS[:1], "csv": csv_text}).get_json()["resolved"] == 1
+
+
+@pytest.mark.parametrize("body, error", [
+    (ROWS, "Expected a JSON object"),
+    ({}, "Missing 'rows' or 'csv'"),
+    ({"rows": []}, "Missing 'rows' or 'csv'"),
+    ({"rows": {"set": "CMR"}}, "Missing 'rows' or 'csv'"),
+    ({"csv": ["NCC,274"]}, "Missing 'rows' or 'csv'"),
+    ({"csv": "set_code,collector_number\n"}, "Missing 'rows' or 'csv'"),
+    ({"rows": ROWS, "currency": 5}, "Invalid 'currency'"),
+    ({"rows": ROWS, "currency": "tix"}, "Unsupported currency 'TIX'"),
+    ({"rows": [ROWS[0], "NCC 274"]}, "each scanned row must be an object"),
+    ({"rows": [["NCC", "274"]]}, "each scanned row must be an object"),
+])
+def test_rejects_malformed_bodies(client, printings, body, error):
+    resp = client.post("/api/scans/resolve", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+def test_limits(client, app_module, printings, monkeypatch):
+    assert client.post("/api/scans/resolve", data="{", content_type="application/json").get_json()["error"] == "Invalid JSON"
+    monkeypatch.setattr(app_module, "SCANS_MAX_ROWS", 2)
+    resp = client.post("/api/scans/resolve", json={"rows": ROWS})
+    assert resp.status_code == 400 and resp.get_json()["error"] == "At most 2 rows per request"
+    assert client.post("/api/scans/resolve", json={"rows": ROWS[:1], "pad": "x" * 500}).status_code == 413
+
+
+@pytest.mark.parametrize("path", ["", "labels.csv", "missing.json"])
+def test_unavailable_without_a_dump_or_store(client, app_module, tmp_path, monkeypatch, path):
+    labels = tmp_path / "labels.csv"
+    labels.write_text("card_name,set_code,collector_number\nFarseek,NCC,274\n")
+    service = PrintingsService(app_module.REPLACEMENT_ENGINE_DIR, str(tmp_path / path) if path else "")
+    monkeypatch.setattr(app_module, "PRINTINGS", service)
+    resp = client.post("/api/scans/resolve", json={"rows": ROWS})
+    assert resp.status_code == 503 and resp.get_json() == {"ok": False, "error": "printings_unavailable"}
+    assert service.metrics()["available"] is False and service.error
+
+
+def test_auth(anonymous_client, printings):
+    assert anonymous_client.post("/api/scans/resolve", json={"rows": ROWS}).status_code == 401
@@ -0,0 +1,86 @@
+import pytest
+
+KAUST = "Kaust, Cunning Instigator"
+
+
+@pytest.fixture
+def store(app_module):
+    return app_module.SYNERGY.warm()
+
+
+def test_top_matches_the_store(client, store):
+    body = client.get("/api/synergy", query_string={"commander": f" {KAUST} ", "n": 5, "offset": 2}).get_json()
+    assert body == {"ok": True, "commander": KAUST, "cards": store.top(KAUST, 5, 2)}
+    assert [c["synergy_score"] for c in body["cards"]] == sorted((c["synergy_score"] for c in body["cards"]), reverse=True)
+    assert len(client.get("/api/synergy", query_string={"commander": KAUST.upper()}).get_json()["cards"]) == 20
+
+
+def test_n_and_offset_are_clamped(client, app_module, store, monkeypatch):
+    monkeypatch.setattr(app_module, "SYNERGY_MAX_TOP", 3)
+    assert len(client.get("/api/synergy", query_string={"commander": KAUST, "n": 500}).get_json()["cards"]) == 3
+    assert len(client.get("/api/synergy", query_string={"commander": KAUST, "n": -4}).get_json()["cards"]) == 1
+    body = client.get("/api/synergy", query_string={"commander": KAUST, "n": 1, "offset": -9}).get_json()
+    assert body["cards"] == store.top(KAUST, 1)
+
+
+@pytest.mark.parametrize("query, status, error", [
+    ({}, 400, "Missing commander"),
+    ({"commander": "  "}, 400, "Missing commander"),
+    ({"commander": KAUST, "n": "ten"}, 400, "Invalid 'n' or 'offset'"),
+    ({"commander": KAUST, "n": "1.5"}, 400, "Invalid 'n' or 'offset'"),
+    ({"commander": KAUST, "offset": "x"}, 400, "Invalid 'n' or 'offset'"),
+    ({"commander": "Nobody At All"}, 404, "Unknown commander"),
+])
+def test_top_rejects_bad_queries(client, store, query, status, error):
+    resp = client.get("/api/synergy", query_string=query)
+    assert resp.status_code == status
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+def test_score_pairs_match_the_store(client, store):
+    card = store.top(KAUST, 1)[0]["card_name"]
+    pairs = [[KAUST, card], {"commander": KAUST.lower(), "card_name": card}, {"commander": KAUST, "card": card},
+             [KAUST, "Not A Card"], ["Nobody", card]]
+    body = client.post("/api/synergy/score", json={"pairs": pairs}).get_json()
+    score = store.top(KAUST, 1)[0]["synergy_score"]
+    assert body == {"ok": True, "scores": [score, score, score, None, None]}
+    assert client.post("/api/synergy/score", json={"pairs": []}).get_json() == {"ok": True, "scores": []}
+
+
+@pytest.mark.parametrize("body, error", [
+    ([[KAUST, "Sol Ring"]], "Missing 'pairs'"),
+    ({}, "Missing 'pairs'"),
+    ({"pairs": {KAUST: "Sol Ring"}}, "Missing 'pairs'"),
+    ({"pairs": "Sol Ring"}, "Missing 'pairs'"),
+    ({"pairs": [[KAUST]]}, "Each pair must be [commander, card]"),
+    ({"pairs": [[KAUST, "Sol Ring", "Extra"]]}, "Each pair must be [commander, card]"),
+    ({"pairs": [[KAUST, 3]]}, "Each pair must be [commander, card]"),
+    ({"pairs": [{"commander": KAUST}]}, "Each pair must be [commander, card]"),
+    ({"pairs": ["Sol Ring"]}, "Each pair must be [commander, card]"),
+    ({"pairs": [None]}, "Each pair must be [commander, card]"),
+])
+def test_score_rejects_malformed_bodies(client, store, body, error):
+    resp = client.post("/api/synergy/score", json=body)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": error}
+
+
+def test_score_limits(client, app_module, store, monkeypatch):
+    assert client.post("/api/synergy/score", data="{", content_type="application/json").get_json()["error"] == "Invalid JSON"
+    monkeypatch.setattr(app_module, "SYNERGY_MAX_PAIRS", 2)
+    resp = client.post("/api/synergy/score", json={"pairs": [[KAUST, "Sol Ring"]] * 3})
+    assert resp.status_code == 413 and resp.get_json()["error"] == "At most 2 pairs per request"
+    assert client.post("/api/synergy/score", json={"pairs": [[KAUST, "x" * 500]]}).status_code == 413
+
+
+def test_synergy_needs_the_api_token(anonymous_client):
+    assert anonymous_client.get("/api/synergy", query_string={"commander": KAUST}).status_code == 401
+    assert anonymous_client.post("/api/synergy/score", json={"pairs": []}).status_code == 401
+
+
+def test_unavailable_store_answers_503(client, unavailable):
+    unavailable("SYNERGY")
+    resp = client.get("/api/synergy", query_string={"commander": KAUST})
+    assert resp.status_code == 503 and resp.get_json()["error"] == "synergy_unavailable"
+    resp = client.post("/api/synergy/score", json={"pairs": [[KAUST, "Sol Ring"]]})
+    assert resp.status_code == 503 and resp.get_json()["error"] == "synergy_unavailable"
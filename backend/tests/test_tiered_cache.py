@@ -0,0 +1,89 @@
+import time
+
+from tiered_cache import Namespace, TieredCache
+
+NAMESPACES = {"card": Namespace(ttl_seconds=60, l1_max=2, l2_max=100), "fx": Namespace(ttl_seconds=60)}
+
+
+def test_l1_round_trip_without_l2():
+    cache = TieredCache(None, NAMESPACES)
+    cache.set("card", "sol ring", {"name": "Sol Ring"})
+    assert cache.get("card", "sol ring") == {"name": "Sol Ring"}
+    assert cache.get("card", "island", "missing") == "missing"
+    assert cache.metrics()["l2_path"] is None
+
+
+def test_l2_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "upstream.sqlite3")
+    worker_a = TieredCache(path, NAMESPACES)
+    worker_b = TieredCache(path, NAMESPACES)
+    worker_a.set("card", "sol ring", {"price": 1.5})
+    assert worker_b.get("card", "sol ring") == {"price": 1.5}
+    assert worker_b.stats["card"]["l2_hits"] == 1
+    # Promoted into worker B's L1.
+    assert worker_b.get("card", "sol ring") == {"price": 1.5}
+    assert worker_b.stats["card"]["l1_hits"] == 1
+
+
+def test_l2_survives_a_restart(tmp_path):
+    path = str(tmp_path / "upstream.sqlite3")
+    TieredCache(path, NAMESPACES).set("fx", "USD", {"GBP": 0.8})
+    assert TieredCache(path, NAMESPACES).get("fx", "USD") == {"GBP": 0.8}
+
+
+def test_entries_expire_after_the_namespace_ttl(tmp_path):
+    cache = TieredCache(str(tmp_path / "upstream.sqlite3"), NAMESPACES)
+    cache.set("card", "old", 1, stored_at=time.time() - 61)
+    cache.set("card", "new", 2, stored_at=time.time() - 59)
+    assert cache.get("card", "old") is None
+    assert cache.get("card", "new") == 2
+    # Stale entries are still visible to the refresher.
+    assert cache.peek_stored_at("card", "old") is not None
+
+
+def test_l1_evicts_least_recently_used():
+    cache = TieredCache(None, NAMESPACES)
+    cache.set("card", "a", 1)
+    cache.set("card", "b", 2)
+    cache.get("card", "a")
+    cache.set("card", "c", 3)
+    assert cache.get("card", "b") is None
+    assert cache.get("card", "a") == 1
+    assert cache.get("card", "c") == 3
+
+
+def test_unwritable_path_degrades_to_l1(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("not a directory")
+    cache = TieredCache(str(blocker / "upstream.sqlite3"), NAMESPACES)
+    assert cache.path is None
+    cache.set("card", "sol ring", 1)
+    assert cache.get("card", "sol ring") == 1
+
+
+def test_metrics_report_hit_rate_per_namespace():
+    cache = TieredCache(None, NAMESPACES)
+    cache.set("card", "a", 1)
+    cache.get("card", "a")
+    cache.get("card", "b")
+    card = cache.metrics()["card"]
+    assert (card["l1_hits"], card["misses"], card["writes"], card["hit_rate"]) == (1, 1, 1, 0.5)
+    assert cache.metrics()["fx"]["hit_rate"] is None
+
+
+def test_card_lookups_are_cached_and_failures_are_not(app_module, scryfall, client):
+    scryfall.cards["Sol Ring"] = {"name": "Sol Ring", "type_line": "Artifact", "prices": {"usd": "1.00"}}
+    first = client.get("/card", query_string={"name": "Sol Ring"}).get_json()
+    second = client.get("/card", query_string={"name": "Sol Ring"}).get_json()
+    assert first == second
+    assert first["data"]["data"]["name"] == "Sol Ring"
+    assert len(scryfall.calls) == 1
+
+    client.get("/card", query_string={"name": "No Such Card"})
+    client.get("/card", query_string={"name": "No Such Card"})
+    assert len(scryfall.calls) == 3
+    assert app_module.UPSTREAM_CACHE.get("card", "no such card") is None
+
+
+def test_card_route_requires_a_name(client):
+    assert client.get("/card").status_code == 400
@@ -0,0 +1,174 @@
+# backend/tiered_cache.py
+"""
+Two-tier cache for upstream (Scryfall / Spellbook) responses.
+
+L1 is a per-process LRU dict. L2 is a SQLite database in WAL mode on local
+disk, so every gunicorn worker on the host shares it and it survives worker
+recycles and restarts. Each namespace has its own TTL and size caps.
+Values must be JSON-serialisable.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class Namespace(NamedTuple):
+    ttl_seconds: float
+    l1_max: int = 5000
+    l2_max: int = 200000
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+CREATE INDEX IF NOT EXISTS cache_ns_stored_at ON cache (ns, stored_at);
+"""
+
+# Trim an L2 namespace back to its cap every this many writes.
+_TRIM_EVERY = 500
+
+
+class TieredCache:
+    def __init__(self, path: Optional[str], namespaces: Dict[str, Namespace]):
+        self.path = path or None
+        self.namespaces = dict(namespaces)
+        self._l1: Dict[str, "OrderedDict[str, CacheEntry]"] = {ns: OrderedDict() for ns in self.namespaces}
+        self._l1_lock = threading.Lock()
+        self._local = threading.local()
+        self._writes: Dict[str, int] = {ns: 0 for ns in self.namespaces}
+        self.started_at = time.time()
+        self.stats: Dict[str, Dict[str, int]] = {
+            ns: {"l1_hits": 0, "l2_hits": 0, "misses": 0, "writes": 0, "l2_errors": 0} for ns in self.namespaces
+        }
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._conn().executescript(_SCHEMA)
+            except (OSError, sqlite3.Error):
+                # Unwritable disk: degrade to L1 only rather than failing boot.
+                self.path = None
+
+    # -- L2 plumbing ---------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are neither thread- nor fork-safe; keep one per
+        # (process, thread).
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != pid:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def _l2_get(self, ns: str, key: str) -> Optional[CacheEntry]:
+        if not self.path:
+            return None
+        try:
+            row = self._conn().execute(
+                "SELECT value, stored_at FROM cache WHERE ns = ? AND key = ?", (ns, key)
+            ).fetchone()
+        except sqlite3.Error:
+            self.stats[ns]["l2_errors"] += 1
+            return None
+        if not row:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1])
+
+    def _l2_set(self, ns: str, key: str, entry: CacheEntry):
+        if not self.path:
+            return
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (ns, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                (ns, key, json.dumps(entry.value, separators=(",", ":")), entry.stored_at),
+            )
+            self._writes[ns] += 1
+            if self._writes[ns] % _TRIM_EVERY == 0:
+                self._l2_trim(conn, ns)
+        except sqlite3.Error:
+            self.stats[ns]["l2_errors"] += 1
+
+    def _l2_trim(self, conn: sqlite3.Connection, ns: str):
+        cfg = self.namespaces[ns]
+        conn.execute("DELETE FROM cache WHERE ns = ? AND stored_at < ?", (ns, time.time() - cfg.ttl_seconds))
+        conn.execute(
+            "DELETE FROM cache WHERE ns = ? AND key IN ("
+            " SELECT key FROM cache WHERE ns = ? ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (ns, ns, cfg.l2_max),
+        )
+
+    # -- L1 plumbing ---------------------------------------------------
+    def _l1_put(self, ns: str, key: str, entry: CacheEntry):
+        with self._l1_lock:
+            l1 = self._l1[ns]
+            l1[key] = entry
+            l1.move_to_end(key)
+            while len(l1) > self.namespaces[ns].l1_max:
+                l1.popitem(last=False)
+
+    # -- Public API ----------------------------------------------------
+    def get_entry(self, ns: str, key: str) -> Optional[CacheEntry]:
+        """Fresh entry for `key`, or None. Counts toward hit-rate stats."""
+        now = time.time()
+        ttl = self.namespaces[ns].ttl_seconds
+        with self._l1_lock:
+            entry = self._l1[ns].get(key)
+            if entry is not None:
+                self._l1[ns].move_to_end(key)
+        if entry is not None and now - entry.stored_at < ttl:
+            self.stats[ns]["l1_hits"] += 1
+            return entry
+        entry = self._l2_get(ns, key)
+        if entry is not None and now - entry.stored_at < ttl:
+            self.stats[ns]["l2_hits"] += 1
+            self._l1_put(ns, key, entry)
+            return entry
+        self.stats[ns]["misses"] += 1
+        return None
+
+    def get(self, ns: str, key: str, default: Any = None) -> Any:
+        entry = self.get_entry(ns, key)
+        return default if entry is None else entry.value
+
+    def peek_stored_at(self, ns: str, key: str) -> Optional[float]:
+        """When `key` was stored (even if stale), without touching stats."""
+        # L2 first: another worker may have refreshed it since our L1 copy.
+        entry = self._l2_get(ns, key)
+        if entry is None:
+            with self._l1_lock:
+                entry = self._l1[ns].get(key)
+        return entry.stored_at if entry else None
+
+    def set(self, ns: str, key: str, value: Any, stored_at: Optional[float] = None):
+        entry = CacheEntry(value, time.time() if stored_at is None else stored_at)
+        self.stats[ns]["writes"] += 1
+        self._l1_put(ns, key, entry)
+        self._l2_set(ns, key, entry)
+
+    def metrics(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"l2_path": self.path, "uptime_seconds": round(time.time() - self.started_at, 1)}
+        for ns, s in self.stats.items():
+            lookups = s["l1_hits"] + s["l2_hits"] + s["misses"]
+            out[ns] = dict(
+                s,
+                l1_size=len(self._l1[ns]),
+                hit_rate=round((s["l1_hits"] + s["l2_hits"]) / lookups, 4) if lookups else None,
+            )
+        return out